@@ -0,0 +1,273 @@
+"""
+Soporte de los tests de la API de extremo a extremo con `TestClient`.
+
+La base de datos se sustituye por `FakeDatabase`, un almacén en memoria con
+los mismos métodos que `Database` y las consultas SQL que usan los
+endpoints; el almacenamiento (Parquet), las instantáneas y la cola de
+trabajos son los reales, en un directorio temporal. Así cada petición pasa
+por `run_anonymization_job` igual que en el servidor. Los tests de cada
+subsistema (`test_*_api.py`) importan de aquí la aplicación y los ayudantes.
+"""
+import copy
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+import database
+
+# --------------------------------------------------
+# BASE DE DATOS EN MEMORIA
+# --------------------------------------------------
+JSONB_COLUMNS = {"column_names", "schema", "column_stats", "column_mappings", "techniques", "global_params", "metrics",
+                 "technique_details", "anonymized_data", "segments", "details"}
+
+
+class FakeDatabase:
+    """Tablas como listas de diccionarios; los JSONB se guardan decodificados, como los devuelve psycopg2."""
+
+    def __init__(self):
+        self.tables = {}
+        self.result_cache = {}
+        self.lock = threading.RLock()
+
+    def _rows(self, table):
+        return self.tables.setdefault(table, [])
+
+    @staticmethod
+    def _store(data):
+        return {key: json.loads(value) if key in JSONB_COLUMNS and isinstance(value, str) else value
+                for key, value in data.items()}
+
+    @staticmethod
+    def _matches(row, filters):
+        return all(str(row.get(key)) == str(value) for key, value in (filters or {}).items())
+
+    def _find(self, table, filters):
+        return [row for row in self._rows(table) if self._matches(row, filters)]
+
+    def insert_returning(self, table, data):
+        with self.lock:
+            row = {"id": str(uuid.uuid4()), **self._store(data)}
+            self._rows(table).append(row)
+            return copy.deepcopy(row)
+
+    def select(self, table, filters=None, order_by=None, limit=None):
+        with self.lock:
+            rows = self._find(table, filters)
+            return copy.deepcopy(rows[:limit] if limit else rows)
+
+    def select_one(self, table, filters):
+        results = self.select(table, filters, limit=1)
+        return results[0] if results else None
+
+    def update(self, table, data, filters):
+        with self.lock:
+            rows = self._find(table, filters)
+            for row in rows:
+                row.update(self._store(data))
+            return copy.deepcopy(rows[0]) if rows else None
+
+    def delete(self, table, filters):
+        with self.lock:
+            self.tables[table] = [row for row in self._rows(table) if not self._matches(row, filters)]
+            return True
+
+    def select_jsonb_range(self, table, column, filters, offset, limit):
+        row = self.select_one(table, filters)
+        return (row.get(column) or [])[offset:offset + limit] if row else []
+
+    def iter_jsonb_array(self, table, column, filters, batch_rows):
+        row = self.select_one(table, filters)
+        values = [json.dumps(value) for value in (row.get(column) or [])] if row else []
+        for start in range(0, len(values), batch_rows):
+            yield values[start:start + batch_rows]
+
+    def jsonb_array_parts(self, table, column, link_column, filters):
+        parts, row = [], self.select_one(table, filters)
+        while row is not None:
+            parts.insert(0, {"id": row["id"], "total": len(row.get(column) or [])})
+            row = self.select_one(table, {"id": row[link_column]}) if row.get(link_column) else None
+        return parts
+
+    def jsonb_array_length(self, table, column, filters):
+        row = self.select_one(table, filters)
+        return len(row.get(column) or []) if row else 0
+
+    def execute_query(self, query, params=None, fetch=False):
+        rows = self._execute(" ".join(query.split()), params or ())
+        return rows if fetch else None
+
+    def execute_one(self, query, params=None):
+        rows = self._execute(" ".join(query.split()), params or ())
+        return rows[0] if rows else None
+
+    def _execute(self, query, params):
+        with self.lock:
+            if query.startswith("UPDATE datasets SET status = 'appending'"):
+                rows = self._find("datasets", {"id": params[0], "status": "ready"})
+                for row in rows:
+                    row["status"] = "appending"
+                return [{"id": row["id"]} for row in rows]
+            if query.startswith("UPDATE anonymization_results r SET anonymized_data = %s::jsonb, base_result_id"):
+                delta, job_id, base_id, status = params
+                target = self._find("anonymization_results", {"id": job_id})
+                base = self._find("anonymization_results", {"id": base_id, "status": status,
+                                                            "config_id": target[0]["config_id"] if target else None})
+                if not base or not target:
+                    return []
+                target[0].update(anonymized_data=json.loads(delta), base_result_id=base_id)
+                return [{"id": job_id}]
+            if query.startswith("UPDATE result_cache"):
+                user_id, key, status = params
+                entry = self.result_cache.get((user_id, key))
+                if entry is None or not self._find("anonymization_results", {"id": entry["result_id"],
+                                                                             "status": status}):
+                    return []
+                entry["hits"] += 1
+                return [{"result_id": entry["result_id"]}]
+            if query.startswith("INSERT INTO result_cache"):
+                user_id, key, dataset_id, result_id, configuration_hash, seed, size_bytes = params
+                hits = self.result_cache.get((user_id, key), {}).get("hits", 0)
+                self.result_cache[(user_id, key)] = {"dataset_id": dataset_id, "result_id": result_id,
+                                                     "size_bytes": size_bytes, "hits": hits}
+                return []
+            if query.startswith("DELETE FROM result_cache WHERE (user_id, cache_key) IN"):
+                return []
+            if query.startswith("DELETE FROM result_cache WHERE user_id = %s"):
+                removed = [(user, key) for (user, key), entry in self.result_cache.items()
+                           if user == params[0] and (len(params) == 1 or entry["dataset_id"] == params[1])]
+                for entry_key in removed:
+                    del self.result_cache[entry_key]
+                return [{"cache_key": key} for _, key in removed]
+            if "FROM result_cache WHERE user_id = %s" in query:
+                entries = [entry for (user, _), entry in self.result_cache.items() if user == params[0]]
+                return [{"entries": len(entries), "size_bytes": sum(e["size_bytes"] for e in entries),
+                         "hits": sum(e["hits"] for e in entries)}]
+
+            # Listados por keyset (list_rows): ... ORDER BY created_at DESC, id DESC [LIMIT %s]
+            match = re.fullmatch(r"SELECT (.+) FROM (\w+)(?: WHERE (.+))? ORDER BY created_at DESC, id DESC"
+                                 r"( LIMIT %s)?", query)
+            if match:
+                fields = [field.strip() for field in match.group(1).split(",")]
+                params = list(params)
+                limit = params.pop() if match.group(4) else None
+                keys = re.findall(r"(?<!\()\b(\w+) = %s", match.group(3) or "")
+                rows = self._find(match.group(2), dict(zip(keys, params)))
+                if "(created_at, id) < (%s, %s)" in (match.group(3) or ""):
+                    after = tuple(params[len(keys):len(keys) + 2])
+                    rows = [row for row in rows if (row["created_at"], row["id"]) < after]
+                rows = sorted(rows, key=lambda row: (row["created_at"], row["id"]), reverse=True)[:limit]
+                return [{field: copy.deepcopy(row.get(field)) for field in fields} for row in rows]
+
+            # SELECT campo, ... FROM tabla WHERE clave = %s AND ... (select_fields)
+            match = re.fullmatch(r"SELECT (.+) FROM (\w+) WHERE (.+)", query)
+            if match:
+                fields = [field.strip() for field in match.group(1).split(",")]
+                keys = re.findall(r"(\w+) = %s", match.group(3))
+                rows = self._find(match.group(2), dict(zip(keys, params)))
+                return [{field: copy.deepcopy(row.get(field)) for field in fields} for row in rows]
+            raise NotImplementedError(f"FakeDatabase does not support: {query}")
+
+
+# --------------------------------------------------
+# APLICACIÓN CON LA BASE DE DATOS EN MEMORIA
+# --------------------------------------------------
+TMP_DIR = tempfile.mkdtemp(prefix="anonymization-api-")
+FAKE_DB = FakeDatabase()
+
+
+def _credentials():
+    # Los valores de credentials.example.json, con todo lo que escribe el servidor en un directorio temporal
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "credentials.example.json"),
+              encoding="utf-8") as f:
+        credentials = json.load(f)
+    credentials["backend"].update(job_workers=2, execution_workers=1)
+    credentials["storage"].update(backend="parquet", path=f"{TMP_DIR}/storage", frame_cache_mb=16)
+    credentials["pseudonym_vault"]["enabled"] = False
+    credentials["anonymization"]["snapshot_path"] = f"{TMP_DIR}/snapshots"
+    return credentials
+
+
+_original = database.load_credentials, database.get_database
+database.load_credentials, database.get_database = _credentials, lambda: FAKE_DB
+try:
+    import main
+finally:
+    database.load_credentials, database.get_database = _original
+
+from differential_privacy import MemoryBudgetLedger
+from fastapi.testclient import TestClient
+
+main.privacy_ledger = MemoryBudgetLedger()
+client = TestClient(main.app)
+
+HIERARCHIES = {"edad": {"type": "intervals", "widths": [10, 20]}, "ciudad": {"type": "suppress"}}
+
+
+def csv_bytes(n, seed, start=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "nombre": [f"persona-{start + i}" for i in range(n)],
+        "edad": rng.integers(20, 70, n),
+        "ciudad": rng.choice(["Madrid", "Sevilla", "Bilbao"], n),
+        "salario": rng.normal(30000, 4000, n).round(2),
+    })
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def upload_dataset(n=120, seed=1):
+    response = client.post("/api/datasets/upload", files={"file": ("personas.csv", io.BytesIO(csv_bytes(n, seed)),
+                                                                   "text/csv")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def create_config(dataset_id, epsilon=1.0, **global_params):
+    response = client.post("/api/configs", json={
+        "dataset_id": dataset_id,
+        "name": "test",
+        "column_mappings": [
+            {"column": "nombre", "type": "identifier"},
+            {"column": "edad", "type": "quasi-identifier"},
+            {"column": "ciudad", "type": "quasi-identifier"},
+            {"column": "salario", "type": "sensitive"},
+        ],
+        "techniques": [
+            {"column": "salario", "technique": "differential_privacy",
+             "params": {"epsilon": epsilon, "lower": 0, "upper": 100000}},
+        ],
+        "global_params": {"k": 3, "l": 1, "hierarchies": HIERARCHIES, "max_suppression": 0.1, **global_params},
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def wait_for_job(job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            assert job["status"] == "completed", job.get("error_message")
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def process(dataset_id, config_id, use_cache=True):
+    response = client.post("/api/process", json={"dataset_id": dataset_id, "config_id": config_id,
+                                                 "use_cache": use_cache})
+    assert response.status_code in (200, 202), response.text
+    job = response.json()
+    return response.status_code, job, wait_for_job(job["id"])
+
+
+def result_rows(result_id):
+    return client.get(f"/api/results/{result_id}").json()["anonymized_data"]
@@ -0,0 +1,47 @@
+"""Benchmark del enmascaramiento: versión vectorizada (`apply_masking`) frente a la
+implementación celda a celda original (`_apply_masking_elementwise`).
+
+Genera columnas de 1M de filas para cada modo, comprueba que ambas salidas son
+idénticas y muestra el tiempo de cada una.
+
+Uso:
+    python benchmark_masking.py [filas]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from techniques import apply_masking, _apply_masking_elementwise
+
+
+def build_columns(rows):
+    rng = np.random.default_rng(42)
+    ids = rng.integers(0, 100000, rows)
+    return {
+        "email": pd.Series([f"usuario.{i}@dominio{i % 50}.com" for i in ids], dtype=object),
+        "phone": pd.Series(rng.integers(600000000, 699999999, rows)),
+        "middle": pd.Series([f"ES{i:020d}" for i in ids], dtype=object),
+        "partial": pd.Series([f"Nombre{i % 1000} Apellido{i % 777}" for i in ids], dtype=object),
+        "default": pd.Series([f"Direccion {i}" for i in ids], dtype=object),
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    columns = build_columns(rows)
+
+    print(f"Enmascaramiento sobre {rows:,} filas")
+    print(f"{'modo':<10}{'vectorizado (s)':>18}{'celda a celda (s)':>20}{'speedup':>10}{'idéntico':>10}")
+    for mask_type, series in columns.items():
+        vectorized, vectorized_time = timed(apply_masking, series, mask_type, "*")
+        elementwise, elementwise_time = timed(_apply_masking_elementwise, series, mask_type, "*")
+        identical = vectorized.astype(object).equals(elementwise.astype(object))
+        print(f"{mask_type:<10}{vectorized_time:>18.3f}{elementwise_time:>20.3f}"
+              f"{elementwise_time / vectorized_time:>9.1f}x{str(identical):>10}")
@@ -1,11 +1,12 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor, Json
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import ThreadedConnectionPool
 import json
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 from contextlib import contextmanager
 import os
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +19,8 @@ class Database:
     def _initialize_pool(self):
         try:
             db_config = self.credentials['database']
-            self.pool = SimpleConnectionPool(
+            # Las peticiones y la cola de trabajos usan el pool desde varios hilos
+            self.pool = ThreadedConnectionPool(
                 minconn=1,
                 maxconn=10,
                 host=db_config['host'],
@@ -111,6 +113,75 @@ class Database:
 
         return self.execute_one(query, values)
 
+    def select_jsonb_range(self, table: str, column: str, filters: Dict, offset: int, limit: int) -> List[Any]:
+        where_clause = ' AND '.join([f"t.{key} = %s" for key in filters.keys()])
+        values = tuple(filters.values()) + (offset, limit)
+
+        query = f"""
+            SELECT e.elem
+            FROM {table} t
+            CROSS JOIN LATERAL jsonb_array_elements(t.{column}) WITH ORDINALITY AS e(elem, idx)
+            WHERE {where_clause}
+            ORDER BY e.idx
+            OFFSET %s LIMIT %s
+        """
+
+        rows = self.execute_query(query, values, fetch=True)
+        return [row['elem'] for row in rows]
+
+    def iter_jsonb_array(self, table: str, column: str, filters: Dict, batch_rows: int) -> Iterator[List[str]]:
+        where_clause = ' AND '.join([f"t.{key} = %s" for key in filters.keys()])
+
+        # Con un único registro, jsonb_array_elements ya devuelve el arreglo en orden: sin ORDER BY
+        # el servidor entrega las primeras filas sin esperar a ordenar el resto
+        query = f"""
+            SELECT e.elem::text AS elem
+            FROM {table} t
+            CROSS JOIN LATERAL jsonb_array_elements(t.{column}) AS e(elem)
+            WHERE {where_clause}
+        """
+
+        # Cursor de servidor: sólo hay un lote en memoria; la conexión queda ocupada hasta terminar
+        with self.get_connection() as conn:
+            with conn.cursor(name=f"jsonb_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = batch_rows
+                cursor.execute(query, tuple(filters.values()))
+                while True:
+                    rows = cursor.fetchmany(batch_rows)
+                    if not rows:
+                        break
+                    yield [row[0] for row in rows]
+
+    def jsonb_array_parts(self, table: str, column: str, link_column: str, filters: Dict) -> List[Dict]:
+        """
+        Partes de un arreglo JSONB repartido en una cadena de filas: la fila de
+        `filters` y las que amplía siguiendo `link_column`. Devuelve el id y el
+        número de elementos de cada parte, de la primera a la última.
+        """
+        where_clause = ' AND '.join([f"t.{key} = %s" for key in filters.keys()])
+        query = f"""
+            WITH RECURSIVE parts AS (
+                SELECT t.id, t.{link_column} AS link, 0 AS depth
+                FROM {table} t
+                WHERE {where_clause}
+                UNION ALL
+                SELECT b.id, b.{link_column}, p.depth + 1
+                FROM {table} b
+                JOIN parts p ON b.id = p.link
+            )
+            SELECT p.id, COALESCE(jsonb_array_length(t.{column}), 0) AS total
+            FROM parts p
+            JOIN {table} t ON t.id = p.id
+            ORDER BY p.depth DESC
+        """
+        return self.execute_query(query, tuple(filters.values()), fetch=True)
+
+    def jsonb_array_length(self, table: str, column: str, filters: Dict) -> int:
+        where_clause = ' AND '.join([f"{key} = %s" for key in filters.keys()])
+        query = f"SELECT COALESCE(jsonb_array_length({column}), 0) AS total FROM {table} WHERE {where_clause}"
+        result = self.execute_one(query, tuple(filters.values()))
+        return int(result['total']) if result else 0
+
     def delete(self, table: str, filters: Dict) -> bool:
         where_clause = ' AND '.join([f"{key} = %s" for key in filters.keys()])
         values = tuple(filters.values())
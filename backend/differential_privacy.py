@@ -0,0 +1,296 @@
+"""
+Privacidad diferencial: mecanismos vectorizados y contabilidad del presupuesto.
+
+Mecanismos (sobre la columna completa, en una sola pasada de NumPy):
+
+    - Laplace: ruido Laplace(0, Δ/ε); ε-DP.
+    - Gaussiano: ruido N(0, σ²) con σ = Δ·sqrt(2·ln(1.25/δ))/ε; (ε, δ)-DP
+      (cota clásica, válida para ε < 1).
+    - Geométrico: diferencia de dos geométricas con α = exp(-ε/Δ), el
+      análogo entero de Laplace; el resultado sigue siendo entero.
+
+Antes de añadir el ruido los valores se recortan a los límites `[lower,
+upper]` y la sensibilidad es Δ = upper - lower. Los límites vienen de los
+parámetros de la técnica o, si no se indican, del perfil de la columna
+(`datasets.column_stats`), así que no hace falta recorrer los datos. Los
+nulos se conservan.
+
+Cada ejecución consume presupuesto del dataset. `PrivacyAccountant` suma lo
+gastado con composición secuencial (los ε y los δ se suman) en un registro
+persistente (`privacy_budget_ledger`) y rechaza con
+`PrivacyBudgetExceeded` la ejecución que superaría el presupuesto.
+"""
+import logging
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from randomness import RandomStreams
+
+logger = logging.getLogger(__name__)
+
+MECHANISMS = ("laplace", "gaussian", "geometric")
+DEFAULT_MECHANISM = "laplace"
+DEFAULT_DELTA = 1e-6
+# Margen para no rechazar por errores de redondeo al sumar ε
+_BUDGET_TOLERANCE = 1e-9
+
+
+class PrivacyBudgetExceeded(ValueError):
+    """La ejecución superaría el presupuesto de privacidad del dataset."""
+
+
+# --------------------------------------------------
+# MECANISMOS
+# --------------------------------------------------
+def clamp_bounds(profile: Optional[Dict], params: Optional[Dict] = None) -> Optional[Tuple[float, float]]:
+    """
+    Límites de recorte de una columna: `params.lower`/`params.upper` si se
+    indican y, para los que falten, el mínimo y el máximo del perfil.
+    """
+    params = params or {}
+    lower, upper = params.get("lower"), params.get("upper")
+    if profile and profile.get("kind") == "numeric" and profile.get("min") is not None:
+        lower = profile["min"] if lower is None else lower
+        upper = profile["max"] if upper is None else upper
+    if lower is None or upper is None:
+        return None
+    if float(lower) > float(upper):
+        raise ValueError(f"Límites de recorte inválidos: {lower} > {upper}")
+    return float(lower), float(upper)
+
+
+def noise_scale(mechanism: str, epsilon: float, sensitivity: float, delta: Optional[float] = None) -> float:
+    """Escala del ruido: b de Laplace, σ del gaussiano o Δ/ε del geométrico."""
+    if mechanism not in MECHANISMS:
+        raise ValueError(f"Mecanismo no soportado: {mechanism}")
+    if epsilon <= 0:
+        raise ValueError(f"Epsilon debe ser positivo: {epsilon}")
+    if mechanism == "gaussian":
+        delta = DEFAULT_DELTA if delta is None else delta
+        if not 0 < delta < 1:
+            raise ValueError(f"Delta debe estar en (0, 1): {delta}")
+        return sensitivity * math.sqrt(2 * math.log(1.25 / delta)) / epsilon
+    return sensitivity / epsilon
+
+
+def privatize(series: pd.Series, epsilon: float, bounds: Tuple[float, float], mechanism: str = DEFAULT_MECHANISM,
+              delta: Optional[float] = None, streams: RandomStreams = None, column: str = None,
+              offset: int = 0) -> pd.Series:
+    """
+    Recorta `series` a `bounds` y le añade el ruido de `mechanism`. El ruido
+    de la fila `offset + i` depende sólo de la semilla y la columna, así que
+    la serie puede procesarse entera o por bloques.
+    """
+    lower, upper = bounds
+    sensitivity = upper - lower
+    scale = noise_scale(mechanism, epsilon, sensitivity, delta)
+    if streams is None:
+        streams = RandomStreams()
+    column = column if column is not None else series.name
+
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+    np.clip(values, lower, upper, out=values)
+    if sensitivity > 0:
+        if mechanism == "laplace":
+            values += streams.laplace(column, len(values), scale, offset)
+        elif mechanism == "gaussian":
+            values += streams.normal(column, len(values), scale, offset)
+        else:
+            np.rint(values, out=values)
+            values += streams.two_sided_geometric(column, len(values), math.exp(-1.0 / scale), offset)
+
+    result = pd.Series(values, index=series.index, name=series.name)
+    if mechanism == "geometric" and not np.isnan(values).any():
+        result = result.astype(np.int64)
+    return result
+
+
+# --------------------------------------------------
+# CONTABILIDAD DEL PRESUPUESTO
+# --------------------------------------------------
+def technique_charges(techniques: List[Dict], columns) -> List[Dict]:
+    """Gasto (ε, δ) de cada técnica de privacidad diferencial sobre una columna existente."""
+    charges = []
+    for tech in techniques:
+        if tech.get("technique") != "differential_privacy" or tech.get("column") not in columns:
+            continue
+        params = tech.get("params", {})
+        mechanism = params.get("mechanism", DEFAULT_MECHANISM)
+        charges.append({
+            "column": tech["column"],
+            "mechanism": mechanism,
+            "epsilon": float(params.get("epsilon", 1.0)),
+            "delta": float(params.get("delta", DEFAULT_DELTA)) if mechanism == "gaussian" else 0.0,
+        })
+    return charges
+
+
+def _within(spent: float, charge: float, budget: Optional[float]) -> bool:
+    return budget is None or spent + charge <= budget + _BUDGET_TOLERANCE
+
+
+class BudgetLedger:
+    name = "base"
+
+    def spent(self, dataset_id: str) -> Dict[str, float]:
+        """ε y δ ya gastados por el dataset."""
+        raise NotImplementedError
+
+    def charge(self, dataset_id: str, charges: List[Dict], budget: Dict, result_id: Optional[str] = None) -> Dict:
+        """
+        Registra `charges` sólo si, sumados a lo gastado, caben en `budget`;
+        la comprobación y la inserción son atómicas. Devuelve el gasto total.
+        """
+        raise NotImplementedError
+
+    def entries(self, dataset_id: str) -> List[Dict]:
+        raise NotImplementedError
+
+
+class PostgresBudgetLedger(BudgetLedger):
+    name = "postgres"
+
+    def __init__(self, db):
+        self.db = db
+
+    def spent(self, dataset_id):
+        row = self.db.execute_one(
+            """
+            SELECT COALESCE(SUM(epsilon), 0) AS epsilon, COALESCE(SUM(delta), 0) AS delta
+            FROM privacy_budget_ledger WHERE dataset_id = %s
+            """,
+            (dataset_id,)
+        )
+        return {"epsilon": float(row["epsilon"]), "delta": float(row["delta"])}
+
+    def charge(self, dataset_id, charges, budget, result_id=None):
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                # El bloqueo de la fila del dataset serializa los cargos concurrentes
+                cursor.execute("SELECT id FROM datasets WHERE id = %s FOR UPDATE", (dataset_id,))
+                cursor.execute(
+                    """
+                    SELECT COALESCE(SUM(epsilon), 0), COALESCE(SUM(delta), 0)
+                    FROM privacy_budget_ledger WHERE dataset_id = %s
+                    """,
+                    (dataset_id,)
+                )
+                spent_epsilon, spent_delta = (float(v) for v in cursor.fetchone())
+                check_budget(spent_epsilon, spent_delta, charges, budget)
+                cursor.execute(
+                    """
+                    INSERT INTO privacy_budget_ledger (dataset_id, result_id, column_name, mechanism, epsilon, delta)
+                    SELECT %s, %s, c.column_name, c.mechanism, c.epsilon, c.delta
+                    FROM unnest(%s::text[], %s::text[], %s::float8[], %s::float8[])
+                        AS c(column_name, mechanism, epsilon, delta)
+                    """,
+                    (dataset_id, result_id, [c["column"] for c in charges], [c["mechanism"] for c in charges],
+                     [c["epsilon"] for c in charges], [c["delta"] for c in charges])
+                )
+        return {
+            "epsilon": spent_epsilon + sum(c["epsilon"] for c in charges),
+            "delta": spent_delta + sum(c["delta"] for c in charges),
+        }
+
+    def entries(self, dataset_id):
+        return self.db.execute_query(
+            """
+            SELECT result_id, column_name, mechanism, epsilon, delta, created_at
+            FROM privacy_budget_ledger WHERE dataset_id = %s ORDER BY created_at
+            """,
+            (dataset_id,),
+            fetch=True
+        )
+
+
+class MemoryBudgetLedger(BudgetLedger):
+    """Registro en memoria (pruebas y ejecuciones sin base de datos)."""
+    name = "memory"
+
+    def __init__(self):
+        self._entries: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def spent(self, dataset_id):
+        entries = self._entries.get(dataset_id, [])
+        return {"epsilon": sum(e["epsilon"] for e in entries), "delta": sum(e["delta"] for e in entries)}
+
+    def charge(self, dataset_id, charges, budget, result_id=None):
+        with self._lock:
+            spent = self.spent(dataset_id)
+            check_budget(spent["epsilon"], spent["delta"], charges, budget)
+            self._entries.setdefault(dataset_id, []).extend(
+                {"result_id": result_id, "column_name": c["column"], "mechanism": c["mechanism"],
+                 "epsilon": c["epsilon"], "delta": c["delta"]}
+                for c in charges
+            )
+            return self.spent(dataset_id)
+
+    def entries(self, dataset_id):
+        return list(self._entries.get(dataset_id, []))
+
+
+def check_budget(spent_epsilon: float, spent_delta: float, charges: List[Dict], budget: Dict):
+    """Lanza `PrivacyBudgetExceeded` si `charges` no caben en lo que queda de `budget`."""
+    epsilon = sum(c["epsilon"] for c in charges)
+    delta = sum(c["delta"] for c in charges)
+    if not _within(spent_epsilon, epsilon, budget.get("epsilon")):
+        raise PrivacyBudgetExceeded(
+            f"Presupuesto de privacidad agotado: gastado ε={spent_epsilon:g}, solicitado ε={epsilon:g}, "
+            f"presupuesto ε={budget['epsilon']:g}"
+        )
+    if not _within(spent_delta, delta, budget.get("delta")):
+        raise PrivacyBudgetExceeded(
+            f"Presupuesto de privacidad agotado: gastado δ={spent_delta:g}, solicitado δ={delta:g}, "
+            f"presupuesto δ={budget['delta']:g}"
+        )
+
+
+class PrivacyAccountant:
+    """Presupuesto (ε, δ) de un dataset y lo gastado en sus ejecuciones, con composición secuencial."""
+
+    def __init__(self, ledger: BudgetLedger, dataset_id: str, budget_epsilon: Optional[float] = None,
+                 budget_delta: Optional[float] = None):
+        self.ledger = ledger
+        self.dataset_id = dataset_id
+        self.budget = {"epsilon": budget_epsilon, "delta": budget_delta}
+
+    def spent(self) -> Dict[str, float]:
+        return self.ledger.spent(self.dataset_id)
+
+    def remaining(self) -> Dict[str, Optional[float]]:
+        spent = self.spent()
+        return {
+            key: None if self.budget[key] is None else max(self.budget[key] - spent[key], 0.0)
+            for key in ("epsilon", "delta")
+        }
+
+    def check(self, charges: List[Dict]):
+        """Comprueba sin registrar (para fallar antes de aplicar las técnicas)."""
+        spent = self.spent()
+        check_budget(spent["epsilon"], spent["delta"], charges, self.budget)
+
+    def charge(self, charges: List[Dict], result_id: Optional[str] = None) -> Dict:
+        """Registra el gasto de una ejecución y devuelve el resumen para `metrics`."""
+        spent = self.ledger.charge(self.dataset_id, charges, self.budget, result_id) if charges else self.spent()
+        return self.summary(charges, spent)
+
+    def summary(self, charges: List[Dict], spent: Optional[Dict] = None) -> Dict:
+        spent = spent or self.spent()
+        return {
+            "epsilon_spent": round(sum(c["epsilon"] for c in charges), 10),
+            "delta_spent": sum(c["delta"] for c in charges),
+            "dataset_epsilon_spent": round(spent["epsilon"], 10),
+            "dataset_delta_spent": spent["delta"],
+            "budget_epsilon": self.budget["epsilon"],
+            "budget_delta": self.budget["delta"],
+            "remaining_epsilon": (
+                None if self.budget["epsilon"] is None else round(max(self.budget["epsilon"] - spent["epsilon"], 0.0), 10)
+            ),
+            "composition": "sequential",
+            "charges": charges,
+        }
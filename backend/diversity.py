@@ -0,0 +1,128 @@
+"""
+Aplicación (no sólo medición) de l-diversidad distinta.
+
+Las clases de equivalencia se numeran en una sola pasada de `groupby` sobre
+los cuasi-identificadores y la diversidad de cada clase se obtiene con
+`groupby().nunique()`. Sólo se recorren en Python las clases que no cumplen
+`l`, nunca todas:
+
+    - "merge":    cada clase que no cumple se fusiona con las clases vecinas
+                  (en el orden de sus cuasi-identificadores) hasta reunir `l`
+                  valores sensibles distintos; en el grupo fusionado, los
+                  cuasi-identificadores que difieren pasan a "*".
+    - "suppress": se eliminan las filas de las clases que no cumplen.
+    - "check":    sólo se mide, sin modificar los datos.
+
+Fusionar clases sólo las hace más grandes, así que el k-anonimato previo se
+conserva.
+"""
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+L_DIVERSITY_MODES = ("merge", "suppress", "check")
+MERGED_LABEL = "*"
+
+
+def equivalence_classes(df: pd.DataFrame, quasi_identifiers: List[str]) -> np.ndarray:
+    """Id de clase de cada fila, numeradas en el orden de los cuasi-identificadores."""
+    return df.groupby(quasi_identifiers, observed=True, sort=True, dropna=False).ngroup().to_numpy()
+
+
+def _merge_runs(class_ids: np.ndarray, sensitive_codes: np.ndarray, diversity: np.ndarray, l: int) -> np.ndarray:
+    """
+    Devuelve el grupo destino de cada clase. Cada clase que no cumple abre un
+    tramo con las clases siguientes hasta reunir `l` valores distintos; si el
+    último tramo no lo consigue, se une al grupo anterior.
+    """
+    class_count = len(diversity)
+    target = np.arange(class_count)
+
+    # Pares (clase, valor sensible) únicos, ordenados por clase, para unir conjuntos por rebanadas
+    present = sensitive_codes >= 0
+    base = int(sensitive_codes.max()) + 1 if present.any() else 1
+    pairs = np.unique(class_ids[present].astype(np.int64) * base + sensitive_codes[present])
+    bounds = np.searchsorted(pairs // base, np.arange(class_count + 1))
+
+    def values_of(c):
+        return pairs[bounds[c]:bounds[c + 1]] % base
+
+    next_free = 0
+    for c in np.flatnonzero(diversity < l):
+        if c < next_free:
+            continue
+        run_values = set(values_of(c).tolist())
+        end = c + 1
+        while len(run_values) < l and end < class_count:
+            run_values.update(values_of(end).tolist())
+            end += 1
+        if len(run_values) < l and c > 0:
+            # Tramo final sin suficientes valores: se une al grupo de la clase anterior
+            target[c:end] = target[c - 1]
+        else:
+            target[c:end] = c
+        next_free = end
+    return target
+
+
+def enforce_l_diversity(df: pd.DataFrame, quasi_identifiers: List[str], sensitive: str, l: int,
+                        mode: str = "merge") -> Tuple[pd.DataFrame, Dict]:
+    if mode not in L_DIVERSITY_MODES:
+        raise ValueError(f"Modo de l-diversidad no soportado: {mode}")
+
+    quasi_identifiers = [col for col in quasi_identifiers if col in df.columns]
+    class_ids = equivalence_classes(df, quasi_identifiers)
+    diversity = pd.Series(df[sensitive].to_numpy()).groupby(class_ids).nunique().to_numpy()
+    violating = diversity < l
+    summary = {
+        "mode": mode,
+        "classes": int(len(diversity)),
+        "violating_classes": int(violating.sum()),
+        "violating_rows": int(violating[class_ids].sum()) if len(class_ids) else 0,
+        "classes_touched": 0,
+        "rows_touched": 0,
+    }
+    if mode == "check" or not violating.any():
+        return df, summary
+
+    if mode == "suppress":
+        keep = ~violating[class_ids]
+        summary["classes_touched"] = summary["violating_classes"]
+        summary["rows_touched"] = int((~keep).sum())
+        return df[keep], summary
+
+    sensitive_codes, _ = pd.factorize(df[sensitive])
+    target = _merge_runs(class_ids, np.asarray(sensitive_codes), diversity, l)
+    merged_classes = target != np.arange(len(target))
+    # Un grupo está afectado si recibe alguna clase distinta de sí mismo
+    touched_groups = np.zeros(len(target), dtype=bool)
+    touched_groups[target[merged_classes]] = True
+    touched_classes = touched_groups[target]
+    rows = touched_classes[class_ids]
+
+    result_df = df.copy()
+    if rows.any():
+        row_group = target[class_ids[rows]]
+        for col in quasi_identifiers:
+            values = result_df[col]
+            distinct = pd.Series(values.to_numpy()[rows]).groupby(row_group).nunique(dropna=False)
+            differs = np.zeros(len(target), dtype=bool)
+            differs[distinct.index.to_numpy()] = distinct.to_numpy() > 1
+            replace = np.zeros(len(df), dtype=bool)
+            replace[rows] = differs[row_group]
+            if not replace.any():
+                continue
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                if MERGED_LABEL not in values.cat.categories:
+                    values = values.cat.add_categories([MERGED_LABEL])
+            else:
+                values = values.astype(object)
+            result_df[col] = values.mask(replace, MERGED_LABEL)
+
+    summary["classes_touched"] = int(touched_classes.sum())
+    summary["rows_touched"] = int(rows.sum())
+    return result_df, summary
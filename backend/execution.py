@@ -0,0 +1,166 @@
+"""
+Motor de ejecución paralela para técnicas independientes por fila.
+
+Enmascaramiento, pseudonimización, generalización numérica (con límites
+precalculados sobre la columna completa), ruido de privacidad diferencial y
+supresión no dependen de otras filas, así que la columna se divide en
+bloques de `chunk_rows` filas que se procesan en un pool de procesos.
+
+Los bloques se forman siempre igual, tanto si se ejecutan en el pool como
+en serie (datasets pequeños o `max_workers=1`), y las técnicas aleatorias
+toman los números de cada fila de su posición en el flujo de la columna
+(`randomness.RandomStreams`): el resultado es el mismo independientemente
+del número de procesos y del tamaño de bloque.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from differential_privacy import DEFAULT_MECHANISM
+from randomness import RandomStreams
+from techniques import (
+    DEFAULT_PSEUDONYM_ALGORITHM,
+    DEFAULT_PSEUDONYM_DIGEST_LENGTH,
+    apply_differential_privacy,
+    apply_masking,
+    generalize_numeric,
+    generalize_numeric_with_edges,
+    hash_values,
+    numeric_bin_edges,
+    pseudonyms_from_codes,
+    suppress_data,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXECUTION_CHUNK_ROWS = 100000
+DEFAULT_MIN_PARALLEL_ROWS = 500000
+# Con "fork" los procesos heredarían los locks y las conexiones de los hilos de la cola de trabajos
+DEFAULT_START_METHOD = "spawn"
+
+
+# --------------------------------------------------
+# KERNELS (nivel de módulo para poder enviarlos al pool)
+# --------------------------------------------------
+def _mask_kernel(chunk: pd.Series, mask_type: str, mask_char: str) -> pd.Series:
+    return apply_masking(chunk, mask_type, mask_char)
+
+
+def _digest_kernel(chunk: pd.Series, algorithm: str, key, digest_length: int) -> pd.Series:
+    return pd.Series(hash_values(chunk, algorithm, key, digest_length), index=chunk.index, dtype=object)
+
+
+def _bin_kernel(chunk: pd.Series, bins_edges, include_na: bool) -> pd.Series:
+    return generalize_numeric_with_edges(chunk, bins_edges, include_na)
+
+
+def _noise_kernel(chunk: pd.Series, epsilon: float, bounds, streams: RandomStreams, column: str, mechanism: str,
+                  delta, offset: int) -> pd.Series:
+    # Cada bloque salta a su posición en el flujo de la columna: el ruido no depende del reparto
+    return apply_differential_privacy(chunk, epsilon, bounds, streams, column, offset, mechanism, delta)
+
+
+class ExecutionEngine:
+    def __init__(self, max_workers: Optional[int] = None, chunk_rows: int = DEFAULT_EXECUTION_CHUNK_ROWS,
+                 min_parallel_rows: int = DEFAULT_MIN_PARALLEL_ROWS, start_method: str = DEFAULT_START_METHOD):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_rows = chunk_rows
+        self.min_parallel_rows = min_parallel_rows
+        self.start_method = start_method
+        self._executor = None
+        # Varios trabajos de la cola pueden pedir el pool a la vez: sólo se crea uno
+        self._lock = threading.Lock()
+        logger.info(f"Execution engine: {self.max_workers} workers, chunks of {chunk_rows} rows")
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context(self.start_method))
+            return self._executor
+
+    def is_parallel(self, series: pd.Series) -> bool:
+        return self.max_workers > 1 and len(series) >= self.min_parallel_rows
+
+    def split(self, series: pd.Series) -> List[pd.Series]:
+        return [series.iloc[start:start + self.chunk_rows] for start in range(0, len(series), self.chunk_rows)]
+
+    def map_chunks(self, kernel: Callable, series: pd.Series, *args, per_chunk_args: List = None) -> pd.Series:
+        """Aplica `kernel(chunk, *args[, per_chunk_arg])` a cada bloque y concatena en el orden original."""
+        chunks = self.split(series)
+        if not chunks:
+            return kernel(series, *args, *([per_chunk_args[0]] if per_chunk_args else []))
+
+        extra = [(arg,) for arg in per_chunk_args] if per_chunk_args else [()] * len(chunks)
+        if self.is_parallel(series):
+            futures = [self.executor.submit(kernel, chunk, *args, *chunk_extra)
+                       for chunk, chunk_extra in zip(chunks, extra)]
+            results = [future.result() for future in futures]
+        else:
+            results = [kernel(chunk, *args, *chunk_extra) for chunk, chunk_extra in zip(chunks, extra)]
+        return pd.concat(results)
+
+    def map_frames(self, kernel: Callable, frame: pd.DataFrame, *args) -> List:
+        """
+        Aplica `kernel(chunk, *args)` a cada bloque de filas de `frame` y
+        devuelve los resultados en orden, sin concatenarlos (p. ej. sketches
+        que el llamador combina).
+        """
+        chunks = [frame.iloc[start:start + self.chunk_rows] for start in range(0, len(frame), self.chunk_rows)]
+        if self.max_workers > 1 and len(frame) >= self.min_parallel_rows:
+            futures = [self.executor.submit(kernel, chunk, *args) for chunk in chunks]
+            return [future.result() for future in futures]
+        return [kernel(chunk, *args) for chunk in chunks]
+
+    # --------------------------------------------------
+    # TÉCNICAS
+    # --------------------------------------------------
+    def masking(self, series: pd.Series, mask_type: str = "partial", mask_char: str = "*") -> pd.Series:
+        return self.map_chunks(_mask_kernel, series, mask_type, mask_char)
+
+    def pseudonymization(self, series: pd.Series, prefix: str = "USER",
+                         algorithm: str = DEFAULT_PSEUDONYM_ALGORITHM, key=None,
+                         digest_length: int = DEFAULT_PSEUDONYM_DIGEST_LENGTH) -> pd.Series:
+        # Se factoriza la columna completa y solo se reparten los valores distintos
+        # entre los procesos: cada valor se hashea una vez aunque aparezca en varios bloques
+        codes, uniques = pd.factorize(series)
+        digests = self.map_chunks(_digest_kernel, pd.Series(uniques, dtype=object), algorithm, key, digest_length)
+        return pseudonyms_from_codes(series, codes, list(digests), prefix)
+
+    def generalize_numeric(self, series: pd.Series, bins: int = 5, bins_edges=None) -> pd.Series:
+        """Con `bins_edges` (p. ej. los de una ejecución anterior) no se recalculan los límites."""
+        if bins_edges is None:
+            try:
+                bins_edges = numeric_bin_edges(series, bins)
+            except Exception:
+                return generalize_numeric(series, bins)
+        # Todos los bloques comparten categorías, así la concatenación sigue siendo Categorical
+        return self.map_chunks(_bin_kernel, series, bins_edges, bool(series.isna().any()))
+
+    def differential_privacy(self, series: pd.Series, epsilon: float, seed: int, column: str,
+                             bounds=None, mechanism: str = DEFAULT_MECHANISM, delta: float = None,
+                             offset: int = 0) -> pd.Series:
+        if not pd.api.types.is_numeric_dtype(series) or series.isna().all():
+            return series
+        # Los límites son los de la columna completa (del perfil o calculados), igual que en la ruta serie
+        if bounds is None:
+            bounds = (float(series.min()), float(series.max()))
+        offsets = [offset + start for start in range(0, len(series), self.chunk_rows)] or [offset]
+        return self.map_chunks(_noise_kernel, series, epsilon, bounds, RandomStreams(seed), column, mechanism, delta,
+                               per_chunk_args=offsets)
+
+    def suppression(self, series: pd.Series, threshold: float, seed: int, column: str, offset: int = 0) -> pd.Series:
+        # Elegir las posiciones es O(n) en el proceso principal; no compensa enviarlo al pool
+        return suppress_data(series, threshold, RandomStreams(seed), column, offset)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,200 @@
+"""
+Exportación por streaming de los resultados de anonimización.
+
+`GET /api/results/{id}` devolvía todas las filas de `anonymized_data` en una
+única respuesta JSON: Postgres entregaba el arreglo completo, se decodificaba
+en Python y FastAPI volvía a serializarlo. Aquí las filas llegan por lotes
+(`Database.iter_jsonb_array`, un cursor de servidor que devuelve cada fila
+como texto JSON) y cada lote se escribe en el formato pedido en cuanto
+llega, así que la memoria depende del tamaño del lote y no del resultado:
+
+    - "ndjson":  una fila JSON por línea; el texto de Postgres se copia tal cual
+    - "csv":     cabecera con las columnas de la primera fila y un bloque por lote
+    - "parquet": un grupo de filas por lote; los tipos salen del esquema del
+                 resultado (`metrics.output_schema`, el mismo formato que el
+                 esquema de los datasets) o, en resultados anteriores, todas
+                 las columnas se exportan como texto
+"""
+import json
+import logging
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from storage import _normalize_for_arrow, apply_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_BATCH_ROWS = 10000
+# Cada exportación ocupa una conexión del pool durante toda la descarga
+DEFAULT_MAX_CONCURRENT_EXPORTS = 4
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def available_formats() -> List[str]:
+    return [name for name in EXPORT_FORMATS if name != "parquet" or pq is not None]
+
+
+class ReleasingStream:
+    """
+    Iterador sobre `content` que llama a `release` una sola vez al terminar,
+    fallar o cerrarse, también si la respuesta se descarta sin empezar a
+    leerla (p. ej. el cliente se desconecta antes del primer lote).
+    """
+
+    def __init__(self, content: Iterator[bytes], release: Callable[[], None]):
+        self.content = content
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            return next(self.content)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            close = getattr(self.content, "close", None)
+            if close is not None:
+                close()
+        finally:
+            release()
+
+    def __del__(self):
+        self.close()
+
+
+# --------------------------------------------------
+# FORMATOS
+# --------------------------------------------------
+def iter_ndjson(batches: Iterable[List[str]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield ("\n".join(batch) + "\n").encode("utf-8")
+
+
+def _batch_frame(batch: List[str], columns: Optional[List[str]]) -> pd.DataFrame:
+    return pd.DataFrame.from_records([json.loads(row) for row in batch], columns=columns)
+
+
+def iter_csv(batches: Iterable[List[str]], columns: Optional[List[str]] = None) -> Iterator[bytes]:
+    """CSV con las columnas de `columns` o, si no se indican, las de la primera fila."""
+    header = True
+    for batch in batches:
+        if columns is None:
+            columns = list(json.loads(batch[0]))
+        yield _batch_frame(batch, columns).to_csv(index=False, header=header).encode("utf-8")
+        header = False
+    if header and columns is not None:
+        # Resultado vacío: sólo la cabecera
+        yield pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8")
+
+
+class _StreamSink:
+    """Archivo de sólo escritura que acumula lo escrito hasta que se recoge con `take`."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Los metadatos de Parquet guardan posiciones absolutas: se cuenta todo lo escrito
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+_ARROW_TYPES = {
+    "integer": "int64",
+    "float": "float64",
+    "boolean": "bool_",
+}
+
+
+def arrow_schema(schema: Dict, columns: Optional[List[str]] = None):
+    """Esquema Arrow de las columnas (`columns` o todas) a partir del esquema lógico."""
+    kinds = {column["name"]: column.get("type") for column in schema.get("columns", [])}
+    names = columns if columns is not None else list(kinds)
+    # Las fechas y los tipos mezclados llegan del JSON como texto
+    return pa.schema([(name, getattr(pa, _ARROW_TYPES.get(kinds.get(name), "string"))()) for name in names])
+
+
+def iter_parquet(batches: Iterable[List[str]], schema: Optional[Dict] = None, columns: Optional[List[str]] = None,
+                 compression: str = "zstd") -> Iterator[bytes]:
+    """
+    Parquet escrito por grupos de filas. Sin `schema`, todas las columnas
+    (las de `columns` o las de la primera fila) se exportan como texto.
+    """
+    if pq is None:
+        raise ValueError("Parquet export requires pyarrow")
+    sink = _StreamSink()
+    writer = None
+    target = None
+    for batch in batches:
+        if target is None:
+            names = columns if columns is not None else list(json.loads(batch[0]))
+            logical = schema or {"columns": [{"name": name, "type": "string"} for name in names]}
+            target = arrow_schema(logical, names)
+            writer = pq.ParquetWriter(sink, target, compression=compression)
+        frame = _normalize_for_arrow(apply_schema(_batch_frame(batch, target.names), schema))
+        for field in target:
+            if field.type == pa.string():
+                series = frame[field.name]
+                frame[field.name] = series.where(series.isna(), series.astype(str))
+        writer.write_table(pa.Table.from_pandas(frame, schema=target, preserve_index=False, safe=False))
+        yield sink.take()
+    if writer is None:
+        names = columns if columns is not None else [column["name"] for column in (schema or {}).get("columns", [])]
+        writer = pq.ParquetWriter(sink, arrow_schema(schema or {"columns": []}, names), compression=compression)
+    writer.close()
+    yield sink.take()
+
+
+def export_stream(export_format: str, batches: Iterable[List[str]], schema: Optional[Dict] = None,
+                  columns: Optional[List[str]] = None) -> Iterator[bytes]:
+    """Bytes del resultado en `export_format`; `batches` son listas de filas en texto JSON."""
+    if export_format == "ndjson":
+        if columns is not None:
+            # Proyectar obliga a decodificar cada fila
+            batches = ([json.dumps({c: row[c] for c in columns if c in row}, ensure_ascii=False)
+                        for row in map(json.loads, batch)] for batch in batches)
+        return iter_ndjson(batches)
+    if export_format == "csv":
+        return iter_csv(batches, columns)
+    if export_format == "parquet":
+        return iter_parquet(batches, schema, columns)
+    raise ValueError(f"Unsupported export format: {export_format}")
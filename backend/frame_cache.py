@@ -0,0 +1,155 @@
+"""
+Caché en memoria de los DataFrames ya decodificados.
+
+Leer un dataset implica traer las filas del almacenamiento (JSONB o
+Parquet), decodificarlas y restaurar los tipos del esquema. Cuando se
+prueban varias configuraciones sobre el mismo dataset, ese trabajo se repite
+en cada `/api/process`. Esta caché guarda, por proceso, las columnas ya
+decodificadas de cada dataset con la clave `(id, updated_at)`: cualquier
+cambio del dataset cambia `updated_at` y deja obsoleta la entrada anterior.
+
+Se guardan columnas sueltas, así que una configuración que sólo lee algunas
+columnas no obliga a cargar el resto, y otra que pide más sólo lee las que
+faltan. La memoria total (`memory_usage(deep=True)`) está acotada por
+`max_bytes`; al superarla se expulsan los datasets usados hace más tiempo
+(LRU). `stats()` devuelve aciertos, fallos y expulsiones.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRAME_CACHE_MB = 1024
+
+
+class _Entry:
+    __slots__ = ("version", "columns", "order", "complete", "bytes", "length")
+
+    def __init__(self, version: str):
+        self.version = version
+        self.columns: Dict[str, pd.Series] = {}
+        self.order: List[str] = []
+        self.complete = False
+        self.bytes = 0
+        self.length = None
+
+
+class FrameCache:
+    def __init__(self, max_bytes: int = DEFAULT_FRAME_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, dataset_id: str, version: str,
+               columns: Optional[List[str]]) -> Tuple[Dict[str, pd.Series], Optional[List[str]]]:
+        """
+        Columnas en caché y las que faltan (`None` = hay que cargarlas todas).
+        Con `columns=None` se piden todas las columnas del dataset.
+        """
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is not None and entry.version != version:
+                self._drop(dataset_id)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return {}, columns
+
+            self._entries.move_to_end(dataset_id)
+            if columns is None:
+                if not entry.complete:
+                    self.misses += 1
+                    return {}, None
+                wanted = entry.order
+            else:
+                wanted = columns
+            found = {name: entry.columns[name] for name in wanted if name in entry.columns}
+            # En una entrada completa, lo que no está es porque el dataset no tiene esa columna
+            missing = [] if entry.complete else [name for name in wanted if name not in entry.columns]
+            if missing:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return found, missing
+
+    def store(self, dataset_id: str, version: str, df: pd.DataFrame, complete: bool = False):
+        """Añade las columnas de `df`; `complete` indica que son todas las del dataset."""
+        sizes = {str(name): int(df[name].memory_usage(deep=True, index=False)) for name in df.columns}
+        if sum(sizes.values()) > self.max_bytes:
+            logger.info(f"Frame cache: dataset {dataset_id} exceeds the memory budget, not cached")
+            return
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None or entry.version != version:
+                if entry is not None:
+                    self._drop(dataset_id)
+                entry = self._entries[dataset_id] = _Entry(version)
+            if entry.length is not None and entry.length != len(df):
+                # Filas distintas para la misma versión: no se mezclan
+                return
+            entry.length = len(df)
+            for name in df.columns:
+                name = str(name)
+                if name in entry.columns:
+                    continue
+                entry.columns[name] = df[name]
+                entry.order.append(name)
+                entry.bytes += sizes[name]
+                self.bytes += sizes[name]
+            if complete:
+                entry.complete = True
+                entry.order = [str(name) for name in df.columns]
+            self._entries.move_to_end(dataset_id)
+            self._evict(keep=dataset_id)
+
+    def _drop(self, dataset_id: str):
+        entry = self._entries.pop(dataset_id)
+        self.bytes -= entry.bytes
+
+    def _evict(self, keep: str):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, dataset_id: Optional[str] = None) -> int:
+        """Vacía la caché (o sólo la entrada de un dataset)."""
+        with self._lock:
+            targets = [dataset_id] if dataset_id is not None else list(self._entries)
+            removed = 0
+            for target in targets:
+                if target in self._entries:
+                    self._drop(target)
+                    removed += 1
+            return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def assemble(columns: Dict[str, pd.Series], order: List[str]) -> pd.DataFrame:
+    """DataFrame nuevo con las columnas en `order` (las Series en caché no se modifican)."""
+    names = [name for name in order if name in columns]
+    if not names:
+        return pd.DataFrame()
+    return pd.concat([columns[name] for name in names], axis=1)
@@ -0,0 +1,306 @@
+"""
+Jerarquías de generalización definidas por el usuario y búsqueda en el
+retículo de generalización para k-anonimato.
+
+Una jerarquía describe, para una columna, una secuencia de niveles cada vez
+más generales que termina siempre en "*":
+
+    {"type": "mask", "levels": 4}                  10001 → 1000* → 100** → 10*** → 1**** → *
+    {"type": "intervals", "widths": [5, 10, 20]}   37 → 35-40 → 30-40 → 20-40 → *
+    {"type": "mapping", "levels": [{"Madrid": "Centro", ...}, {"Centro": "España"}]}
+    {"type": "suppress"}                           valor → *
+
+Los niveles se calculan sobre los valores distintos de la columna, no por
+fila. Cada nivel se guarda como el mapa de códigos del nivel anterior al
+siguiente, y se comprueba que la jerarquía sea consistente (un valor no
+puede tener dos padres).
+
+La búsqueda recorre el retículo de nodos (nivel de cada cuasi-identificador)
+de abajo arriba. Un nodo sólo se evalúa si ninguno de sus hijos cumple k:
+por monotonía, cualquier generalización de un nodo que cumple k también lo
+cumple. Las clases de equivalencia de un nodo se obtienen agregando la
+tabla de frecuencias (combinación de códigos → filas) de uno de sus hijos,
+nunca reagrupando el DataFrame completo.
+"""
+import logging
+import math
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from techniques import _format_edge_value
+
+logger = logging.getLogger(__name__)
+
+SUPPRESSED_LABEL = "*"
+MAX_LATTICE_NODES = 200000
+
+
+# --------------------------------------------------
+# JERARQUÍAS
+# --------------------------------------------------
+def _is_null(value) -> bool:
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def _label(value) -> str:
+    if _is_null(value):
+        return "nan"
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+        return _format_edge_value(value)
+    return str(value)
+
+
+def _mask_level(level: int, mask_char: str):
+    def generalize(value):
+        if _is_null(value):
+            return "nan"
+        text = _label(value)
+        keep = max(len(text) - level, 0)
+        return text[:keep] + mask_char * (len(text) - keep)
+    return generalize
+
+
+def _interval_level(width: float):
+    def generalize(value):
+        if _is_null(value):
+            return "nan"
+        lower = np.floor(float(value) / width) * width
+        return f"{_format_edge_value(lower)}-{_format_edge_value(lower + width)}"
+    return generalize
+
+
+def _mapping_level(mapping: Dict):
+    def generalize(label):
+        return str(mapping.get(label, label))
+    return generalize
+
+
+class Hierarchy:
+    """
+    Niveles de generalización de una columna. `codes` asigna a cada fila el
+    código de su valor en el nivel 0; `labels[l]` son las etiquetas del nivel
+    `l` y `parents[l]` lleva los códigos del nivel `l` a los del `l + 1`.
+    """
+
+    def __init__(self, codes: np.ndarray, labels: List[List[str]], parents: List[np.ndarray]):
+        self.codes = codes
+        self.labels = labels
+        self.parents = parents
+
+    @property
+    def height(self) -> int:
+        return len(self.labels) - 1
+
+    def level_codes(self, level: int, codes: np.ndarray = None) -> np.ndarray:
+        codes = self.codes if codes is None else codes
+        for l in range(level):
+            codes = self.parents[l][codes]
+        return codes
+
+    def generalize(self, level: int, index=None, name=None) -> pd.Series:
+        level = max(0, min(int(level), self.height))
+        categorical = pd.Categorical.from_codes(self.level_codes(level), categories=self.labels[level])
+        return pd.Series(categorical, index=index, name=name)
+
+    def loss(self, level: int) -> float:
+        """Fracción de distinciones perdidas en `level`: 0 en el nivel original, 1 en "*"."""
+        base = len(self.labels[0])
+        if base <= 1:
+            return 0.0 if level == 0 else 1.0
+        return 1.0 - (len(self.labels[level]) - 1) / (base - 1)
+
+    @classmethod
+    def from_spec(cls, series: pd.Series, spec: Optional[Dict] = None) -> "Hierarchy":
+        spec = spec or {"type": "suppress"}
+        kind = spec.get("type", "suppress")
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        values = list(uniques)
+
+        level_functions = []
+        if kind == "mask":
+            mask_char = spec.get("char", "*")
+            longest = max((len(_label(v)) for v in values), default=1)
+            level_functions = [_mask_level(l, mask_char) for l in range(1, min(spec.get("levels", longest), longest) + 1)]
+        elif kind == "intervals":
+            level_functions = [_interval_level(float(width)) for width in spec.get("widths", [])]
+        elif kind == "mapping":
+            level_functions = [_mapping_level(mapping) for mapping in spec.get("levels", [])]
+        elif kind != "suppress":
+            raise ValueError(f"Tipo de jerarquía no soportado: {kind}")
+
+        labels = [[_label(v) for v in values]]
+        parents = []
+        # Código de cada valor distinto en el nivel actual
+        value_codes = np.arange(len(values))
+        for generalize in level_functions:
+            # "mapping" se encadena desde las etiquetas del nivel anterior; el resto parte del valor original
+            source = [labels[-1][c] for c in value_codes] if kind == "mapping" else values
+            level_codes, level_labels = pd.factorize(pd.Series([generalize(v) for v in source], dtype=object))
+            parents.append(_parent_map(value_codes, level_codes, len(labels[-1]), len(labels)))
+            labels.append([str(label) for label in level_labels])
+            value_codes = level_codes
+
+        if labels[-1] != [SUPPRESSED_LABEL]:
+            parents.append(np.zeros(len(labels[-1]), dtype=np.int64))
+            labels.append([SUPPRESSED_LABEL])
+
+        return cls(np.asarray(codes, dtype=np.int64), labels, parents)
+
+
+def _parent_map(child_codes: np.ndarray, parent_codes: np.ndarray, child_count: int, level: int) -> np.ndarray:
+    parent = np.zeros(child_count, dtype=np.int64)
+    parent[child_codes] = parent_codes
+    if (parent[child_codes] != parent_codes).any():
+        raise ValueError(f"Jerarquía inconsistente en el nivel {level}: un valor tiene varios padres")
+    return parent
+
+
+# --------------------------------------------------
+# BÚSQUEDA EN EL RETÍCULO
+# --------------------------------------------------
+def _group_table(codes: np.ndarray, counts: np.ndarray, cardinalities: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Agrupa filas de códigos iguales sumando sus frecuencias."""
+    if np.prod([float(c) for c in cardinalities]) < 2 ** 62:
+        # Clave de base mixta: una sola columna entera por combinación
+        key = np.zeros(len(codes), dtype=np.int64)
+        for j, cardinality in enumerate(cardinalities):
+            key = key * cardinality + codes[:, j]
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(codes, axis=0, return_index=True, return_inverse=True)
+    return codes[first], np.bincount(np.ravel(inverse), weights=counts).astype(np.int64)
+
+
+class LatticeSearch:
+    """
+    Busca el nodo del retículo de menor pérdida que cumple k-anonimato,
+    permitiendo suprimir como mucho `max_suppression` de las filas (las de
+    clases con menos de k filas).
+    """
+
+    def __init__(self, hierarchies: List[Hierarchy], k: int, max_suppression: float = 0.0):
+        self.hierarchies = hierarchies
+        self.k = k
+        self.max_suppression = max_suppression
+        self.heights = [h.height for h in hierarchies]
+        self.nodes_evaluated = 0
+
+        base_codes = np.stack([h.codes for h in hierarchies], axis=1) if hierarchies else np.zeros((0, 0), dtype=np.int64)
+        self.row_count = len(base_codes)
+        self.base = _group_table(base_codes, np.ones(self.row_count), self._cardinalities((0,) * len(hierarchies)))
+
+    def _cardinalities(self, node) -> List[int]:
+        return [len(h.labels[level]) for h, level in zip(self.hierarchies, node)]
+
+    def rollup(self, table, child, dim: int):
+        """Tabla de frecuencias del padre de `child` en la dimensión `dim`."""
+        codes, counts = table
+        codes = codes.copy()
+        codes[:, dim] = self.hierarchies[dim].parents[child[dim]][codes[:, dim]]
+        parent = tuple(level + (j == dim) for j, level in enumerate(child))
+        return _group_table(codes, counts, self._cardinalities(parent))
+
+    def suppressed_rows(self, counts: np.ndarray) -> int:
+        return int(counts[counts < self.k].sum())
+
+    def loss(self, node, suppressed: int) -> float:
+        column_loss = np.mean([h.loss(level) for h, level in zip(self.hierarchies, node)]) if node else 0.0
+        fraction = suppressed / self.row_count if self.row_count else 0.0
+        # Las filas suprimidas pierden toda su información
+        return float((1 - fraction) * column_loss + fraction)
+
+    def search(self) -> Dict:
+        # El tamaño se conoce sin enumerar los nodos
+        if math.prod(h + 1 for h in self.heights) > MAX_LATTICE_NODES:
+            raise ValueError("El retículo de generalización es demasiado grande; reduce los niveles de las jerarquías")
+        nodes_by_height = {}
+        for node in product(*[range(h + 1) for h in self.heights]):
+            nodes_by_height.setdefault(sum(node), []).append(node)
+
+        allowed = self.max_suppression * self.row_count
+        satisfying = set()
+        candidates = []
+        previous_tables = {}
+        for height in sorted(nodes_by_height):
+            tables = {}
+            for node in nodes_by_height[height]:
+                children = [(j, node[:j] + (node[j] - 1,) + node[j + 1:]) for j in range(len(node)) if node[j] > 0]
+                # Monotonía: si un hijo cumple k, este nodo también, pero no es mínimo
+                if any(child in satisfying for _, child in children):
+                    satisfying.add(node)
+                    continue
+
+                if children:
+                    # Se agrega desde el hijo con la tabla más pequeña
+                    dim, child = min(children, key=lambda c: len(previous_tables[c[1]][1]))
+                    table = self.rollup(previous_tables[child], child, dim)
+                else:
+                    table = self.base
+                self.nodes_evaluated += 1
+
+                suppressed = self.suppressed_rows(table[1])
+                if suppressed <= allowed:
+                    satisfying.add(node)
+                    candidates.append((self.loss(node, suppressed), height, node, suppressed, len(table[1])))
+                else:
+                    tables[node] = table
+            previous_tables = tables
+
+        if not candidates:
+            # Ningún nodo cumple k con la supresión permitida (p. ej. menos filas que k): se aplica la
+            # generalización completa y se suprimen igualmente las filas de sus clases con menos de k
+            top = tuple(self.heights)
+            suppressed = self.suppressed_rows(previous_tables[top][1])
+            logger.warning(f"No lattice node reaches k={self.k} within the suppression limit; "
+                           f"suppressing {suppressed} of {self.row_count} rows")
+            return {"node": top, "loss": round(self.loss(top, suppressed), 4), "suppressed_rows": suppressed,
+                    "classes": len(previous_tables[top][1]), "minimal_nodes": 0,
+                    "nodes_evaluated": self.nodes_evaluated, "suppression_limit_exceeded": True}
+
+        loss, _, node, suppressed, classes = min(candidates)
+        return {
+            "node": node,
+            "loss": round(loss, 4),
+            "suppressed_rows": suppressed,
+            "classes": classes,
+            "minimal_nodes": len(candidates),
+            "nodes_evaluated": self.nodes_evaluated,
+            "suppression_limit_exceeded": False,
+        }
+
+
+def lattice_anonymize(df: pd.DataFrame, quasi_identifiers: List[str], k: int,
+                      specs: Optional[Dict[str, Dict]] = None, max_suppression: float = 0.0) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Aplica a `df` el nodo óptimo del retículo. Los cuasi-identificadores sin
+    jerarquía definida en `specs` sólo pueden quedarse como están o pasar a
+    "*". Las filas suprimidas (las de clases con menos de k registros) no
+    aparecen en el resultado.
+    """
+    specs = specs or {}
+    quasi_identifiers = [col for col in quasi_identifiers if col in df.columns]
+    hierarchies = [Hierarchy.from_spec(df[col], specs.get(col)) for col in quasi_identifiers]
+    search = LatticeSearch(hierarchies, k, max_suppression)
+    summary = search.search()
+
+    result_df = df.copy()
+    level_codes = []
+    for col, hierarchy, level in zip(quasi_identifiers, hierarchies, summary["node"]):
+        result_df[col] = hierarchy.generalize(level, index=df.index, name=col)
+        level_codes.append(hierarchy.level_codes(level))
+
+    if summary["suppressed_rows"]:
+        # Las filas de clases con menos de k registros se eliminan: juntas formarían otra clase pequeña
+        codes = pd.DataFrame(np.stack(level_codes, axis=1))
+        small = (codes.groupby(list(codes.columns), sort=False)[0].transform("size") < k).to_numpy()
+        result_df = result_df[~small]
+
+    summary["levels"] = {col: int(level) for col, level in zip(quasi_identifiers, summary.pop("node"))}
+    summary["heights"] = {col: h.height for col, h in zip(quasi_identifiers, hierarchies)}
+    return result_df, summary
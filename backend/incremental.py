@@ -0,0 +1,433 @@
+"""
+Re-anonimización incremental.
+
+Una ejecución tiene dos fases: las técnicas por columna (cada salida depende
+sólo de su columna, de sus técnicas y de la semilla) y los pasos que
+dependen de los cuasi-identificadores (k-anonimato y l-diversidad), que
+sólo modifican los cuasi-identificadores y pueden eliminar filas.
+
+Al terminar cada ejecución se guarda una instantánea por dataset con la
+salida de la primera fase de cada columna, los cuasi-identificadores finales
+(con el índice de las filas que quedan), una huella por columna de lo que la
+produjo y las métricas. La siguiente ejecución sobre el mismo contenido
+compara huellas (`plan_changes`): sólo recalcula las columnas cuya huella
+cambió, toma las demás de la instantánea y rehace la segunda fase sólo si
+cambiaron sus parámetros o la salida real de algún cuasi-identificador o
+del atributo sensible.
+
+Si al dataset sólo se le han añadido segmentos desde la instantánea y la
+configuración no cambió (`plan_append`), sólo se procesan las filas nuevas
+con los parámetros guardados de la ejecución anterior (límites de los
+intervalos, valores frecuentes, límites de recorte, nivel de la jerarquía):
+las técnicas por columna no dependen de otras filas y los pasos de
+cuasi-identificadores se extienden con la tabla de clases guardada
+(`extend_classes`). Lo que no puede extenderse así (Mondrian, valores fuera
+de los intervalos guardados) lanza `AppendUnsupported` y se hace una
+ejecución completa.
+
+Las instantáneas se guardan en disco con una serie por archivo (`pickle`,
+conserva tipos mixtos como los de la supresión) para leer sólo las columnas
+reutilizadas; cada columna puede tener varias partes, una por ejecución que
+añadió filas, y las partes de la ejecución anterior se enlazan en lugar de
+copiarse. `latest.json` apunta a la última ejecución de cada dataset y las
+anteriores se borran en cuanto ningún trabajo las está leyendo.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from privacy_metrics import CLASS_COUNT_COLUMN, class_table, merge_class_tables
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+# Técnicas cuya salida depende de la semilla del trabajo
+RANDOM_TECHNIQUES = {"suppression", "differential_privacy"}
+# Parámetros globales que usan los pasos de cuasi-identificadores
+QI_STEP_PARAMS = ("k", "l", "hierarchies", "max_suppression", "l_diversity_mode")
+
+
+class AppendUnsupported(ValueError):
+    """Las filas añadidas no pueden procesarse por separado: hace falta una ejecución completa."""
+
+
+def _sha256_json(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _parsed(value, default):
+    if isinstance(value, str):
+        return json.loads(value)
+    return value if value is not None else default
+
+
+# --------------------------------------------------
+# HUELLAS Y PLAN
+# --------------------------------------------------
+def column_fingerprints(config: Dict, columns: List[str], settings: str = "") -> Dict[str, str]:
+    """Huella de lo que determina la salida de la primera fase de cada columna."""
+    column_mappings = _parsed(config.get("column_mappings"), [])
+    techniques = _parsed(config.get("techniques"), [])
+    seed = _parsed(config.get("global_params"), {}).get("seed")
+    identifiers = {m["column"] for m in column_mappings if m["type"] == "identifier"}
+
+    fingerprints = {}
+    for col in columns:
+        applied = [
+            {"technique": t["technique"], "params": t.get("params") or {}}
+            for t in techniques if t["column"] == col
+        ]
+        fingerprints[col] = _sha256_json({
+            "identifier": col in identifiers,
+            "techniques": applied,
+            "seed": seed if any(t["technique"] in RANDOM_TECHNIQUES for t in applied) else None,
+            "settings": settings if any(t["technique"] == "pseudonymization" for t in applied) else None,
+        })
+    return fingerprints
+
+
+def qi_step_columns(config: Dict) -> List[str]:
+    """Columnas que leen los pasos de cuasi-identificadores: los cuasi-identificadores y el primer sensible."""
+    column_mappings = _parsed(config.get("column_mappings"), [])
+    quasi_identifiers = [m["column"] for m in column_mappings if m["type"] == "quasi-identifier"]
+    sensitive = [m["column"] for m in column_mappings if m["type"] == "sensitive"]
+    return quasi_identifiers + sensitive[:1]
+
+
+def global_fingerprint(config: Dict) -> str:
+    column_mappings = _parsed(config.get("column_mappings"), [])
+    global_params = _parsed(config.get("global_params"), {})
+    return _sha256_json({
+        "quasi_identifiers": [m["column"] for m in column_mappings if m["type"] == "quasi-identifier"],
+        "sensitive": [m["column"] for m in column_mappings if m["type"] == "sensitive"],
+        "params": {key: global_params.get(key) for key in QI_STEP_PARAMS},
+    })
+
+
+class IncrementalPlan:
+    """Columnas a recalcular y a reutilizar respecto a una instantánea."""
+
+    def __init__(self, manifest: Dict, recompute: List[str], reuse: List[str], global_changed: bool):
+        self.manifest = manifest
+        self.recompute = recompute
+        self.reuse = reuse
+        self.global_changed = global_changed
+
+    def to_dict(self) -> Dict:
+        return {
+            "base_result_id": self.manifest["result_id"],
+            "recomputed_columns": self.recompute,
+            "reused_columns": len(self.reuse),
+        }
+
+
+def plan_changes(manifest: Dict, fingerprints: Dict[str, str], global_fp: str) -> IncrementalPlan:
+    previous = manifest.get("fingerprints", {})
+    stored = set(manifest.get("stage1_columns", []))
+    recompute, reuse = [], []
+    # Los identificadores eliminados no tienen salida guardada: si no cambian tampoco hay nada que recalcular
+    available = stored | set(manifest.get("dropped_columns", []))
+    for col, fingerprint in fingerprints.items():
+        if previous.get(col) == fingerprint and col in available:
+            reuse.append(col)
+        else:
+            recompute.append(col)
+    return IncrementalPlan(manifest, recompute, reuse, manifest.get("global") != global_fp)
+
+
+def split_details(technique_details: Dict, columns: List[str]) -> Dict:
+    """Separa los detalles por columna (primera fase) de los de los pasos globales."""
+    by_column = {col: {} for col in columns}
+    global_details = {}
+    for key, detail in technique_details.items():
+        if key == "no_changes":
+            # Depende del resto de detalles: se vuelve a calcular al combinarlos
+            continue
+        col = detail.get("column") if isinstance(detail, dict) else None
+        if col is None and key.startswith("identifier_"):
+            col = key[len("identifier_"):]
+        if col in by_column:
+            by_column[col][key] = detail
+        else:
+            global_details[key] = detail
+    return {"columns": by_column, "global": global_details}
+
+
+# --------------------------------------------------
+# SEGMENTOS AÑADIDOS
+# --------------------------------------------------
+class AppendPlan:
+    """Filas añadidas al dataset después de la instantánea `manifest`."""
+
+    def __init__(self, manifest: Dict, offset: int, rows: int, segments: List[int]):
+        self.manifest = manifest
+        self.offset = offset
+        self.rows = rows
+        self.segments = segments
+
+    def to_dict(self) -> Dict:
+        return {
+            "mode": "append",
+            "base_result_id": self.manifest["result_id"],
+            "appended_rows": self.rows,
+            "appended_segments": self.segments,
+        }
+
+
+def plan_append(manifest: Dict, segments: List[Dict], fingerprints: Dict[str, str],
+                global_fp: str) -> Optional[AppendPlan]:
+    """
+    Plan para procesar sólo los segmentos posteriores a la instantánea, o
+    None si la instantánea no cubre un prefijo de `segments` o la
+    configuración cambió.
+    """
+    if manifest.get("fingerprints") != fingerprints or manifest.get("global") != global_fp:
+        return None
+    hashes = [segment["content_hash"] for segment in segments]
+    if manifest.get("content_hash") not in hashes[:-1]:
+        return None
+    added = segments[hashes.index(manifest["content_hash"]) + 1:]
+    if added[0]["row_offset"] != manifest.get("rows"):
+        return None
+    return AppendPlan(manifest, added[0]["row_offset"], sum(s["row_count"] for s in added),
+                      [s["index"] for s in added])
+
+
+def extend_classes(delta: pd.DataFrame, quasi_identifiers: List[str], sensitive: Optional[str],
+                   classes: pd.DataFrame, k: int, l: int) -> pd.Series:
+    """
+    Filas nuevas (ya generalizadas) que pueden publicarse: las de clases que,
+    sumando las filas ya publicadas (`classes`, de `class_table`), tienen al
+    menos `k` filas y `l` valores sensibles distintos. Una clase publicada
+    sólo puede crecer, así que las filas anteriores siguen cumpliendo. Las
+    demás se suprimen, como en la ejecución completa.
+    """
+    quasi_identifiers = [col for col in quasi_identifiers if col in delta.columns]
+    if not quasi_identifiers or len(delta) == 0:
+        return pd.Series(True, index=delta.index)
+    sensitive = sensitive if sensitive in delta.columns else None
+
+    combined = merge_class_tables(classes, class_table(delta, quasi_identifiers, sensitive))
+    grouped = combined.groupby(quasi_identifiers, dropna=False, sort=False)
+    stats = grouped[CLASS_COUNT_COLUMN].sum().rename("size").to_frame()
+    if sensitive is not None:
+        stats["distinct"] = grouped[sensitive].count()
+
+    keys = delta[quasi_identifiers].astype(object)
+    row_stats = keys.merge(stats.reset_index(), on=quasi_identifiers, how="left")
+    publish = np.ones(len(delta), dtype=bool)
+    if k > 1:
+        publish &= row_stats["size"].fillna(0).to_numpy() >= k
+    if l > 1 and sensitive is not None:
+        publish &= row_stats["distinct"].fillna(0).to_numpy() >= l
+    return pd.Series(publish, index=delta.index)
+
+
+# --------------------------------------------------
+# INSTANTÁNEAS
+# --------------------------------------------------
+class SnapshotStore:
+    """
+    Instantáneas en disco, una carpeta por ejecución. Las escrituras de un
+    mismo dataset se serializan, y un trabajo que lee una instantánea la
+    obtiene con `acquire` y la suelta con `release`: mientras tanto, aunque
+    otro trabajo guarde una más reciente, sus archivos no se borran.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._dataset_locks = {}
+        # Ruta de cada ejecución -> trabajos que la están leyendo
+        self._readers = {}
+
+    def _dataset_dir(self, dataset_id) -> str:
+        return os.path.join(self.root, str(dataset_id))
+
+    def _dataset_lock(self, dataset_id) -> threading.Lock:
+        with self._lock:
+            return self._dataset_locks.setdefault(str(dataset_id), threading.Lock())
+
+    def latest(self, dataset_id) -> Optional[Dict]:
+        """Manifiesto de la última ejecución del dataset, o None."""
+        pointer = os.path.join(self._dataset_dir(dataset_id), "latest.json")
+        try:
+            with open(pointer, encoding="utf-8") as f:
+                run = json.load(f)["run"]
+            with open(os.path.join(self._dataset_dir(dataset_id), run, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            return None
+        manifest["path"] = os.path.join(self._dataset_dir(dataset_id), run)
+        return manifest
+
+    def acquire(self, dataset_id) -> Optional[Dict]:
+        """Como `latest`, pero la ejecución no se borra hasta llamar a `release` con el manifiesto."""
+        with self._dataset_lock(dataset_id):
+            manifest = self.latest(dataset_id)
+            if manifest is not None:
+                with self._lock:
+                    self._readers[manifest["path"]] = self._readers.get(manifest["path"], 0) + 1
+            return manifest
+
+    def release(self, manifest: Optional[Dict]):
+        if manifest is None:
+            return
+        path = manifest["path"]
+        with self._lock:
+            readers = self._readers.get(path, 0) - 1
+            if readers > 0:
+                self._readers[path] = readers
+                return
+            self._readers.pop(path, None)
+        # Si entretanto se guardó otra ejecución, ésta ya puede borrarse
+        dataset_dir = os.path.dirname(path)
+        with self._dataset_lock(os.path.basename(dataset_dir)):
+            self._collect(dataset_dir)
+
+    @staticmethod
+    def _read_parts(manifest: Dict, names: List[str]):
+        parts = [pd.read_pickle(os.path.join(manifest["path"], name)) for name in names]
+        return parts[0] if len(parts) == 1 else pd.concat(parts)
+
+    def load_stage1(self, manifest: Dict, columns: List[str]) -> pd.DataFrame:
+        files = manifest["stage1_files"]
+        series = [self._read_parts(manifest, files[col]) for col in columns if col in files]
+        if not series:
+            return pd.DataFrame(index=pd.RangeIndex(manifest["rows"]))
+        return pd.concat(series, axis=1)
+
+    def load_final(self, manifest: Dict) -> pd.DataFrame:
+        return self._read_parts(manifest, manifest["final_files"])
+
+    def load_classes(self, manifest: Dict) -> Optional[pd.DataFrame]:
+        if not manifest.get("classes_file"):
+            return None
+        return pd.read_pickle(os.path.join(manifest["path"], manifest["classes_file"]))
+
+    def load_output(self, manifest: Dict) -> pd.DataFrame:
+        """Resultado completo de la ejecución: la primera fase en las filas finales con los cuasi-identificadores finales."""
+        final = self.load_final(manifest)
+        output = self.load_stage1(manifest, manifest["stage1_columns"]).loc[final.index]
+        for col in final.columns:
+            output[col] = final[col]
+        return output
+
+    def _collect(self, dataset_dir: str):
+        """Borra las ejecuciones guardadas que no son la última ni las lee ningún trabajo (con el lock del dataset)."""
+        try:
+            with open(os.path.join(dataset_dir, "latest.json"), encoding="utf-8") as f:
+                current = json.load(f)["run"]
+            entries = os.listdir(dataset_dir)
+        except (OSError, ValueError, KeyError):
+            return
+        with self._lock:
+            held = set(self._readers)
+        for entry in entries:
+            path = os.path.join(dataset_dir, entry)
+            # Sin manifiesto es una ejecución que todavía se está escribiendo
+            if entry == current or path in held or not os.path.exists(os.path.join(path, "manifest.json")):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _new_run(self, dataset_id, manifest: Dict):
+        run = f"{manifest['result_id']}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self._dataset_dir(dataset_id), run)
+        os.makedirs(path, exist_ok=True)
+        return run, path
+
+    @staticmethod
+    def _write(path: str, data, name: str) -> str:
+        data.to_pickle(os.path.join(path, name))
+        return name
+
+    @staticmethod
+    def _link(base: Dict, path: str, name: str) -> str:
+        # Las partes no se modifican nunca: basta con un enlace (o una copia si el sistema no lo admite)
+        source, target = os.path.join(base["path"], name), os.path.join(path, name)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+        return name
+
+    def save(self, dataset_id, manifest: Dict, stage1: pd.DataFrame, final: pd.DataFrame,
+             classes: Optional[pd.DataFrame] = None):
+        """Guarda la instantánea de una ejecución y la marca como la última del dataset."""
+        run, path = self._new_run(dataset_id, manifest)
+        try:
+            files = {
+                str(col): [self._write(path, stage1[col], f"{position:05d}-00000.pkl")]
+                for position, col in enumerate(stage1.columns)
+            }
+            self._commit(dataset_id, run, path, {
+                **manifest,
+                "rows": len(stage1),
+                "stage1_columns": [str(col) for col in stage1.columns],
+                "stage1_files": files,
+                "final_files": [self._write(path, final, "final-00000.pkl")],
+            }, classes)
+        except Exception:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+
+    def extend(self, dataset_id, manifest: Dict, base: Dict, stage1: pd.DataFrame, final: pd.DataFrame,
+               classes: Optional[pd.DataFrame] = None):
+        """
+        Instantánea de una ejecución que sólo procesó filas añadidas: enlaza
+        las partes de `base` y añade como partes nuevas `stage1` y `final`.
+        """
+        if [str(col) for col in stage1.columns] != base["stage1_columns"]:
+            raise ValueError("Appended rows do not have the columns of the snapshot")
+        run, path = self._new_run(dataset_id, manifest)
+        try:
+            files = {}
+            for position, col in enumerate(base["stage1_columns"]):
+                names = [self._link(base, path, name) for name in base["stage1_files"][col]]
+                names.append(self._write(path, stage1[col], f"{position:05d}-{len(names):05d}.pkl"))
+                files[col] = names
+            final_files = [self._link(base, path, name) for name in base["final_files"]]
+            final_files.append(self._write(path, final, f"final-{len(final_files):05d}.pkl"))
+            self._commit(dataset_id, run, path, {
+                **manifest,
+                "rows": base["rows"] + len(stage1),
+                "stage1_columns": base["stage1_columns"],
+                "stage1_files": files,
+                "final_files": final_files,
+            }, classes)
+        except Exception:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+
+    def _commit(self, dataset_id, run: str, path: str, manifest: Dict, classes: Optional[pd.DataFrame]):
+        dataset_dir = self._dataset_dir(dataset_id)
+        manifest = {**manifest, "version": SNAPSHOT_VERSION}
+        manifest.pop("path", None)
+        if classes is not None:
+            manifest["classes_file"] = self._write(path, classes, "classes.pkl")
+
+        with self._dataset_lock(dataset_id):
+            with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, default=str)
+
+            # El puntero se reemplaza de forma atómica; después se borran las ejecuciones que nadie lee
+            pointer = os.path.join(dataset_dir, "latest.json")
+            tmp = f"{pointer}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"run": run}, f)
+            os.replace(tmp, pointer)
+            self._collect(dataset_dir)
+
+    def delete(self, dataset_id):
+        with self._dataset_lock(dataset_id):
+            shutil.rmtree(self._dataset_dir(dataset_id), ignore_errors=True)
@@ -0,0 +1,240 @@
+"""
+Métricas de pérdida de información por tipo de columna.
+
+    - NCP (Normalized Certainty Penalty): para columnas numéricas, ancho del
+      intervalo de cada fila dividido por el rango original; las etiquetas
+      ("18-30", "*") se interpretan una vez por categoría, no por fila. Para
+      columnas categóricas, cuántos valores originales distintos comparten
+      la etiqueta de cada fila, normalizado por los valores distintos.
+    - Discernibilidad: suma de los cuadrados de los tamaños de las clases de
+      equivalencia (normalizada por n²).
+    - Pérdida por entropía: 1 - H(anonimizada) / H(original).
+
+El rango, los valores distintos y la entropía de cada columna original se
+calculan una vez por dataset (`column_statistics`) y se guardan en
+`datasets.column_stats`, así que no hace falta volver a recorrer el dataset
+original en cada ejecución.
+
+Cuando sólo se anonimizan filas añadidas a un dataset, `merge_information_loss`
+combina la pérdida por columna de la ejecución anterior con la de las filas
+nuevas (media ponderada por filas publicadas) y recalcula la discernibilidad
+a partir de los tamaños de las clases combinadas.
+"""
+import logging
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from privacy_metrics import equivalence_class_ids
+
+logger = logging.getLogger(__name__)
+
+SUPPRESSED_LABELS = {"*"}
+_NUMBER = r"-?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?"
+_INTERVAL = re.compile(rf"^\s*({_NUMBER})\s*-\s*({_NUMBER})\s*$")
+_SINGLE = re.compile(rf"^\s*({_NUMBER})\s*$")
+
+
+# --------------------------------------------------
+# ESTADÍSTICAS DEL DATASET ORIGINAL
+# --------------------------------------------------
+def _entropy(counts: np.ndarray) -> float:
+    total = counts.sum()
+    if total == 0:
+        return 0.0
+    p = counts[counts > 0] / total
+    return float(-(p * np.log2(p)).sum())
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def column_statistics(df: pd.DataFrame) -> Dict[str, Dict]:
+    """Estadísticas por columna que necesitan las métricas de pérdida (una pasada por columna)."""
+    stats = {}
+    for col in df.columns:
+        series = df[col]
+        counts = series.value_counts(dropna=True)
+        entry = {
+            "kind": "numeric" if _is_numeric(series) else "categorical",
+            "count": int(series.notna().sum()),
+            "null_count": int(series.isna().sum()),
+            "distinct": int(len(counts)),
+            "entropy": round(_entropy(counts.to_numpy()), 6),
+        }
+        if entry["kind"] == "numeric" and len(counts):
+            entry["min"] = float(series.min())
+            entry["max"] = float(series.max())
+        stats[col] = entry
+    return stats
+
+
+# --------------------------------------------------
+# NCP
+# --------------------------------------------------
+def _label_width(label: str) -> Optional[float]:
+    """Ancho del intervalo que representa una etiqueta; None si no es numérica."""
+    if label in SUPPRESSED_LABELS:
+        return np.inf
+    if label == "nan":
+        return 0.0
+    match = _INTERVAL.match(label)
+    if match:
+        return abs(float(match.group(2)) - float(match.group(1)))
+    if _SINGLE.match(label):
+        return 0.0
+    return None
+
+
+def _shared_originals(original: pd.Series, anonymized: pd.Series):
+    """Para cada fila, cuántos valores originales distintos comparten su etiqueta anonimizada."""
+    original_codes, _ = pd.factorize(original)
+    anon_codes, anon_labels = pd.factorize(anonymized.astype(object))
+    present = (original_codes >= 0) & (anon_codes >= 0)
+    base = max(int(original_codes.max()) + 1, 1) if len(original_codes) else 1
+    pairs = np.unique(anon_codes[present].astype(np.int64) * base + original_codes[present])
+    shared = np.bincount(pairs // base, minlength=max(len(anon_labels), 1))
+    per_row = np.zeros(len(anonymized))
+    per_row[anon_codes >= 0] = shared[anon_codes[anon_codes >= 0]]
+    suppressed = np.array([str(label) in SUPPRESSED_LABELS for label in anon_labels] + [False])
+    return per_row, suppressed[anon_codes]
+
+
+def column_ncp(original: pd.Series, anonymized: pd.Series, stats: Dict) -> float:
+    """NCP medio de una columna (0 = sin pérdida, 1 = totalmente generalizada)."""
+    if len(anonymized) == 0:
+        return 0.0
+    if stats.get("kind") == "numeric":
+        value_range = stats.get("max", 0.0) - stats.get("min", 0.0)
+        if value_range <= 0:
+            return 0.0
+        if _is_numeric(anonymized) and not isinstance(anonymized.dtype, pd.CategoricalDtype):
+            # Sigue siendo numérica (p. ej. ruido): error absoluto medio relativo al rango
+            error = (anonymized.astype(float) - original.astype(float)).abs().mean()
+            return float(min(error / value_range, 1.0)) if pd.notna(error) else 0.0
+
+        labels = anonymized.astype("category")
+        widths = [_label_width(str(label)) for label in labels.cat.categories]
+        if all(width is not None for width in widths):
+            # Una interpretación por categoría y un gather por códigos
+            per_category = np.minimum(np.array(widths, dtype=float) / value_range, 1.0)
+            codes = labels.cat.codes.to_numpy()
+            return float(np.where(codes >= 0, per_category[codes], 0.0).mean())
+
+    distinct = stats.get("distinct", 0)
+    if distinct <= 1:
+        return 0.0
+    shared, suppressed = _shared_originals(original, anonymized)
+    per_row = np.where(suppressed, 1.0, np.clip(shared - 1, 0, None) / (distinct - 1))
+    return float(per_row.mean())
+
+
+# --------------------------------------------------
+# SUITE COMPLETA
+# --------------------------------------------------
+def compute_information_loss(original_df: pd.DataFrame, anonymized_df: pd.DataFrame, columns: List[str],
+                             stats: Dict[str, Dict], quasi_identifiers: Optional[List[str]] = None,
+                             discernibility: Optional[float] = None, reuse: Optional[Dict[str, Dict]] = None,
+                             total_rows: Optional[int] = None) -> Dict:
+    """
+    NCP y pérdida por entropía por columna (las columnas eliminadas cuentan
+    como pérdida total) y discernibilidad de las clases de equivalencia.
+    Con `discernibility` (p. ej. la estimada con sketches) no se agrupa por
+    los cuasi-identificadores. `reuse` trae la pérdida ya calculada de las
+    columnas cuya salida no cambió (re-anonimización incremental); entonces
+    `original_df` sólo necesita las demás y `total_rows` da el número de filas.
+    """
+    reuse = reuse or {}
+    total = total_rows if total_rows is not None else len(original_df)
+    original_rows = None
+
+    per_column = {}
+    for col in columns:
+        if col in reuse:
+            per_column[col] = reuse[col]
+            continue
+        col_stats = stats.get(col, {})
+        if col not in anonymized_df.columns or col not in original_df.columns:
+            per_column[col] = {"ncp": 1.0, "entropy_loss": 1.0}
+            continue
+
+        if original_rows is None:
+            # Las filas eliminadas (p. ej. supresión por l-diversidad) se comparan sólo con las que quedan
+            original_rows = (
+                original_df if anonymized_df.index.equals(original_df.index) else original_df.loc[anonymized_df.index]
+            )
+        anonymized = anonymized_df[col]
+        ncp = column_ncp(original_rows[col], anonymized, col_stats)
+        # Sin entropía en el perfil (columnas aproximadas) no se mide esta pérdida
+        original_entropy = col_stats.get("entropy") or 0.0
+        if original_entropy > 0:
+            anon_entropy = _entropy(anonymized.value_counts(dropna=True).to_numpy())
+            entropy_loss = float(np.clip(1 - anon_entropy / original_entropy, 0.0, 1.0))
+        else:
+            entropy_loss = 0.0
+        per_column[col] = {"ncp": round(ncp, 4), "entropy_loss": round(entropy_loss, 4)}
+
+    n = len(anonymized_df)
+    quasi_identifiers = [col for col in (quasi_identifiers or []) if col in anonymized_df.columns]
+    if discernibility is not None:
+        discernibility = float(discernibility + (total - n) * total)
+    elif quasi_identifiers and n:
+        class_ids, class_count = equivalence_class_ids(anonymized_df, quasi_identifiers)
+        sizes = np.bincount(class_ids, minlength=class_count).astype(float)
+        # Las filas eliminadas se penalizan con el tamaño del dataset completo
+        removed = total - n
+        discernibility = float((sizes ** 2).sum() + removed * total)
+    else:
+        discernibility = float(n)
+
+    ncp_values = [c["ncp"] for c in per_column.values()]
+    entropy_values = [c["entropy_loss"] for c in per_column.values()]
+    return {
+        "ncp": round(float(np.mean(ncp_values)), 4) if ncp_values else 0.0,
+        "entropy_loss": round(float(np.mean(entropy_values)), 4) if entropy_values else 0.0,
+        "discernibility": discernibility,
+        "normalized_discernibility": round(discernibility / total ** 2, 6) if total else 0.0,
+        "columns": per_column,
+    }
+
+
+def merge_information_loss(base: Dict[str, Dict], base_rows: int, delta: Dict[str, Dict], delta_rows: int,
+                           total_rows: int, class_sizes: Optional[np.ndarray] = None) -> Dict:
+    """
+    Pérdida de información tras añadir filas: la de cada columna es la media
+    de `base` (pérdida por columna de la ejecución anterior, sobre
+    `base_rows` filas publicadas) y `delta` ponderada por filas. La pérdida
+    por entropía así combinada es una aproximación: la entropía no es
+    aditiva. `class_sizes` son los tamaños de todas las clases de
+    equivalencia publicadas (None si no hay cuasi-identificadores).
+    """
+    per_column = {}
+    published = base_rows + delta_rows
+    for col in dict.fromkeys([*base, *delta]):
+        old, new = base.get(col), delta.get(col)
+        if old is None or new is None or not published:
+            per_column[col] = old or new
+            continue
+        per_column[col] = {
+            metric: round((old[metric] * base_rows + new[metric] * delta_rows) / published, 4)
+            for metric in ("ncp", "entropy_loss")
+        }
+
+    if class_sizes is not None and len(class_sizes):
+        sizes = np.asarray(class_sizes, dtype=float)
+        discernibility = float((sizes ** 2).sum() + (total_rows - sizes.sum()) * total_rows)
+    else:
+        discernibility = float(published)
+
+    ncp_values = [c["ncp"] for c in per_column.values()]
+    entropy_values = [c["entropy_loss"] for c in per_column.values()]
+    return {
+        "ncp": round(float(np.mean(ncp_values)), 4) if ncp_values else 0.0,
+        "entropy_loss": round(float(np.mean(entropy_values)), 4) if entropy_values else 0.0,
+        "discernibility": discernibility,
+        "normalized_discernibility": round(discernibility / total_rows ** 2, 6) if total_rows else 0.0,
+        "columns": per_column,
+    }
@@ -0,0 +1,176 @@
+"""
+Ingesta por bloques (chunks) de archivos subidos.
+
+En lugar de leer el archivo completo con `pd.read_csv`/`pd.read_excel` y
+serializarlo entero, el archivo se recorre en bloques de `chunk_rows` filas.
+Cada bloque se escribe en el almacenamiento en cuanto se lee, de modo que la
+memoria usada depende del tamaño del bloque y no del tamaño del archivo.
+El número de filas, columnas y el esquema se calculan sobre la marcha.
+"""
+import logging
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 50000
+
+
+# --------------------------------------------------
+# ESQUEMA
+# --------------------------------------------------
+def _dtype_kind(series: pd.Series) -> Optional[str]:
+    """Tipo lógico de una columna dentro de un bloque (None si está vacía)."""
+    if series.isna().all():
+        return None
+    if pd.api.types.is_bool_dtype(series):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(series):
+        return "integer"
+    if pd.api.types.is_float_dtype(series):
+        # Columnas enteras con nulos llegan como float
+        non_null = series.dropna()
+        if len(non_null) < len(series) and np.all(np.mod(non_null, 1) == 0):
+            return "integer"
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    return "string"
+
+
+def _merge_kinds(current: Optional[str], new: Optional[str]) -> Optional[str]:
+    if current is None:
+        return new
+    if new is None or current == new:
+        return current
+    if {current, new} <= {"integer", "float"}:
+        return "float"
+    return "string"
+
+
+class SchemaTracker:
+    """Acumula filas, columnas, tipos y nulos a medida que llegan los bloques."""
+
+    def __init__(self):
+        self.columns: List[str] = []
+        self.kinds: Dict[str, Optional[str]] = {}
+        self.null_counts: Dict[str, int] = {}
+        self.row_count = 0
+        self.chunk_count = 0
+
+    def update(self, chunk: pd.DataFrame):
+        if not self.columns:
+            self.columns = [str(c) for c in chunk.columns]
+        for col in chunk.columns:
+            name = str(col)
+            self.kinds[name] = _merge_kinds(self.kinds.get(name), _dtype_kind(chunk[col]))
+            self.null_counts[name] = self.null_counts.get(name, 0) + int(chunk[col].isna().sum())
+        self.row_count += len(chunk)
+        self.chunk_count += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            "columns": [
+                {
+                    "name": col,
+                    "type": self.kinds.get(col) or "string",
+                    "null_count": self.null_counts.get(col, 0)
+                }
+                for col in self.columns
+            ],
+            "row_count": self.row_count,
+            "chunk_count": self.chunk_count
+        }
+
+
+def merge_schemas(base: Dict, delta: Dict) -> Dict:
+    """Esquema del dataset tras añadir las filas de `delta` (mismas columnas)."""
+    delta_columns = {column["name"]: column for column in delta.get("columns", [])}
+    columns = []
+    for column in base.get("columns", []):
+        added = delta_columns.get(column["name"], {})
+        columns.append({
+            "name": column["name"],
+            "type": _merge_kinds(column.get("type"), added.get("type")) or "string",
+            "null_count": column.get("null_count", 0) + added.get("null_count", 0),
+        })
+    return {
+        "columns": columns,
+        "row_count": base.get("row_count", 0) + delta.get("row_count", 0),
+        "chunk_count": base.get("chunk_count", 0) + delta.get("chunk_count", 0),
+    }
+
+
+# --------------------------------------------------
+# LECTORES POR BLOQUES
+# --------------------------------------------------
+def iter_csv_chunks(fileobj, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    reader = pd.read_csv(fileobj, chunksize=chunk_rows)
+    for chunk in reader:
+        yield chunk
+
+
+def iter_excel_chunks(fileobj, filename: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    if not filename.endswith('.xlsx'):
+        # El formato .xls antiguo no admite lectura en streaming
+        df = pd.read_excel(fileobj)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows].reset_index(drop=True)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+
+        buffer = []
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            buffer.append(row[:len(columns)])
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_upload_chunks(fileobj, filename: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    if filename.endswith('.csv'):
+        return iter_csv_chunks(fileobj, chunk_rows)
+    return iter_excel_chunks(fileobj, filename, chunk_rows)
+
+
+# --------------------------------------------------
+# ESCRITURA DE BLOQUES
+# --------------------------------------------------
+def chunk_to_records(chunk: pd.DataFrame) -> List[Dict]:
+    return chunk.astype(object).where(chunk.notna(), None).to_dict(orient='records')
+
+
+def ingest_chunks(chunks: Iterator[pd.DataFrame], write_chunk: Callable[[int, int, pd.DataFrame], None],
+                  profiler=None) -> SchemaTracker:
+    """
+    Recorre los bloques, actualiza el esquema y entrega cada bloque a
+    `write_chunk(chunk_index, row_offset, chunk)` para que se persista.
+    Si se pasa `profiler` (`profiling.ColumnProfiler`), también se actualiza
+    con cada bloque. Sólo hay un bloque en memoria a la vez.
+    """
+    tracker = SchemaTracker()
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        write_chunk(tracker.chunk_count, tracker.row_count, chunk)
+        tracker.update(chunk)
+        if profiler is not None:
+            profiler.update(chunk)
+    return tracker
@@ -0,0 +1,85 @@
+"""
+Cola de trabajos de anonimización en segundo plano.
+
+`/api/process` ya no ejecuta la anonimización dentro del event loop: crea
+una fila en `anonymization_results` con estado `pending` y entrega el
+trabajo a un pool de hilos. El estado (pending → running → completed /
+failed) y el avance se guardan en la misma fila y se consultan con
+`GET /api/jobs/{id}`.
+"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+DEFAULT_JOB_WORKERS = 2
+
+
+class JobProgress:
+    """Actualiza el estado y el avance de un trabajo en `anonymization_results`."""
+
+    def __init__(self, db, job_id: str):
+        self.db = db
+        self.job_id = job_id
+
+    def _update(self, data: Dict):
+        try:
+            self.db.update("anonymization_results", data, {"id": self.job_id})
+        except Exception as e:
+            logger.error(f"Failed to update job {self.job_id}: {str(e)}")
+
+    def start(self):
+        self._update({"status": JOB_RUNNING, "stage": "started", "progress": 0, "started_at": datetime.utcnow()})
+
+    def update(self, progress: int, stage: str):
+        logger.info(f"Job {self.job_id}: {stage} ({progress}%)")
+        self._update({"progress": progress, "stage": stage})
+
+    def fail(self, error: str):
+        self._update({
+            "status": JOB_FAILED,
+            "stage": "failed",
+            "error_message": error,
+            "completed_at": datetime.utcnow()
+        })
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = DEFAULT_JOB_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="anonymization-job")
+        self.futures: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        logger.info(f"Job queue started with {max_workers} workers")
+
+    def submit(self, job_id: str, fn: Callable, *args, **kwargs) -> Future:
+        future = self.executor.submit(fn, *args, **kwargs)
+        with self.lock:
+            self.futures[job_id] = future
+        future.add_done_callback(lambda f: self._forget(job_id, f))
+        return future
+
+    def _forget(self, job_id: str, future: Future):
+        with self.lock:
+            self.futures.pop(job_id, None)
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Job {job_id} raised an unhandled error: {str(error)}")
+
+    def is_active(self, job_id: str) -> bool:
+        with self.lock:
+            return job_id in self.futures
+
+    def active_count(self) -> int:
+        with self.lock:
+            return len(self.futures)
+
+    def shutdown(self, wait: bool = False):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,19 +1,99 @@
 import logging
 import os
+import threading
 import time
+from contextlib import closing
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Depends, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
 import pandas as pd
 import numpy as np
-from io import BytesIO
 import json
 from collections import Counter
-import math
 from database import get_database, load_credentials
+from differential_privacy import (
+    DEFAULT_DELTA,
+    DEFAULT_MECHANISM,
+    MECHANISMS,
+    PostgresBudgetLedger,
+    PrivacyAccountant,
+    PrivacyBudgetExceeded,
+    clamp_bounds,
+    technique_charges,
+)
+from diversity import enforce_l_diversity
+from execution import DEFAULT_EXECUTION_CHUNK_ROWS, DEFAULT_MIN_PARALLEL_ROWS, ExecutionEngine
+from export import (
+    DEFAULT_EXPORT_BATCH_ROWS,
+    DEFAULT_MAX_CONCURRENT_EXPORTS,
+    EXPORT_FORMATS,
+    ReleasingStream,
+    available_formats,
+    export_stream,
+)
+from hierarchies import Hierarchy, lattice_anonymize
+from incremental import (
+    AppendUnsupported,
+    SnapshotStore,
+    column_fingerprints,
+    extend_classes,
+    global_fingerprint,
+    plan_append,
+    plan_changes,
+    qi_step_columns,
+    split_details,
+)
+from information_loss import column_statistics, compute_information_loss, merge_information_loss
+from ingestion import (
+    DEFAULT_CHUNK_ROWS,
+    SchemaTracker,
+    chunk_to_records,
+    ingest_chunks,
+    iter_upload_chunks,
+    merge_schemas,
+)
+from jobs import DEFAULT_JOB_WORKERS, JOB_COMPLETED, JOB_PENDING, JobProgress, JobQueue
+from mondrian import mondrian_anonymize
+from privacy_metrics import (
+    CLASS_COUNT_COLUMN,
+    DEFAULT_APPROXIMATE_ROWS,
+    approximate_privacy_metrics,
+    class_table,
+    compute_privacy_metrics,
+    merge_class_tables,
+)
+from profiling import DEFAULT_MAX_TRACKED_VALUES, DEFAULT_TOP_K, ColumnProfiler, merge_profiles, top_values
+from pseudonym_vault import build_vault
+from randomness import RandomStreams, new_seed
+from result_cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    ContentHasher,
+    ResultCache,
+    cache_key,
+    chain_hash,
+    config_hash,
+    content_hash,
+    settings_fingerprint,
+)
+from risk import DEFAULT_RISK_THRESHOLD, DEFAULT_TOP_RECORDS, MAX_TOP_RECORDS, RiskAccumulator, compute_risk
+from storage import StorageManager
+from techniques import (
+    DEFAULT_PSEUDONYM_ALGORITHM,
+    DEFAULT_PSEUDONYM_DIGEST_LENGTH,
+    apply_differential_privacy,
+    apply_masking,
+    apply_pseudonymization,
+    generalize_categorical,
+    generalize_numeric,
+    generalize_numeric_with_edges,
+    numeric_bin_edges,
+    suppress_data,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,6 +103,43 @@ logger = logging.getLogger(__name__)
 
 credentials = load_credentials()
 db = get_database()
+storage = StorageManager(db, credentials.get('storage', {}))
+job_queue = JobQueue(credentials['backend'].get('job_workers', DEFAULT_JOB_WORKERS))
+execution_engine = ExecutionEngine(
+    max_workers=credentials['backend'].get('execution_workers'),
+    chunk_rows=credentials['backend'].get('execution_chunk_rows', DEFAULT_EXECUTION_CHUNK_ROWS),
+    min_parallel_rows=credentials['backend'].get('execution_min_parallel_rows', DEFAULT_MIN_PARALLEL_ROWS)
+)
+anonymization_config = credentials.get('anonymization', {})
+PSEUDONYM_KEY = anonymization_config.get('pseudonym_key')
+if not PSEUDONYM_KEY:
+    logger.warning("No pseudonym_key configured: pseudonyms are unkeyed hashes")
+pseudonym_vault = build_vault(db, credentials.get('pseudonym_vault', {}), key=PSEUDONYM_KEY)
+privacy_ledger = PostgresBudgetLedger(db)
+
+# Instantáneas de la última ejecución por dataset para la re-anonimización incremental
+snapshot_path = anonymization_config.get('snapshot_path', 'backend/storage/snapshots')
+if not os.path.isabs(snapshot_path):
+    snapshot_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), snapshot_path)
+snapshot_store = SnapshotStore(snapshot_path) if anonymization_config.get('incremental', True) else None
+# Ajustes del servidor que cambian el resultado sin formar parte de la configuración
+RESULT_SETTINGS = settings_fingerprint({
+    "pseudonym_algorithm": anonymization_config.get('pseudonym_algorithm'),
+    "pseudonym_digest_length": anonymization_config.get('pseudonym_digest_length'),
+    "pseudonym_key": PSEUDONYM_KEY,
+    "pseudonym_vault": pseudonym_vault is not None,
+})
+result_cache_config = credentials.get('result_cache', {})
+result_cache = ResultCache(
+    db,
+    max_entries=result_cache_config.get('max_entries', DEFAULT_CACHE_MAX_ENTRIES),
+    max_bytes=result_cache_config.get('max_bytes', DEFAULT_CACHE_MAX_BYTES),
+    enabled=result_cache_config.get('enabled', True)
+)
+# Exportaciones simultáneas: cada una mantiene una conexión del pool hasta terminar la descarga
+export_slots = threading.BoundedSemaphore(
+    credentials['backend'].get('max_concurrent_exports', DEFAULT_MAX_CONCURRENT_EXPORTS)
+)
 
 app = FastAPI(title="Data Anonymization System API")
 
@@ -33,6 +150,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -58,6 +176,13 @@ class AnonymizationConfig(BaseModel):
 class ProcessRequest(BaseModel):
     dataset_id: str
     config_id: str
+    # False recalcula aunque haya un resultado en caché (p. ej. para obtener ruido nuevo sin semilla)
+    use_cache: bool = True
+
+
+class PrivacyBudgetRequest(BaseModel):
+    epsilon: Optional[float] = None
+    delta: Optional[float] = None
 
 
 def get_current_user():
@@ -78,6 +203,88 @@ def log_audit(user_id: str, action: str, resource_type: str, resource_id: str, d
         logger.error(f"Failed to log audit: {str(e)}")
 
 
+# --------------------------------------------------
+# LISTADOS LIGEROS Y PAGINADOS
+# --------------------------------------------------
+# Columnas devueltas siempre en los listados; los campos pesados sólo con `include`
+DATASET_LIST_FIELDS = ["id", "user_id", "name", "original_filename", "file_size", "row_count", "column_count",
+                       "column_names", "storage_format", "status", "created_at", "updated_at"]
+DATASET_HEAVY_FIELDS = ["schema", "column_stats", "data"]
+# Lo que necesita un trabajo de anonimización, sin las filas
+DATASET_PROCESS_FIELDS = DATASET_LIST_FIELDS + ["schema", "column_stats", "storage_path", "content_hash",
+                                                "privacy_budget_epsilon", "privacy_budget_delta", "segments"]
+# Estados en los que las filas del dataset están completas y pueden anonimizarse
+PROCESSABLE_DATASET_STATUSES = ("ready", "completed")
+
+CONFIG_LIST_FIELDS = ["id", "user_id", "dataset_id", "name", "created_at", "updated_at"]
+CONFIG_HEAVY_FIELDS = ["column_mappings", "techniques", "global_params"]
+
+RESULT_LIST_FIELDS = ["id", "user_id", "dataset_id", "config_id", "metrics", "status", "progress",
+                      "error_message", "processing_time_ms", "completed_at", "created_at"]
+RESULT_HEAVY_FIELDS = ["technique_details", "anonymized_data"]
+
+JOB_FIELDS = ["id", "dataset_id", "config_id", "status", "stage", "progress", "error_message", "metrics",
+              "processing_time_ms", "created_at", "started_at", "completed_at"]
+
+JSON_FIELDS = ["column_names", "schema", "column_stats", "column_mappings", "techniques", "global_params", "metrics",
+               "technique_details", "anonymized_data", "segments"]
+
+
+def parse_include(include: Optional[str], heavy_fields: List[str]) -> List[str]:
+    requested = [f.strip() for f in include.split(',') if f.strip()] if include else []
+    unknown = [f for f in requested if f not in heavy_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include fields: {', '.join(unknown)}. "
+                                                    f"Allowed: {', '.join(heavy_fields)}")
+    return requested
+
+
+def encode_cursor(row: Dict) -> str:
+    return f"{row['created_at'].isoformat()}|{row['id']}"
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, row_id = cursor.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), row_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def list_rows(table: str, fields: List[str], filters: Dict, cursor: Optional[str], limit: Optional[int],
+              response: Response) -> List[Dict]:
+    """
+    Listado por keyset sobre (created_at, id), del más reciente al más antiguo.
+    Si hay más filas, el cursor de la siguiente página va en la cabecera `X-Next-Cursor`.
+    """
+    conditions = [f"{key} = %s" for key in filters.keys()]
+    params = list(filters.values())
+
+    if cursor:
+        conditions.append("(created_at, id) < (%s, %s)")
+        params.extend(decode_cursor(cursor))
+
+    query = f"SELECT {', '.join(fields)} FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY created_at DESC, id DESC"
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit + 1)
+
+    results = db.execute_query(query, tuple(params), fetch=True)
+
+    if limit and len(results) > limit:
+        results = results[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(results[-1])
+
+    for result in results:
+        for field in JSON_FIELDS:
+            if isinstance(result.get(field), str):
+                result[field] = json.loads(result[field])
+    return results
+
+
 @app.get("/", response_class=HTMLResponse)
 def read_root():
     html_content = """
@@ -211,6 +418,16 @@ def read_root():
                 color: white;
             }
 
+            .method.put {
+                background: #f59e0b;
+                color: white;
+            }
+
+            .method.delete {
+                background: #ef4444;
+                color: white;
+            }
+
             .path {
                 font-family: 'Courier New', monospace;
                 color: #667eea;
@@ -396,12 +613,31 @@ def read_root():
                         </div>
                     </div>
 
+                    <div class="endpoint">
+                        <div>
+                            <span class="method post">POST</span>
+                            <span class="path">/api/datasets/{dataset_id}/append</span>
+                        </div>
+                        <div class="description">Añadir filas a un dataset como un segmento nuevo (mismas columnas); la siguiente anonimización con la misma configuración sólo procesa las filas añadidas</div>
+                        <div class="params">
+                            <div class="params-title">Parámetros:</div>
+                            <div class="param-item">dataset_id: UUID</div>
+                            <div class="param-item">file: UploadFile (CSV o XLSX, máx 50MB)</div>
+                        </div>
+                    </div>
+
                     <div class="endpoint">
                         <div>
                             <span class="method get">GET</span>
                             <span class="path">/api/datasets</span>
                         </div>
                         <div class="description">Listar todos los datasets subidos con metadata (nombre, filas, columnas, fecha)</div>
+                        <div class="params">
+                            <div class="params-title">Query params (opcional):</div>
+                            <div class="param-item">include: schema,column_stats,data</div>
+                            <div class="param-item">limit: int (cursor siguiente en cabecera X-Next-Cursor)</div>
+                            <div class="param-item">cursor: string</div>
+                        </div>
                     </div>
 
                     <div class="endpoint">
@@ -413,6 +649,57 @@ def read_root():
                         <div class="params">
                             <div class="params-title">Parámetros:</div>
                             <div class="param-item">dataset_id: UUID</div>
+                            <div class="param-item">offset: int, limit: int (paginación de filas)</div>
+                            <div class="param-item">columns: col1,col2 (proyección de columnas)</div>
+                        </div>
+                    </div>
+
+                    <div class="endpoint">
+                        <div>
+                            <span class="method get">GET</span>
+                            <span class="path">/api/datasets/{dataset_id}/profile</span>
+                        </div>
+                        <div class="description">Perfil de columnas calculado al subir el dataset (tipo, nulos, mín/máx, distintos y valores más frecuentes) sin descargar filas</div>
+                        <div class="params">
+                            <div class="params-title">Parámetros:</div>
+                            <div class="param-item">dataset_id: UUID</div>
+                        </div>
+                    </div>
+
+                    <div class="endpoint">
+                        <div>
+                            <span class="method get">GET</span>
+                            <span class="path">/api/datasets/{dataset_id}/risk</span>
+                        </div>
+                        <div class="description">Riesgo de reidentificación (fiscal, periodista, comercializador), únicos muestrales y registros de mayor riesgo para un conjunto de cuasi-identificadores</div>
+                        <div class="params">
+                            <div class="params-title">Query params:</div>
+                            <div class="param-item">quasi_identifiers: col1,col2</div>
+                            <div class="param-item">sampling_fraction: float (0-1], threshold: float, top: int</div>
+                        </div>
+                    </div>
+
+                    <div class="endpoint">
+                        <div>
+                            <span class="method get">GET</span>
+                            <span class="path">/api/datasets/{dataset_id}/privacy-budget</span>
+                        </div>
+                        <div class="description">Presupuesto de privacidad diferencial del dataset: ε y δ gastados por composición secuencial, restante y registro de cargos por ejecución</div>
+                        <div class="params">
+                            <div class="params-title">Parámetros:</div>
+                            <div class="param-item">dataset_id: UUID</div>
+                        </div>
+                    </div>
+
+                    <div class="endpoint">
+                        <div>
+                            <span class="method put">PUT</span>
+                            <span class="path">/api/datasets/{dataset_id}/privacy-budget</span>
+                        </div>
+                        <div class="description">Fijar el presupuesto (ε, δ) del dataset; null vuelve al valor por defecto de la configuración</div>
+                        <div class="params">
+                            <div class="params-title">Body (JSON):</div>
+                            <div class="param-item">epsilon: float | null, delta: float | null</div>
                         </div>
                     </div>
 
@@ -441,6 +728,8 @@ def read_root():
                         <div class="params">
                             <div class="params-title">Query params (opcional):</div>
                             <div class="param-item">dataset_id: UUID</div>
+                            <div class="param-item">include: column_mappings,techniques,global_params</div>
+                            <div class="param-item">limit: int / cursor: string</div>
                         </div>
                     </div>
 
@@ -449,11 +738,24 @@ def read_root():
                             <span class="method post">POST</span>
                             <span class="path">/api/process</span>
                         </div>
-                        <div class="description">Procesar la anonimización de un dataset aplicando una configuración específica</div>
+                        <div class="description">Encolar la anonimización de un dataset aplicando una configuración específica (responde 202 con el trabajo creado, o 200 con el resultado en caché si ya se ejecutó la misma configuración sobre el mismo contenido y semilla)</div>
                         <div class="params">
                             <div class="params-title">Parámetros JSON:</div>
                             <div class="param-item">dataset_id: UUID</div>
                             <div class="param-item">config_id: UUID</div>
+                            <div class="param-item">use_cache: bool (por defecto true)</div>
+                        </div>
+                    </div>
+
+                    <div class="endpoint">
+                        <div>
+                            <span class="method get">GET</span>
+                            <span class="path">/api/jobs/{job_id}</span>
+                        </div>
+                        <div class="description">Consultar el estado de un procesamiento encolado (pending, running, completed, failed) y su avance</div>
+                        <div class="params">
+                            <div class="params-title">Parámetros:</div>
+                            <div class="param-item">job_id: UUID (devuelto por /api/process)</div>
                         </div>
                     </div>
 
@@ -463,6 +765,13 @@ def read_root():
                             <span class="path">/api/results</span>
                         </div>
                         <div class="description">Listar todos los resultados de anonimización con métricas de privacidad</div>
+                        <div class="params">
+                            <div class="params-title">Query params (opcional):</div>
+                            <div class="param-item">dataset_id: UUID</div>
+                            <div class="param-item">status: pending | running | completed | failed</div>
+                            <div class="param-item">include: technique_details,anonymized_data</div>
+                            <div class="param-item">limit: int / cursor: string</div>
+                        </div>
                     </div>
 
                     <div class="endpoint">
@@ -474,6 +783,34 @@ def read_root():
                         <div class="params">
                             <div class="params-title">Parámetros:</div>
                             <div class="param-item">result_id: UUID</div>
+                            <div class="param-item">offset: int, limit: int (paginación de filas)</div>
+                            <div class="param-item">columns: col1,col2 (proyección de columnas)</div>
+                        </div>
+                    </div>
+
+                    <div class="endpoint">
+                        <div>
+                            <span class="method get">GET</span>
+                            <span class="path">/api/results/{result_id}/export</span>
+                        </div>
+                        <div class="description">Descargar las filas anonimizadas por streaming, por lotes y sin cargar el resultado completo en memoria</div>
+                        <div class="params">
+                            <div class="params-title">Query params (opcional):</div>
+                            <div class="param-item">format: ndjson | csv | parquet (por defecto ndjson)</div>
+                            <div class="param-item">columns: col1,col2 (proyección de columnas)</div>
+                        </div>
+                    </div>
+
+                    <div class="endpoint">
+                        <div>
+                            <span class="method get">GET</span>
+                            <span class="path">/api/results/{result_id}/risk</span>
+                        </div>
+                        <div class="description">Riesgo de reidentificación de un resultado anonimizado (por defecto con sus cuasi-identificadores)</div>
+                        <div class="params">
+                            <div class="params-title">Query params (opcional):</div>
+                            <div class="param-item">quasi_identifiers: col1,col2</div>
+                            <div class="param-item">sampling_fraction: float (0-1], threshold: float, top: int</div>
                         </div>
                     </div>
 
@@ -484,6 +821,26 @@ def read_root():
                         </div>
                         <div class="description">Obtener estadísticas generales del sistema (datasets, configs, resultados)</div>
                     </div>
+
+                    <div class="endpoint">
+                        <div>
+                            <span class="method get">GET</span>
+                            <span class="path">/api/cache</span>
+                        </div>
+                        <div class="description">Estado de la caché de resultados (entradas, bytes, aciertos y límites de expulsión LRU) y de la caché de DataFrames decodificados del proceso (aciertos, fallos, expulsiones)</div>
+                    </div>
+
+                    <div class="endpoint">
+                        <div>
+                            <span class="method delete">DELETE</span>
+                            <span class="path">/api/cache</span>
+                        </div>
+                        <div class="description">Invalidar la caché de resultados y de DataFrames (toda o sólo la de un dataset); los resultados se conservan</div>
+                        <div class="params">
+                            <div class="params-title">Query params:</div>
+                            <div class="param-item">dataset_id: UUID (opcional)</div>
+                        </div>
+                    </div>
                 </div>
 
                 <div class="section">
@@ -555,6 +912,14 @@ def read_root():
     return HTMLResponse(content=html_content)
 
 
+def new_column_profiler(sketch_distinct: bool = False) -> ColumnProfiler:
+    return ColumnProfiler(
+        credentials['backend'].get('profile_max_tracked_values', DEFAULT_MAX_TRACKED_VALUES),
+        credentials['backend'].get('profile_top_k', DEFAULT_TOP_K),
+        sketch_distinct
+    )
+
+
 @app.post("/api/datasets/upload")
 async def upload_dataset(
         file: UploadFile = File(...),
@@ -570,453 +935,643 @@ async def upload_dataset(
         raise HTTPException(status_code=400, detail=f"File size must be less than {max_size_mb}MB")
 
     try:
-        contents = await file.read()
-
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(BytesIO(contents))
-        else:
-            df = pd.read_excel(BytesIO(contents))
+        # El archivo ya está en un SpooledTemporaryFile: se recorre por bloques sin cargarlo entero
+        fileobj = file.file
+        fileobj.seek(0, os.SEEK_END)
+        file_size = fileobj.tell()
+        fileobj.seek(0)
 
-        df = df.replace({np.nan: None})
+        if file_size > max_size_mb * 1024 * 1024:
+            raise HTTPException(status_code=400, detail=f"File size must be less than {max_size_mb}MB")
 
-        data_json = df.to_dict(orient='records')
-        column_names = df.columns.tolist()
+        chunk_rows = credentials['backend'].get('upload_chunk_rows', DEFAULT_CHUNK_ROWS)
+        store = storage.default()
 
-        dataset = {
+        dataset = db.insert_returning("datasets", {
             "user_id": user_id,
             "name": file.filename.rsplit('.', 1)[0],
             "original_filename": file.filename,
-            "file_size": len(contents),
-            "row_count": len(df),
-            "column_count": len(df.columns),
-            "column_names": json.dumps(column_names),
-            "data": json.dumps(data_json),
-            "status": "ready",
+            "file_size": file_size,
+            "row_count": 0,
+            "column_count": 0,
+            "column_names": json.dumps([]),
+            "storage_format": store.name,
+            "status": "uploading",
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
-        }
+        })
+        dataset_id = dataset["id"]
+
+        # El hash del contenido (clave de la caché de resultados) se calcula en la misma pasada
+        hasher = ContentHasher()
 
-        result = db.insert_returning("datasets", dataset)
+        def write_chunk(chunk_index, row_offset, chunk):
+            hasher.update(chunk)
+            store.write_chunk(dataset_id, chunk_index, row_offset, chunk)
+
+        # El perfil de columnas se calcula en la misma pasada que el esquema
+        profiler = new_column_profiler()
+
+        try:
+            tracker = await run_in_threadpool(
+                ingest_chunks, iter_upload_chunks(fileobj, file.filename, chunk_rows), write_chunk, profiler
+            )
+        except Exception:
+            store.delete(dataset)
+            db.delete("datasets", {"id": dataset_id})
+            raise
+
+        schema = tracker.to_dict()
+        result = db.update("datasets", {
+            "row_count": tracker.row_count,
+            "column_count": len(tracker.columns),
+            "column_names": json.dumps(tracker.columns),
+            "schema": json.dumps(schema),
+            "column_stats": json.dumps(profiler.to_dict()),
+            "content_hash": hasher.hexdigest(),
+            "segments": json.dumps([dataset_segment(0, 0, tracker.row_count, 0, tracker.chunk_count,
+                                                    hasher.hexdigest())]),
+            "storage_path": store.storage_path(dataset_id),
+            "status": "ready",
+            "updated_at": datetime.utcnow()
+        }, {"id": dataset_id})
 
         log_audit(user_id, "upload_dataset", "dataset", result["id"], {
             "filename": file.filename,
-            "rows": len(df),
-            "columns": len(df.columns)
+            "rows": tracker.row_count,
+            "columns": len(tracker.columns),
+            "chunks": tracker.chunk_count
         })
 
-        # result['column_names'] = json.loads(result['column_names'])
-        # result['data'] = json.loads(result['data'])
         result['column_names'] = json.loads(result['column_names']) if isinstance(result.get('column_names'),
                                                                                   str) else result.get('column_names',
                                                                                                        [])
-        result['data'] = json.loads(result['data']) if isinstance(result.get('data'), str) else result.get('data', [])
+        result['schema'] = json.loads(result['schema']) if isinstance(result.get('schema'), str) else result.get(
+            'schema', {})
 
-        logger.info(f"Dataset uploaded successfully: {result['id']}")
+        logger.info(f"Dataset uploaded successfully: {result['id']} ({tracker.row_count} rows, "
+                    f"{tracker.chunk_count} chunks)")
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         linea_error = e.__traceback__.tb_lineno
         logger.error(f"Error uploading dataset: {str(e)} - Line: {linea_error}")
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)} - Line: {linea_error}")
 
 
-@app.get("/api/datasets")
-def get_datasets(user_id: str = Depends(get_current_user)):
-    logger.info(f"User {user_id} fetching datasets")
-    try:
-        results = db.execute_query(
-            "SELECT * FROM datasets WHERE user_id = %s ORDER BY created_at DESC",
-            (user_id,),
-            fetch=True
-        )
+def dataset_segment(index: int, row_offset: int, row_count: int, chunk_offset: int, chunk_count: int,
+                    content_hash: str) -> Dict:
+    # `content_hash` es el del dataset completo tras el segmento: así se sabe qué segmentos cubre una instantánea
+    return {
+        "index": index,
+        "row_offset": row_offset,
+        "row_count": row_count,
+        "chunk_offset": chunk_offset,
+        "chunk_count": chunk_count,
+        "content_hash": content_hash,
+        "created_at": datetime.utcnow().isoformat()
+    }
 
-        for result in results:
-            if isinstance(result.get('column_names'), str):
-                result['column_names'] = json.loads(result['column_names'])
-            if isinstance(result.get('data'), str):
-                result['data'] = json.loads(result['data'])
 
-        return results
-    except Exception as e:
-        logger.error(f"Error fetching datasets: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+@app.post("/api/datasets/{dataset_id}/append")
+async def append_dataset_rows(
+        dataset_id: str,
+        file: UploadFile = File(...),
+        user_id: str = Depends(get_current_user)
+):
+    """
+    Añade las filas del archivo al dataset como un segmento nuevo. El
+    esquema, el perfil de columnas y el hash del contenido se actualizan
+    combinando los del dataset con los del segmento, sin volver a leer las
+    filas que ya había; la siguiente anonimización con la misma
+    configuración sólo procesa el segmento.
+    """
+    logger.info(f"User {user_id} appending file {file.filename} to dataset {dataset_id}")
+
+    if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
+        raise HTTPException(status_code=400, detail="Only Excel (.xlsx, .xls) and CSV files are supported")
 
+    max_size_mb = credentials['backend'].get('max_upload_size_mb', 50)
+    if file.size and file.size > max_size_mb * 1024 * 1024:
+        raise HTTPException(status_code=400, detail=f"File size must be less than {max_size_mb}MB")
 
-@app.get("/api/datasets/{dataset_id}")
-def get_dataset(dataset_id: str, user_id: str = Depends(get_current_user)):
-    logger.info(f"User {user_id} fetching dataset {dataset_id}")
     try:
-        result = db.select_one("datasets", {"id": dataset_id, "user_id": user_id})
-        if not result:
+        dataset = select_fields("datasets", DATASET_PROCESS_FIELDS, {"id": dataset_id, "user_id": user_id})
+        if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
+        store = storage.for_dataset(dataset)
+        try:
+            first_chunk = store.chunk_count(dataset)
+        except NotImplementedError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Un único segmento a la vez: el dataset queda bloqueado mientras se escribe
+        locked = db.execute_one(
+            "UPDATE datasets SET status = 'appending' WHERE id = %s AND status = 'ready' RETURNING id",
+            (dataset_id,)
+        )
+        if not locked:
+            raise HTTPException(status_code=409, detail="Dataset is not ready for appending rows")
+
+        try:
+            column_names = dataset["column_names"]
+            segments = dataset.get("segments") or []
+            if not segments:
+                # Datasets subidos antes de los segmentos: todo lo anterior es el primero
+                segments = [dataset_segment(0, 0, int(dataset["row_count"] or 0), 0, first_chunk,
+                                            dataset_content_hash(dataset))]
+            row_offset = int(dataset["row_count"] or 0)
+
+            fileobj = file.file
+            hasher = ContentHasher()
+
+            def write_chunk(chunk_index, chunk_offset, chunk):
+                if list(chunk.columns) != column_names:
+                    if sorted(map(str, chunk.columns)) != sorted(column_names):
+                        raise ValueError(f"Appended columns {list(chunk.columns)} do not match {column_names}")
+                    chunk = chunk[column_names]
+                hasher.update(chunk)
+                store.write_chunk(dataset_id, first_chunk + chunk_index, row_offset + chunk_offset, chunk)
+
+            # El perfil del segmento guarda siempre el HLL para poder combinarlo con el del dataset
+            profiler = new_column_profiler(sketch_distinct=True)
+            chunk_rows = credentials['backend'].get('upload_chunk_rows', DEFAULT_CHUNK_ROWS)
+            tracker = await run_in_threadpool(
+                ingest_chunks, iter_upload_chunks(fileobj, file.filename, chunk_rows), write_chunk, profiler
+            )
+            if tracker.row_count == 0:
+                raise ValueError("The appended file has no rows")
+
+            content = chain_hash(dataset_content_hash(dataset), hasher.hexdigest())
+            segments.append(dataset_segment(len(segments), row_offset, tracker.row_count, first_chunk,
+                                            tracker.chunk_count, content))
+            # Un nuevo `updated_at` deja obsoletas las columnas en la caché de DataFrames
+            result = db.update("datasets", {
+                "row_count": row_offset + tracker.row_count,
+                "schema": json.dumps(merge_schemas(dataset.get("schema") or {}, tracker.to_dict())),
+                "column_stats": json.dumps(merge_profiles(
+                    dataset.get("column_stats") or {}, profiler.to_dict(),
+                    credentials['backend'].get('profile_top_k', DEFAULT_TOP_K)
+                )),
+                "content_hash": content,
+                "segments": json.dumps(segments),
+                "file_size": int(dataset.get("file_size") or 0) + (file.size or 0),
+                "status": "ready",
+                "updated_at": datetime.utcnow()
+            }, {"id": dataset_id})
+        except Exception:
+            store.delete_chunks(dataset, first_chunk)
+            db.update("datasets", {"status": "ready"}, {"id": dataset_id})
+            raise
+
+        log_audit(user_id, "append_dataset", "dataset", dataset_id, {
+            "filename": file.filename,
+            "segment": len(segments) - 1,
+            "rows": tracker.row_count,
+            "chunks": tracker.chunk_count
+        })
 
-        if isinstance(result.get('column_names'), str):
-            result['column_names'] = json.loads(result['column_names'])
-        if isinstance(result.get('data'), str):
-            result['data'] = json.loads(result['data'])
+        for field in JSON_FIELDS:
+            if isinstance(result.get(field), str):
+                result[field] = json.loads(result[field])
+        result.pop("column_stats", None)
 
+        logger.info(f"Appended {tracker.row_count} rows to dataset {dataset_id} (segment {len(segments) - 1})")
         return result
+
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error fetching dataset: {str(e)}")
-        raise HTTPException(status_code=404, detail="Dataset not found")
+        logger.error(f"Error appending rows to dataset {dataset_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 
-@app.post("/api/configs")
-def create_config(config: AnonymizationConfig, user_id: str = Depends(get_current_user)):
-    logger.info(f"User {user_id} creating config for dataset {config.dataset_id}")
+@app.get("/api/datasets")
+def get_datasets(
+        response: Response,
+        include: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        user_id: str = Depends(get_current_user)
+):
+    logger.info(f"User {user_id} fetching datasets")
+    include_fields = parse_include(include, DATASET_HEAVY_FIELDS)
     try:
-        config_data = {
-            "user_id": user_id,
-            "dataset_id": config.dataset_id,
-            "name": config.name,
-            "column_mappings": json.dumps([mapping.dict() for mapping in config.column_mappings]),
-            "techniques": json.dumps([tech.dict() for tech in config.techniques]),
-            "global_params": json.dumps(config.global_params),
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-
-        result = db.insert_returning("anonymization_configs", config_data)
-
-        log_audit(user_id, "create_config", "config", result["id"], {
-            "dataset_id": config.dataset_id,
-            "name": config.name
-        })
-
-        # result['column_mappings'] = json.loads(result['column_mappings'])
-        # result['techniques'] = json.loads(result['techniques'])
-        # result['global_params'] = json.loads(result['global_params'])
+        # `data` no es una columna para los datasets en almacenamiento externo: se carga aparte
+        fields = DATASET_LIST_FIELDS + [f for f in include_fields if f != "data"]
+        if "data" in include_fields:
+            fields += ["data", "storage_path"]
 
-        result['column_mappings'] = json.loads(result['column_mappings']) if isinstance(result.get('column_mappings'),
-                                                                                        str) else result.get(
-            'column_mappings', [])
-        result['techniques'] = json.loads(result['techniques']) if isinstance(result.get('techniques'),
-                                                                              str) else result.get('techniques', [])
-        result['global_params'] = json.loads(result['global_params']) if isinstance(result.get('global_params'),
-                                                                                    str) else result.get(
-            'global_params', {})
+        results = list_rows("datasets", fields, {"user_id": user_id}, cursor, limit, response)
 
-        logger.info(f"Config created successfully: {result['id']}")
-        return result
+        if "data" in include_fields:
+            for result in results:
+                result['data'] = chunk_to_records(storage.load(result))
 
+        return results
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error creating config: {str(e)}")
+        logger.error(f"Error fetching datasets: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/configs")
-def get_configs(dataset_id: Optional[str] = None, user_id: str = Depends(get_current_user)):
-    logger.info(f"User {user_id} fetching configs")
-    try:
-        if dataset_id:
-            query = "SELECT * FROM anonymization_configs WHERE user_id = %s AND dataset_id = %s ORDER BY created_at DESC"
-            params = (user_id, dataset_id)
-        else:
-            query = "SELECT * FROM anonymization_configs WHERE user_id = %s ORDER BY created_at DESC"
-            params = (user_id,)
-
-        results = db.execute_query(query, params, fetch=True)
+def parse_columns(columns: Optional[str]) -> Optional[List[str]]:
+    if not columns:
+        return None
+    return [c.strip() for c in columns.split(',') if c.strip()]
 
-        for result in results:
-            if isinstance(result.get('column_mappings'), str):
-                result['column_mappings'] = json.loads(result['column_mappings'])
-            if isinstance(result.get('techniques'), str):
-                result['techniques'] = json.loads(result['techniques'])
-            if isinstance(result.get('global_params'), str):
-                result['global_params'] = json.loads(result['global_params'])
 
-        return results
-    except Exception as e:
-        logger.error(f"Error fetching configs: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+def select_fields(table: str, fields: List[str], filters: Dict) -> Optional[Dict]:
+    where_clause = ' AND '.join([f"{key} = %s" for key in filters.keys()])
+    result = db.execute_one(f"SELECT {', '.join(fields)} FROM {table} WHERE {where_clause}",
+                            tuple(filters.values()))
+    if result:
+        for field in JSON_FIELDS:
+            if isinstance(result.get(field), str):
+                result[field] = json.loads(result[field])
+    return result
 
 
 # --------------------------------------------------
-# MÉTRICAS
+# FILAS DE LOS RESULTADOS
 # --------------------------------------------------
-def calculate_k_anonymity(df: pd.DataFrame, quasi_identifiers: List[str]) -> int:
-    if not quasi_identifiers:
-        return len(df)
-    groups = df.groupby(quasi_identifiers).size()
-    return int(groups.min()) if len(groups) > 0 else 0
+# Un resultado de filas añadidas guarda sólo esas filas y enlaza (`base_result_id`) el resultado que amplía;
+# al llegar a este número de partes se vuelve a guardar completo para que las lecturas no recorran cadenas largas
+MAX_RESULT_PARTS = 32
 
 
-def calculate_l_diversity(df: pd.DataFrame, quasi_identifiers: List[str], sensitive_attr: str) -> float:
-    if not quasi_identifiers or not sensitive_attr:
-        return 0.0
-    groups = df.groupby(quasi_identifiers)[sensitive_attr]
-    return float(groups.apply(lambda x: len(x.unique())).min())
+def result_parts(filters: Dict) -> List[Dict]:
+    """Id y número de filas de cada parte del resultado, de la primera a la última."""
+    return db.jsonb_array_parts("anonymization_results", "anonymized_data", "base_result_id", filters)
 
 
-def calculate_information_loss(original_df: pd.DataFrame, anonymized_df: pd.DataFrame, columns: List[str]) -> float:
-    total_loss = 0.0
-    for col in columns:
-        if col not in original_df.columns or col not in anonymized_df.columns:
+def read_result_rows(parts: List[Dict], offset: int, limit: int) -> List[Any]:
+    rows = []
+    for part in parts:
+        if limit <= 0:
+            break
+        if offset >= part["total"]:
+            offset -= part["total"]
             continue
+        page = db.select_jsonb_range("anonymization_results", "anonymized_data", {"id": part["id"]}, offset, limit)
+        rows.extend(page)
+        limit -= len(page)
+        offset = 0
+    return rows
 
-        if pd.api.types.is_numeric_dtype(original_df[col]):
-            try:
-                orig_range = original_df[col].max() - original_df[col].min()
-                if orig_range == 0:
-                    continue
-                anon_range = anonymized_df[col].max() - anonymized_df[col].min()
-                loss = 1 - (anon_range / orig_range)
-                total_loss += loss
-            except (TypeError, ValueError):
-                # If anonymized column became non-numeric (e.g., generalization to ranges)
-                # Calculate loss based on unique values instead
-                orig_unique = len(original_df[col].unique())
-                anon_unique = len(anonymized_df[col].unique())
-                if orig_unique > 0:
-                    loss = 1 - (anon_unique / orig_unique)
-                    total_loss += loss
-        else:
-            orig_unique = len(original_df[col].unique())
-            anon_unique = len(anonymized_df[col].unique())
-            if orig_unique > 0:
-                loss = 1 - (anon_unique / orig_unique)
-                total_loss += loss
-
-    return (total_loss / len(columns)) * 100 if columns else 0.0
 
+def iter_result_batches(parts: List[Dict], batch_rows: int):
+    """Filas del resultado en texto JSON, por lotes y parte a parte (`Database.iter_jsonb_array`)."""
+    for part in parts:
+        yield from db.iter_jsonb_array("anonymization_results", "anonymized_data", {"id": part["id"]}, batch_rows)
 
-# --------------------------------------------------
-# FUNCIONES DE APOYO
-# --------------------------------------------------
-def generalize_numeric(series: pd.Series, bins: int = 5, return_bins: bool = False):
-    try:
-        # pd.cut con retbins devuelve la serie categórica y los límites usados
-        cat, bins_edges = pd.cut(series, bins=bins, duplicates='drop', retbins=True)
 
-        # Convertir las categorías a intervalos legibles
-        result = cat.apply(lambda x: f"{_format_edge_value(x.left)}-{_format_edge_value(x.right)}" if pd.notna(x) else str(x))
+@app.get("/api/datasets/{dataset_id}")
+def get_dataset(
+        dataset_id: str,
+        offset: int = Query(0, ge=0),
+        limit: Optional[int] = Query(None, ge=1, le=10000),
+        columns: Optional[str] = None,
+        user_id: str = Depends(get_current_user)
+):
+    logger.info(f"User {user_id} fetching dataset {dataset_id}")
+    try:
+        result = select_fields("datasets", DATASET_LIST_FIELDS + ["schema", "storage_path"],
+                               {"id": dataset_id, "user_id": user_id})
+        if not result:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+
+        selected_columns = parse_columns(columns)
+        if limit is None:
+            # Sin paginación se devuelve el dataset completo (comportamiento original)
+            page = storage.load(result, columns=selected_columns)
+            page = page.iloc[offset:]
+        else:
+            page = storage.read_range(result, offset, limit, columns=selected_columns)
+
+        result['data'] = chunk_to_records(page)
+        result['offset'] = offset
+        result['limit'] = limit
+        result['total_rows'] = result['row_count']
 
-        if return_bins:
-            return result, bins_edges
         return result
-    except Exception:
-        if return_bins:
-            return series.astype(str), None
-        return series.astype(str)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching dataset: {str(e)}")
+        raise HTTPException(status_code=404, detail="Dataset not found")
 
 
-# Helper para formatear los valores de los límites de intervalo
-def _format_edge_value(v):
+@app.get("/api/datasets/{dataset_id}/profile")
+def get_dataset_profile(dataset_id: str, user_id: str = Depends(get_current_user)):
+    logger.info(f"User {user_id} fetching profile of dataset {dataset_id}")
     try:
-        if v is None or (isinstance(v, float) and (math.isinf(v) or math.isnan(v))):
-            return str(v)
-        fv = float(v)
-        # Mostrar como entero si es entero, sino con 2 decimales
-        if fv.is_integer():
-            return str(int(round(fv)))
-        return str(round(fv, 2))
-    except Exception:
-        return str(v)
-
-
-def generalize_categorical(series: pd.Series, levels: int = 1) -> pd.Series:
-    if levels == 1:
-        return pd.Series(['Generalizado'] * len(series), index=series.index)
-    counts = series.value_counts()
-    top = counts.head(levels).index.tolist()
-    return series.apply(lambda x: x if x in top else 'Otros')
-
-
-def suppress_data(series: pd.Series, threshold: float = 0.1) -> pd.Series:
-    """
-    TÉCNICA DE SUPRESIÓN (SUPPRESSION)
+        dataset = select_fields("datasets", DATASET_LIST_FIELDS + ["schema", "column_stats", "storage_path"],
+                                {"id": dataset_id, "user_id": user_id})
+        if not dataset:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+
+        profile = dataset.get("column_stats") or {}
+        if any(col not in profile for col in dataset["column_names"]):
+            # Datasets subidos antes de existir el perfil: se calcula una vez, por bloques, y se guarda
+            profiler = new_column_profiler()
+            for chunk in storage.iter_chunks(dataset):
+                profiler.update(chunk)
+            profile = {**profiler.to_dict(), **profile}
+            db.update("datasets", {"column_stats": json.dumps(profile)}, {"id": dataset_id})
+
+        return {
+            "dataset_id": dataset_id,
+            "row_count": dataset["row_count"],
+            "columns": {col: profile.get(col, {}) for col in dataset["column_names"]},
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching dataset profile: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-    Esta es la técnica que OCULTA valores reemplazándolos con asteriscos '*'.
-    Se usa cuando se quiere eliminar información sensible de forma aleatoria.
 
-    Ejemplo:
-        Antes: ["Diabetes", "Asma", "Hipertensión", "Diabetes", "Ninguna"]
-        Después (threshold=0.2): ["*", "Asma", "*", "Diabetes", "Ninguna"]
+@app.get("/api/datasets/{dataset_id}/risk")
+def get_dataset_risk(
+        dataset_id: str,
+        quasi_identifiers: str,
+        sampling_fraction: float = Query(1.0, gt=0, le=1),
+        threshold: float = Query(DEFAULT_RISK_THRESHOLD, gt=0, le=1),
+        top: int = Query(DEFAULT_TOP_RECORDS, ge=0, le=MAX_TOP_RECORDS),
+        user_id: str = Depends(get_current_user)
+):
+    logger.info(f"User {user_id} fetching risk of dataset {dataset_id}")
+    try:
+        dataset = select_fields("datasets", DATASET_LIST_FIELDS + ["schema", "storage_path"],
+                                {"id": dataset_id, "user_id": user_id})
+        if not dataset:
+            raise HTTPException(status_code=404, detail="Dataset not found")
 
-    Args:
-        series: Serie de pandas con los datos a suprimir
-        threshold: Porcentaje de datos a suprimir/ocultar (0.0 a 1.0)
-                  Por defecto 0.1 = 10% de los valores se ocultarán con '*'
+        columns = parse_columns(quasi_identifiers) or []
+        unknown = [col for col in columns if col not in dataset["column_names"]]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}")
 
-    Returns:
-        Serie con datos suprimidos (algunos valores reemplazados por '*')
-    """
-    result = series.copy()
-    n = int(len(series) * threshold)
+        # Sólo se leen del almacenamiento las columnas de los cuasi-identificadores
+        df = storage.load(dataset, columns=columns)
+        return {"dataset_id": dataset_id, **compute_risk(df, columns, sampling_fraction, threshold, top)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing dataset risk: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-    # Asegurar que n no sea mayor que el tamaño de la serie
-    available_size = len(series.index.unique())
-    n = min(n, available_size)
 
-    if n > 0 and available_size > 0:
-        try:
-            # Usar índices únicos para evitar problemas con duplicados
-            unique_indices = series.index.unique()
-            idx = np.random.choice(unique_indices, size=n, replace=False)
-            result.loc[idx] = '*'
-        except ValueError as e:
-            # Si aún hay error, suprimir el mínimo entre n y available_size
-            logger.warning(f"Error en suppress_data: {str(e)}. Ajustando tamaño de muestra.")
-            n = min(n, len(series))
-            if n > 0:
-                idx = series.index[:n]
-                result.loc[idx] = '*'
-    return result
+def config_seed(config: Dict) -> Optional[int]:
+    global_params = config.get("global_params") or {}
+    if isinstance(global_params, str):
+        global_params = json.loads(global_params)
+    return global_params.get("seed")
 
 
-def apply_differential_privacy(series: pd.Series, epsilon: float = 1.0) -> pd.Series:
-    if not pd.api.types.is_numeric_dtype(series):
-        return series
-    sensitivity = series.max() - series.min()
-    if sensitivity == 0:
-        return series
-    scale = sensitivity / epsilon
-    noise = np.random.laplace(0, scale, size=len(series))
-    return series + noise
+def dataset_content_hash(dataset: Dict) -> str:
+    """Hash del contenido guardado al subir; los datasets anteriores a la caché lo calculan una vez."""
+    if dataset.get("content_hash"):
+        return dataset["content_hash"]
+    digest = content_hash(storage.iter_chunks(dataset))
+    db.update("datasets", {"content_hash": digest}, {"id": dataset["id"]})
+    dataset["content_hash"] = digest
+    return digest
 
 
-def apply_pseudonymization(series: pd.Series, prefix: str = "USER") -> pd.Series:
-    """
-    TÉCNICA DE PSEUDONIMIZACIÓN (PSEUDONYMIZATION)
+def result_cache_key(dataset: Dict, config: Dict) -> str:
+    return cache_key(dataset_content_hash(dataset), config_hash(config), config_seed(config), RESULT_SETTINGS)
 
-    Reemplaza valores reales con pseudónimos únicos y consistentes.
-    El mismo valor siempre genera el mismo pseudónimo.
 
-    Ejemplo:
-        Antes: ["Juan Pérez", "María García", "Juan Pérez", "Pedro López"]
-        Después: ["USER_001", "USER_002", "USER_001", "USER_003"]
+def privacy_accountant(dataset: Dict) -> PrivacyAccountant:
+    """Contable del presupuesto del dataset: el propio o, si no tiene, el de la configuración."""
+    epsilon = dataset.get("privacy_budget_epsilon")
+    delta = dataset.get("privacy_budget_delta")
+    return PrivacyAccountant(
+        privacy_ledger,
+        dataset["id"],
+        epsilon if epsilon is not None else anonymization_config.get('privacy_budget_epsilon'),
+        delta if delta is not None else anonymization_config.get('privacy_budget_delta')
+    )
 
-    Args:
-        series: Serie de pandas con los datos a pseudonimizar
-        prefix: Prefijo para los pseudónimos (default: "USER")
 
-    Returns:
-        Serie con pseudónimos consistentes
-    """
-    import hashlib
+def privacy_budget_status(dataset: Dict) -> Dict:
+    accountant = privacy_accountant(dataset)
+    spent = accountant.spent()
+    return {
+        "dataset_id": dataset["id"],
+        "budget_epsilon": accountant.budget["epsilon"],
+        "budget_delta": accountant.budget["delta"],
+        "spent_epsilon": spent["epsilon"],
+        "spent_delta": spent["delta"],
+        "remaining": accountant.remaining(),
+        "composition": "sequential",
+        "mechanisms": list(MECHANISMS),
+        "ledger": privacy_ledger.entries(dataset["id"]),
+    }
 
-    # Crear mapeo consistente: mismo valor → mismo pseudónimo
-    unique_values = series.unique()
-    pseudonym_map = {}
 
-    for idx, value in enumerate(unique_values, start=1):
-        if pd.isna(value):
-            pseudonym_map[value] = None
-        else:
-            # Usar hash para generar un ID consistente
-            hash_obj = hashlib.md5(str(value).encode())
-            hash_hex = hash_obj.hexdigest()[:6]  # Primeros 6 caracteres del hash
-            pseudonym_map[value] = f"{prefix}_{hash_hex}"
+@app.get("/api/datasets/{dataset_id}/privacy-budget")
+def get_privacy_budget(dataset_id: str, user_id: str = Depends(get_current_user)):
+    logger.info(f"User {user_id} fetching privacy budget of dataset {dataset_id}")
+    try:
+        dataset = select_fields("datasets", ["id", "privacy_budget_epsilon", "privacy_budget_delta"],
+                                {"id": dataset_id, "user_id": user_id})
+        if not dataset:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        return privacy_budget_status(dataset)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching privacy budget: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-    return series.map(pseudonym_map)
 
+@app.put("/api/datasets/{dataset_id}/privacy-budget")
+def set_privacy_budget(dataset_id: str, request: PrivacyBudgetRequest, user_id: str = Depends(get_current_user)):
+    logger.info(f"User {user_id} setting privacy budget of dataset {dataset_id}")
+    try:
+        if request.epsilon is not None and request.epsilon <= 0:
+            raise HTTPException(status_code=400, detail="Epsilon budget must be positive")
+        if request.delta is not None and not 0 <= request.delta < 1:
+            raise HTTPException(status_code=400, detail="Delta budget must be in [0, 1)")
+
+        # Sin tocar `updated_at`: el contenido no cambia y la caché de DataFrames sigue siendo válida
+        dataset = db.update("datasets", {
+            "privacy_budget_epsilon": request.epsilon,
+            "privacy_budget_delta": request.delta
+        }, {"id": dataset_id, "user_id": user_id})
+        if not dataset:
+            raise HTTPException(status_code=404, detail="Dataset not found")
 
-def apply_masking(series: pd.Series, mask_type: str = "partial", mask_char: str = "*") -> pd.Series:
-    """
-    TÉCNICA DE ENMASCARAMIENTO (MASKING)
-
-    Enmascara parcialmente datos sensibles manteniendo el formato.
-
-    Ejemplos:
-        - Email: "juan.perez@email.com" → "j***@email.com"
-        - Teléfono: "612345678" → "612***678"
-        - Nombre: "Juan Pérez" → "J*** P***"
-        - Texto: "Información" → "Inf*******"
-
-    Args:
-        series: Serie de pandas con los datos a enmascarar
-        mask_type: Tipo de enmascaramiento
-            - "partial": Mantiene inicio y fin
-            - "email": Enmascara usuario del email
-            - "phone": Enmascara parte central del teléfono
-            - "middle": Enmascarara solo la parte central
-        mask_char: Carácter para enmascarar (default: "*")
-
-    Returns:
-        Serie con datos enmascarados
-    """
-    def mask_value(value):
-        if pd.isna(value):
-            return value
-
-        value_str = str(value)
-
-        if mask_type == "email":
-            # Enmascarar email: mantener primera letra y dominio
-            if "@" in value_str:
-                parts = value_str.split("@")
-                username = parts[0]
-                domain = parts[1] if len(parts) > 1 else ""
-                if len(username) > 1:
-                    masked_user = username[0] + mask_char * (len(username) - 1)
-                    return f"{masked_user}@{domain}"
-            return value_str
-
-        elif mask_type == "phone":
-            # Enmascarar teléfono: mantener inicio y fin
-            if len(value_str) >= 6:
-                start = value_str[:3]
-                end = value_str[-3:]
-                middle_len = len(value_str) - 6
-                return f"{start}{mask_char * middle_len}{end}"
-            return value_str
-
-        elif mask_type == "middle":
-            # Enmascarar solo la parte central
-            if len(value_str) >= 4:
-                start = value_str[:2]
-                end = value_str[-2:]
-                middle_len = len(value_str) - 4
-                return f"{start}{mask_char * middle_len}{end}"
-            return value_str
-
-        elif mask_type == "partial":
-            # Enmascaramiento parcial por defecto
-            if len(value_str) > 3:
-                # Para nombres con espacios (ej: "Juan Pérez")
-                if " " in value_str:
-                    parts = value_str.split()
-                    masked_parts = [p[0] + mask_char * (len(p) - 1) for p in parts]
-                    return " ".join(masked_parts)
-                else:
-                    # Para texto simple
-                    return value_str[:3] + mask_char * (len(value_str) - 3)
-            return value_str
+        log_audit(user_id, "set_privacy_budget", "dataset", dataset_id, {
+            "epsilon": request.epsilon,
+            "delta": request.delta
+        })
+        return privacy_budget_status(dataset)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error setting privacy budget: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        else:
-            # Enmascaramiento por defecto (parcial)
-            if len(value_str) > 3:
-                return value_str[:3] + mask_char * (len(value_str) - 3)
-            return value_str
 
-    return series.apply(mask_value)
+@app.post("/api/configs")
+def create_config(config: AnonymizationConfig, user_id: str = Depends(get_current_user)):
+    logger.info(f"User {user_id} creating config for dataset {config.dataset_id}")
+    try:
+        config_data = {
+            "user_id": user_id,
+            "dataset_id": config.dataset_id,
+            "name": config.name,
+            "column_mappings": json.dumps([mapping.dict() for mapping in config.column_mappings]),
+            "techniques": json.dumps([tech.dict() for tech in config.techniques]),
+            "global_params": json.dumps(config.global_params),
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+
+        result = db.insert_returning("anonymization_configs", config_data)
+
+        log_audit(user_id, "create_config", "config", result["id"], {
+            "dataset_id": config.dataset_id,
+            "name": config.name
+        })
+
+        # result['column_mappings'] = json.loads(result['column_mappings'])
+        # result['techniques'] = json.loads(result['techniques'])
+        # result['global_params'] = json.loads(result['global_params'])
+
+        result['column_mappings'] = json.loads(result['column_mappings']) if isinstance(result.get('column_mappings'),
+                                                                                        str) else result.get(
+            'column_mappings', [])
+        result['techniques'] = json.loads(result['techniques']) if isinstance(result.get('techniques'),
+                                                                              str) else result.get('techniques', [])
+        result['global_params'] = json.loads(result['global_params']) if isinstance(result.get('global_params'),
+                                                                                    str) else result.get(
+            'global_params', {})
+
+        logger.info(f"Config created successfully: {result['id']}")
+        return result
+
+    except Exception as e:
+        logger.error(f"Error creating config: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/configs")
+def get_configs(
+        response: Response,
+        dataset_id: Optional[str] = None,
+        include: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        user_id: str = Depends(get_current_user)
+):
+    logger.info(f"User {user_id} fetching configs")
+    include_fields = parse_include(include, CONFIG_HEAVY_FIELDS)
+    try:
+        filters = {"user_id": user_id}
+        if dataset_id:
+            filters["dataset_id"] = dataset_id
+
+        return list_rows("anonymization_configs", CONFIG_LIST_FIELDS + include_fields, filters, cursor, limit,
+                         response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching configs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# --------------------------------------------------
+# MÉTRICAS
+# --------------------------------------------------
+def calculate_k_anonymity(df: pd.DataFrame, quasi_identifiers: List[str]) -> int:
+    if not quasi_identifiers:
+        return len(df)
+    groups = df.groupby(quasi_identifiers, observed=True).size()
+    return int(groups.min()) if len(groups) > 0 else 0
+
+
+def calculate_l_diversity(df: pd.DataFrame, quasi_identifiers: List[str], sensitive_attr: str) -> float:
+    if not quasi_identifiers or not sensitive_attr:
+        return 0.0
+    groups = df.groupby(quasi_identifiers, observed=True)[sensitive_attr]
+    diversity = groups.nunique()
+    return float(diversity.min()) if len(diversity) > 0 else 0.0
 
 
 # --------------------------------------------------
 # K-ANONIMATO
 # --------------------------------------------------
 def apply_k_anonymity_algorithm(df, quasi_identifiers, k, technique_details):
-    result_df = df.copy()
-    changes = []
-
+    result_df, partitioning = mondrian_anonymize(df, quasi_identifiers, k)
+    changes = [
+        f"Se dividieron los registros en {partitioning['partition_count']} grupos "
+        f"(tamaño mínimo {partitioning.get('min_partition_size', 0)}, "
+        f"tamaño medio {partitioning.get('avg_partition_size', 0)})"
+    ]
     for col in quasi_identifiers:
-        if col not in result_df.columns:
+        if col not in df.columns:
             continue
+        changes.append(
+            f"Se generalizó la columna '{col}' a los rangos de cada grupo (ej: {result_df[col].iloc[0]}) "
+            f"→ valores únicos de {df[col].nunique()} a {result_df[col].nunique()}"
+        )
 
-        original_unique = result_df[col].nunique()
+    achieved_k = calculate_k_anonymity(result_df, quasi_identifiers)
 
-        if pd.api.types.is_numeric_dtype(result_df[col]):
-            # Generalizar directamente a intervalos numéricos
-            result_df[col] = generalize_numeric(result_df[col], bins=max(2, k))
-            changes.append(f"Se generalizó la columna numérica '{col}' en intervalos (ej: {result_df[col].iloc[0]})")
-        else:
-            result_df[col] = generalize_categorical(result_df[col], levels=2)
-            changes.append(f"Se generalizó la columna categórica '{col}'")
+    technique_details["k_anonymity"] = {
+        "technique": "K-Anonimato",
+        "target_k": k,
+        "achieved_k": achieved_k,
+        "target_reached": achieved_k >= k,
+        "quasi_identifiers": quasi_identifiers,
+        "algorithm": partitioning.get("algorithm", "mondrian"),
+        "partition_count": partitioning["partition_count"],
+        "ncp": partitioning.get("ncp"),
+        "partitions": partitioning["partitions"],
+        "partitions_truncated": partitioning.get("partitions_truncated", False),
+        "changes": changes,
+        "explanation": (
+            "Se dividieron los registros en grupos de al menos k filas partiendo por la mediana "
+            "de los cuasi-identificadores (Mondrian), y cada grupo se generalizó al rango de sus "
+            f"valores, de modo que ninguna fila pueda diferenciarse de al menos {k - 1} registros "
+            f"adicionales. K objetivo: {k}. K logrado: {achieved_k}."
+        )
+    }
+
+    return result_df
 
-        new_unique = result_df[col].nunique()
-        changes.append(f"→ Se redujeron los valores únicos de {original_unique} a {new_unique}")
+
+def apply_hierarchy_k_anonymity(df, quasi_identifiers, k, hierarchy_specs, max_suppression, technique_details):
+    try:
+        result_df, search = lattice_anonymize(df, quasi_identifiers, k, hierarchy_specs, max_suppression)
+    except ValueError as e:
+        logger.warning(f"Lattice search failed ({e}), falling back to Mondrian")
+        return apply_k_anonymity_algorithm(df, quasi_identifiers, k, technique_details)
+
+    changes = [
+        f"Se evaluaron {search['nodes_evaluated']} nodos del retículo de generalización "
+        f"y se eligió el de menor pérdida entre {search['minimal_nodes']} nodos mínimos"
+    ]
+    for col, level in search["levels"].items():
+        example = f" (ej: {result_df[col].iloc[0]})" if len(result_df) else ""
+        changes.append(f"Columna '{col}': nivel {level} de {search['heights'][col]}{example}")
+    if search["suppression_limit_exceeded"]:
+        changes.append(
+            f"Ningún nivel de generalización cumple k={k} suprimiendo como mucho el {max_suppression * 100}% "
+            f"de las filas: se aplicó la generalización completa"
+        )
+    if search["suppressed_rows"]:
+        changes.append(f"Se suprimieron {search['suppressed_rows']} filas de grupos con menos de {k} registros")
 
     achieved_k = calculate_k_anonymity(result_df, quasi_identifiers)
 
@@ -1024,33 +1579,46 @@ def apply_k_anonymity_algorithm(df, quasi_identifiers, k, technique_details):
         "technique": "K-Anonimato",
         "target_k": k,
         "achieved_k": achieved_k,
+        "target_reached": achieved_k >= k,
         "quasi_identifiers": quasi_identifiers,
+        "algorithm": "lattice",
+        "levels": search["levels"],
+        "heights": search["heights"],
+        "loss": search["loss"],
+        "suppressed_rows": search["suppressed_rows"],
+        "suppression_limit_exceeded": search["suppression_limit_exceeded"],
+        "nodes_evaluated": search["nodes_evaluated"],
         "changes": changes,
         "explanation": (
-            "Se agruparon los registros para que cada fila del conjunto de datos "
-            f"no pueda diferenciarse de al menos {k - 1} registros adicionales. "
+            "Se recorrieron las combinaciones de niveles de las jerarquías de generalización "
+            "definidas para cada cuasi-identificador y se aplicó la de menor pérdida de "
+            f"información que garantiza grupos de al menos {k} registros. "
             f"K objetivo: {k}. K logrado: {achieved_k}."
         )
     }
 
-
     return result_df
 
 
 # --------------------------------------------------
 # L-DIVERSIDAD
 # --------------------------------------------------
-def apply_l_diversity_algorithm(df, quasi_identifiers, sensitive_col, l, technique_details):
-    result_df = df.copy()
-    changes = []
-
-    for _, group in result_df.groupby(quasi_identifiers):
-        diversity = group[sensitive_col].nunique()
-        if diversity < l:
-            changes.append(
-                f"Se detectó un grupo con {diversity} valores sensibles distintos "
-                f"(menor al mínimo esperado de {l})"
-            )
+def apply_l_diversity_algorithm(df, quasi_identifiers, sensitive_col, l, technique_details, mode="merge"):
+    result_df, enforcement = enforce_l_diversity(df, quasi_identifiers, sensitive_col, l, mode)
+
+    changes = [
+        f"{enforcement['violating_classes']} de {enforcement['classes']} grupos "
+        f"({enforcement['violating_rows']} filas) tenían menos de {l} valores sensibles distintos"
+    ]
+    if mode == "merge" and enforcement["rows_touched"]:
+        changes.append(
+            f"Se fusionaron {enforcement['classes_touched']} grupos con sus vecinos "
+            f"({enforcement['rows_touched']} filas); los cuasi-identificadores que diferían pasaron a '*'"
+        )
+    elif mode == "suppress" and enforcement["rows_touched"]:
+        changes.append(
+            f"Se eliminaron {enforcement['rows_touched']} filas de {enforcement['classes_touched']} grupos"
+        )
 
     achieved_l = calculate_l_diversity(result_df, quasi_identifiers, sensitive_col)
 
@@ -1060,10 +1628,18 @@ def apply_l_diversity_algorithm(df, quasi_identifiers, sensitive_col, l, techniq
         "achieved_l": achieved_l,
         "sensitive_attribute": sensitive_col,
         "quasi_identifiers": quasi_identifiers,
+        "mode": mode,
+        "classes": enforcement["classes"],
+        "violating_classes": enforcement["violating_classes"],
+        "classes_touched": enforcement["classes_touched"],
+        "rows_touched": enforcement["rows_touched"],
         "changes": changes,
         "explanation": (
-            "Se validó que cada grupo de registros tenga suficientes valores distintos "
-            "en la información sensible, reduciendo el riesgo de inferencia directa. "
+            "Se comprobó que cada grupo de registros tenga suficientes valores distintos "
+            "en la información sensible"
+            + ({"merge": " y los grupos que no los tenían se fusionaron con sus vecinos",
+                "suppress": " y los grupos que no los tenían se eliminaron"}.get(mode, ""))
+            + ", reduciendo el riesgo de inferencia directa. "
             f"L objetivo: {l}. L logrado: {achieved_l}."
         )
     }
@@ -1073,13 +1649,8 @@ def apply_l_diversity_algorithm(df, quasi_identifiers, sensitive_col, l, techniq
 # --------------------------------------------------
 # APLICACIÓN DE TÉCNICAS
 # --------------------------------------------------
-def apply_techniques(df, config, technique_details):
-    result_df = df.copy()
-
-    # column_mappings = json.loads(config["column_mappings"])
-    # techniques = json.loads(config["techniques"])
-    # global_params = json.loads(config["global_params"])
-
+def config_parts(config):
+    """`column_mappings`, `techniques` y `global_params` de una configuración (JSON o ya decodificados)."""
     column_mappings = (
         json.loads(config["column_mappings"]) if isinstance(config.get("column_mappings"), str) else config.get(
             "column_mappings", [])
@@ -1092,15 +1663,54 @@ def apply_techniques(df, config, technique_details):
     global_params = (
         json.loads(config["global_params"]) if isinstance(config.get("global_params"), str) else config.get("global_params", {})
     )
+    return column_mappings, techniques, global_params or {}
 
-    quasi_identifiers = [m["column"] for m in column_mappings if m["type"] == "quasi-identifier"]
-    sensitive_columns = [m["column"] for m in column_mappings if m["type"] == "sensitive"]
+
+def apply_techniques(df, config, technique_details, engine=None, column_stats=None):
+    """
+    Aplica la configuración al DataFrame. Con `engine` (ExecutionEngine) las
+    técnicas independientes por fila se ejecutan por bloques en paralelo. La
+    supresión usa siempre la semilla `global_params.seed` (o una nueva,
+    registrada en `technique_details`), con o sin `engine`; el ruido de la
+    privacidad diferencial, una semilla nueva que no se registra. Si `global_params.hierarchies` define jerarquías
+    de generalización, el k-anonimato busca en su retículo; si no, usa Mondrian.
+    `column_stats` (perfil del dataset) aporta rangos y valores frecuentes sin
+    volver a recorrer las columnas.
+    """
+    result_df = apply_column_techniques(df, config, technique_details, engine, column_stats)
+    return apply_global_steps(result_df, config, technique_details)
+
+
+def apply_column_techniques(df, config, technique_details, engine=None, column_stats=None, column_params=None,
+                            offset=0):
+    """
+    Primera fase: elimina los identificadores y aplica las técnicas de cada columna.
+
+    Con `column_params` se registran, por técnica y columna, los parámetros
+    que dependen de los datos (límites de los intervalos, valores más
+    frecuentes, límites de recorte, nivel de la jerarquía); si ya están, se
+    usan en lugar de recalcularlos. Así las filas añadidas a un dataset
+    (`df` desde la fila `offset`) se procesan igual que las anteriores.
+    """
+    result_df = df.copy()
+    column_stats = column_stats or {}
+    stored_params = column_params if column_params is not None else {}
+    column_mappings, techniques, global_params = config_parts(config)
     identifiers = [m["column"] for m in column_mappings if m["type"] == "identifier"]
 
-    # Eliminar identificadores directos
+    # Flujos aleatorios del trabajo: con la semilla registrada se reproduce el resultado
+    streams = RandomStreams(global_params.get("seed"))
+    seed = streams.seed
+    # El ruido de la privacidad diferencial sale de una semilla nueva de la entropía del sistema que no se
+    # guarda ni se devuelve: con la semilla publicada se podría regenerar el ruido y restarlo, y dos
+    # ejecuciones con distinto epsilon compartirían los mismos uniformes
+    noise_streams = RandomStreams()
+
+    # Eliminar identificadores directos (pueden no haberse cargado desde el almacenamiento)
+    omitted_columns = df.attrs.get("omitted_columns", [])
     for col in identifiers:
-        if col in result_df.columns:
-            result_df.drop(columns=[col], inplace=True)
+        if col in result_df.columns or col in omitted_columns:
+            result_df.drop(columns=[col], inplace=True, errors="ignore")
             technique_details[f"identifier_{col}"] = {
                 "technique": "Supresión de Identificadores",
                 "changes": [f"Se eliminó completamente la columna '{col}'"],
@@ -1117,19 +1727,60 @@ def apply_techniques(df, config, technique_details):
 
         params = tech.get("params", {})
         sample_before = result_df[col].iloc[0]
+        stored = stored_params.get(col, {}).get(tech["technique"])
 
         if tech["technique"] == "generalization":
-            if pd.api.types.is_numeric_dtype(result_df[col]):
+            if params.get("hierarchy"):
+                hierarchy = Hierarchy.from_spec(result_df[col], params["hierarchy"])
+                level = min(int(params.get("level", 1)), hierarchy.height)
+                if stored is not None and stored["level"] == stored["height"]:
+                    level = hierarchy.height
+                elif stored is not None:
+                    # Las etiquetas de un nivel no dependen de los datos salvo el último ("*")
+                    if stored["level"] >= hierarchy.height:
+                        raise AppendUnsupported(f"Hierarchy of column '{col}' changed with the appended rows")
+                    level = stored["level"]
+                stored_params.setdefault(col, {})["generalization"] = stored or {
+                    "level": level, "height": hierarchy.height
+                }
+                result_df[col] = hierarchy.generalize(level, index=result_df.index, name=col)
+                explanation = (
+                    "Los valores fueron reemplazados por su nivel de la jerarquía de generalización "
+                    "definida para la columna (ej: 10001 → 100**)."
+                )
+            elif pd.api.types.is_numeric_dtype(result_df[col]):
                 bins = params.get("bins", 5)
+                edges = None
+                if stored is not None:
+                    edges = np.asarray(stored["bin_edges"], dtype=float)
+                    values = result_df[col]
+                    if (values.notna() & ((values <= edges[0]) | (values > edges[-1]))).any():
+                        raise AppendUnsupported(f"Appended values of '{col}' fall outside the stored intervals")
+                elif column_params is not None and result_df[col].notna().any():
+                    edges = numeric_bin_edges(result_df[col], bins)
+                    stored_params.setdefault(col, {})["generalization"] = {"bin_edges": [float(e) for e in edges]}
                 # Generalizar directamente a intervalos numéricos
-                result_df[col] = generalize_numeric(result_df[col], bins)
+                if engine is not None:
+                    result_df[col] = engine.generalize_numeric(result_df[col], bins, edges)
+                elif edges is not None:
+                    result_df[col] = generalize_numeric_with_edges(result_df[col], edges)
+                else:
+                    result_df[col] = generalize_numeric(result_df[col], bins)
                 explanation = (
                     "Los valores numéricos exactos fueron reemplazados por intervalos "
                     "para disminuir el nivel de detalle del dato (ej: 28 → 28-35)."
                 )
             else:
                 levels = params.get("levels", 1)
-                result_df[col] = generalize_categorical(result_df[col], levels)
+                if stored is not None:
+                    frequent = stored["top_values"]
+                else:
+                    frequent = top_values(column_stats.get(col), levels)
+                    if frequent is None and column_params is not None and levels != 1:
+                        frequent = result_df[col].value_counts().head(levels).index.tolist()
+                    if frequent is not None:
+                        stored_params.setdefault(col, {})["generalization"] = {"top_values": frequent}
+                result_df[col] = generalize_categorical(result_df[col], levels, frequent)
                 explanation = (
                     "Los valores específicos fueron agrupados en categorías "
                     "más generales para evitar valores únicos."
@@ -1147,7 +1798,11 @@ def apply_techniques(df, config, technique_details):
 
         elif tech["technique"] == "suppression":
             threshold = params.get("threshold", 0.1)
-            result_df[col] = suppress_data(result_df[col], threshold)
+            if engine is not None:
+                result_df[col] = engine.suppression(result_df[col], threshold, seed, col, offset)
+            else:
+                result_df[col] = suppress_data(result_df[col], threshold, streams, col, offset)
+            params = {**params, "seed": seed}
             suppressed_count = (result_df[col] == '*').sum()
             technique_details[f"suppression_{col}"] = {
                 "technique": "Supresión",
@@ -1164,23 +1819,64 @@ def apply_techniques(df, config, technique_details):
 
         elif tech["technique"] == "differential_privacy":
             epsilon = params.get("epsilon", 1.0)
-            result_df[col] = apply_differential_privacy(result_df[col], epsilon)
+            mechanism = params.get("mechanism", DEFAULT_MECHANISM)
+            delta = params.get("delta", DEFAULT_DELTA) if mechanism == "gaussian" else None
+            # Límites de recorte de los parámetros o del perfil: no se recorre la columna
+            if stored is not None:
+                bounds = tuple(stored["bounds"]) if stored["bounds"] is not None else None
+            else:
+                bounds = clamp_bounds(column_stats.get(col), params)
+                numeric = pd.api.types.is_numeric_dtype(result_df[col]) and result_df[col].notna().any()
+                if bounds is None and column_params is not None and numeric:
+                    bounds = (float(result_df[col].min()), float(result_df[col].max()))
+                stored_params.setdefault(col, {})["differential_privacy"] = {"bounds": list(bounds) if bounds else None}
+            if engine is not None:
+                result_df[col] = engine.differential_privacy(result_df[col], epsilon, noise_streams.seed, col, bounds,
+                                                             mechanism, delta, offset)
+            else:
+                result_df[col] = apply_differential_privacy(result_df[col], epsilon, bounds, noise_streams, col,
+                                                            offset, mechanism=mechanism, delta=delta)
+            params = {**params, "mechanism": mechanism}
+            if bounds is not None:
+                params.update(lower=bounds[0], upper=bounds[1])
+            if delta is not None:
+                params["delta"] = delta
             technique_details[f"differential_privacy_{col}"] = {
                 "technique": "Privacidad Diferencial",
                 "column": col,
                 "params": params,
                 "changes": [f"Ejemplo: {sample_before} → {result_df[col].iloc[0]}"],
                 "explanation": (
-                    f"Se añadió ruido aleatorio controlado (epsilon={epsilon}) "
+                    f"Se añadió ruido aleatorio controlado ({mechanism}, epsilon={epsilon}) "
                     "para proteger la información individual."
                 )
             }
 
         elif tech["technique"] == "pseudonymization":
-            result_df[col] = apply_pseudonymization(result_df[col])
+            # La clave nunca se guarda en los detalles; solo el algoritmo y la longitud
+            params = {
+                "prefix": params.get("prefix", "USER"),
+                "algorithm": params.get(
+                    "algorithm",
+                    anonymization_config.get('pseudonym_algorithm', DEFAULT_PSEUDONYM_ALGORITHM)
+                ),
+                "digest_length": params.get(
+                    "digest_length",
+                    anonymization_config.get('pseudonym_digest_length', DEFAULT_PSEUDONYM_DIGEST_LENGTH)
+                ),
+            }
+            if pseudonym_vault is not None:
+                # Los valores ya vistos en otros datasets reutilizan su pseudónimo guardado
+                result_df[col] = pseudonym_vault.pseudonymize(result_df[col], **params)
+                params = {**params, "vault": True}
+            elif engine is not None:
+                result_df[col] = engine.pseudonymization(result_df[col], key=PSEUDONYM_KEY, **params)
+            else:
+                result_df[col] = apply_pseudonymization(result_df[col], key=PSEUDONYM_KEY, **params)
             technique_details[f"pseudonymization_{col}"] = {
                 "technique": "Pseudonimización",
                 "column": col,
+                "params": params,
                 "changes": [f"Ejemplo: {sample_before} → {result_df[col].iloc[0]}"],
                 "explanation": (
                     "Los datos fueron reemplazados por pseudónimos únicos y consistentes, "
@@ -1191,7 +1887,10 @@ def apply_techniques(df, config, technique_details):
         elif tech["technique"] == "masking":
             mask_type = params.get("mask_type", "partial")
             mask_char = params.get("mask_char", "*")
-            result_df[col] = apply_masking(result_df[col], mask_type, mask_char)
+            if engine is not None:
+                result_df[col] = engine.masking(result_df[col], mask_type, mask_char)
+            else:
+                result_df[col] = apply_masking(result_df[col], mask_type, mask_char)
             technique_details[f"masking_{col}"] = {
                 "technique": "Enmascaramiento",
                 "column": col,
@@ -1203,17 +1902,228 @@ def apply_techniques(df, config, technique_details):
                 )
             }
 
-    # Aplicar métricas globales
+    return result_df
+
+
+def apply_global_steps(result_df, config, technique_details):
+    """
+    Segunda fase: k-anonimato y l-diversidad sobre los cuasi-identificadores.
+    Sólo modifica los cuasi-identificadores y puede eliminar filas.
+    """
+    column_mappings, _, global_params = config_parts(config)
+    quasi_identifiers = [m["column"] for m in column_mappings if m["type"] == "quasi-identifier"]
+    sensitive_columns = [m["column"] for m in column_mappings if m["type"] == "sensitive"]
+
     k = global_params.get("k", 2)
+    hierarchy_specs = global_params.get("hierarchies") or {}
     if quasi_identifiers and k > 1:
-        result_df = apply_k_anonymity_algorithm(result_df, quasi_identifiers, k, technique_details)
+        if hierarchy_specs:
+            result_df = apply_hierarchy_k_anonymity(
+                result_df, quasi_identifiers, k, hierarchy_specs,
+                global_params.get("max_suppression", 0.0), technique_details
+            )
+        else:
+            result_df = apply_k_anonymity_algorithm(result_df, quasi_identifiers, k, technique_details)
 
     l = global_params.get("l", 2)
     if quasi_identifiers and sensitive_columns and l > 1:
         result_df = apply_l_diversity_algorithm(
-            result_df, quasi_identifiers, sensitive_columns[0], l, technique_details
+            result_df, quasi_identifiers, sensitive_columns[0], l, technique_details,
+            mode=global_params.get("l_diversity_mode", "merge")
+        )
+
+    add_no_changes_detail(technique_details)
+    return result_df
+
+
+def apply_techniques_incremental(df, config, technique_details, plan, column_names, engine=None,
+                                 column_stats=None, column_params=None):
+    """
+    Como `apply_techniques`, pero a partir de la instantánea de la ejecución
+    anterior (`plan`): `df` sólo trae las columnas de `plan.recompute`, las
+    demás se leen de la instantánea y los pasos de cuasi-identificadores sólo
+    se rehacen si cambiaron sus parámetros o la salida de alguna columna que
+    leen. Devuelve (resultado, salida de la primera fase, pasos rehechos).
+    """
+    manifest = plan.manifest
+    _, techniques, _ = config_parts(config)
+    if column_params is not None:
+        column_params.update({col: manifest["column_params"][col] for col in plan.reuse
+                              if col in manifest["column_params"]})
+    partial = {**config, "techniques": [t for t in techniques if t["column"] in plan.recompute]}
+    recomputed = apply_column_techniques(df, partial, technique_details, engine, column_stats, column_params)
+
+    reused = snapshot_store.load_stage1(manifest, plan.reuse)
+    for col in plan.reuse:
+        technique_details.update(manifest["details"]["columns"].get(col, {}))
+    frames = [frame for frame in (recomputed, reused) if len(frame.columns)]
+    stage1 = pd.concat(frames, axis=1) if frames else recomputed
+    stage1 = stage1[[c for c in column_names if c in stage1.columns]]
+
+    # Una columna recalculada con la misma salida no obliga a rehacer los pasos globales
+    changed = [c for c in qi_step_columns(config) if c in plan.recompute]
+    previous = snapshot_store.load_stage1(manifest, changed)
+    redo = plan.global_changed or any(
+        c not in stage1.columns or c not in previous.columns or not stage1[c].equals(previous[c]) for c in changed
+    )
+    if redo:
+        return apply_global_steps(stage1, config, technique_details), stage1, True
+
+    final = snapshot_store.load_final(manifest)
+    result_df = stage1.copy() if final.index.equals(stage1.index) else stage1.loc[final.index]
+    for col in final.columns:
+        result_df[col] = final[col]
+    technique_details.update(manifest["details"]["global"])
+    add_no_changes_detail(technique_details)
+    return result_df, stage1, False
+
+
+def apply_techniques_append(df, config, technique_details, plan, column_params, engine=None):
+    """
+    Procesa sólo las filas añadidas al dataset (`df`, desde la fila
+    `plan.offset`) con los parámetros guardados en la instantánea. El
+    k-anonimato por jerarquías aplica los mismos niveles y, como la
+    l-diversidad, sólo publica las filas nuevas cuya clase cumple al sumarle
+    las ya publicadas; el resto se suprime. Devuelve (filas finales, primera
+    fase, tabla de clases combinada, filas nuevas suprimidas). Lanza
+    `AppendUnsupported` si el resultado no puede extenderse sin recalcularlo.
+    """
+    manifest = plan.manifest
+    column_mappings, _, global_params = config_parts(config)
+    quasi_identifiers = [m["column"] for m in column_mappings if m["type"] == "quasi-identifier"]
+    sensitive_columns = [m["column"] for m in column_mappings if m["type"] == "sensitive"]
+    sensitive = sensitive_columns[0] if sensitive_columns else None
+
+    # Los detalles de las técnicas son los de la ejecución anterior: los parámetros no cambian
+    stage1 = apply_column_techniques(df, config, {}, engine, column_params=column_params, offset=plan.offset)
+    if [str(col) for col in stage1.columns] != manifest["stage1_columns"]:
+        raise AppendUnsupported("Appended rows do not have the columns of the previous run")
+    for details in manifest["details"]["columns"].values():
+        technique_details.update(details)
+    technique_details.update(manifest["details"]["global"])
+
+    k = global_params.get("k", 2)
+    l = global_params.get("l", 2)
+    k_step = bool(quasi_identifiers) and k > 1
+    l_step = bool(quasi_identifiers) and sensitive is not None and l > 1
+    classes = snapshot_store.load_classes(manifest)
+    if not (k_step or l_step):
+        return stage1, stage1, classes, 0
+    if classes is None:
+        raise AppendUnsupported("The previous run has no equivalence class table")
+
+    result_df = stage1.copy()
+    if k_step:
+        k_detail = manifest["details"]["global"].get("k_anonymity", {})
+        if k_detail.get("algorithm") != "lattice":
+            raise AppendUnsupported("Mondrian partitions must be recomputed with all rows")
+        hierarchy_specs = global_params.get("hierarchies") or {}
+        for col, level in k_detail["levels"].items():
+            # Mismo criterio que la generalización por jerarquía de la primera fase
+            hierarchy = Hierarchy.from_spec(result_df[col], hierarchy_specs.get(col))
+            if level == k_detail["heights"][col]:
+                level = hierarchy.height
+            elif level >= hierarchy.height:
+                raise AppendUnsupported(f"Hierarchy of column '{col}' changed with the appended rows")
+            result_df[col] = hierarchy.generalize(level, index=result_df.index, name=col)
+
+    publish = extend_classes(result_df, quasi_identifiers, sensitive, classes, k if k_step else 1,
+                             l if l_step else 1)
+    # Como en el retículo, las filas que no pueden publicarse se eliminan: enmascaradas formarían otra clase pequeña
+    withheld = int((~publish).sum())
+    if withheld:
+        result_df = result_df[publish]
+
+    technique_details["appended_rows"] = {
+        "technique": "Filas Añadidas",
+        "changes": [
+            f"Se procesaron {len(df)} filas añadidas con los parámetros de la ejecución anterior",
+            f"Se suprimieron {withheld} filas nuevas de grupos que no cumplían k={k} o l={l}"
+        ],
+        "explanation": (
+            "Las filas nuevas se anonimizaron igual que las anteriores y sólo se publicaron "
+            "las que quedan en grupos que siguen cumpliendo las garantías de privacidad."
         )
+    }
+    merged = merge_class_tables(classes, class_table(result_df, quasi_identifiers, sensitive))
+    return result_df, stage1, merged, withheld
+
+
+def incremental_plan(dataset: Dict, config: Dict, column_names: List[str], base: Optional[Dict]):
+    """
+    Plan respecto a la instantánea `base` del dataset, o None si no es válida
+    para su contenido actual o el modo incremental está desactivado.
+    """
+    _, _, global_params = config_parts(config)
+    if base is None or not global_params.get("incremental", True):
+        return None
+    if base.get("content_hash") != dataset_content_hash(dataset):
+        return None
+    return plan_changes(base, column_fingerprints(config, column_names, RESULT_SETTINGS), global_fingerprint(config))
+
+
+def append_plan(dataset: Dict, config: Dict, column_names: List[str], base: Optional[Dict]):
+    """Plan para procesar sólo los segmentos añadidos después de la instantánea `base`, o None."""
+    _, _, global_params = config_parts(config)
+    segments = dataset.get("segments") or []
+    if isinstance(segments, str):
+        segments = json.loads(segments)
+    if base is None or len(segments) < 2 or not global_params.get("incremental", True):
+        return None
+    return plan_append(base, segments, column_fingerprints(config, column_names, RESULT_SETTINGS),
+                       global_fingerprint(config))
+
+
+def snapshot_manifest(job_id: str, dataset: Dict, config: Dict, column_names: List[str], technique_details: Dict,
+                      column_params: Dict, privacy: Dict, metrics: Dict, output_bytes: int) -> Dict:
+    column_mappings, _, _ = config_parts(config)
+    return {
+        "result_id": job_id,
+        "content_hash": dataset_content_hash(dataset),
+        "seed": config_seed(config),
+        "config_hash": config_hash(config),
+        "fingerprints": column_fingerprints(config, column_names, RESULT_SETTINGS),
+        "global": global_fingerprint(config),
+        "dropped_columns": [m["column"] for m in column_mappings if m["type"] == "identifier"],
+        "details": split_details(technique_details, column_names),
+        "column_params": column_params,
+        "approximate": bool(metrics.get("approximate")),
+        "privacy": privacy,
+        "information_loss": metrics["information_loss"]["columns"],
+        "anonymized_rows": metrics["anonymized_rows"],
+        "output_bytes": output_bytes,
+        "output_schema": metrics.get("output_schema"),
+    }
 
+
+def save_snapshot(job_id: str, dataset: Dict, config: Dict, column_names: List[str], stage1: pd.DataFrame,
+                  anonymized_df: pd.DataFrame, technique_details: Dict, column_params: Dict, privacy: Dict,
+                  metrics: Dict, output_bytes: int, base: Optional[Dict] = None,
+                  classes: Optional[pd.DataFrame] = None):
+    """
+    Guarda la instantánea de la ejecución (con `base`, sólo las filas
+    añadidas a la anterior); sin ella la siguiente sólo deja de ser incremental.
+    """
+    if snapshot_store is None:
+        return
+    qi_columns = [c for c in qi_step_columns(config) if c in anonymized_df.columns]
+    try:
+        manifest = snapshot_manifest(job_id, dataset, config, column_names, technique_details, column_params,
+                                     privacy, metrics, output_bytes)
+        if base is not None:
+            snapshot_store.extend(dataset["id"], manifest, base, stage1, anonymized_df[qi_columns], classes)
+            return
+        column_mappings, _, _ = config_parts(config)
+        quasi_identifiers = [m["column"] for m in column_mappings if m["type"] == "quasi-identifier"]
+        if quasi_identifiers:
+            sensitive_columns = [m["column"] for m in column_mappings if m["type"] == "sensitive"]
+            classes = class_table(anonymized_df, quasi_identifiers, sensitive_columns[0] if sensitive_columns else None)
+        snapshot_store.save(dataset["id"], manifest, stage1, anonymized_df[qi_columns], classes)
+    except Exception as e:
+        logger.warning(f"Could not save incremental snapshot for result {job_id}: {str(e)}")
+
+
+def add_no_changes_detail(technique_details):
     if not technique_details:
         technique_details["no_changes"] = {
             "technique": "Sin Transformaciones",
@@ -1224,30 +2134,205 @@ def apply_techniques(df, config, technique_details):
             ),
             "changes": []
         }
-    return result_df
 
 
-@app.post("/api/process")
-async def process_anonymization(request: ProcessRequest, user_id: str = Depends(get_current_user)):
-    logger.info(f"User {user_id} processing dataset {request.dataset_id} with config {request.config_id}")
-    start_time = time.time()
+def load_column_stats(dataset: Dict, df: pd.DataFrame, exact: bool = True) -> Dict:
+    """
+    Estadísticas por columna del dataset original: el perfil guardado en
+    `datasets.column_stats` al subirlo. Las columnas que aún no lo tienen se
+    calculan sobre `df` (ya cargado) y se guardan para las siguientes
+    ejecuciones; con `exact`, también las que sólo tienen distintos estimados.
+    """
+    stats = dataset.get("column_stats") or {}
+    if isinstance(stats, str):
+        stats = json.loads(stats)
+    if exact:
+        missing = [col for col in df.columns if not stats.get(col, {}).get("distinct_exact", col in stats)]
+    else:
+        missing = [col for col in df.columns if col not in stats]
+    if missing:
+        computed = column_statistics(df[missing])
+        stats = {
+            **stats,
+            **{col: {**stats.get(col, {}), **computed[col], "distinct_exact": True} for col in missing}
+        }
+        db.update("datasets", {"column_stats": json.dumps(stats)}, {"id": dataset["id"]})
+    return stats
+
+
+def output_schema(df: pd.DataFrame) -> Dict:
+    """Tipos de las columnas del resultado (mismo formato que el esquema de los datasets), para exportarlo."""
+    tracker = SchemaTracker()
+    tracker.update(df)
+    return tracker.to_dict()
+
+
+def build_metrics(privacy: Dict, information_loss: Dict, total_rows: int, anonymized_rows: int,
+                  anonymized_columns: int, column_names: List[str], quasi_identifiers: List[str],
+                  sensitive_columns: List[str], approximate: bool) -> Dict:
+    metrics = {
+        "k_anonymity": privacy.get("k_anonymity", 0),
+        "l_diversity": privacy.get("l_diversity", None if approximate else 0.0),
+        "entropy_l_diversity": privacy.get("entropy_l_diversity"),
+        "t_closeness": privacy.get("t_closeness"),
+        "equivalence_classes": privacy.get("equivalence_classes", 0),
+        "avg_class_size": privacy.get("avg_class_size", 0.0),
+        "class_size_histogram": privacy.get("class_size_histogram", {}),
+        "information_loss_percentage": round(information_loss["ncp"] * 100, 2),
+        "information_loss": information_loss,
+        "original_rows": total_rows,
+        "anonymized_rows": anonymized_rows,
+        "original_columns": len(column_names),
+        "anonymized_columns": anonymized_columns,
+        "quasi_identifiers": quasi_identifiers,
+        "sensitive_attributes": sensitive_columns
+    }
+    if approximate:
+        # `k_anonymity` es el valor conservador; la estimación del sketch sólo es una cota superior
+        metrics["approximate"] = True
+        metrics["k_anonymity_upper_bound"] = privacy.get("k_anonymity_upper_bound")
+        metrics["error_bounds"] = privacy.get("error_bounds", {})
+    return metrics
+
+
+def finish_job(job_id: str, dataset: Dict, config: Dict, user_id: str, result_key: Optional[str], metrics: Dict,
+               technique_details: Dict, start_time: float, output_bytes: int, anonymized_data: Optional[str] = None):
+    """Marca el trabajo como completado (con `anonymized_data` si aún no está guardado), lo audita y lo cachea."""
+    processing_time = int((time.time() - start_time) * 1000)
+    data = {
+        "metrics": json.dumps(metrics),
+        "technique_details": json.dumps(technique_details, default=str),
+        "status": JOB_COMPLETED,
+        "stage": "completed",
+        "progress": 100,
+        "processing_time_ms": processing_time,
+        "completed_at": datetime.utcnow()
+    }
+    if anonymized_data is not None:
+        data["anonymized_data"] = anonymized_data
+    db.update("anonymization_results", data, {"id": job_id})
+
+    log_audit(user_id, "process_anonymization", "result", job_id, {
+        "dataset_id": dataset["id"],
+        "config_id": config["id"],
+        "k_value": metrics["k_anonymity"],
+        "processing_time_ms": processing_time
+    })
+
+    if result_key is not None:
+        try:
+            result_cache.store(user_id, result_key, dataset["id"], job_id, config_hash(config),
+                               config_seed(config), output_bytes)
+        except Exception as e:
+            # Sin la entrada de caché el resultado sigue siendo válido
+            logger.warning(f"Could not cache result {job_id}: {str(e)}")
 
-    try:
-        dataset = db.select_one("datasets", {"id": request.dataset_id, "user_id": user_id})
-        if not dataset:
-            raise HTTPException(status_code=404, detail="Dataset not found")
+    logger.info(f"Processing completed in {processing_time}ms, result: {job_id}")
 
-        config = db.select_one("anonymization_configs", {"id": request.config_id, "user_id": user_id})
-        if not config:
-            raise HTTPException(status_code=404, detail="Config not found")
 
-        data = dataset["data"]
-        if isinstance(data, str):
-            data = json.loads(data)
-        df = pd.DataFrame(data)
+def run_append_job(job_id: str, dataset: Dict, config: Dict, user_id: str, result_key: Optional[str],
+                   plan, column_names: List[str], progress: JobProgress, start_time: float):
+    """
+    Anonimiza sólo las filas añadidas después de la instantánea `plan.manifest`
+    y guarda sólo su salida, enlazada al resultado anterior. Las métricas de privacidad
+    salen de la tabla de clases combinada, así que el coste depende de las
+    filas nuevas y del número de clases, no del tamaño del dataset. Las
+    filas nuevas son disjuntas de las anteriores: la privacidad diferencial
+    no vuelve a gastar presupuesto (composición paralela).
+    """
+    manifest = plan.manifest
+    column_mappings, _, _ = config_parts(config)
+    quasi_identifiers = [m["column"] for m in column_mappings if m["type"] == "quasi-identifier"]
+    sensitive_columns = [m["column"] for m in column_mappings if m["type"] == "sensitive"]
+    identifiers = [m["column"] for m in column_mappings if m["type"] == "identifier"]
+    total_rows = plan.offset + plan.rows
+
+    progress.update(10, "loading_dataset")
+    df = storage.read_range(dataset, plan.offset, plan.rows, [c for c in column_names if c not in identifiers])
+    df.index = pd.RangeIndex(plan.offset, plan.offset + len(df))
+    df.attrs["omitted_columns"] = [c for c in column_names if c in identifiers]
+
+    progress.update(30, "applying_techniques")
+    technique_details = {}
+    column_params = {col: dict(params) for col, params in manifest["column_params"].items()}
+    delta_df, stage1, classes, withheld = apply_techniques_append(
+        df, config, technique_details, plan, column_params, engine=execution_engine
+    )
 
-        technique_details = {}
-        anonymized_df = apply_techniques(df, config, technique_details)
+    progress.update(70, "calculating_metrics")
+    sensitive = sensitive_columns[0] if sensitive_columns else None
+    if quasi_identifiers and classes is not None:
+        privacy = compute_privacy_metrics(classes, quasi_identifiers, sensitive, weights=classes[CLASS_COUNT_COLUMN])
+        class_sizes = classes.groupby(quasi_identifiers, dropna=False, sort=False)[CLASS_COUNT_COLUMN].sum().to_numpy()
+    else:
+        privacy, class_sizes = {}, None
+    column_stats = dataset.get("column_stats") or {}
+    if isinstance(column_stats, str):
+        column_stats = json.loads(column_stats)
+    delta_loss = compute_information_loss(df, delta_df, column_names, column_stats, quasi_identifiers,
+                                          discernibility=0.0)
+    information_loss = merge_information_loss(manifest["information_loss"], manifest["anonymized_rows"],
+                                              delta_loss["columns"], len(delta_df), total_rows, class_sizes)
+
+    anonymized_rows = manifest["anonymized_rows"] + len(delta_df)
+    metrics = build_metrics(privacy, information_loss, total_rows, anonymized_rows, len(delta_df.columns),
+                            column_names, quasi_identifiers, sensitive_columns, False)
+    metrics["incremental"] = {**plan.to_dict(), "withheld_rows": withheld}
+    if manifest.get("output_schema"):
+        metrics["output_schema"] = merge_schemas(manifest["output_schema"], output_schema(delta_df))
+
+    # Sólo se guardan las filas nuevas, enlazadas al resultado anterior (del que el nuevo es la última parte).
+    # Si el anterior ya no existe o la cadena llega a MAX_RESULT_PARTS, se guarda completo desde la instantánea
+    progress.update(90, "saving_result")
+    delta_data = json.dumps(chunk_to_records(delta_df), default=str)
+    output_bytes = manifest.get("output_bytes", 0) + len(delta_data)
+    extended = None
+    if 0 < len(result_parts({"id": manifest["result_id"]})) < MAX_RESULT_PARTS:
+        extended = db.execute_one("""
+            UPDATE anonymization_results r
+            SET anonymized_data = %s::jsonb, base_result_id = b.id
+            FROM anonymization_results b
+            WHERE r.id = %s AND b.id = %s AND b.status = %s AND b.config_id = r.config_id
+            RETURNING r.id
+        """, (delta_data, job_id, manifest["result_id"], JOB_COMPLETED))
+    anonymized_data = None
+    if extended is None:
+        output = pd.concat([snapshot_store.load_output(manifest), delta_df])
+        anonymized_data = json.dumps(chunk_to_records(output), default=str)
+        output_bytes = len(anonymized_data)
+
+    save_snapshot(job_id, dataset, config, column_names, stage1, delta_df, technique_details, column_params,
+                  privacy, metrics, output_bytes, base=manifest, classes=classes)
+    finish_job(job_id, dataset, config, user_id, result_key, metrics, technique_details, start_time, output_bytes,
+               anonymized_data)
+
+
+def run_anonymization_job(job_id: str, dataset: Dict, config: Dict, user_id: str, result_key: Optional[str] = None,
+                          reuse_seed: bool = True):
+    """
+    Ejecuta una anonimización encolada y guarda el resultado en su fila de
+    `anonymization_results`; con `result_key`, lo registra en la caché de resultados.
+    Sin semilla en la configuración se reutiliza la de la instantánea si es de
+    la misma configuración y `reuse_seed`; si no, se usa una nueva.
+    Si hay una instantánea de una ejecución anterior sobre el mismo contenido,
+    sólo se recalcula lo que cambió respecto a ella (`incremental_plan`); si
+    sólo se añadieron filas al dataset, sólo se procesan ésas (`run_append_job`).
+    """
+    progress = JobProgress(db, job_id)
+    progress.start()
+    start_time = time.time()
+    # Instantánea que lee el trabajo: no se borra hasta soltarla, aunque otro trabajo guarde una más reciente
+    base = None
+
+    try:
+        # El dataset pudo cambiar (p. ej. filas añadidas) mientras el trabajo esperaba en la cola
+        dataset = select_fields("datasets", DATASET_PROCESS_FIELDS, {"id": dataset["id"]})
+        if dataset is None:
+            raise ValueError("Dataset not found")
+        if dataset["status"] not in PROCESSABLE_DATASET_STATUSES:
+            raise ValueError(f"Dataset is not ready for processing (status: {dataset['status']})")
+        if result_key is not None:
+            result_key = result_cache_key(dataset, config)
 
         column_mappings = config["column_mappings"]
         if isinstance(column_mappings, str):
@@ -1255,109 +2340,271 @@ async def process_anonymization(request: ProcessRequest, user_id: str = Depends(
 
         quasi_identifiers = [m["column"] for m in column_mappings if m["type"] == "quasi-identifier"]
         sensitive_columns = [m["column"] for m in column_mappings if m["type"] == "sensitive"]
+        identifiers = [m["column"] for m in column_mappings if m["type"] == "identifier"]
+
+        column_names = dataset["column_names"]
+        if isinstance(column_names, str):
+            column_names = json.loads(column_names)
+        _, techniques, global_params = config_parts(config)
+
+        # La semilla se fija antes de comparar con la instantánea: sin una explícita se reutiliza la anterior
+        # sólo si es de la misma configuración y no se pidió ruido nuevo (`use_cache=False`)
+        plan = None
+        if snapshot_store is not None:
+            base = snapshot_store.acquire(dataset["id"])
+            seed = global_params.get("seed")
+            if seed is None:
+                reusable = (reuse_seed and base is not None and base.get("seed") is not None
+                            and base.get("config_hash") == config_hash(config))
+                seed = base["seed"] if reusable else new_seed()
+            config = {**config, "global_params": {**global_params, "seed": seed}}
+            appended = append_plan(dataset, config, column_names, base)
+            if appended is not None:
+                try:
+                    return run_append_job(job_id, dataset, config, user_id, result_key, appended, column_names,
+                                          progress, start_time)
+                except AppendUnsupported as e:
+                    logger.info(f"Appended rows need a full run for result {job_id}: {str(e)}")
+            plan = incremental_plan(dataset, config, column_names, base)
+
+        # Los identificadores directos se eliminan del resultado: no hace falta leerlos
+        progress.update(10, "loading_dataset")
+        pending = plan.recompute if plan is not None else column_names
+        df = storage.load(dataset, columns=[c for c in pending if c not in identifiers])
+        df.attrs["omitted_columns"] = [c for c in pending if c in identifiers]
+        total_rows = len(df) if len(df.columns) else int(dataset.get("row_count") or 0)
+
+        # Por encima del umbral, las métricas se estiman con sketches en lugar de agrupar
+        approximate = global_params.get("approximate_metrics")
+        if approximate is None:
+            approximate = total_rows >= anonymization_config.get('approximate_metrics_rows', DEFAULT_APPROXIMATE_ROWS)
+
+        # El presupuesto de privacidad se comprueba antes de aplicar las técnicas y se gasta al guardar;
+        # las columnas reutilizadas de la instantánea no vuelven a gastarlo
+        dp_charges = technique_charges(techniques, df.columns)
+        accountant = privacy_accountant(dataset) if dp_charges else None
+        if accountant is not None:
+            accountant.check(dp_charges)
+
+        progress.update(30, "applying_techniques")
+        technique_details = {}
+        # Parámetros que dependen de los datos, para procesar después sólo las filas añadidas
+        column_params = {}
+        column_stats = load_column_stats(dataset, df, exact=not approximate)
+        if plan is not None:
+            anonymized_df, stage1, qi_redone = apply_techniques_incremental(
+                df, config, technique_details, plan, column_names, engine=execution_engine, column_stats=column_stats,
+                column_params=column_params
+            )
+        else:
+            stage1 = apply_column_techniques(df, config, technique_details, engine=execution_engine,
+                                             column_stats=column_stats, column_params=column_params)
+            anonymized_df = apply_global_steps(stage1, config, technique_details)
+            qi_redone = True
+
+        progress.update(70, "calculating_metrics")
+        # Sin cambios en los cuasi-identificadores ni en las filas, las métricas de privacidad no cambian
+        reuse_privacy = plan is not None and not qi_redone and plan.manifest.get("approximate") == bool(approximate)
+        # k, l y t-closeness salen de una única agrupación por cuasi-identificadores
+        if reuse_privacy:
+            privacy = plan.manifest["privacy"]
+        elif not quasi_identifiers:
+            privacy = {}
+        elif approximate:
+            privacy = approximate_privacy_metrics(anonymized_df, quasi_identifiers, engine=execution_engine)
+        else:
+            privacy = compute_privacy_metrics(
+                anonymized_df, quasi_identifiers, sensitive_columns[0] if sensitive_columns else None
+            )
 
-        k_value = calculate_k_anonymity(anonymized_df, quasi_identifiers) if quasi_identifiers else 0
-        l_value = calculate_l_diversity(anonymized_df, quasi_identifiers,
-                                        sensitive_columns[0]) if quasi_identifiers and sensitive_columns else 0.0
-        info_loss = calculate_information_loss(df, anonymized_df, df.columns.tolist())
-
-        metrics = {
-            "k_anonymity": k_value,
-            "l_diversity": l_value,
-            "information_loss_percentage": round(info_loss, 2),
-            "original_rows": len(df),
-            "anonymized_rows": len(anonymized_df),
-            "original_columns": len(df.columns),
-            "anonymized_columns": len(anonymized_df.columns),
-            "quasi_identifiers": quasi_identifiers,
-            "sensitive_attributes": sensitive_columns
-        }
+        # La pérdida de las columnas reutilizadas sólo se conserva si quedan las mismas filas
+        reuse_loss = {}
+        if plan is not None and not qi_redone:
+            reuse_loss = {c: plan.manifest["information_loss"][c] for c in plan.reuse
+                          if c in plan.manifest["information_loss"]}
+        missing = [c for c in column_names if c not in reuse_loss and c not in df.columns and c not in identifiers]
+        if missing:
+            df = pd.concat([df, storage.load(dataset, columns=missing)], axis=1) if len(df.columns) else storage.load(
+                dataset, columns=missing)
+            column_stats = load_column_stats(dataset, df, exact=not approximate)
+        information_loss = compute_information_loss(
+            df, anonymized_df, column_names, column_stats, quasi_identifiers,
+            discernibility=privacy.get("discernibility") if approximate else None,
+            reuse=reuse_loss, total_rows=total_rows
+        )
 
-        processing_time = int((time.time() - start_time) * 1000)
+        metrics = build_metrics(privacy, information_loss, total_rows, len(anonymized_df),
+                                len(anonymized_df.columns), column_names, quasi_identifiers, sensitive_columns,
+                                approximate)
+        metrics["output_schema"] = output_schema(anonymized_df)
+        if plan is not None:
+            metrics["incremental"] = {**plan.to_dict(), "qi_steps_recomputed": qi_redone}
 
-        result_data = {
-            "user_id": user_id,
-            "dataset_id": request.dataset_id,
-            "config_id": request.config_id,
-            "anonymized_data": json.dumps(anonymized_df.to_dict(orient='records')),
-            "metrics": json.dumps(metrics),
-            "technique_details": json.dumps(technique_details),
-            "status": "completed",
-            "processing_time_ms": processing_time,
-            "completed_at": datetime.utcnow(),
-            "created_at": datetime.utcnow()
-        }
+        progress.update(90, "saving_result")
+        if accountant is not None:
+            metrics["privacy_budget"] = accountant.charge(dp_charges, job_id)
+
+        anonymized_data = json.dumps(chunk_to_records(anonymized_df), default=str)
+        save_snapshot(job_id, dataset, config, column_names, stage1, anonymized_df, technique_details,
+                      column_params, privacy, metrics, len(anonymized_data))
+        finish_job(job_id, dataset, config, user_id, result_key, metrics, technique_details, start_time,
+                   len(anonymized_data), anonymized_data)
+
+    except Exception as e:
+        logger.error(f"Error processing anonymization job {job_id}: {str(e)}")
+        progress.fail(str(e))
+    finally:
+        if base is not None:
+            snapshot_store.release(base)
+
+
+@app.post("/api/process", status_code=202)
+def process_anonymization(request: ProcessRequest, response: Response, user_id: str = Depends(get_current_user)):
+    logger.info(f"User {user_id} processing dataset {request.dataset_id} with config {request.config_id}")
 
-        result = db.insert_returning("anonymization_results", result_data)
+    try:
+        # Sin `data`: las filas se leen en el trabajo, desde la caché de DataFrames si ya están decodificadas
+        dataset = select_fields("datasets", DATASET_PROCESS_FIELDS, {"id": request.dataset_id, "user_id": user_id})
+        if not dataset:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        if dataset["status"] not in PROCESSABLE_DATASET_STATUSES:
+            raise HTTPException(status_code=409,
+                                detail=f"Dataset is not ready for processing (status: {dataset['status']})")
 
-        log_audit(user_id, "process_anonymization", "result", result["id"], {
+        config = db.select_one("anonymization_configs", {"id": request.config_id, "user_id": user_id})
+        if not config:
+            raise HTTPException(status_code=404, detail="Config not found")
+
+        # Misma configuración sobre el mismo contenido y con la misma semilla: se reutiliza el resultado
+        # (sin volver a gastar presupuesto de privacidad ni guardar otra copia de los datos)
+        key = result_cache_key(dataset, config) if result_cache.enabled else None
+        if key is not None and request.use_cache:
+            cached_id = result_cache.lookup(user_id, key, JOB_COMPLETED)
+            if cached_id:
+                logger.info(f"Result cache hit: {cached_id}")
+                response.status_code = 200
+                return {**get_job(cached_id, user_id), "cached": True}
+
+        # Rechazo inmediato si la configuración ya no cabe en el presupuesto de privacidad del dataset
+        techniques = config["techniques"]
+        if isinstance(techniques, str):
+            techniques = json.loads(techniques)
+        column_names = dataset["column_names"]
+        if isinstance(column_names, str):
+            column_names = json.loads(column_names)
+        dp_charges = technique_charges(techniques, column_names)
+        if dp_charges:
+            try:
+                privacy_accountant(dataset).check(dp_charges)
+            except PrivacyBudgetExceeded as e:
+                raise HTTPException(status_code=409, detail=f"Privacy budget exceeded: {e}")
+
+        job = db.insert_returning("anonymization_results", {
+            "user_id": user_id,
             "dataset_id": request.dataset_id,
             "config_id": request.config_id,
-            "k_value": k_value,
-            "processing_time_ms": processing_time
+            "anonymized_data": json.dumps([]),
+            "metrics": json.dumps({}),
+            "status": JOB_PENDING,
+            "stage": "queued",
+            "progress": 0,
+            "created_at": datetime.utcnow()
         })
 
-        # result['anonymized_data'] = json.loads(result['anonymized_data'])
-        # result['metrics'] = json.loads(result['metrics'])
-        # result['technique_details'] = json.loads(result['technique_details'])
+        job_queue.submit(job["id"], run_anonymization_job, job["id"], dataset, config, user_id, key,
+                         request.use_cache)
+        logger.info(f"Anonymization job queued: {job['id']}")
 
-        result['anonymized_data'] = json.loads(result['anonymized_data']) if isinstance(result.get('anonymized_data'),
-                                                                                        str) else result.get(
-            'anonymized_data', [])
-        result['metrics'] = json.loads(result['metrics']) if isinstance(result.get('metrics'), str) else result.get(
-            'metrics', {})
-        result['technique_details'] = json.loads(result['technique_details']) if isinstance(
-            result.get('technique_details'), str) else result.get('technique_details', {})
-
-        logger.info(f"Processing completed in {processing_time}ms, result: {result['id']}")
-        return result
+        return {**get_job(job["id"], user_id), "cached": False}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing anonymization: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str, user_id: str = Depends(get_current_user)):
+    try:
+        job = select_fields("anonymization_results", JOB_FIELDS, {"id": job_id, "user_id": user_id})
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        job["result_id"] = job["id"] if job["status"] == JOB_COMPLETED else None
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching job: {str(e)}")
+        raise HTTPException(status_code=404, detail="Job not found")
+
+
 @app.get("/api/results")
-def get_results(dataset_id: Optional[str] = None, user_id: str = Depends(get_current_user)):
+def get_results(
+        response: Response,
+        dataset_id: Optional[str] = None,
+        status: Optional[str] = None,
+        include: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        user_id: str = Depends(get_current_user)
+):
     logger.info(f"User {user_id} fetching results")
+    include_fields = parse_include(include, RESULT_HEAVY_FIELDS)
     try:
+        filters = {"user_id": user_id}
         if dataset_id:
-            query = "SELECT * FROM anonymization_results WHERE user_id = %s AND dataset_id = %s ORDER BY created_at DESC"
-            params = (user_id, dataset_id)
-        else:
-            query = "SELECT * FROM anonymization_results WHERE user_id = %s ORDER BY created_at DESC"
-            params = (user_id,)
+            filters["dataset_id"] = dataset_id
+        if status:
+            filters["status"] = status
 
-        results = db.execute_query(query, params, fetch=True)
+        fields = RESULT_LIST_FIELDS + include_fields
+        if "anonymized_data" in include_fields:
+            fields = fields + ["base_result_id"]
+        results = list_rows("anonymization_results", fields, filters, cursor, limit, response)
 
+        # Los resultados de filas añadidas sólo guardan esas filas: se completan con las partes anteriores
         for result in results:
-            if isinstance(result.get('anonymized_data'), str):
-                result['anonymized_data'] = json.loads(result['anonymized_data'])
-            if isinstance(result.get('metrics'), str):
-                result['metrics'] = json.loads(result['metrics'])
-            if isinstance(result.get('technique_details'), str):
-                result['technique_details'] = json.loads(result['technique_details'])
-
+            if result.pop("base_result_id", None) is not None:
+                parts = result_parts({"id": result["id"]})
+                result["anonymized_data"] = read_result_rows(parts, 0, sum(part["total"] for part in parts))
         return results
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching results: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/results/{result_id}")
-def get_result(result_id: str, user_id: str = Depends(get_current_user)):
+def get_result(
+        result_id: str,
+        offset: int = Query(0, ge=0),
+        limit: Optional[int] = Query(None, ge=1, le=10000),
+        columns: Optional[str] = None,
+        user_id: str = Depends(get_current_user)
+):
     logger.info(f"User {user_id} fetching result {result_id}")
     try:
-        result = db.select_one("anonymization_results", {"id": result_id, "user_id": user_id})
+        filters = {"id": result_id, "user_id": user_id}
+        result = select_fields("anonymization_results", RESULT_LIST_FIELDS + ["technique_details"], filters)
         if not result:
             raise HTTPException(status_code=404, detail="Result not found")
 
-        if isinstance(result.get('anonymized_data'), str):
-            result['anonymized_data'] = json.loads(result['anonymized_data'])
-        if isinstance(result.get('metrics'), str):
-            result['metrics'] = json.loads(result['metrics'])
-        if isinstance(result.get('technique_details'), str):
-            result['technique_details'] = json.loads(result['technique_details'])
+        # Sólo se transfieren desde Postgres las filas de la página pedida
+        parts = result_parts(filters)
+        total_rows = sum(part["total"] for part in parts)
+        rows = read_result_rows(parts, offset, limit if limit is not None else total_rows)
+
+        selected_columns = parse_columns(columns)
+        if selected_columns is not None:
+            rows = [{c: row.get(c) for c in selected_columns if c in row} for row in rows]
+
+        result['anonymized_data'] = rows
+        result['offset'] = offset
+        result['limit'] = limit
+        result['total_rows'] = total_rows
 
         return result
     except HTTPException:
@@ -1367,46 +2614,163 @@ def get_result(result_id: str, user_id: str = Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="Result not found")
 
 
-@app.get("/api/stats")
-def get_stats(user_id: str = Depends(get_current_user)):
-    logger.info(f"User {user_id} fetching statistics")
+@app.get("/api/results/{result_id}/export")
+def export_result(
+        result_id: str,
+        export_format: str = Query("ndjson", alias="format"),
+        columns: Optional[str] = None,
+        user_id: str = Depends(get_current_user)
+):
+    logger.info(f"User {user_id} exporting result {result_id} as {export_format}")
     try:
-        datasets = db.execute_query("SELECT * FROM datasets WHERE user_id = %s", (user_id,), fetch=True)
-        configs = db.execute_query("SELECT * FROM anonymization_configs WHERE user_id = %s", (user_id,), fetch=True)
-        results = db.execute_query("SELECT * FROM anonymization_results WHERE user_id = %s", (user_id,), fetch=True)
+        if export_format not in available_formats():
+            raise HTTPException(status_code=400, detail=f"Unsupported export format: {export_format}")
 
-        total_rows_processed = 0
-        total_processing_time = 0
+        filters = {"id": result_id, "user_id": user_id}
+        result = select_fields("anonymization_results", ["id", "status", "metrics"], filters)
+        if not result:
+            raise HTTPException(status_code=404, detail="Result not found")
+        if result["status"] != JOB_COMPLETED:
+            raise HTTPException(status_code=409, detail="Result is not completed")
+
+        # Las filas se leen y se escriben por lotes mientras se envía la respuesta; la conexión queda
+        # ocupada hasta el final, así que sin un hueco libre se rechaza en lugar de agotar el pool
+        if not export_slots.acquire(blocking=False):
+            raise HTTPException(status_code=503, detail="Too many exports in progress, try again later",
+                                headers={"Retry-After": "5"})
+        try:
+            batch_rows = credentials['backend'].get('export_batch_rows', DEFAULT_EXPORT_BATCH_ROWS)
+            batches = iter_result_batches(result_parts(filters), batch_rows)
+            content = export_stream(export_format, batches, (result.get("metrics") or {}).get("output_schema"),
+                                    parse_columns(columns))
+        except Exception:
+            export_slots.release()
+            raise
+        content = ReleasingStream(content, export_slots.release)
+
+        log_audit(user_id, "export_result", "result", result_id, {"format": export_format})
+        return StreamingResponse(content, media_type=EXPORT_FORMATS[export_format], headers={
+            "Content-Disposition": f'attachment; filename="result-{result_id}.{export_format}"'
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting result: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        for r in results:
-            metrics = r.get("metrics")
-            if isinstance(metrics, str):
-                metrics = json.loads(metrics)
-            total_rows_processed += metrics.get("original_rows", 0)
-            total_processing_time += r.get("processing_time_ms", 0)
 
-        avg_processing_time = total_processing_time / len(results) if results else 0
+@app.get("/api/results/{result_id}/risk")
+def get_result_risk(
+        result_id: str,
+        quasi_identifiers: Optional[str] = None,
+        sampling_fraction: float = Query(1.0, gt=0, le=1),
+        threshold: float = Query(DEFAULT_RISK_THRESHOLD, gt=0, le=1),
+        top: int = Query(DEFAULT_TOP_RECORDS, ge=0, le=MAX_TOP_RECORDS),
+        user_id: str = Depends(get_current_user)
+):
+    logger.info(f"User {user_id} fetching risk of result {result_id}")
+    try:
+        filters = {"id": result_id, "user_id": user_id}
+        result = select_fields("anonymization_results", ["id", "metrics"], filters)
+        if not result:
+            raise HTTPException(status_code=404, detail="Result not found")
 
+        # Por defecto, los cuasi-identificadores con los que se anonimizó
+        metrics = result.get("metrics") or {}
+        columns = parse_columns(quasi_identifiers) or metrics.get("quasi_identifiers", [])
+
+        # Las columnas se validan con el esquema del resultado antes de abrir el cursor
+        schema = metrics.get("output_schema")
+        if schema is not None:
+            known = {column["name"] for column in schema["columns"]}
+            unknown = [col for col in columns if col not in known]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}")
+
+        # Las filas se leen por lotes y sólo se conservan los recuentos por clase; `closing` cierra el
+        # cursor de servidor aunque se salga del bucle con una excepción
+        accumulator = RiskAccumulator(columns)
+        batch_rows = credentials['backend'].get('export_batch_rows', DEFAULT_EXPORT_BATCH_ROWS)
+        with closing(iter_result_batches(result_parts(filters), batch_rows)) as batches:
+            for batch in batches:
+                rows = [json.loads(row) for row in batch]
+                # Resultados anteriores sin esquema: se comprueban con la primera fila de cada lote
+                unknown = [col for col in columns if col not in rows[0]] if schema is None else []
+                if unknown:
+                    raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}")
+                accumulator.update(pd.DataFrame.from_records(
+                    [{col: row.get(col) for col in columns} for row in rows], columns=columns
+                ))
+
+        return {"result_id": result_id, **accumulator.result(sampling_fraction, threshold, top)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing result risk: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/cache")
+def get_result_cache(user_id: str = Depends(get_current_user)):
+    try:
+        # Incluye los contadores de la caché de DataFrames decodificados de este proceso
         return {
-            "total_datasets": len(datasets),
-            "total_configs": len(configs),
-            "total_results": len(results),
-            "total_rows_processed": total_rows_processed,
-            "avg_processing_time_ms": round(avg_processing_time, 2)
+            **result_cache.stats(user_id),
+            "dataframes": storage.frame_cache.stats() if storage.frame_cache is not None else None
         }
     except Exception as e:
-        logger.error(f"Error fetching stats: {str(e)}")
+        logger.error(f"Error fetching result cache stats: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-if __name__ == "__main__":
-    import uvicorn
+@app.delete("/api/cache")
+def invalidate_result_cache(dataset_id: Optional[str] = None, user_id: str = Depends(get_current_user)):
+    logger.info(f"User {user_id} invalidating result cache" + (f" of dataset {dataset_id}" if dataset_id else ""))
+    try:
+        removed = result_cache.invalidate(user_id, dataset_id)
+        frames = storage.frame_cache.invalidate(dataset_id) if storage.frame_cache is not None else 0
+        log_audit(user_id, "invalidate_result_cache", "dataset" if dataset_id else "cache", dataset_id, {
+            "entries": removed,
+            "dataframes": frames
+        })
+        return {"invalidated": removed, "dataframes_invalidated": frames, "dataset_id": dataset_id}
+    except Exception as e:
+        logger.error(f"Error invalidating result cache: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-    backend_config = credentials['backend']
-    uvicorn.run(
-        app,
-        host=backend_config.get('host', '0.0.0.0'),
-        port=backend_config.get('port', 8000)
-    )
+
+@app.get("/api/stats")
+def get_stats(user_id: str = Depends(get_current_user)):
+    logger.info(f"User {user_id} fetching statistics")
+    try:
+        # Sólo agregados: no se leen las filas ni los datos anonimizados
+        stats = db.execute_one(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM datasets WHERE user_id = %s) AS total_datasets,
+                (SELECT COUNT(*) FROM anonymization_configs WHERE user_id = %s) AS total_configs,
+                COUNT(*) AS total_results,
+                COALESCE(SUM((metrics->>'original_rows')::bigint), 0) AS total_rows_processed,
+                COALESCE(AVG(processing_time_ms), 0) AS avg_processing_time_ms
+            FROM anonymization_results
+            WHERE user_id = %s AND status = 'completed'
+            """,
+            (user_id, user_id, user_id)
+        )
+
+        return {
+            "total_datasets": stats["total_datasets"],
+            "total_configs": stats["total_configs"],
+            "total_results": stats["total_results"],
+            "total_rows_processed": int(stats["total_rows_processed"]),
+            "avg_processing_time_ms": round(float(stats["avg_processing_time_ms"]), 2)
+        }
+    except Exception as e:
+        logger.error(f"Error fetching stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.on_event("shutdown")
+def shutdown_job_queue():
+    job_queue.shutdown(wait=False)
+    execution_engine.shutdown()
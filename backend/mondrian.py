@@ -0,0 +1,213 @@
+"""
+K-anonimato multidimensional con el algoritmo Mondrian (LeFevre et al.).
+
+Los cuasi-identificadores se codifican como rangos densos (entero por valor
+distinto, en orden) y el espacio se parte recursivamente por la mediana de
+la dimensión con mayor dispersión relativa mientras ambas mitades conserven
+al menos `k` filas. Cada partición final se generaliza a su rango en cada
+cuasi-identificador ("18-35" para numéricas, "A..F" para categóricas). Si
+en una dimensión la partición mezcla nulos y valores, se generaliza a "*"
+(todo el dominio, nulos incluidos): ni los nulos reciben un rango que no es
+el suyo ni forman una clase aparte con menos de `k` filas.
+
+La recursión se ejecuta por niveles: en cada iteración se procesan todas
+las particiones activas a la vez con operaciones vectorizadas (ordenación
+por partición, `reduceat`, `bincount`), de modo que el coste es
+O(n log n) por nivel y hay O(log(n / k)) niveles.
+"""
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from techniques import _format_edge_value
+
+logger = logging.getLogger(__name__)
+
+MAX_RECORDED_PARTITIONS = 100
+
+
+def encode_quasi_identifiers(df: pd.DataFrame, quasi_identifiers: List[str]):
+    """
+    Devuelve la matriz (n, d) de rangos densos, los valores ordenados de cada
+    columna y si cada columna es numérica. Los nulos reciben el rango
+    `len(valores)`, es decir, quedan al final de cada dimensión.
+    """
+    ranks = np.empty((len(df), len(quasi_identifiers)), dtype=np.int64)
+    uniques, numeric = [], []
+    for j, col in enumerate(quasi_identifiers):
+        series = df[col]
+        try:
+            codes, values = pd.factorize(series, sort=True)
+        except TypeError:
+            # Tipos mezclados que no se pueden ordenar entre sí
+            codes, values = pd.factorize(series.where(series.isna(), series.astype(str)), sort=True)
+        codes = np.asarray(codes, dtype=np.int64)
+        codes[codes < 0] = len(values)
+        ranks[:, j] = codes
+        uniques.append(np.asarray(values, dtype=object))
+        numeric.append(pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series))
+    return ranks, uniques, numeric
+
+
+def _segment_bounds(sorted_ranks: np.ndarray, starts: np.ndarray, null_ranks: np.ndarray):
+    """Rango [lo, hi] por dimensión (sin contar nulos) de cada segmento contiguo de filas."""
+    is_null = sorted_ranks == null_ranks
+    lo = np.minimum.reduceat(np.where(is_null, np.iinfo(np.int64).max, sorted_ranks), starts, axis=0)
+    hi = np.maximum.reduceat(np.where(is_null, -1, sorted_ranks), starts, axis=0)
+    return lo, hi
+
+
+def _segment_positions(starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Posiciones de todas las filas de los segmentos [start, start + size), en orden."""
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    return np.repeat(starts - offsets, sizes) + np.arange(int(sizes.sum()))
+
+
+def mondrian_partition(ranks: np.ndarray, k: int, null_ranks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Devuelve `(perm, sizes)`: una permutación de las filas en la que cada
+    partición ocupa un segmento contiguo, y el tamaño de cada segmento en
+    orden. Todas las particiones tienen al menos `k` filas si n >= k.
+    """
+    n, d = ranks.shape
+    perm = np.arange(n)
+    if n < 2 * k or d == 0:
+        return perm, np.array([n], dtype=np.int64)
+
+    widths = np.maximum(null_ranks - 1, 1).astype(float)
+    key_base = int(null_ranks.max()) + 1
+    # Segmentos activos (aún divisibles) y finales; cada uno es [start, start + size)
+    starts = np.zeros(1, dtype=np.int64)
+    sizes = np.array([n], dtype=np.int64)
+    attempts = np.zeros(1, dtype=np.int64)
+    final_starts, final_sizes = [], []
+
+    while len(starts):
+        segments = np.arange(len(starts))
+        positions = _segment_positions(starts, sizes)
+        seg = np.repeat(segments, sizes)
+        local_starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        segment_ranks = ranks[perm[positions]]
+
+        lo, hi = _segment_bounds(segment_ranks, local_starts, null_ranks)
+        spread = np.clip(hi - lo, 0, None) / widths
+        dim_order = np.argsort(-spread, axis=1, kind="stable")
+        chosen = dim_order[segments, np.minimum(attempts, d - 1)]
+        # Segmentos que ya no pueden dividirse: sin dimensiones por probar, pequeños o sin dispersión
+        splittable = (attempts < d) & (sizes >= 2 * k) & (spread[segments, chosen] > 0)
+
+        # Ordenar cada segmento por la dimensión elegida (una sola ordenación para todos)
+        key = segment_ranks[np.arange(len(seg)), chosen[seg]]
+        order = np.argsort(seg * key_base + key)
+        key = key[order]
+        perm[positions] = perm[positions[order]]
+
+        median = key[local_starts + sizes // 2]
+        left_lt = np.bincount(seg, weights=key < median[seg], minlength=len(starts)).astype(np.int64)
+        left_le = np.bincount(seg, weights=key <= median[seg], minlength=len(starts)).astype(np.int64)
+        ok_lt = (left_lt >= k) & (sizes - left_lt >= k)
+        ok_le = (left_le >= k) & (sizes - left_le >= k)
+        # Entre los cortes válidos se elige el más equilibrado
+        use_le = ok_le & (~ok_lt | (np.abs(2 * left_le - sizes) < np.abs(2 * left_lt - sizes)))
+        cut = splittable & (ok_lt | ok_le)
+        failed = splittable & ~cut
+        done = ~splittable
+
+        final_starts.append(starts[done])
+        final_sizes.append(sizes[done])
+
+        # Las mitades ya están contiguas tras ordenar; los intentos fallidos prueban la siguiente dimensión
+        left = np.where(use_le, left_le, left_lt)[cut]
+        starts = np.concatenate((starts[cut], starts[cut] + left, starts[failed]))
+        sizes = np.concatenate((left, sizes[cut] - left, sizes[failed]))
+        attempts = np.concatenate((np.zeros(2 * int(cut.sum()), dtype=np.int64), attempts[failed] + 1))
+        order = np.argsort(starts, kind="stable")
+        starts, sizes, attempts = starts[order], sizes[order], attempts[order]
+
+    final_starts = np.concatenate(final_starts)
+    final_sizes = np.concatenate(final_sizes)
+    return perm, final_sizes[np.argsort(final_starts, kind="stable")]
+
+
+def _format_range(lo: int, hi: int, values: np.ndarray, numeric: bool, formatted: Dict[int, str]) -> str:
+    # `formatted` guarda cada extremo ya formateado: muchos rangos comparten extremos
+    for rank in (lo, hi):
+        if rank not in formatted:
+            formatted[rank] = _format_edge_value(values[rank]) if numeric else str(values[rank])
+    if formatted[lo] == formatted[hi]:
+        return formatted[lo]
+    return f"{formatted[lo]}-{formatted[hi]}" if numeric else f"{formatted[lo]}..{formatted[hi]}"
+
+
+def mondrian_anonymize(df: pd.DataFrame, quasi_identifiers: List[str], k: int) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Generaliza los cuasi-identificadores de `df` con Mondrian y devuelve el
+    DataFrame resultante junto con un resumen de las particiones elegidas.
+    """
+    result_df = df.copy()
+    quasi_identifiers = [col for col in quasi_identifiers if col in df.columns]
+    if not quasi_identifiers or len(df) == 0:
+        return result_df, {"partition_count": 0, "partitions": []}
+
+    ranks, uniques, numeric = encode_quasi_identifiers(df, quasi_identifiers)
+    null_ranks = np.array([len(values) for values in uniques], dtype=np.int64)
+    perm, sizes = mondrian_partition(ranks, k, null_ranks)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    sorted_ranks = ranks[perm]
+    lo, hi = _segment_bounds(sorted_ranks, starts, null_ranks)
+    has_null = np.add.reduceat((sorted_ranks == null_ranks).astype(np.int64), starts, axis=0) > 0
+    # Partición de cada fila en el orden original
+    local = np.empty(len(df), dtype=np.int64)
+    local[perm] = np.repeat(np.arange(len(sizes)), sizes)
+
+    labels_by_partition = []
+    penalty = np.zeros(len(sizes))
+    for j, col in enumerate(quasi_identifiers):
+        values = uniques[j]
+        all_null = hi[:, j] < 0
+        mixed = has_null[:, j] & ~all_null
+        # Las etiquetas se formatean una vez por rango distinto, no por partición (-1: sólo nulos, -2: mezcla)
+        pairs = np.stack([lo[:, j], hi[:, j]], axis=1)
+        pairs[all_null] = -1
+        pairs[mixed] = -2
+        distinct, pair_codes = np.unique(pairs, axis=0, return_inverse=True)
+        formatted = {}
+        labels = [
+            "nan" if a == -1 else "*" if a == -2 else _format_range(a, b, values, numeric[j], formatted)
+            for a, b in distinct
+        ]
+        # Rangos distintos pueden redondear a la misma etiqueta: se fusionan
+        positions = {}
+        remap = np.array([positions.setdefault(label, len(positions)) for label in labels], dtype=np.int64)
+        partition_codes = remap[np.ravel(pair_codes)]
+        categories = list(positions)
+
+        labels_by_partition.append([categories[c] for c in partition_codes])
+        result_df[col] = pd.Series(
+            pd.Categorical.from_codes(partition_codes[local], categories=categories),
+            index=df.index, name=col
+        )
+        span = max(len(values) - 1, 1)
+        penalty += np.where(all_null | mixed, 1.0, (hi[:, j] - lo[:, j]) / span)
+
+    # Penalización de certeza normalizada (NCP): 0 = sin pérdida, 1 = todo generalizado
+    ncp = float(np.sum(penalty * sizes) / (len(df) * len(quasi_identifiers)))
+    recorded = np.argsort(-sizes, kind="stable")[:MAX_RECORDED_PARTITIONS]
+    summary = {
+        "algorithm": "mondrian",
+        "partition_count": int(len(sizes)),
+        "min_partition_size": int(sizes.min()),
+        "avg_partition_size": round(float(sizes.mean()), 2),
+        "ncp": round(ncp, 4),
+        "partitions": [
+            {
+                "size": int(sizes[p]),
+                "bounds": {col: labels_by_partition[j][p] for j, col in enumerate(quasi_identifiers)}
+            }
+            for p in recorded
+        ],
+        "partitions_truncated": bool(len(sizes) > MAX_RECORDED_PARTITIONS),
+    }
+    return result_df, summary
@@ -0,0 +1,293 @@
+"""
+Métricas de privacidad calculadas en una sola agrupación.
+
+Los cuasi-identificadores se factorizan una vez y se combinan en una clave
+entera por fila (id de clase de equivalencia). A partir de esa clave y de
+los códigos del atributo sensible se obtienen, con `bincount` y sin
+funciones Python por grupo:
+
+    - k-anonimato (tamaño mínimo de clase) e histograma de tamaños
+    - l-diversidad distinta y de entropía (exp(H) mínimo)
+    - t-closeness: distancia máxima entre la distribución sensible de una
+      clase y la global (variación total para categóricos, EMD ordenada
+      para numéricos)
+
+Para datasets muy grandes, `approximate_privacy_metrics` evita la
+agrupación exacta: cada fila se reduce a un hash de sus
+cuasi-identificadores (por bloques en paralelo si hay `ExecutionEngine`),
+el número de clases se estima con HyperLogLog y el tamaño de la clase de
+cada fila con Count-Min. Las cotas de error se devuelven en `error_bounds`.
+
+`class_table` resume un resultado en recuentos por (clase, valor sensible).
+Las métricas se calculan igual sobre esa tabla pasando los recuentos como
+`weights`, así que al añadir filas a un dataset basta con sumar la tabla de
+las filas nuevas a la guardada (`merge_class_tables`).
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sketches import CountMinSketch, HyperLogLog, hash_values64
+
+logger = logging.getLogger(__name__)
+
+# Límites inferiores de los tramos del histograma de tamaños de clase
+CLASS_SIZE_BUCKETS = [1, 2, 3, 4, 5, 10, 20, 50, 100]
+# Número máximo de tramos para la EMD ordenada de atributos numéricos
+ORDERED_EMD_BINS = 32
+# Celdas (clases × valores) por bloque al construir distribuciones densas
+DENSE_BLOCK_CELLS = 1 << 24
+# Filas a partir de las que las métricas de un trabajo se estiman con sketches
+DEFAULT_APPROXIMATE_ROWS = 5000000
+# Columna con el número de filas de cada entrada de `class_table`
+CLASS_COUNT_COLUMN = "_rows"
+
+
+def equivalence_class_ids(df: pd.DataFrame, quasi_identifiers: List[str]) -> Tuple[np.ndarray, int]:
+    """Id de clase de equivalencia de cada fila (0..clases-1) y número de clases."""
+    if not quasi_identifiers or len(df) == 0:
+        return np.zeros(len(df), dtype=np.int64), 1 if len(df) else 0
+
+    columns = []
+    cardinalities = []
+    for col in quasi_identifiers:
+        codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        columns.append(np.asarray(codes, dtype=np.int64))
+        cardinalities.append(max(len(uniques), 1))
+
+    if np.prod([float(c) for c in cardinalities]) < 2 ** 62:
+        # Clave de base mixta; se compacta después a ids consecutivos
+        key = np.zeros(len(df), dtype=np.int64)
+        for codes, cardinality in zip(columns, cardinalities):
+            key = key * cardinality + codes
+        _, class_ids = np.unique(key, return_inverse=True)
+    else:
+        _, class_ids = np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)
+    class_ids = np.ravel(class_ids)
+    return class_ids, int(class_ids.max()) + 1
+
+
+def class_size_histogram(sizes: np.ndarray) -> Dict[str, int]:
+    edges = CLASS_SIZE_BUCKETS + [np.inf]
+    counts = np.histogram(sizes, bins=edges)[0] if len(sizes) else np.zeros(len(CLASS_SIZE_BUCKETS), dtype=int)
+    histogram = {}
+    for low, high, count in zip(edges[:-1], edges[1:], counts):
+        if high == np.inf:
+            label = f"{low}+"
+        elif high - low == 1:
+            label = str(low)
+        else:
+            label = f"{low}-{int(high) - 1}"
+        histogram[label] = int(count)
+    return histogram
+
+
+def _pair_counts(keys: np.ndarray, weights: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Claves distintas y su frecuencia (la suma de `weights` si se dan)."""
+    if weights is None:
+        return np.unique(keys, return_counts=True)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return unique_keys, np.bincount(np.ravel(inverse), weights=weights, minlength=len(unique_keys))
+
+
+def _weighted_quantiles(values: np.ndarray, weights: np.ndarray, quantiles: np.ndarray) -> np.ndarray:
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    positions = np.searchsorted(cumulative, quantiles * cumulative[-1], side="left")
+    return values[order][np.clip(positions, 0, len(values) - 1)]
+
+
+def _categorical_t_closeness(class_ids, codes, class_count, value_count, weights=None) -> float:
+    """Variación total máxima usando sólo los pares (clase, valor) presentes."""
+    present = codes >= 0
+    present_weights = weights[present] if weights is not None else None
+    pair_keys, pair_counts = _pair_counts(class_ids[present] * value_count + codes[present], present_weights)
+    pair_class, pair_value = pair_keys // value_count, pair_keys % value_count
+
+    value_totals = np.bincount(codes[present], weights=present_weights, minlength=value_count)
+    global_p = value_totals / value_totals.sum()
+    class_totals = np.bincount(pair_class, weights=pair_counts, minlength=class_count)
+    p = pair_counts / class_totals[pair_class]
+    q = global_p[pair_value]
+    # Σ|p - q| = Σ_presentes (|p - q| - q) + 1, porque los valores ausentes aportan q
+    partial = np.bincount(pair_class, weights=np.abs(p - q) - q, minlength=class_count)
+    distances = 0.5 * (partial + 1)
+    return float(distances[class_totals > 0].max()) if (class_totals > 0).any() else 0.0
+
+
+def _ordered_t_closeness(class_ids, values: np.ndarray, class_count, weights=None) -> float:
+    """
+    EMD ordenada máxima; con muchos valores distintos se agrupan en tramos de
+    cuantiles (ponderados por `weights` si se dan).
+    """
+    present = ~np.isnan(values)
+    row_weights = weights[present] if weights is not None else None
+    uniques = np.unique(values[present])
+    if len(uniques) <= 1:
+        return 0.0
+    if len(uniques) <= ORDERED_EMD_BINS:
+        codes = np.searchsorted(uniques, values[present])
+        bins = len(uniques)
+    else:
+        quantiles = np.linspace(0, 1, ORDERED_EMD_BINS + 1)[1:-1]
+        if row_weights is None:
+            edges = np.unique(np.quantile(values[present], quantiles))
+        else:
+            edges = np.unique(_weighted_quantiles(values[present], row_weights, quantiles))
+        codes = np.searchsorted(edges, values[present], side="right")
+        bins = len(edges) + 1
+    row_classes = class_ids[present]
+
+    value_totals = np.bincount(codes, weights=row_weights, minlength=bins)
+    global_cdf = np.cumsum(value_totals) / value_totals.sum()
+    worst = 0.0
+    block = max(1, DENSE_BLOCK_CELLS // bins)
+    for start in range(0, class_count, block):
+        stop = min(start + block, class_count)
+        in_block = (row_classes >= start) & (row_classes < stop)
+        counts = np.bincount((row_classes[in_block] - start) * bins + codes[in_block],
+                             weights=row_weights[in_block] if row_weights is not None else None,
+                             minlength=(stop - start) * bins).reshape(stop - start, bins)
+        totals = counts.sum(axis=1)
+        nonempty = totals > 0
+        cdf = np.cumsum(counts[nonempty], axis=1) / totals[nonempty, None]
+        if len(cdf):
+            worst = max(worst, float((np.abs(cdf - global_cdf)[:, :-1].sum(axis=1) / (bins - 1)).max()))
+    return worst
+
+
+def compute_privacy_metrics(df: pd.DataFrame, quasi_identifiers: List[str],
+                            sensitive: Optional[str] = None, weights=None) -> Dict:
+    """
+    Métricas exactas de `df`. Con `weights` cada fila cuenta como ese número
+    de filas (p. ej. la columna de recuentos de `class_table`).
+    """
+    quasi_identifiers = [col for col in quasi_identifiers if col in df.columns]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+    class_ids, class_count = equivalence_class_ids(df, quasi_identifiers)
+    if not len(df):
+        sizes = np.zeros(0, dtype=np.int64)
+    elif weights is None:
+        sizes = np.bincount(class_ids, minlength=class_count)
+    else:
+        sizes = np.rint(np.bincount(class_ids, weights=weights, minlength=class_count)).astype(np.int64)
+
+    metrics = {
+        "k_anonymity": int(sizes.min()) if len(sizes) else 0,
+        "equivalence_classes": int(class_count),
+        "avg_class_size": round(float(sizes.mean()), 2) if len(sizes) else 0.0,
+        "class_size_histogram": class_size_histogram(sizes),
+    }
+    if not sensitive or sensitive not in df.columns or len(df) == 0:
+        return metrics
+
+    series = df[sensitive]
+    codes, uniques = pd.factorize(series)
+    codes = np.asarray(codes, dtype=np.int64)
+    value_count = max(len(uniques), 1)
+    present = codes >= 0
+
+    # Frecuencia de cada par (clase, valor sensible) en una sola pasada
+    pair_keys, pair_counts = _pair_counts(class_ids[present] * value_count + codes[present],
+                                          weights[present] if weights is not None else None)
+    pair_class = pair_keys // value_count
+    distinct = np.bincount(pair_class, minlength=class_count)
+    class_totals = np.bincount(pair_class, weights=pair_counts, minlength=class_count)
+    p = pair_counts / class_totals[pair_class]
+    entropy = np.bincount(pair_class, weights=-p * np.log(p), minlength=class_count)
+
+    metrics["l_diversity"] = float(distinct.min())
+    metrics["entropy_l_diversity"] = round(float(np.exp(entropy).min()), 4)
+
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        t = _ordered_t_closeness(class_ids, series.to_numpy(dtype=float, na_value=np.nan), class_count, weights)
+    else:
+        t = _categorical_t_closeness(class_ids, codes, class_count, value_count, weights)
+    metrics["t_closeness"] = round(t, 4)
+    return metrics
+
+
+def class_table(df: pd.DataFrame, quasi_identifiers: List[str], sensitive: Optional[str] = None) -> pd.DataFrame:
+    """Número de filas de cada combinación (cuasi-identificadores, valor sensible) de `df`."""
+    columns = [col for col in quasi_identifiers if col in df.columns]
+    if sensitive and sensitive in df.columns and sensitive not in columns:
+        columns.append(sensitive)
+    if not columns:
+        return pd.DataFrame({CLASS_COUNT_COLUMN: [len(df)] if len(df) else []}, dtype=np.int64)
+    # Como object: las tablas de distintos segmentos se combinan aunque sus categorías difieran
+    frame = df[columns].astype(object)
+    counts = frame.groupby(columns, dropna=False, sort=False).size()
+    return counts.rename(CLASS_COUNT_COLUMN).reset_index()
+
+
+def merge_class_tables(*tables: pd.DataFrame) -> pd.DataFrame:
+    """Suma tablas de `class_table` con las mismas columnas."""
+    tables = [table for table in tables if table is not None and len(table)]
+    if not tables:
+        return pd.DataFrame({CLASS_COUNT_COLUMN: []}, dtype=np.int64)
+    combined = pd.concat(tables, ignore_index=True)
+    columns = [col for col in combined.columns if col != CLASS_COUNT_COLUMN]
+    if not columns:
+        return pd.DataFrame({CLASS_COUNT_COLUMN: [int(combined[CLASS_COUNT_COLUMN].sum())]})
+    merged = combined.groupby(columns, dropna=False, sort=False)[CLASS_COUNT_COLUMN].sum()
+    return merged.reset_index()
+
+
+# --------------------------------------------------
+# MODO APROXIMADO
+# --------------------------------------------------
+def _row_hash_kernel(frame: pd.DataFrame) -> np.ndarray:
+    return hash_values64(frame)
+
+
+def approximate_privacy_metrics(df: pd.DataFrame, quasi_identifiers: List[str], engine=None) -> Dict:
+    """
+    k-anonimato, número de clases e histograma de tamaños estimados con
+    sketches. El tamaño de clase de Count-Min nunca se subestima: el mínimo
+    estimado es una cota superior del k real (`k_anonymity_upper_bound`) y
+    `k_anonymity` es el valor conservador, esa cota menos el error máximo
+    del sketch (con probabilidad 1 - delta). La l-diversidad y la
+    t-closeness necesitan la agrupación exacta y no se calculan.
+    """
+    quasi_identifiers = [col for col in quasi_identifiers if col in df.columns]
+    n = len(df)
+    frame = df[quasi_identifiers]
+    if engine is not None:
+        hashed = engine.map_frames(_row_hash_kernel, frame)
+    else:
+        hashed = [_row_hash_kernel(frame)] if n else []
+
+    # Los sketches son combinables: actualizarlos con todos los hashes equivale a combinar uno por bloque
+    hashes = np.concatenate(hashed) if hashed else np.zeros(0, dtype=np.uint64)
+    classes_sketch = HyperLogLog()
+    classes_sketch.update_hashes(hashes)
+    sizes_sketch = CountMinSketch.for_rows(n)
+    sizes_sketch.update_hashes(hashes)
+
+    row_sizes = sizes_sketch.query_hashes(hashes)
+    class_count = min(max(classes_sketch.estimate(), 1.0), float(n)) if n else 0.0
+    # Cada clase de tamaño s aporta s filas con peso 1/s: la suma por tramo estima las clases del tramo
+    edges = CLASS_SIZE_BUCKETS + [np.inf]
+    weighted = np.histogram(row_sizes, bins=edges, weights=1.0 / np.maximum(row_sizes, 1))[0] if n else []
+    histogram = dict(zip(class_size_histogram(np.zeros(0)).keys(), (int(round(w)) for w in weighted)))
+
+    k_upper = int(row_sizes.min()) if n else 0
+    k_lower = max(1, int(np.ceil(k_upper - sizes_sketch.error_bound))) if n else 0
+
+    return {
+        "k_anonymity": k_lower,
+        "k_anonymity_upper_bound": k_upper,
+        "equivalence_classes": int(round(class_count)),
+        "avg_class_size": round(n / class_count, 2) if class_count else 0.0,
+        "class_size_histogram": histogram or class_size_histogram(np.zeros(0)),
+        "discernibility": float(row_sizes.sum()),
+        "approximate": True,
+        "error_bounds": {
+            "equivalence_classes_relative": round(classes_sketch.relative_error, 4),
+            "class_size_overestimate": round(sizes_sketch.error_bound, 2),
+            "class_size_confidence": round(1 - sizes_sketch.delta, 4),
+        },
+    }
@@ -0,0 +1,226 @@
+"""
+Perfil de columnas calculado durante la subida.
+
+`ColumnProfiler` se actualiza con cada bloque que llega en la ingesta, junto
+con `SchemaTracker`, y acumula por columna el tipo, los nulos, el mínimo y
+el máximo, los valores distintos y las frecuencias más altas. El perfil se
+guarda en `datasets.column_stats` con las mismas claves que
+`information_loss.column_statistics`, así que las técnicas (sensibilidad de
+la privacidad diferencial, categorías más frecuentes) y las métricas de
+pérdida lo leen sin volver a recorrer el dataset original.
+
+Para no crecer sin límite, el recuento de valores se guarda completo sólo
+hasta `max_tracked_values` valores distintos. Por encima, los valores
+frecuentes se mantienen con Misra-Gries (`top_values_error` acota cuánto
+se subestima cada recuento), `distinct` pasa a ser una estimación
+HyperLogLog (`distinct_error`, con el sketch guardado para poder
+combinarlo) y la entropía no se informa (`distinct_exact = False`).
+
+Al añadir un segmento a un dataset, el perfil del segmento se combina con el
+guardado (`merge_profiles`) sin volver a leer las filas anteriores.
+"""
+import logging
+from collections import Counter
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from ingestion import _dtype_kind, _merge_kinds
+from information_loss import _entropy
+from sketches import FrequentItems, HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TRACKED_VALUES = 100000
+DEFAULT_TOP_K = 10
+NUMERIC_KINDS = {"integer", "float"}
+
+
+def _json_value(value):
+    """Valor serializable en JSON (escalares numpy, fechas, etc.)."""
+    if hasattr(value, "item"):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class _ColumnState:
+    __slots__ = ("kind", "count", "null_count", "min", "max", "items", "distinct_sketch")
+
+    def __init__(self, max_tracked_values: int):
+        self.kind: Optional[str] = None
+        self.count = 0
+        self.null_count = 0
+        self.min = None
+        self.max = None
+        self.items = FrequentItems(max_tracked_values)
+        self.distinct_sketch: Optional[HyperLogLog] = None
+
+
+class ColumnProfiler:
+    """Acumula el perfil de cada columna a medida que llegan los bloques."""
+
+    def __init__(self, max_tracked_values: int = DEFAULT_MAX_TRACKED_VALUES, top_k: int = DEFAULT_TOP_K,
+                 sketch_distinct: bool = False):
+        self.max_tracked_values = max_tracked_values
+        self.top_k = top_k
+        # Guardar siempre el HLL (perfiles de segmentos que se combinarán con otro perfil)
+        self.sketch_distinct = sketch_distinct
+        self.columns: List[str] = []
+        self._states: Dict[str, _ColumnState] = {}
+
+    def update(self, chunk: pd.DataFrame):
+        for col in chunk.columns:
+            name = str(col)
+            if name not in self._states:
+                self.columns.append(name)
+                self._states[name] = _ColumnState(self.max_tracked_values)
+                if self.sketch_distinct:
+                    self._states[name].distinct_sketch = HyperLogLog()
+            self._update_column(self._states[name], chunk[col])
+
+    def _update_column(self, state: _ColumnState, series: pd.Series):
+        nulls = int(series.isna().sum())
+        state.null_count += nulls
+        state.count += len(series) - nulls
+        state.kind = _merge_kinds(state.kind, _dtype_kind(series))
+
+        if state.kind in NUMERIC_KINDS and pd.api.types.is_numeric_dtype(series) and nulls < len(series):
+            low, high = float(series.min()), float(series.max())
+            state.min = low if state.min is None else min(state.min, low)
+            state.max = high if state.max is None else max(state.max, high)
+
+        counts = series.value_counts(dropna=True)
+        if state.distinct_sketch is None and len(state.items.counts) + len(counts) > self.max_tracked_values:
+            # A punto de superar el límite: el HLL arranca con todos los valores vistos (aún exactos)
+            state.distinct_sketch = HyperLogLog()
+            state.distinct_sketch.update(state.items.counts.index)
+        if state.distinct_sketch is not None:
+            state.distinct_sketch.update(counts.index)
+        state.items.update_counts(counts)
+
+    def column_profile(self, name: str) -> Dict:
+        state = self._states[name]
+        counts = state.items.counts
+        exact = state.items.exact
+        numeric = state.kind in NUMERIC_KINDS
+        entry = {
+            "kind": "numeric" if numeric else "categorical",
+            "type": state.kind or "string",
+            "count": int(state.count),
+            "null_count": int(state.null_count),
+            "distinct": int(len(counts)) if exact else int(round(state.distinct_sketch.estimate())),
+            "distinct_exact": exact,
+            "entropy": round(_entropy(counts.to_numpy(dtype=float)), 6) if exact else None,
+            "top_values": [
+                {"value": _json_value(value), "count": int(count)}
+                for value, count in state.items.top(self.top_k).items()
+            ],
+        }
+        if not exact:
+            entry["distinct_error"] = round(state.distinct_sketch.relative_error, 4)
+            entry["top_values_error"] = int(state.items.error)
+        if state.distinct_sketch is not None and (not exact or self.sketch_distinct):
+            entry["distinct_sketch"] = state.distinct_sketch.to_dict()
+        if numeric and state.min is not None:
+            entry["min"] = state.min
+            entry["max"] = state.max
+        return entry
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {name: self.column_profile(name) for name in self.columns}
+
+
+def profile_dataframe(df: pd.DataFrame, max_tracked_values: int = DEFAULT_MAX_TRACKED_VALUES,
+                      top_k: int = DEFAULT_TOP_K) -> Dict[str, Dict]:
+    """Perfil de un DataFrame ya cargado (datasets subidos antes de existir el perfil)."""
+    profiler = ColumnProfiler(max_tracked_values, top_k)
+    profiler.update(df)
+    return profiler.to_dict()
+
+
+def _fully_listed(profile: Dict) -> bool:
+    """El perfil enumera todos los valores de la columna con su recuento exacto."""
+    return bool(profile.get("distinct_exact")) and profile.get("distinct", 0) <= len(profile.get("top_values") or [])
+
+
+def _merge_column_profiles(base: Dict, delta: Dict, top_k: int) -> Dict:
+    kind = _merge_kinds(base.get("type"), delta.get("type"))
+    counts = Counter()
+    for entry in (base.get("top_values") or []) + (delta.get("top_values") or []):
+        counts[entry["value"]] += entry["count"]
+
+    merged = {
+        "kind": "numeric" if kind in NUMERIC_KINDS else "categorical",
+        "type": kind or "string",
+        "count": base.get("count", 0) + delta.get("count", 0),
+        "null_count": base.get("null_count", 0) + delta.get("null_count", 0),
+        "top_values": [{"value": value, "count": int(count)} for value, count in counts.most_common(top_k)],
+    }
+    if _fully_listed(base) and _fully_listed(delta):
+        merged.update(distinct=len(counts), distinct_exact=True,
+                      entropy=round(_entropy(pd.Series(counts).to_numpy(dtype=float)), 6))
+    else:
+        # Un valor que falta en una lista puede tener hasta el menor recuento listado en ella
+        error = 0
+        for profile in (base, delta):
+            error += profile.get("top_values_error", 0)
+            if not _fully_listed(profile) and profile.get("top_values"):
+                error += min(entry["count"] for entry in profile["top_values"])
+        distinct = max(base.get("distinct", 0), delta.get("distinct", 0))
+        sketches = [HyperLogLog.from_dict(p["distinct_sketch"]) for p in (base, delta) if p.get("distinct_sketch")]
+        if len(sketches) == 2:
+            sketch = sketches[0].merge(sketches[1])
+            distinct = max(distinct, int(round(sketch.estimate())))
+            merged["distinct_sketch"] = sketch.to_dict()
+            merged["distinct_error"] = round(sketch.relative_error, 4)
+        merged.update(distinct=distinct, distinct_exact=False, entropy=None, top_values_error=int(error))
+
+    if merged["kind"] == "numeric":
+        lows = [p["min"] for p in (base, delta) if p.get("min") is not None]
+        highs = [p["max"] for p in (base, delta) if p.get("max") is not None]
+        if lows:
+            merged["min"], merged["max"] = min(lows), max(highs)
+    return merged
+
+
+def merge_profiles(base: Dict[str, Dict], delta: Dict[str, Dict], top_k: int = DEFAULT_TOP_K) -> Dict[str, Dict]:
+    """
+    Perfil del dataset tras añadir las filas perfiladas en `delta`. Recuentos,
+    nulos, mínimo y máximo son exactos; los valores distintos sólo siguen
+    siendo exactos si ambos perfiles enumeran todos sus valores (si no, se
+    estiman con los HLL y `distinct_exact = False` hace que el siguiente
+    trabajo exacto los recalcule).
+    """
+    merged = {}
+    for name in list(base) + [name for name in delta if name not in base]:
+        if name in base and name in delta:
+            merged[name] = _merge_column_profiles(base[name], delta[name], top_k)
+        else:
+            merged[name] = base.get(name) or delta[name]
+    return merged
+
+
+# --------------------------------------------------
+# CONSULTAS SOBRE EL PERFIL
+# --------------------------------------------------
+def numeric_range(profile: Optional[Dict]) -> Optional[float]:
+    """max - min de una columna numérica del perfil; None si no se conoce."""
+    if not profile or profile.get("kind") != "numeric" or profile.get("min") is None:
+        return None
+    return float(profile["max"]) - float(profile["min"])
+
+
+def top_values(profile: Optional[Dict], levels: int) -> Optional[List]:
+    """
+    Los `levels` valores más frecuentes según el perfil, o None si el perfil
+    no guarda suficientes (hay que calcularlos sobre los datos).
+    """
+    # Las fechas se guardan como texto y ya no coincidirían con los valores de la columna
+    if not profile or profile.get("top_values") is None or profile.get("type") == "datetime":
+        return None
+    values = [entry["value"] for entry in profile["top_values"]]
+    if len(values) < levels and len(values) < profile.get("distinct", 0):
+        return None
+    return values[:levels]
@@ -0,0 +1,227 @@
+"""
+Bóveda persistente de pseudónimos.
+
+Guarda la correspondencia `hash del valor → pseudónimo` para que un mismo
+valor reciba el mismo pseudónimo en todos los datasets sin recalcularlo en
+cada `/api/process`. El valor real nunca se almacena: la clave de búsqueda es
+un HMAC-SHA256 del valor con la clave secreta de pseudonimización.
+
+Delante del almacén (tabla `pseudonym_vault` en Postgres o un archivo SQLite
+local) hay una caché LRU acotada en memoria; los valores que no están en la
+caché se resuelven con una sola consulta por lote y los nuevos se insertan
+también por lotes.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from techniques import (
+    DEFAULT_PSEUDONYM_ALGORITHM,
+    DEFAULT_PSEUDONYM_DIGEST_LENGTH,
+    gather_codes,
+    hash_values,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VAULT_CACHE_SIZE = 100000
+DEFAULT_VAULT_SQLITE_PATH = "backend/storage/pseudonyms.db"
+VAULT_BATCH_SIZE = 10000
+
+
+def _batches(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# --------------------------------------------------
+# ALMACENES
+# --------------------------------------------------
+class VaultStore:
+    name = "base"
+
+    def lookup(self, namespace: str, digests: List[str]) -> Dict[str, str]:
+        """Devuelve los pseudónimos ya guardados para `digests`."""
+        raise NotImplementedError
+
+    def insert(self, namespace: str, entries: Dict[str, str]):
+        """Guarda `digest → pseudónimo`; los que ya existen se conservan."""
+        raise NotImplementedError
+
+
+class PostgresVaultStore(VaultStore):
+    name = "postgres"
+
+    def __init__(self, db):
+        self.db = db
+
+    def lookup(self, namespace, digests):
+        found = {}
+        for batch in _batches(digests, VAULT_BATCH_SIZE):
+            rows = self.db.execute_query(
+                """
+                SELECT value_digest, pseudonym FROM pseudonym_vault
+                WHERE namespace = %s AND value_digest = ANY(%s)
+                """,
+                (namespace, batch),
+                fetch=True
+            )
+            found.update({row["value_digest"]: row["pseudonym"] for row in rows})
+        return found
+
+    def insert(self, namespace, entries):
+        items = list(entries.items())
+        for batch in _batches(items, VAULT_BATCH_SIZE):
+            self.db.execute_query(
+                """
+                INSERT INTO pseudonym_vault (namespace, value_digest, pseudonym)
+                SELECT %s, t.value_digest, t.pseudonym
+                FROM unnest(%s::text[], %s::text[]) AS t(value_digest, pseudonym)
+                ON CONFLICT (namespace, value_digest) DO NOTHING
+                """,
+                (namespace, [d for d, _ in batch], [p for _, p in batch])
+            )
+
+
+class SQLiteVaultStore(VaultStore):
+    name = "sqlite"
+    # SQLite limita el número de parámetros por sentencia
+    _lookup_batch = 900
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pseudonym_vault (
+                namespace TEXT NOT NULL,
+                value_digest TEXT NOT NULL,
+                pseudonym TEXT NOT NULL,
+                PRIMARY KEY (namespace, value_digest)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def lookup(self, namespace, digests):
+        found = {}
+        with self._lock:
+            for batch in _batches(digests, self._lookup_batch):
+                placeholders = ", ".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT value_digest, pseudonym FROM pseudonym_vault "
+                    f"WHERE namespace = ? AND value_digest IN ({placeholders})",
+                    (namespace, *batch)
+                )
+                found.update(dict(rows.fetchall()))
+        return found
+
+    def insert(self, namespace, entries):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO pseudonym_vault (namespace, value_digest, pseudonym) VALUES (?, ?, ?)",
+                [(namespace, digest, pseudonym) for digest, pseudonym in entries.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+# --------------------------------------------------
+# BÓVEDA
+# --------------------------------------------------
+class PseudonymVault:
+    def __init__(self, store: VaultStore, key=None, cache_size: int = DEFAULT_VAULT_CACHE_SIZE):
+        self.store = store
+        self.key = key
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def namespace(prefix: str, algorithm: str, digest_length: int) -> str:
+        # Cada combinación de parámetros tiene su propio espacio de pseudónimos
+        return f"{prefix}:{algorithm}:{digest_length}"
+
+    def _cache_get(self, namespace: str, values: List[str]) -> List[Optional[str]]:
+        with self._lock:
+            result = []
+            for value in values:
+                pseudonym = self._cache.get((namespace, value))
+                if pseudonym is not None:
+                    self._cache.move_to_end((namespace, value))
+                result.append(pseudonym)
+            return result
+
+    def _cache_put(self, namespace: str, pairs):
+        with self._lock:
+            for value, pseudonym in pairs:
+                self._cache[(namespace, value)] = pseudonym
+                self._cache.move_to_end((namespace, value))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def resolve(self, values: List[str], prefix: str = "USER", algorithm: str = DEFAULT_PSEUDONYM_ALGORITHM,
+                digest_length: int = DEFAULT_PSEUDONYM_DIGEST_LENGTH) -> List[str]:
+        """Pseudónimos de `values` (textos distintos), consultando caché, almacén y, por último, el hash."""
+        namespace = self.namespace(prefix, algorithm, digest_length)
+        pseudonyms = self._cache_get(namespace, values)
+        missing = [i for i, pseudonym in enumerate(pseudonyms) if pseudonym is None]
+        self.hits += len(values) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return pseudonyms
+
+        missing_values = [values[i] for i in missing]
+        digests = hash_values(missing_values, "hmac-sha256", self.key, 64)
+        found = self.store.lookup(namespace, digests)
+
+        new_positions = [j for j, digest in enumerate(digests) if digest not in found]
+        if new_positions:
+            generated = hash_values([missing_values[j] for j in new_positions], algorithm, self.key, digest_length)
+            new_entries = {digests[j]: f"{prefix}_{g}" for j, g in zip(new_positions, generated)}
+            self.store.insert(namespace, new_entries)
+            found.update(new_entries)
+
+        resolved = [found[digest] for digest in digests]
+        for i, pseudonym in zip(missing, resolved):
+            pseudonyms[i] = pseudonym
+        self._cache_put(namespace, zip(missing_values, resolved))
+        return pseudonyms
+
+    def pseudonymize(self, series: pd.Series, prefix: str = "USER", algorithm: str = DEFAULT_PSEUDONYM_ALGORITHM,
+                     digest_length: int = DEFAULT_PSEUDONYM_DIGEST_LENGTH) -> pd.Series:
+        codes, uniques = pd.factorize(series)
+        labels = self.resolve([str(value) for value in uniques], prefix, algorithm, digest_length)
+        return gather_codes(series, codes, labels)
+
+
+def build_vault(db, config: Dict = None, key=None) -> Optional[PseudonymVault]:
+    """Crea la bóveda según la sección `pseudonym_vault` de credentials.json (None si está desactivada)."""
+    config = config or {}
+    if not config.get("enabled", False):
+        return None
+
+    backend = config.get("backend", PostgresVaultStore.name)
+    if backend == SQLiteVaultStore.name:
+        path = config.get("path", DEFAULT_VAULT_SQLITE_PATH)
+        if not os.path.isabs(path):
+            # Rutas relativas a la raíz del proyecto, igual que credentials.json
+            path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+        store = SQLiteVaultStore(path)
+    else:
+        store = PostgresVaultStore(db)
+
+    cache_size = config.get("cache_size", DEFAULT_VAULT_CACHE_SIZE)
+    logger.info(f"Pseudonym vault: {store.name} store, LRU cache of {cache_size} values")
+    return PseudonymVault(store, key=key, cache_size=cache_size)
@@ -0,0 +1,103 @@
+"""
+Flujos aleatorios reproducibles para las técnicas aleatorias.
+
+Cada trabajo tiene una semilla (`global_params.seed` o una nueva que se
+registra en los detalles de la técnica). De ella sale un flujo
+independiente por columna y propósito ("suppression", "laplace",
+"gaussian", "geometric"), derivado con `SeedSequence`, y cada flujo es un
+generador Philox basado en contador: el número aleatorio de la fila `i` es
+siempre el `i`-ésimo del flujo, y cualquier bloque de filas puede generarse
+saltando directamente a su posición (`advance`). Así el resultado no
+depende de cómo se repartan las filas en bloques ni del número de procesos,
+y no se usa el estado global de `np.random`.
+
+El ruido de la privacidad diferencial no usa la semilla registrada: cada
+ejecución crea `RandomStreams()` con una semilla nueva que no se guarda, de
+modo que el ruido no puede regenerarse a partir del resultado publicado.
+"""
+import logging
+import math
+import zlib
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RNG_ALGORITHM = "philox"
+# Philox genera bloques de 4 enteros de 64 bits por valor del contador
+_PHILOX_BLOCK = 4
+
+
+def new_seed() -> int:
+    """Semilla nueva a partir de la entropía del sistema."""
+    return int(np.random.SeedSequence().generate_state(1, dtype=np.uint64)[0] >> np.uint64(1))
+
+
+def _label_key(label: str) -> int:
+    return zlib.crc32(str(label).encode("utf-8"))
+
+
+class RandomStreams:
+    """Semilla de un trabajo y los flujos por columna que se derivan de ella."""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = int(seed) if seed is not None else new_seed()
+
+    def sequence(self, column: str, purpose: str) -> np.random.SeedSequence:
+        return np.random.SeedSequence(self.seed, spawn_key=(_label_key(column), _label_key(purpose)))
+
+    def generator(self, column: str, purpose: str, offset: int = 0) -> np.random.Generator:
+        """Generador del flujo (columna, propósito) colocado en el valor número `offset`."""
+        key = self.sequence(column, purpose).generate_state(2, dtype=np.uint64)
+        bit_generator = np.random.Philox(key=key)
+        blocks, remainder = divmod(int(offset), _PHILOX_BLOCK)
+        if blocks:
+            bit_generator.advance(blocks)
+        if remainder:
+            bit_generator.random_raw(remainder)
+        return np.random.Generator(bit_generator)
+
+    def uniform(self, column: str, purpose: str, size: int, offset: int = 0) -> np.ndarray:
+        """
+        Uniformes en el intervalo abierto (0, 1) para las filas
+        [offset, offset + size): un entero de 64 bits por fila.
+        """
+        raw = self.generator(column, purpose, offset).bit_generator.random_raw(size)
+        return ((raw >> np.uint64(11)).astype(np.float64) + 0.5) * 2.0 ** -53
+
+    def laplace(self, column: str, size: int, scale: float, offset: int = 0) -> np.ndarray:
+        """Ruido de Laplace(0, scale) por inversión de la función de distribución."""
+        centered = self.uniform(column, "laplace", size, offset) - 0.5
+        return -scale * np.sign(centered) * np.log1p(-2.0 * np.abs(centered))
+
+    def normal(self, column: str, size: int, scale: float, offset: int = 0) -> np.ndarray:
+        """Ruido N(0, scale²) por Box-Muller: dos uniformes por fila."""
+        u = self.uniform(column, "gaussian", 2 * size, 2 * offset).reshape(size, 2)
+        return scale * np.sqrt(-2.0 * np.log(u[:, 0])) * np.cos(2.0 * np.pi * u[:, 1])
+
+    def two_sided_geometric(self, column: str, size: int, alpha: float, offset: int = 0) -> np.ndarray:
+        """
+        Ruido entero con P(k) ∝ alpha^|k|: diferencia de dos geométricas
+        obtenidas por inversión, dos uniformes por fila.
+        """
+        u = self.uniform(column, "geometric", 2 * size, 2 * offset).reshape(size, 2)
+        if alpha <= 0:
+            return np.zeros(size)
+        geometric = np.floor(np.log(u) / math.log(alpha))
+        return geometric[:, 0] - geometric[:, 1]
+
+    def suppression_mask(self, column: str, size: int, threshold: float, offset: int = 0) -> np.ndarray:
+        """
+        Máscara con exactamente `int(size * threshold)` filas elegidas al azar
+        (las de menor uniforme). Con `offset` se usan los uniformes de las filas
+        [offset, offset + size), p. ej. para un segmento añadido al dataset.
+        """
+        count = min(max(int(size * threshold), 0), size)
+        mask = np.zeros(size, dtype=bool)
+        if count:
+            mask[np.argpartition(self.uniform(column, "suppression", size, offset), count - 1)[:count]] = True
+        return mask
+
+    def to_dict(self) -> Dict:
+        return {"seed": self.seed, "algorithm": RNG_ALGORITHM}
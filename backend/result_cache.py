@@ -0,0 +1,216 @@
+"""
+Caché de resultados de `/api/process` direccionada por contenido.
+
+La clave de una ejecución es el hash de
+
+    (contenido del dataset, configuración normalizada, semilla, ajustes)
+
+El contenido del dataset se resume al subirlo (`ContentHasher`, un hash por
+fila encadenado en SHA-256, independiente del reparto en bloques); al añadir
+un segmento se encadena con el hash del segmento (`chain_hash`). La
+configuración se normaliza antes de resumirla: `column_mappings` se ordena
+por columna, `techniques` conserva su orden (se aplican en secuencia) y
+`global_params` se serializa con las claves ordenadas y sin la semilla, que
+entra aparte. Los ajustes que cambian el resultado sin estar en la
+configuración (algoritmo y clave de pseudonimización) entran por su huella.
+
+Si la clave ya está en `result_cache` y su resultado está completado, se
+devuelve ese resultado en lugar de recalcularlo y guardar otra copia de
+`anonymized_data`. Las entradas se invalidan explícitamente (por dataset o
+todas las del usuario) y al borrar el dataset o el resultado (ON DELETE
+CASCADE). El tamaño está acotado por número de entradas y por bytes de los
+resultados: al superarlo se expulsan las usadas hace más tiempo (LRU).
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Cambia cuando cambia la forma de calcular los resultados: invalida las claves antiguas
+CACHE_VERSION = 1
+DEFAULT_CACHE_MAX_ENTRIES = 1000
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+
+# --------------------------------------------------
+# HASHES
+# --------------------------------------------------
+class ContentHasher:
+    """SHA-256 del contenido de un dataset, alimentado bloque a bloque."""
+
+    def __init__(self):
+        self._digest = hashlib.sha256()
+        self._columns = None
+
+    def update(self, chunk: pd.DataFrame):
+        columns = [str(col) for col in chunk.columns]
+        # Los nombres de columna entran al principio y cada vez que cambian
+        if columns != self._columns:
+            self._columns = columns
+            self._digest.update(json.dumps(columns).encode("utf-8"))
+        # Un hash de 64 bits por fila: el resultado no depende de dónde se corten los bloques
+        self._digest.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def content_hash(chunks: Iterable[pd.DataFrame]) -> str:
+    """Hash del contenido de un dataset ya guardado (datasets subidos antes de existir la caché)."""
+    hasher = ContentHasher()
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def chain_hash(previous: str, segment: str) -> str:
+    """
+    Hash del contenido tras añadir un segmento: encadena el hash anterior con
+    el del segmento, sin volver a leer las filas que ya había.
+    """
+    return hashlib.sha256(f"{previous}:{segment}".encode("utf-8")).hexdigest()
+
+
+def _parsed(value, default):
+    if isinstance(value, str):
+        return json.loads(value)
+    return value if value is not None else default
+
+
+def normalize_config(config: Dict) -> Dict:
+    """Forma canónica de la configuración; la semilla se excluye de `global_params`."""
+    column_mappings = _parsed(config.get("column_mappings"), [])
+    techniques = _parsed(config.get("techniques"), [])
+    global_params = dict(_parsed(config.get("global_params"), {}))
+    global_params.pop("seed", None)
+    return {
+        "column_mappings": sorted(
+            ({"column": m["column"], "type": m["type"]} for m in column_mappings),
+            key=lambda m: m["column"]
+        ),
+        "techniques": [
+            {"column": t["column"], "technique": t["technique"], "params": t.get("params") or {}}
+            for t in techniques
+        ],
+        "global_params": global_params,
+    }
+
+
+def _sha256_json(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def config_hash(config: Dict) -> str:
+    return _sha256_json(normalize_config(config))
+
+
+def settings_fingerprint(settings: Dict) -> str:
+    """Huella de los ajustes del servidor que afectan al resultado (las claves no se guardan en claro)."""
+    return _sha256_json(settings)
+
+
+def cache_key(dataset_hash: str, configuration_hash: str, seed: Optional[int], settings: str = "") -> str:
+    return _sha256_json({
+        "version": CACHE_VERSION,
+        "dataset": dataset_hash,
+        "config": configuration_hash,
+        "seed": seed,
+        "settings": settings,
+    })
+
+
+# --------------------------------------------------
+# ALMACÉN
+# --------------------------------------------------
+class ResultCache:
+    def __init__(self, db, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 enabled: bool = True):
+        self.db = db
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+    def lookup(self, user_id: str, key: str, status: str) -> Optional[str]:
+        """Id del resultado guardado para `key` si está en `status`; cuenta el acierto."""
+        if not self.enabled:
+            return None
+        row = self.db.execute_one(
+            """
+            UPDATE result_cache c SET hits = c.hits + 1, last_used_at = CURRENT_TIMESTAMP
+            FROM anonymization_results r
+            WHERE c.user_id = %s AND c.cache_key = %s AND r.id = c.result_id AND r.status = %s
+            RETURNING c.result_id
+            """,
+            (user_id, key, status)
+        )
+        return str(row["result_id"]) if row else None
+
+    def store(self, user_id: str, key: str, dataset_id: str, result_id: str, configuration_hash: str,
+              seed: Optional[int], size_bytes: int):
+        if not self.enabled:
+            return
+        self.db.execute_query(
+            """
+            INSERT INTO result_cache (user_id, cache_key, dataset_id, result_id, config_hash, seed, size_bytes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (user_id, cache_key) DO UPDATE SET
+                result_id = EXCLUDED.result_id,
+                size_bytes = EXCLUDED.size_bytes,
+                last_used_at = CURRENT_TIMESTAMP
+            """,
+            (user_id, key, dataset_id, result_id, configuration_hash, seed, size_bytes)
+        )
+        self.evict()
+
+    def evict(self) -> int:
+        """Expulsa las entradas menos usadas recientemente hasta respetar los límites."""
+        rows = self.db.execute_query(
+            """
+            DELETE FROM result_cache WHERE (user_id, cache_key) IN (
+                SELECT user_id, cache_key FROM (
+                    SELECT user_id, cache_key,
+                           ROW_NUMBER() OVER (ORDER BY last_used_at DESC) AS position,
+                           SUM(size_bytes) OVER (ORDER BY last_used_at DESC ROWS UNBOUNDED PRECEDING) AS total_bytes
+                    FROM result_cache
+                ) ranked
+                WHERE position > %s OR total_bytes > %s
+            )
+            RETURNING cache_key
+            """,
+            (self.max_entries, self.max_bytes),
+            fetch=True
+        )
+        if rows:
+            logger.info(f"Result cache: evicted {len(rows)} entries")
+        return len(rows)
+
+    def invalidate(self, user_id: str, dataset_id: Optional[str] = None) -> int:
+        """Borra las entradas del usuario (o sólo las de un dataset); los resultados se conservan."""
+        query = "DELETE FROM result_cache WHERE user_id = %s"
+        params = [user_id]
+        if dataset_id is not None:
+            query += " AND dataset_id = %s"
+            params.append(dataset_id)
+        rows = self.db.execute_query(query + " RETURNING cache_key", tuple(params), fetch=True)
+        return len(rows)
+
+    def stats(self, user_id: str) -> Dict:
+        row = self.db.execute_one(
+            """
+            SELECT COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS size_bytes, COALESCE(SUM(hits), 0) AS hits
+            FROM result_cache WHERE user_id = %s
+            """,
+            (user_id,)
+        )
+        return {
+            "enabled": self.enabled,
+            "entries": int(row["entries"]),
+            "size_bytes": int(row["size_bytes"]),
+            "hits": int(row["hits"]),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,160 @@
+"""
+Riesgo de reidentificación para un conjunto de cuasi-identificadores.
+
+Todo sale de un único recuento por clase de equivalencia: las columnas se
+factorizan y combinan en una clave entera (`equivalence_class_ids`) y
+`bincount` da el tamaño `f` de la clase de cada fila. A partir de ahí:
+
+    - Fiscal (prosecutor): el atacante sabe que la persona está en la
+      muestra. Riesgo de una fila = 1 / f; se informa el máximo y la media.
+    - Periodista (journalist): el atacante parte de la población. Con una
+      fracción de muestreo `pi`, el tamaño de la clase en la población se
+      estima como F = f / pi y el riesgo máximo es 1 / min(F).
+    - Comercializador (marketer): proporción esperada de filas reidentificadas
+      al intentar enlazarlas todas, (1 / n) · Σ f / F.
+    - Únicos muestrales: proporción de filas en clases de tamaño 1.
+
+`RiskAccumulator` calcula lo mismo sobre un resultado leído por bloques.
+"""
+import logging
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ingestion import chunk_to_records
+from privacy_metrics import class_size_histogram, equivalence_class_ids
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RISK_THRESHOLD = 0.2
+DEFAULT_TOP_RECORDS = 20
+MAX_TOP_RECORDS = 1000
+
+
+def compute_risk(df: pd.DataFrame, quasi_identifiers: List[str], sampling_fraction: float = 1.0,
+                 threshold: float = DEFAULT_RISK_THRESHOLD, top: int = DEFAULT_TOP_RECORDS) -> Dict:
+    """
+    Métricas de riesgo de `df` para `quasi_identifiers` y las `top` filas de
+    mayor riesgo (posición en `df`, valores de los cuasi-identificadores y
+    tamaño de su clase).
+    """
+    _check_sampling_fraction(sampling_fraction)
+    missing = [col for col in quasi_identifiers if col not in df.columns]
+    if missing:
+        raise ValueError(f"Columnas no encontradas: {', '.join(missing)}")
+
+    n = len(df)
+    if not quasi_identifiers or n == 0:
+        return {"quasi_identifiers": quasi_identifiers, "rows": n, "equivalence_classes": 0, "top_records": []}
+
+    class_ids, class_count = equivalence_class_ids(df, quasi_identifiers)
+    return _risk_measures(quasi_identifiers, class_ids, np.bincount(class_ids, minlength=class_count),
+                          lambda rows: chunk_to_records(df[quasi_identifiers].iloc[rows]),
+                          sampling_fraction, threshold, top)
+
+
+class RiskAccumulator:
+    """
+    Riesgo de un resultado que llega por bloques de filas: los tamaños de
+    clase se acumulan bloque a bloque y sólo se conserva, además, el id de
+    clase de cada fila (un entero) y los valores de cada clase, no las filas.
+    """
+
+    def __init__(self, quasi_identifiers: List[str]):
+        self.quasi_identifiers = quasi_identifiers
+        self.class_index: Dict[tuple, int] = {}
+        self.class_values: List[Dict] = []
+        self.counts: List[int] = []
+        self.row_classes: List[np.ndarray] = []
+
+    def update(self, chunk: pd.DataFrame):
+        missing = [col for col in self.quasi_identifiers if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Columnas no encontradas: {', '.join(missing)}")
+        if len(chunk) == 0:
+            return
+        local_ids, local_count = equivalence_class_ids(chunk, self.quasi_identifiers)
+        # Una fila de cada clase del bloque da sus valores y su id global
+        first_rows = np.unique(local_ids, return_index=True)[1]
+        mapping = np.empty(local_count, dtype=np.int64)
+        representatives = chunk_to_records(chunk[self.quasi_identifiers].iloc[first_rows])
+        for local, values in zip(local_ids[first_rows], representatives):
+            key = tuple(values.values())
+            if key not in self.class_index:
+                self.class_index[key] = len(self.class_values)
+                self.class_values.append(values)
+                self.counts.append(0)
+            mapping[local] = self.class_index[key]
+        class_ids = mapping[local_ids]
+        for class_id, count in zip(*np.unique(class_ids, return_counts=True)):
+            self.counts[class_id] += int(count)
+        self.row_classes.append(class_ids)
+
+    def result(self, sampling_fraction: float = 1.0, threshold: float = DEFAULT_RISK_THRESHOLD,
+               top: int = DEFAULT_TOP_RECORDS) -> Dict:
+        """Mismas métricas que `compute_risk` sobre todas las filas acumuladas."""
+        _check_sampling_fraction(sampling_fraction)
+        class_ids = np.concatenate(self.row_classes) if self.row_classes else np.zeros(0, dtype=np.int64)
+        if not self.quasi_identifiers or len(class_ids) == 0:
+            return {"quasi_identifiers": self.quasi_identifiers, "rows": len(class_ids), "equivalence_classes": 0,
+                    "top_records": []}
+        return _risk_measures(self.quasi_identifiers, class_ids, np.asarray(self.counts, dtype=np.int64),
+                              lambda rows: [self.class_values[class_ids[row]] for row in rows],
+                              sampling_fraction, threshold, top)
+
+
+def _check_sampling_fraction(sampling_fraction: float):
+    if not 0 < sampling_fraction <= 1:
+        raise ValueError(f"La fracción de muestreo debe estar en (0, 1]: {sampling_fraction}")
+
+
+def _risk_measures(quasi_identifiers: List[str], class_ids: np.ndarray, sizes: np.ndarray,
+                   row_values: Callable[[np.ndarray], List[Dict]], sampling_fraction: float, threshold: float,
+                   top: int) -> Dict:
+    """Métricas a partir del id de clase de cada fila y del tamaño de cada clase."""
+    n = len(class_ids)
+    class_count = len(sizes)
+    row_sizes = sizes[class_ids]
+    row_risk = 1.0 / row_sizes
+    # Tamaño estimado de cada clase en la población (nunca menor que en la muestra)
+    population_sizes = np.maximum(sizes / sampling_fraction, sizes)
+
+    top = max(0, min(int(top), MAX_TOP_RECORDS, n))
+    if top:
+        # Sólo se ordenan las `top` filas de clases más pequeñas
+        candidates = np.argpartition(row_sizes, top - 1)[:top]
+        candidates = candidates[np.lexsort((candidates, row_sizes[candidates]))]
+    else:
+        candidates = np.zeros(0, dtype=np.int64)
+    records = row_values(candidates)
+    top_records = [
+        {"row": int(row), "class_size": int(row_sizes[row]), "risk": round(float(row_risk[row]), 4), "values": values}
+        for row, values in zip(candidates, records)
+    ]
+
+    return {
+        "quasi_identifiers": quasi_identifiers,
+        "rows": n,
+        "equivalence_classes": int(class_count),
+        "k_anonymity": int(sizes.min()),
+        "sampling_fraction": sampling_fraction,
+        "prosecutor": {
+            "max_risk": round(float(row_risk.max()), 4),
+            "avg_risk": round(class_count / n, 4),
+            "records_at_risk": int((row_risk > threshold).sum()),
+            "records_at_risk_share": round(float((row_risk > threshold).mean()), 4),
+        },
+        "journalist": {
+            "max_risk": round(float(1.0 / population_sizes.min()), 4),
+            "records_at_risk": int(sizes[1.0 / population_sizes > threshold].sum()),
+        },
+        "marketer": {
+            "risk": round(float((sizes / population_sizes).sum() / n), 4),
+        },
+        "sample_uniques": int((sizes == 1).sum()),
+        "sample_unique_share": round(float((sizes == 1).sum() / n), 4),
+        "threshold": threshold,
+        "class_size_histogram": class_size_histogram(sizes),
+        "top_records": top_records,
+    }
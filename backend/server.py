@@ -0,0 +1,22 @@
+"""
+Arranque del servidor: `python server.py`.
+
+La aplicación se carga como módulo (`main:app`) y no como `__main__`. El
+motor de ejecución crea sus procesos con "spawn", que vuelve a ejecutar el
+script principal en cada proceso hijo: si ese script fuera `main.py`, cada
+proceso abriría otra vez la base de datos, la cola de trabajos y el resto
+de servicios. Este script sólo arranca uvicorn, y los procesos hijos
+importan únicamente los módulos de las técnicas (`execution`).
+Equivale a `uvicorn main:app --host ... --port ...`.
+"""
+import uvicorn
+
+from database import load_credentials
+
+if __name__ == "__main__":
+    backend_config = load_credentials()['backend']
+    uvicorn.run(
+        "main:app",
+        host=backend_config.get('host', '0.0.0.0'),
+        port=backend_config.get('port', 8000)
+    )
@@ -0,0 +1,244 @@
+"""
+Sketches aproximados y combinables para datasets muy grandes.
+
+    - HyperLogLog: número de valores distintos con error relativo típico
+      1.04 / sqrt(2^precision) y memoria fija (2^precision bytes).
+    - Count-Min: frecuencia de cualquier clave (p. ej. una combinación de
+      cuasi-identificadores). Nunca subestima; con probabilidad
+      1 - e^-depth sobreestima como mucho (e / width) * total.
+    - FrequentItems (Misra-Gries, equivalente a space-saving): los valores
+      más frecuentes guardando como mucho `capacity` contadores; cada
+      recuento se subestima como mucho total / (capacity + 1).
+
+Todos se construyen bloque a bloque con operaciones vectorizadas sobre
+hashes de 64 bits (`hash_values64`) y se combinan con `merge`, de modo que
+sirven tanto para la ingesta por bloques como para los bloques que procesa
+en paralelo el `ExecutionEngine`: el resultado no depende del reparto.
+"""
+import base64
+import logging
+import math
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HLL_PRECISION = 14
+DEFAULT_CMS_DEPTH = 4
+DEFAULT_CMS_WIDTH = 1 << 20
+MAX_CMS_WIDTH = 1 << 22
+
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+# --------------------------------------------------
+# HASHES
+# --------------------------------------------------
+def _mix64(h: np.ndarray) -> np.ndarray:
+    """Finalizador de splitmix64: reparte bien los bits de cualquier hash."""
+    h = h ^ (h >> np.uint64(30))
+    h = h * np.uint64(0xBF58476D1CE4E5B9)
+    h = h ^ (h >> np.uint64(27))
+    h = h * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def _hash_column(values: Union[pd.Series, pd.Index]) -> np.ndarray:
+    series = pd.Series(values, copy=False) if isinstance(values, pd.Index) else values
+    # Un mismo número llega como int o como float según el bloque (nulos): se hashea siempre como float
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.util.hash_pandas_object(series.astype(float), index=False).to_numpy(dtype=np.uint64)
+    # Texto: se hashea cada valor distinto una vez y se reparte por códigos
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    hashed = pd.util.hash_pandas_object(pd.Series(uniques, dtype=object), index=False).to_numpy(dtype=np.uint64)
+    return hashed[codes]
+
+
+def hash_values64(values: Union[pd.Series, pd.Index, pd.DataFrame]) -> np.ndarray:
+    """Hash de 64 bits por valor (Series/Index) o por fila (DataFrame), estable entre bloques y procesos."""
+    if not isinstance(values, pd.DataFrame):
+        return _mix64(_hash_column(values))
+    h = np.zeros(len(values), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for col in values.columns:
+            h = (h * _FNV_PRIME) ^ _hash_column(values[col])
+    return _mix64(h)
+
+
+def _leading_zeros(x: np.ndarray) -> np.ndarray:
+    """
+    Ceros a la izquierda de cada entero de 64 bits, a partir del exponente
+    en coma flotante. El redondeo sólo cambia el resultado para valores a
+    menos de 2^-53 (relativo) de una potencia de dos.
+    """
+    exponent = np.frexp(x.astype(np.float64))[1]
+    return np.clip(64 - exponent, 0, 64)
+
+
+def _encode(array: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+
+# --------------------------------------------------
+# HYPERLOGLOG
+# --------------------------------------------------
+class HyperLogLog:
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"Precisión de HyperLogLog fuera de rango: {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update_hashes(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << p) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def update(self, values: Union[pd.Series, pd.Index]):
+        """Añade los valores no nulos de `values`."""
+        values = values[pd.notna(values)] if len(values) else values
+        self.update_hashes(hash_values64(values))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("No se pueden combinar HyperLogLog de distinta precisión")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            # Corrección para cardinalidades pequeñas (conteo lineal)
+            return float(m * math.log(m / empty))
+        return float(raw)
+
+    def to_dict(self) -> Dict:
+        return {"precision": self.precision, "registers": _encode(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HyperLogLog":
+        sketch = cls(data["precision"])
+        sketch.registers = np.frombuffer(base64.b64decode(data["registers"]), dtype=np.uint8).copy()
+        return sketch
+
+
+# --------------------------------------------------
+# COUNT-MIN
+# --------------------------------------------------
+class CountMinSketch:
+    def __init__(self, width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH):
+        # Ancho potencia de dos: el índice de cada fila es una máscara de bits
+        self.width = 1 << max(int(width) - 1, 1).bit_length()
+        self.depth = depth
+        self.table = np.zeros((depth, self.width), dtype=np.int32)
+        self.total = 0
+
+    @classmethod
+    def for_rows(cls, rows: int, depth: int = DEFAULT_CMS_DEPTH) -> "CountMinSketch":
+        """Ancho proporcional al número de filas (hasta `MAX_CMS_WIDTH`) para que el error sea de pocas filas."""
+        return cls(min(max(2 * rows, 1 << 10), MAX_CMS_WIDTH), depth)
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    @property
+    def error_bound(self) -> float:
+        """Sobreestimación máxima (en filas) con probabilidad 1 - delta."""
+        return self.epsilon * self.total
+
+    def _indices(self, hashes: np.ndarray):
+        # Doble hashing (Kirsch-Mitzenmacher): las filas se derivan de las dos mitades de un solo hash
+        mask = np.uint64(self.width - 1)
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        for row in range(self.depth):
+            yield ((low + np.uint64(row) * high) & mask).astype(np.int64)
+
+    def update_hashes(self, hashes: np.ndarray):
+        # Con pocos hashes frente al ancho, sumar en su sitio evita recorrer la tabla completa
+        dense = len(hashes) >= self.width // 8
+        for row, index in enumerate(self._indices(hashes)):
+            if dense:
+                self.table[row] += np.bincount(index, minlength=self.width).astype(np.int32)
+            else:
+                np.add.at(self.table[row], index, 1)
+        self.total += len(hashes)
+
+    def update(self, values: Union[pd.Series, pd.DataFrame]):
+        self.update_hashes(hash_values64(values))
+
+    def query_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        estimate = None
+        for row, index in enumerate(self._indices(hashes)):
+            counts = self.table[row][index]
+            estimate = counts if estimate is None else np.minimum(estimate, counts)
+        return estimate if estimate is not None else np.zeros(len(hashes), dtype=np.int64)
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        if other.width != self.width or other.depth != self.depth:
+            raise ValueError("No se pueden combinar sketches Count-Min de distinto tamaño")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+
+# --------------------------------------------------
+# VALORES FRECUENTES (MISRA-GRIES)
+# --------------------------------------------------
+class FrequentItems:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        self.total = 0
+        # Cota de subestimación acumulada por las reducciones
+        self.error = 0
+
+    def update_counts(self, counts: pd.Series):
+        """Añade recuentos ya agregados (p. ej. `value_counts` de un bloque)."""
+        self.total += int(counts.sum())
+        self.counts = counts.copy() if self.counts.empty else self.counts.add(counts, fill_value=0)
+        self._reduce()
+
+    def update(self, values: pd.Series):
+        self.update_counts(values.value_counts(dropna=True))
+
+    def merge(self, other: "FrequentItems") -> "FrequentItems":
+        self.total += other.total
+        self.error += other.error
+        self.counts = other.counts.copy() if self.counts.empty else self.counts.add(other.counts, fill_value=0)
+        self._reduce()
+        return self
+
+    def _reduce(self):
+        if len(self.counts) <= self.capacity:
+            return
+        # Se resta el (capacity + 1)-ésimo recuento a todos y se descartan los que no quedan positivos
+        threshold = int(self.counts.nlargest(self.capacity + 1).iloc[-1])
+        reduced = self.counts - threshold
+        self.counts = reduced[reduced > 0].astype("int64")
+        self.error += threshold
+
+    @property
+    def exact(self) -> bool:
+        return self.error == 0
+
+    def top(self, k: int) -> pd.Series:
+        return self.counts.nlargest(k)
+
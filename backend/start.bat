@@ -76,5 +76,5 @@ echo Presiona Ctrl+C para detener el servidor
 echo ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 echo.
 
-python main.py
+python server.py
 pause
@@ -74,4 +74,4 @@ echo "Presiona Ctrl+C para detener el servidor"
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 echo ""
 
-python main.py
+python server.py
@@ -0,0 +1,354 @@
+"""
+Almacenamiento de las filas de los datasets.
+
+Cada dataset guarda en Postgres sólo su metadata y una referencia
+(`storage_format`, `storage_path`); las filas viven en un backend de
+almacenamiento intercambiable:
+
+    - "inline":  arreglo JSONB en `datasets.data` (datasets antiguos)
+    - "chunked": bloques JSONB en la tabla `dataset_chunks`
+    - "parquet": archivos Parquet comprimidos en disco local, uno por bloque
+
+El backend Parquet conserva los tipos de cada columna y permite leer sólo
+las columnas que necesita una configuración.
+"""
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from frame_cache import DEFAULT_FRAME_CACHE_MB, FrameCache, assemble
+from ingestion import chunk_to_records
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORAGE_PATH = os.path.join(os.path.dirname(__file__), 'storage')
+
+
+def _parse_json(value, default):
+    if isinstance(value, str):
+        return json.loads(value)
+    return value if value is not None else default
+
+
+# --------------------------------------------------
+# TIPOS
+# --------------------------------------------------
+def apply_schema(df: pd.DataFrame, schema: Optional[Dict]) -> pd.DataFrame:
+    """
+    Restaura los tipos lógicos registrados en la ingesta. Los enteros con
+    nulos se devuelven como `Int64` en lugar de convertirse a float.
+    """
+    if not schema:
+        return df
+    for column in schema.get("columns", []):
+        name = column["name"]
+        if name not in df.columns:
+            continue
+        kind = column.get("type")
+        series = df[name]
+        try:
+            if kind == "integer" and not pd.api.types.is_integer_dtype(series):
+                df[name] = series.astype("Int64" if series.isna().any() else "int64")
+            elif kind == "integer" and column.get("null_count", 0) > 0:
+                df[name] = series.astype("Int64")
+            elif kind == "float" and not pd.api.types.is_float_dtype(series):
+                df[name] = series.astype("float64")
+            elif kind == "string" and pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+                df[name] = series.where(series.isna(), series.astype(str))
+        except (TypeError, ValueError):
+            logger.warning(f"Could not restore type '{kind}' for column '{name}'")
+    return df
+
+
+def _normalize_for_arrow(chunk: pd.DataFrame) -> pd.DataFrame:
+    # Arrow no admite columnas object con tipos mezclados (ej: Excel con números y texto)
+    for col in chunk.columns:
+        if chunk[col].dtype == object:
+            inferred = pd.api.types.infer_dtype(chunk[col], skipna=True)
+            if inferred not in ("string", "empty", "boolean", "bytes"):
+                chunk[col] = chunk[col].where(chunk[col].isna(), chunk[col].astype(str))
+    chunk.columns = [str(c) for c in chunk.columns]
+    return chunk
+
+
+# --------------------------------------------------
+# BACKENDS
+# --------------------------------------------------
+class DatasetStore:
+    name = None
+
+    def storage_path(self, dataset_id: str) -> Optional[str]:
+        return None
+
+    def write_chunk(self, dataset_id: str, chunk_index: int, row_offset: int, chunk: pd.DataFrame):
+        raise NotImplementedError
+
+    def iter_chunks(self, dataset: Dict, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        raise NotImplementedError
+
+    def delete(self, dataset: Dict):
+        pass
+
+    def chunk_count(self, dataset: Dict) -> int:
+        """Bloques ya escritos: el siguiente segmento añadido continúa la numeración."""
+        raise NotImplementedError(f"Storage backend '{self.name}' does not support appending rows")
+
+    def delete_chunks(self, dataset: Dict, first_chunk: int):
+        """Borra los bloques desde `first_chunk` (un segmento añadido que no llegó a completarse)."""
+        pass
+
+    def load(self, dataset: Dict, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return _concat_or_empty(list(self.iter_chunks(dataset, columns)), dataset, columns)
+
+    def read_range(self, dataset: Dict, offset: int, limit: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Filas [offset, offset + limit). Los backends lo redefinen para no leer el dataset completo."""
+        frames = []
+        position = 0
+        end = offset + limit
+        for chunk in self.iter_chunks(dataset, columns):
+            if position + len(chunk) > offset:
+                frames.append(chunk.iloc[max(0, offset - position):end - position])
+            position += len(chunk)
+            if position >= end:
+                break
+        return _concat_or_empty(frames, dataset, columns)
+
+
+def _concat_or_empty(frames: List[pd.DataFrame], dataset: Dict, columns: Optional[List[str]]) -> pd.DataFrame:
+    if not frames:
+        column_names = _parse_json(dataset.get("column_names"), [])
+        return pd.DataFrame(columns=columns if columns is not None else column_names)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _project(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    if columns is None:
+        return df
+    return df[[c for c in columns if c in df.columns]]
+
+
+class InlineStore(DatasetStore):
+    name = "inline"
+
+    def __init__(self, db):
+        self.db = db
+
+    def iter_chunks(self, dataset, columns=None):
+        if "data" in dataset:
+            data = dataset["data"]
+        else:
+            data = self.db.execute_one("SELECT data FROM datasets WHERE id = %s", (dataset["id"],))["data"]
+        yield _project(pd.DataFrame(_parse_json(data, [])), columns)
+
+    def read_range(self, dataset, offset, limit, columns=None):
+        rows = self.db.select_jsonb_range("datasets", "data", {"id": dataset["id"]}, offset, limit)
+        return _project(pd.DataFrame(rows), columns)
+
+
+class PostgresChunkStore(DatasetStore):
+    name = "chunked"
+
+    def __init__(self, db):
+        self.db = db
+
+    def write_chunk(self, dataset_id, chunk_index, row_offset, chunk):
+        self.db.execute_query(
+            """
+            INSERT INTO dataset_chunks (dataset_id, chunk_index, row_offset, row_count, rows)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (dataset_id, chunk_index, row_offset, len(chunk), json.dumps(chunk_to_records(chunk), default=str))
+        )
+
+    def iter_chunks(self, dataset, columns=None):
+        chunk_ids = self.db.execute_query(
+            "SELECT chunk_index FROM dataset_chunks WHERE dataset_id = %s ORDER BY chunk_index",
+            (dataset["id"],),
+            fetch=True
+        )
+        for row in chunk_ids:
+            chunk = self.db.execute_one(
+                "SELECT rows FROM dataset_chunks WHERE dataset_id = %s AND chunk_index = %s",
+                (dataset["id"], row["chunk_index"])
+            )
+            yield _project(pd.DataFrame(_parse_json(chunk["rows"], [])), columns)
+
+    def chunk_count(self, dataset):
+        row = self.db.execute_one("SELECT COUNT(*) AS chunks FROM dataset_chunks WHERE dataset_id = %s",
+                                  (dataset["id"],))
+        return int(row["chunks"])
+
+    def delete_chunks(self, dataset, first_chunk):
+        self.db.execute_query("DELETE FROM dataset_chunks WHERE dataset_id = %s AND chunk_index >= %s",
+                              (dataset["id"], first_chunk))
+
+    def read_range(self, dataset, offset, limit, columns=None):
+        # Sólo se expanden los bloques que se solapan con el rango pedido
+        rows = self.db.execute_query(
+            """
+            SELECT e.elem
+            FROM dataset_chunks c
+            CROSS JOIN LATERAL jsonb_array_elements(c.rows) WITH ORDINALITY AS e(elem, idx)
+            WHERE c.dataset_id = %s
+              AND c.row_offset < %s AND c.row_offset + c.row_count > %s
+              AND c.row_offset + e.idx - 1 >= %s AND c.row_offset + e.idx - 1 < %s
+            ORDER BY c.chunk_index, e.idx
+            """,
+            (dataset["id"], offset + limit, offset, offset, offset + limit),
+            fetch=True
+        )
+        df = pd.DataFrame([row["elem"] for row in rows])
+        if df.empty:
+            return _concat_or_empty([], dataset, columns)
+        return _project(df, columns)
+
+
+class ParquetStore(DatasetStore):
+    name = "parquet"
+
+    def __init__(self, root: str = DEFAULT_STORAGE_PATH, compression: str = "zstd"):
+        self.root = root
+        self.compression = compression
+
+    def storage_path(self, dataset_id):
+        return os.path.join(self.root, str(dataset_id))
+
+    def _dataset_path(self, dataset):
+        return dataset.get("storage_path") or self.storage_path(dataset["id"])
+
+    def part_files(self, dataset) -> List[str]:
+        path = self._dataset_path(dataset)
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.parquet'))
+
+    def chunk_count(self, dataset):
+        return len(self.part_files(dataset))
+
+    def delete_chunks(self, dataset, first_chunk):
+        for part in self.part_files(dataset)[first_chunk:]:
+            os.remove(part)
+
+    def write_chunk(self, dataset_id, chunk_index, row_offset, chunk):
+        path = self.storage_path(dataset_id)
+        os.makedirs(path, exist_ok=True)
+        chunk = _normalize_for_arrow(chunk.copy())
+        chunk.to_parquet(
+            os.path.join(path, f"part-{chunk_index:05d}.parquet"),
+            engine="pyarrow",
+            compression=self.compression,
+            index=False
+        )
+
+    def iter_chunks(self, dataset, columns=None):
+        for part in self.part_files(dataset):
+            if columns is not None:
+                available = pq.ParquetFile(part).schema_arrow.names
+                yield pd.read_parquet(part, columns=[c for c in columns if c in available])
+            else:
+                yield pd.read_parquet(part)
+
+    def read_range(self, dataset, offset, limit, columns=None):
+        # El número de filas de cada parte está en el pie del archivo Parquet
+        frames = []
+        position = 0
+        end = offset + limit
+        for part in self.part_files(dataset):
+            parquet_file = pq.ParquetFile(part)
+            num_rows = parquet_file.metadata.num_rows
+            if position + num_rows > offset:
+                part_columns = None
+                if columns is not None:
+                    part_columns = [c for c in columns if c in parquet_file.schema_arrow.names]
+                start = max(0, offset - position)
+                stop = min(num_rows, end - position)
+                table = parquet_file.read(columns=part_columns)
+                frames.append(table.slice(start, stop - start).to_pandas())
+            position += num_rows
+            if position >= end:
+                break
+        return _concat_or_empty(frames, dataset, columns)
+
+    def delete(self, dataset):
+        shutil.rmtree(self._dataset_path(dataset), ignore_errors=True)
+
+
+# --------------------------------------------------
+# SELECCIÓN DE BACKEND
+# --------------------------------------------------
+class StorageManager:
+    """Resuelve el backend de cada dataset y el usado para las nuevas subidas."""
+
+    def __init__(self, db, config: Dict = None):
+        config = config or {}
+        self.stores = {
+            InlineStore.name: InlineStore(db),
+            PostgresChunkStore.name: PostgresChunkStore(db),
+        }
+        if pq is not None:
+            root = config.get("path", DEFAULT_STORAGE_PATH)
+            if not os.path.isabs(root):
+                # Rutas relativas a la raíz del proyecto, igual que credentials.json
+                root = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), root)
+            self.stores[ParquetStore.name] = ParquetStore(
+                root=root,
+                compression=config.get("compression", "zstd")
+            )
+
+        # Columnas ya decodificadas por dataset y versión (0 desactiva la caché)
+        frame_cache_mb = config.get("frame_cache_mb", DEFAULT_FRAME_CACHE_MB)
+        self.frame_cache = FrameCache(int(frame_cache_mb * 1024 * 1024)) if frame_cache_mb else None
+
+        self.default_format = config.get("backend", ParquetStore.name if pq is not None else PostgresChunkStore.name)
+        if self.default_format not in self.stores:
+            logger.warning(f"Storage backend '{self.default_format}' not available, using 'chunked'")
+            self.default_format = PostgresChunkStore.name
+        logger.info(f"Dataset storage backend: {self.default_format}")
+
+    def default(self) -> DatasetStore:
+        return self.stores[self.default_format]
+
+    def for_dataset(self, dataset: Dict) -> DatasetStore:
+        storage_format = dataset.get("storage_format") or InlineStore.name
+        if storage_format not in self.stores:
+            raise ValueError(f"Storage backend '{storage_format}' is not available")
+        return self.stores[storage_format]
+
+    def load(self, dataset: Dict, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Dataset (o sus `columns`) con los tipos del esquema. Las columnas ya
+        decodificadas se sirven desde `frame_cache` mientras no cambie
+        `updated_at`; sólo se leen del almacenamiento las que faltan.
+        """
+        if self.frame_cache is None or dataset.get("id") is None or dataset.get("updated_at") is None:
+            return self._load(dataset, columns)
+
+        dataset_id, version = str(dataset["id"]), str(dataset["updated_at"])
+        found, missing = self.frame_cache.lookup(dataset_id, version, columns)
+        if missing is None or missing:
+            loaded = self._load(dataset, missing)
+            self.frame_cache.store(dataset_id, version, loaded, complete=missing is None)
+            found.update({str(name): loaded[name] for name in loaded.columns})
+        return assemble(found, columns if columns is not None else list(found))
+
+    def _load(self, dataset: Dict, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        df = self.for_dataset(dataset).load(dataset, columns)
+        return apply_schema(df, _parse_json(dataset.get("schema"), None))
+
+    def read_range(self, dataset: Dict, offset: int, limit: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        df = self.for_dataset(dataset).read_range(dataset, offset, limit, columns)
+        return apply_schema(df, _parse_json(dataset.get("schema"), None))
+
+    def iter_chunks(self, dataset: Dict, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        schema = _parse_json(dataset.get("schema"), None)
+        for chunk in self.for_dataset(dataset).iter_chunks(dataset, columns):
+            yield apply_schema(chunk, schema)
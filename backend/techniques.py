@@ -0,0 +1,461 @@
+"""
+Técnicas de anonimización por columna.
+
+Funciones puras sobre `pd.Series`, sin dependencias de la base de datos ni
+de la aplicación FastAPI, para que puedan ejecutarse tanto en el proceso
+principal como en los procesos del motor de ejecución paralela.
+"""
+import hashlib
+import hmac
+import logging
+import math
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from differential_privacy import DEFAULT_MECHANISM, privatize
+from randomness import RandomStreams
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - sin pyarrow se usa la versión celda a celda
+    pa = None
+    pc = None
+
+logger = logging.getLogger(__name__)
+
+# Algoritmo → longitud máxima del hash en caracteres hexadecimales
+PSEUDONYM_ALGORITHMS = {"blake2b": 128, "hmac-sha256": 64, "md5": 32}
+DEFAULT_PSEUDONYM_ALGORITHM = "blake2b"
+DEFAULT_PSEUDONYM_DIGEST_LENGTH = 16
+
+
+# --------------------------------------------------
+# FUNCIONES DE APOYO
+# --------------------------------------------------
+def generalize_numeric(series: pd.Series, bins: int = 5, return_bins: bool = False):
+    try:
+        # pd.cut con retbins devuelve la serie categórica y los límites usados
+        cat, bins_edges = pd.cut(series, bins=bins, duplicates='drop', retbins=True)
+
+        # Convertir las categorías a intervalos legibles
+        result = _format_intervals(cat)
+
+        if return_bins:
+            return result, bins_edges
+        return result
+    except Exception:
+        if return_bins:
+            return series.astype(str), None
+        return series.astype(str)
+
+
+def numeric_bin_edges(series: pd.Series, bins: int = 5):
+    """
+    Límites que usaría `generalize_numeric` para la serie completa. Sólo
+    dependen del mínimo y el máximo, así que se calculan sobre los valores
+    únicos y después pueden aplicarse bloque a bloque con
+    `generalize_numeric_with_edges` obteniendo el mismo resultado.
+    """
+    _, bins_edges = pd.cut(pd.Series(series.dropna().unique()), bins=bins, duplicates='drop', retbins=True)
+    return bins_edges
+
+
+def generalize_numeric_with_edges(series: pd.Series, bins_edges, include_na: bool = None) -> pd.Series:
+    try:
+        return _format_intervals(pd.cut(series, bins=bins_edges), include_na)
+    except Exception:
+        return series.astype(str)
+
+
+def _format_intervals(cat: pd.Series, include_na: bool = None) -> pd.Series:
+    """
+    Convierte la serie de `pd.cut` en un `Categorical` con una etiqueta
+    legible por intervalo ("18-30"). Las etiquetas se formatean una vez por
+    intervalo y las filas sólo guardan el código entero; los nulos se
+    etiquetan como "nan", igual que hacía la conversión fila a fila.
+
+    `include_na` fuerza (o evita) la categoría "nan" para que todos los
+    bloques de una misma columna compartan categorías y puedan concatenarse
+    sin perder el tipo.
+    """
+    labels = [f"{_format_edge_value(i.left)}-{_format_edge_value(i.right)}" for i in cat.cat.categories]
+    # Intervalos distintos pueden redondear a la misma etiqueta: se fusionan
+    positions = {}
+    remap = np.array([positions.setdefault(label, len(positions)) for label in labels], dtype=np.int64)
+    categories = list(positions)
+
+    codes = cat.cat.codes.to_numpy()
+    missing = codes < 0
+    new_codes = remap[np.where(missing, 0, codes)] if len(remap) else np.zeros(len(codes), dtype=np.int64)
+    if include_na is None:
+        include_na = bool(missing.any())
+    if include_na:
+        categories.append("nan")
+        new_codes[missing] = len(categories) - 1
+    else:
+        new_codes[missing] = -1
+
+    return pd.Series(pd.Categorical.from_codes(new_codes, categories=categories), index=cat.index, name=cat.name)
+
+
+# Helper para formatear los valores de los límites de intervalo
+def _format_edge_value(v):
+    try:
+        if v is None or (isinstance(v, float) and (math.isinf(v) or math.isnan(v))):
+            return str(v)
+        fv = float(v)
+        # Mostrar como entero si es entero, sino con 2 decimales
+        if fv.is_integer():
+            return str(int(round(fv)))
+        return str(round(fv, 2))
+    except Exception:
+        return str(v)
+
+
+def generalize_categorical(series: pd.Series, levels: int = 1, top_values: List = None) -> pd.Series:
+    """
+    Conserva los `levels` valores más frecuentes y agrupa el resto en "Otros".
+    `top_values` (del perfil del dataset) evita recontar los valores.
+    """
+    if levels == 1:
+        return pd.Series(['Generalizado'] * len(series), index=series.index)
+    if top_values is None:
+        top_values = series.value_counts().head(levels).index.tolist()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    return series.where(series.isin(top_values), 'Otros')
+
+
+def suppress_data(series: pd.Series, threshold: float = 0.1, streams: RandomStreams = None,
+                  column: str = None, offset: int = 0) -> pd.Series:
+    """
+    TÉCNICA DE SUPRESIÓN (SUPPRESSION)
+
+    Esta es la técnica que OCULTA valores reemplazándolos con asteriscos '*'.
+    Se usa cuando se quiere eliminar información sensible de forma aleatoria.
+
+    Ejemplo:
+        Antes: ["Diabetes", "Asma", "Hipertensión", "Diabetes", "Ninguna"]
+        Después (threshold=0.2): ["*", "Asma", "*", "Diabetes", "Ninguna"]
+
+    Args:
+        series: Serie de pandas con los datos a suprimir
+        threshold: Porcentaje de datos a suprimir/ocultar (0.0 a 1.0)
+                  Por defecto 0.1 = 10% de los valores se ocultarán con '*'
+        streams: Flujos aleatorios del trabajo (RandomStreams); sin ellos se
+                 usa una semilla nueva
+        column: Nombre del flujo (por defecto, el nombre de la serie)
+        offset: Posición de la primera fila de la serie en el dataset
+
+    Returns:
+        Serie con datos suprimidos (algunos valores reemplazados por '*')
+    """
+    if streams is None:
+        streams = RandomStreams()
+    mask = streams.suppression_mask(column if column is not None else series.name, len(series), threshold, offset)
+    if not mask.any():
+        return series.copy()
+    return series.astype(object).mask(mask, '*')
+
+
+def apply_differential_privacy(series: pd.Series, epsilon: float = 1.0, bounds: Tuple[float, float] = None,
+                               streams: RandomStreams = None, column: str = None, offset: int = 0,
+                               mechanism: str = DEFAULT_MECHANISM, delta: float = None) -> pd.Series:
+    """
+    Recorta la columna a `bounds` y añade el ruido de `mechanism` (Laplace,
+    gaussiano o geométrico) con sensibilidad upper - lower. Sin `bounds` se
+    usan el mínimo y el máximo de la serie; lo normal es pasarlos desde el
+    perfil del dataset (`differential_privacy.clamp_bounds`).
+    """
+    if not pd.api.types.is_numeric_dtype(series):
+        return series
+    if bounds is None:
+        if series.isna().all():
+            return series
+        bounds = (float(series.min()), float(series.max()))
+    return privatize(series, epsilon, bounds, mechanism, delta, streams, column, offset)
+
+
+def _pseudonym_key(key) -> bytes:
+    if key is None:
+        return b""
+    key = key.encode("utf-8") if isinstance(key, str) else bytes(key)
+    # BLAKE2b admite claves de hasta 64 bytes; las más largas se condensan primero
+    return hashlib.sha256(key).digest() if len(key) > 64 else key
+
+
+def hash_values(values, algorithm: str = DEFAULT_PSEUDONYM_ALGORITHM, key=None,
+                digest_length: int = DEFAULT_PSEUDONYM_DIGEST_LENGTH) -> List[str]:
+    """
+    Calcula el hash hexadecimal (truncado a `digest_length` caracteres) de cada
+    valor, en una sola pasada y reutilizando el estado inicial del algoritmo.
+    """
+    if algorithm not in PSEUDONYM_ALGORITHMS:
+        raise ValueError(f"Algoritmo de pseudonimización no soportado: {algorithm}")
+    digest_length = max(1, min(int(digest_length), PSEUDONYM_ALGORITHMS[algorithm]))
+    key = _pseudonym_key(key)
+
+    if algorithm == "blake2b":
+        base = hashlib.blake2b(key=key, digest_size=min(64, -(-digest_length // 2)))
+    elif algorithm == "hmac-sha256":
+        base = hmac.new(key, digestmod=hashlib.sha256)
+    else:
+        # md5 sin clave: compatible con los pseudónimos generados por versiones anteriores
+        base = hashlib.md5()
+
+    digests = []
+    for value in values:
+        h = base.copy()
+        h.update(str(value).encode())
+        digests.append(h.hexdigest()[:digest_length])
+    return digests
+
+
+def gather_codes(series: pd.Series, codes: np.ndarray, labels: List) -> pd.Series:
+    """Reconstruye la columna a partir de los códigos de `pd.factorize` (-1 = nulo)."""
+    table = np.empty(len(labels) + 1, dtype=object)
+    table[:-1] = labels
+    table[-1] = None
+    return pd.Series(table[codes], index=series.index, name=series.name)
+
+
+def pseudonyms_from_codes(series: pd.Series, codes: np.ndarray, digests: List[str], prefix: str) -> pd.Series:
+    return gather_codes(series, codes, [f"{prefix}_{digest}" for digest in digests])
+
+
+def apply_pseudonymization(series: pd.Series, prefix: str = "USER",
+                           algorithm: str = DEFAULT_PSEUDONYM_ALGORITHM, key=None,
+                           digest_length: int = DEFAULT_PSEUDONYM_DIGEST_LENGTH) -> pd.Series:
+    """
+    TÉCNICA DE PSEUDONIMIZACIÓN (PSEUDONYMIZATION)
+
+    Reemplaza valores reales con pseudónimos únicos y consistentes.
+    El mismo valor siempre genera el mismo pseudónimo.
+
+    La columna se codifica como diccionario (`pd.factorize`): solo se calcula
+    el hash de los valores distintos y el resultado se reparte a todas las
+    filas a través de los códigos enteros.
+
+    Ejemplo:
+        Antes: ["Juan Pérez", "María García", "Juan Pérez", "Pedro López"]
+        Después: ["USER_9f2c41d07a3be215", "USER_0b7e5a93c1d2f468", "USER_9f2c41d07a3be215", ...]
+
+    Args:
+        series: Serie de pandas con los datos a pseudonimizar
+        prefix: Prefijo para los pseudónimos (default: "USER")
+        algorithm: "blake2b" o "hmac-sha256" (con clave), o "md5" (sin clave, heredado)
+        key: Clave secreta del hash; sin ella el pseudónimo puede revertirse por diccionario
+        digest_length: Caracteres hexadecimales del pseudónimo (6 colisiona a partir de unos miles de valores)
+
+    Returns:
+        Serie con pseudónimos consistentes
+    """
+    codes, uniques = pd.factorize(series)
+    digests = hash_values(uniques, algorithm, key, digest_length)
+    return pseudonyms_from_codes(series, codes, digests, prefix)
+
+
+def apply_masking(series: pd.Series, mask_type: str = "partial", mask_char: str = "*") -> pd.Series:
+    """
+    TÉCNICA DE ENMASCARAMIENTO (MASKING)
+
+    Enmascara parcialmente datos sensibles manteniendo el formato.
+
+    Ejemplos:
+        - Email: "juan.perez@email.com" → "j***@email.com"
+        - Teléfono: "612345678" → "612***678"
+        - Nombre: "Juan Pérez" → "J*** P***"
+        - Texto: "Información" → "Inf*******"
+
+    Args:
+        series: Serie de pandas con los datos a enmascarar
+        mask_type: Tipo de enmascaramiento
+            - "partial": Mantiene inicio y fin
+            - "email": Enmascara usuario del email
+            - "phone": Enmascara parte central del teléfono
+            - "middle": Enmascarara solo la parte central
+        mask_char: Carácter para enmascarar (default: "*")
+
+    Returns:
+        Serie con datos enmascarados
+    """
+    if pc is None:
+        return _apply_masking_elementwise(series, mask_type, mask_char)
+
+    na_mask = series.isna().to_numpy()
+    if na_mask.all():
+        return series.copy()
+
+    values = _to_arrow_strings(series, na_mask)
+
+    if mask_type == "email":
+        masked = _mask_email(values, mask_char)
+    elif mask_type == "phone":
+        masked = _mask_keep_ends(values, 3, 3, 6, mask_char)
+    elif mask_type == "middle":
+        masked = _mask_keep_ends(values, 2, 2, 4, mask_char)
+    elif mask_type == "partial":
+        masked = _mask_partial(values, mask_char)
+    else:
+        # Enmascaramiento por defecto (parcial)
+        masked = _mask_prefix(values, 3, mask_char)
+
+    # Se trabaja por posición para no depender de índices duplicados
+    result = series.to_numpy(dtype=object, copy=True)
+    result[~na_mask] = masked.to_numpy(zero_copy_only=False)
+    return pd.Series(result, index=series.index, name=series.name, dtype=object, copy=False)
+
+
+# --------------------------------------------------
+# ENMASCARAMIENTO VECTORIZADO (pyarrow.compute)
+# --------------------------------------------------
+# Cada modo reproduce exactamente `_mask_value`, pero con kernels de Arrow
+# sobre la columna completa en lugar de una llamada Python por celda.
+def _to_arrow_strings(series: pd.Series, na_mask: np.ndarray):
+    """Valores no nulos como arreglo Arrow de texto, equivalente a `str(value)`."""
+    if pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+        values = series.to_numpy()[~na_mask]
+        if pd.api.types.is_bool_dtype(series):
+            return pa.array(np.where(values.astype(bool), "True", "False"), type=pa.string())
+        return pc.cast(pa.array(values.astype(np.int64)), pa.string())
+
+    if isinstance(series.dtype, (pd.StringDtype, pd.ArrowDtype)) and getattr(series.dtype, "storage", "pyarrow") == "pyarrow":
+        # Columnas que ya están en Arrow: sin pasar por objetos Python
+        array = pa.chunked_array(pa.array(series.array)).combine_chunks()
+        return pc.cast(array.filter(pa.array(~na_mask)), pa.string())
+
+    values = series.to_numpy(dtype=object)[~na_mask]
+    if pd.api.types.infer_dtype(values, skipna=False) != "string":
+        values = np.array([str(v) for v in values], dtype=object)
+    return pa.array(values, type=pa.string())
+
+
+def _mask_runs(lengths, mask_char: str):
+    """`mask_char * n` para cada longitud."""
+    return pc.binary_repeat(pa.scalar(mask_char, type=pa.string()), pc.max_element_wise(lengths, 0))
+
+
+def _join(*parts):
+    return pc.binary_join_element_wise(*parts, "")
+
+
+def _mask_keep_ends(values, head: int, tail: int, min_len: int, mask_char: str):
+    lengths = pc.utf8_length(values)
+    masked = _join(
+        pc.utf8_slice_codeunits(values, 0, head),
+        _mask_runs(pc.subtract(lengths, min_len), mask_char),
+        pc.utf8_slice_codeunits(values, -tail)
+    )
+    return pc.if_else(pc.greater_equal(lengths, min_len), masked, values)
+
+
+def _mask_prefix(values, keep: int, mask_char: str):
+    lengths = pc.utf8_length(values)
+    masked = _join(pc.utf8_slice_codeunits(values, 0, keep), _mask_runs(pc.subtract(lengths, keep), mask_char))
+    return pc.if_else(pc.greater(lengths, keep), masked, values)
+
+
+def _mask_email(values, mask_char: str):
+    # Igual que value_str.split("@"): el dominio es el texto entre la primera y la segunda '@'
+    parts = pc.split_pattern(values, "@", max_splits=2)
+    username = pc.list_element(parts, 0)
+    has_at = pc.greater(pc.list_value_length(parts), 1)
+    domain = pc.list_element(pc.if_else(has_at, parts, pa.scalar(["", ""], type=parts.type)), 1)
+
+    user_lengths = pc.utf8_length(username)
+    masked = _join(
+        pc.utf8_slice_codeunits(username, 0, 1),
+        _mask_runs(pc.subtract(user_lengths, 1), mask_char),
+        pa.scalar("@"),
+        domain
+    )
+    return pc.if_else(pc.and_(has_at, pc.greater(user_lengths, 1)), masked, values)
+
+
+def _mask_partial(values, mask_char: str):
+    result = _mask_prefix(values, 3, mask_char)
+
+    has_space = pc.and_(pc.match_substring(values, " "), pc.greater(pc.utf8_length(values), 3))
+    if not pc.any(has_space).as_py():
+        return result
+
+    # Nombres con espacios: cada palabra conserva su primera letra (como value_str.split())
+    positions = np.flatnonzero(has_space.to_numpy(zero_copy_only=False))
+    words = pc.utf8_split_whitespace(values.take(pa.array(positions)))
+    flat = pc.list_flatten(words)
+    parents = pc.list_parent_indices(words).to_numpy()
+    keep = pc.greater(pc.utf8_length(flat), 0)
+    flat = flat.filter(keep)
+    parents = parents[keep.to_numpy(zero_copy_only=False)]
+
+    masked_words = _join(pc.utf8_slice_codeunits(flat, 0, 1), _mask_runs(pc.subtract(pc.utf8_length(flat), 1), mask_char))
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(parents, minlength=len(positions)))]).astype(np.int32)
+    joined = pc.binary_join(pa.ListArray.from_arrays(pa.array(offsets), masked_words), " ")
+
+    # Se intercalan los nombres enmascarados en sus posiciones sin salir de Arrow
+    take_indices = np.arange(len(result), dtype=np.int64)
+    take_indices[positions] = len(result) + np.arange(len(positions), dtype=np.int64)
+    return pa.concat_arrays([result, joined.cast(pa.string())]).take(pa.array(take_indices))
+
+
+def _apply_masking_elementwise(series: pd.Series, mask_type: str = "partial", mask_char: str = "*") -> pd.Series:
+    """Implementación celda a celda original; se conserva como referencia para tests y benchmarks."""
+    return series.apply(_mask_value, args=(mask_type, mask_char))
+
+
+def _mask_value(value, mask_type: str, mask_char: str):
+    if pd.isna(value):
+        return value
+
+    value_str = str(value)
+
+    if mask_type == "email":
+        # Enmascarar email: mantener primera letra y dominio
+        if "@" in value_str:
+            parts = value_str.split("@")
+            username = parts[0]
+            domain = parts[1] if len(parts) > 1 else ""
+            if len(username) > 1:
+                masked_user = username[0] + mask_char * (len(username) - 1)
+                return f"{masked_user}@{domain}"
+        return value_str
+
+    elif mask_type == "phone":
+        # Enmascarar teléfono: mantener inicio y fin
+        if len(value_str) >= 6:
+            start = value_str[:3]
+            end = value_str[-3:]
+            middle_len = len(value_str) - 6
+            return f"{start}{mask_char * middle_len}{end}"
+        return value_str
+
+    elif mask_type == "middle":
+        # Enmascarar solo la parte central
+        if len(value_str) >= 4:
+            start = value_str[:2]
+            end = value_str[-2:]
+            middle_len = len(value_str) - 4
+            return f"{start}{mask_char * middle_len}{end}"
+        return value_str
+
+    elif mask_type == "partial":
+        # Enmascaramiento parcial por defecto
+        if len(value_str) > 3:
+            # Para nombres con espacios (ej: "Juan Pérez")
+            if " " in value_str:
+                parts = value_str.split()
+                masked_parts = [p[0] + mask_char * (len(p) - 1) for p in parts]
+                return " ".join(masked_parts)
+            else:
+                # Para texto simple
+                return value_str[:3] + mask_char * (len(value_str) - 3)
+        return value_str
+
+    else:
+        # Enmascaramiento por defecto (parcial)
+        if len(value_str) > 3:
+            return value_str[:3] + mask_char * (len(value_str) - 3)
+        return value_str
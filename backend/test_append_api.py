@@ -0,0 +1,116 @@
+"""
+Test de las filas añadidas a un dataset: sólo se anonimiza el segmento nuevo
+(a través de la API, con la base de datos en memoria de `api_testing`).
+"""
+import io
+import json
+
+from api_testing import FAKE_DB, client, create_config, csv_bytes, main, process, result_rows, upload_dataset
+
+
+def test_append_anonymizes_only_new_rows():
+    print("\n" + "="*80)
+    print("TEST: API - FILAS AÑADIDAS")
+    print("="*80)
+
+    dataset = upload_dataset(n=150, seed=4)
+    config = create_config(dataset["id"], seed=3)
+    _, _, first = process(dataset["id"], config["id"])
+
+    appended = client.post(f"/api/datasets/{dataset['id']}/append",
+                           files={"file": ("nuevas.csv", io.BytesIO(csv_bytes(40, 8, start=150)), "text/csv")})
+    assert appended.status_code == 200, appended.text
+    assert appended.json()["row_count"] == 190 and len(appended.json()["segments"]) == 2
+
+    # Sólo se leen las filas del segmento nuevo
+    reads = []
+    load, read_range = main.storage.load, main.storage.read_range
+    main.storage.load = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("full dataset loaded"))
+    main.storage.read_range = lambda dataset, offset, rows, *args: reads.append((offset, rows)) or read_range(
+        dataset, offset, rows, *args)
+    try:
+        _, _, second = process(dataset["id"], config["id"])
+    finally:
+        main.storage.load, main.storage.read_range = load, read_range
+
+    incremental = second["metrics"]["incremental"]
+    assert reads == [(150, 40)]
+    assert incremental["mode"] == "append" and incremental["appended_rows"] == 40
+    assert incremental["base_result_id"] == first["id"]
+    published = 40 - incremental["withheld_rows"]
+    rows = result_rows(second["id"])
+    assert len(rows) == first["metrics"]["anonymized_rows"] + published == second["metrics"]["anonymized_rows"]
+    assert rows[:len(result_rows(first["id"]))] == result_rows(first["id"])
+    assert second["metrics"]["k_anonymity"] >= 3
+    print("✓ Añadir filas sólo anonimiza el segmento nuevo")
+
+
+def _append(dataset_id, n, seed, start):
+    response = client.post(f"/api/datasets/{dataset_id}/append",
+                           files={"file": ("nuevas.csv", io.BytesIO(csv_bytes(n, seed, start=start)), "text/csv")})
+    assert response.status_code == 200, response.text
+
+
+def _stored(result_id):
+    return FAKE_DB.select_one("anonymization_results", {"id": result_id})
+
+
+def test_append_stores_only_the_new_rows():
+    dataset = upload_dataset(n=150, seed=5)
+    config = create_config(dataset["id"], seed=4)
+    _, _, first = process(dataset["id"], config["id"])
+    results = [first]
+    for i, n in enumerate([40, 30]):
+        _append(dataset["id"], n, 20 + i, start=150 + 40 * i)
+        _, _, job = process(dataset["id"], config["id"])
+        assert job["metrics"]["incremental"]["mode"] == "append"
+        results.append(job)
+
+    # Cada resultado guarda sólo sus filas nuevas y enlaza el anterior
+    first_rows = result_rows(first["id"])
+    sizes = [len(first_rows)] + [job["metrics"]["anonymized_rows"] - prev["metrics"]["anonymized_rows"]
+                                 for prev, job in zip(results, results[1:])]
+    for job, previous, size in zip(results[1:], results, sizes[1:]):
+        assert _stored(job["id"])["base_result_id"] == previous["id"]
+        assert len(_stored(job["id"])["anonymized_data"]) == size
+
+    # Las lecturas recorren las partes: completo, por páginas que cruzan partes, exportado y en el listado
+    last = results[-1]["id"]
+    rows = result_rows(last)
+    assert len(rows) == sum(sizes) == results[-1]["metrics"]["anonymized_rows"]
+    assert rows[:len(first_rows)] == first_rows
+    page = client.get(f"/api/results/{last}", params={"offset": len(first_rows) - 2, "limit": 5}).json()
+    assert page["total_rows"] == len(rows) and page["anonymized_data"] == rows[len(first_rows) - 2:len(first_rows) + 3]
+    exported = client.get(f"/api/results/{last}/export").text.splitlines()
+    assert [json.loads(line) for line in exported] == rows
+    listed = client.get("/api/results", params={"dataset_id": dataset["id"], "include": "anonymized_data"}).json()
+    assert {r["id"]: r["anonymized_data"] for r in listed}[last] == rows and all("base_result_id" not in r
+                                                                               for r in listed)
+    print("✓ Cada ampliación guarda sólo sus filas y las lecturas recorren las partes")
+
+
+def test_append_chain_is_compacted():
+    dataset = upload_dataset(n=150, seed=6)
+    config = create_config(dataset["id"], seed=4)
+    process(dataset["id"], config["id"])
+    limit, main.MAX_RESULT_PARTS = main.MAX_RESULT_PARTS, 2
+    try:
+        _append(dataset["id"], 40, 30, start=150)
+        _, _, second = process(dataset["id"], config["id"])
+        _append(dataset["id"], 40, 31, start=190)
+        _, _, third = process(dataset["id"], config["id"])
+    finally:
+        main.MAX_RESULT_PARTS = limit
+
+    # Con la cadena en el límite, el resultado se guarda completo desde la instantánea
+    assert _stored(second["id"])["base_result_id"] is not None
+    assert _stored(third["id"]).get("base_result_id") is None
+    assert len(_stored(third["id"])["anonymized_data"]) == third["metrics"]["anonymized_rows"]
+    assert result_rows(third["id"])[:len(result_rows(second["id"]))] == result_rows(second["id"])
+    print("✓ Al llegar al máximo de partes el resultado se vuelve a guardar completo")
+
+
+if __name__ == "__main__":
+    test_append_anonymizes_only_new_rows()
+    test_append_stores_only_the_new_rows()
+    test_append_chain_is_compacted()
@@ -0,0 +1,127 @@
+"""
+Test de los mecanismos de privacidad diferencial y de la contabilidad del presupuesto.
+"""
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from differential_privacy import (
+    MemoryBudgetLedger,
+    PrivacyAccountant,
+    PrivacyBudgetExceeded,
+    clamp_bounds,
+    noise_scale,
+    privatize,
+    technique_charges,
+)
+from profiling import profile_dataframe
+from randomness import RandomStreams
+
+
+def _ages(n=200000, seed=3):
+    return pd.Series(np.random.default_rng(seed).integers(18, 90, n).astype(float), name="edad")
+
+
+def test_mechanisms_have_expected_scale():
+    print("\n" + "="*80)
+    print("TEST: MECANISMOS DE PRIVACIDAD DIFERENCIAL")
+    print("="*80)
+
+    ages = _ages()
+    bounds = (18.0, 89.0)
+    streams = RandomStreams(5)
+
+    laplace = privatize(ages, 1.0, bounds, "laplace", streams=streams) - ages
+    scale = noise_scale("laplace", 1.0, 71.0)
+    assert abs(laplace.abs().mean() - scale) / scale < 0.02
+
+    gaussian = privatize(ages, 0.5, bounds, "gaussian", delta=1e-5, streams=streams) - ages
+    sigma = 71.0 * math.sqrt(2 * math.log(1.25 / 1e-5)) / 0.5
+    assert abs(gaussian.std() - sigma) / sigma < 0.02 and abs(gaussian.mean()) < sigma / 100
+
+    geometric = privatize(ages, 2.0, bounds, "geometric", streams=streams)
+    assert geometric.dtype == np.int64
+    alpha = math.exp(-2.0 / 71.0)
+    expected_var = 2 * alpha / (1 - alpha) ** 2
+    assert abs((geometric - ages).var() - expected_var) / expected_var < 0.03
+    print("✓ Laplace, gaussiano y geométrico con la escala teórica")
+
+
+def test_clamping_nulls_and_chunking():
+    ages = _ages(10000)
+    ages.iloc[::10] = np.nan
+    profile = profile_dataframe(ages.to_frame())["edad"]
+
+    assert clamp_bounds(profile) == (18.0, 89.0)
+    assert clamp_bounds(profile, {"upper": 65}) == (18.0, 65.0)
+    assert clamp_bounds({"kind": "categorical"}) is None
+
+    streams = RandomStreams(9)
+    noisy = privatize(ages, 1.0, (30.0, 40.0), streams=streams, column="edad")
+    assert noisy.isna().equals(ages.isna())
+    # Con sensibilidad nula sólo se recorta
+    clamped = privatize(ages, 1.0, (30.0, 30.0), streams=streams)
+    assert set(clamped.dropna().unique()) == {30.0}
+
+    # Por bloques con su posición, el mismo resultado que de una vez
+    for mechanism in ("laplace", "gaussian", "geometric"):
+        whole = privatize(ages, 1.0, (18.0, 89.0), mechanism, streams=streams, column="edad")
+        parts = pd.concat([
+            privatize(ages.iloc[start:start + 3000], 1.0, (18.0, 89.0), mechanism, streams=streams, column="edad",
+                      offset=start)
+            for start in range(0, len(ages), 3000)
+        ])
+        assert np.allclose(whole.to_numpy(dtype=float), parts.to_numpy(dtype=float), equal_nan=True)
+    print("✓ Recorte con los límites del perfil, nulos conservados y ruido independiente del reparto")
+
+
+def test_accountant_enforces_budget():
+    techniques = [
+        {"column": "edad", "technique": "differential_privacy", "params": {"epsilon": 0.4}},
+        {"column": "salario", "technique": "differential_privacy",
+         "params": {"epsilon": 0.5, "mechanism": "gaussian", "delta": 1e-6}},
+        {"column": "ciudad", "technique": "generalization", "params": {}},
+        {"column": "borrada", "technique": "differential_privacy", "params": {"epsilon": 3}},
+    ]
+    charges = technique_charges(techniques, ["edad", "salario", "ciudad"])
+    assert [c["column"] for c in charges] == ["edad", "salario"]
+    assert charges[0]["delta"] == 0.0 and charges[1]["delta"] == 1e-6
+
+    ledger = MemoryBudgetLedger()
+    accountant = PrivacyAccountant(ledger, "ds-1", budget_epsilon=2.0, budget_delta=1e-5)
+    first = accountant.charge(charges, "run-1")
+    assert first["epsilon_spent"] == 0.9 and first["dataset_epsilon_spent"] == 0.9
+    assert first["remaining_epsilon"] == 1.1
+    accountant.charge(charges, "run-2")
+    assert abs(accountant.remaining()["epsilon"] - 0.2) < 1e-9
+
+    try:
+        accountant.charge(charges, "run-3")
+        assert False, "el tercer cargo supera el presupuesto"
+    except PrivacyBudgetExceeded:
+        pass
+    # El cargo rechazado no deja rastro y otro dataset tiene su propio presupuesto
+    assert len(ledger.entries("ds-1")) == 4
+    assert PrivacyAccountant(ledger, "ds-2", 2.0).charge(charges)["dataset_epsilon_spent"] == 0.9
+    # Sin presupuesto configurado sólo se contabiliza
+    assert PrivacyAccountant(ledger, "ds-3").charge(charges * 5)["remaining_epsilon"] is None
+    print("✓ Composición secuencial por dataset y rechazo al agotar el presupuesto")
+
+
+def test_ten_million_values_single_pass():
+    values = pd.Series(np.random.default_rng(1).uniform(0, 100, 10_000_000), name="importe")
+    start = time.time()
+    noisy = privatize(values, 1.0, (0.0, 100.0), "laplace", streams=RandomStreams(4), column="importe")
+    elapsed = time.time() - start
+    print(f"  10M valores en {elapsed:.2f}s")
+    assert len(noisy) == len(values) and noisy.dtype == np.float64
+    assert elapsed < 10
+    print("✓ 10M valores en una sola pasada vectorizada")
+
+
+if __name__ == "__main__":
+    test_mechanisms_have_expected_scale()
+    test_clamping_nulls_and_chunking()
+    test_accountant_enforces_budget()
+    test_ten_million_values_single_pass()
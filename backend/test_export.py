@@ -0,0 +1,115 @@
+"""
+Test de la exportación por streaming de resultados (NDJSON, CSV y Parquet).
+"""
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from export import ReleasingStream, export_stream
+from ingestion import SchemaTracker, chunk_to_records
+
+
+def _result(n=2500, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "edad": pd.Series(rng.choice(["18-30", "30-45", "45-90"], n)),
+        "cp": pd.Series(rng.integers(28000, 29000, n)).astype(object),
+        "salario": rng.normal(30000, 5000, n).round(2),
+        "hijos": pd.Series(rng.integers(0, 4, n), dtype="Int64"),
+    })
+    df.loc[7, "cp"] = "*"
+    df.loc[::11, "hijos"] = pd.NA
+    return df
+
+
+def _batches(df, size):
+    # Mismo formato que `Database.iter_jsonb_array`: texto JSON de cada fila, por lotes
+    rows = [json.dumps(row, default=str) for row in chunk_to_records(df)]
+    return (rows[start:start + size] for start in range(0, len(rows), size))
+
+
+def _schema(df):
+    tracker = SchemaTracker()
+    tracker.update(df)
+    return tracker.to_dict()
+
+
+def test_text_formats_stream_by_batch():
+    print("\n" + "="*80)
+    print("TEST: EXPORTACIÓN POR STREAMING")
+    print("="*80)
+
+    df = _result()
+    parts = list(export_stream("ndjson", _batches(df, 1000)))
+    assert len(parts) == 3
+    lines = b"".join(parts).decode("utf-8").splitlines()
+    assert len(lines) == len(df) and json.loads(lines[7])["cp"] == "*"
+
+    csv = b"".join(export_stream("csv", _batches(df, 700))).decode("utf-8")
+    read = pd.read_csv(io.StringIO(csv), dtype=str, keep_default_na=False)
+    assert list(read.columns) == list(df.columns) and len(read) == len(df)
+    assert read.loc[7, "cp"] == "*" and read.loc[0, "hijos"] == ""
+
+    # Proyección de columnas y resultado vacío
+    projected = b"".join(export_stream("ndjson", _batches(df, 1000), columns=["salario"])).decode("utf-8")
+    assert set(json.loads(projected.splitlines()[0])) == {"salario"}
+    assert b"".join(export_stream("csv", iter([]), columns=["edad", "cp"])).decode("utf-8").strip() == "edad,cp"
+    print("✓ NDJSON y CSV se escriben lote a lote")
+
+
+def test_parquet_keeps_result_types():
+    df = _result()
+    parts = list(export_stream("parquet", _batches(df, 1000), _schema(df)))
+    # Un grupo de filas por lote, más el pie del archivo
+    assert len(parts) == 4 and all(parts[:3])
+    table = pq.read_table(io.BytesIO(b"".join(parts)))
+    assert pq.ParquetFile(io.BytesIO(b"".join(parts))).metadata.num_row_groups == 3
+
+    exported = table.to_pandas()
+    assert len(exported) == len(df)
+    assert str(table.schema.field("hijos").type) == "int64" and exported["hijos"].isna().sum() == df["hijos"].isna().sum()
+    assert str(table.schema.field("salario").type) == "double"
+    assert np.allclose(exported["salario"], df["salario"])
+    # Columnas con valores mezclados (números y "*") se exportan como texto
+    assert exported.loc[7, "cp"] == "*" and exported.loc[0, "cp"] == str(df.loc[0, "cp"])
+
+    # Sin esquema (resultados anteriores), todo como texto
+    legacy = pq.read_table(io.BytesIO(b"".join(export_stream("parquet", _batches(df, 1000)))))
+    assert all(str(field.type) == "string" for field in legacy.schema)
+    print("✓ Parquet por grupos de filas con los tipos del resultado")
+
+
+def test_releasing_stream_releases_once():
+    released = []
+    # Leída hasta el final
+    stream = ReleasingStream(export_stream("ndjson", _batches(_result(30), 10)), lambda: released.append(1))
+    assert len(b"".join(stream).splitlines()) == 30
+    assert released == [1]
+
+    # Cerrada a medias (el cliente se desconecta) y descartada sin empezar
+    stream = ReleasingStream(export_stream("ndjson", _batches(_result(30), 10)), lambda: released.append(2))
+    next(stream)
+    stream.close()
+    stream.close()
+    ReleasingStream(iter([b"x"]), lambda: released.append(3))
+    assert released == [1, 2, 3]
+
+    # Un error al generar también libera
+    def failing():
+        yield b"x"
+        raise RuntimeError("fallo")
+    stream = ReleasingStream(failing(), lambda: released.append(4))
+    try:
+        list(stream)
+    except RuntimeError:
+        pass
+    assert released == [1, 2, 3, 4]
+    print("✓ El hueco de exportación se libera una vez al terminar, cerrar o fallar")
+
+
+if __name__ == "__main__":
+    test_text_formats_stream_by_batch()
+    test_parquet_keeps_result_types()
+    test_releasing_stream_releases_once()
@@ -0,0 +1,61 @@
+"""
+Test de `GET /api/results/{id}/export` (a través de la API, con la base de
+datos en memoria de `api_testing`).
+"""
+import io
+import json
+
+import pandas as pd
+from api_testing import client, create_config, main, process, result_rows, upload_dataset
+
+
+def test_export_streams_result():
+    print("\n" + "="*80)
+    print("TEST: API - EXPORTACIÓN")
+    print("="*80)
+
+    dataset = upload_dataset(seed=6)
+    _, _, job = process(dataset["id"], create_config(dataset["id"], seed=2)["id"])
+    rows = result_rows(job["id"])
+
+    ndjson = client.get(f"/api/results/{job['id']}/export", params={"format": "ndjson"})
+    assert ndjson.status_code == 200 and ndjson.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == rows
+
+    csv = client.get(f"/api/results/{job['id']}/export", params={"format": "csv", "columns": "edad,salario"})
+    exported = pd.read_csv(io.StringIO(csv.text), dtype=str)
+    assert list(exported.columns) == ["edad", "salario"] and len(exported) == len(rows)
+
+    assert client.get(f"/api/results/{job['id']}/export", params={"format": "xml"}).status_code == 400
+    print("✓ Exportación del resultado por streaming")
+
+
+def test_concurrent_exports_are_capped():
+    dataset = upload_dataset(seed=8)
+    _, _, job = process(dataset["id"], create_config(dataset["id"], seed=3)["id"])
+
+    # Sin huecos libres se rechaza la exportación en lugar de esperar por una conexión del pool
+    held = 0
+    while main.export_slots.acquire(blocking=False):
+        held += 1
+    try:
+        response = client.get(f"/api/results/{job['id']}/export")
+        assert response.status_code == 503 and response.headers["retry-after"] == "5"
+    finally:
+        for _ in range(held):
+            main.export_slots.release()
+
+    # Cada descarga terminada devuelve su hueco
+    for _ in range(held + 2):
+        assert client.get(f"/api/results/{job['id']}/export").status_code == 200
+    assert client.get(f"/api/results/{job['id']}/export", params={"format": "xml"}).status_code == 400
+    acquired = [main.export_slots.acquire(blocking=False) for _ in range(held)]
+    for _ in range(sum(acquired)):
+        main.export_slots.release()
+    assert all(acquired)
+    print("✓ Exportaciones simultáneas limitadas y huecos liberados al terminar")
+
+
+if __name__ == "__main__":
+    test_export_streams_result()
+    test_concurrent_exports_are_capped()
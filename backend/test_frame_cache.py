@@ -0,0 +1,91 @@
+"""
+Test de la caché en memoria de DataFrames decodificados.
+"""
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from frame_cache import FrameCache
+from storage import StorageManager
+
+
+def _sample(n=20000, seed=4):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "edad": rng.integers(18, 90, n),
+        "ciudad": rng.choice(["Madrid", "Toledo", "Sevilla"], n),
+        "salario": rng.normal(30000, 5000, n).round(2),
+    })
+
+
+def test_storage_serves_decoded_columns_from_cache():
+    print("\n" + "="*80)
+    print("TEST: CACHÉ DE DATAFRAMES DECODIFICADOS")
+    print("="*80)
+
+    df = _sample()
+    root = tempfile.mkdtemp()
+    try:
+        storage = StorageManager(None, {"backend": "parquet", "path": root, "frame_cache_mb": 64})
+        store = storage.default()
+        for index, start in enumerate(range(0, len(df), 5000)):
+            store.write_chunk("ds-1", index, start, df.iloc[start:start + 5000])
+        dataset = {"id": "ds-1", "storage_format": "parquet", "storage_path": store.storage_path("ds-1"),
+                   "updated_at": "2024-01-01T00:00:00"}
+
+        partial = storage.load(dataset, columns=["edad"])
+        assert partial.equals(df[["edad"]])
+        full = storage.load(dataset)
+        pd.testing.assert_frame_equal(full, df)
+        assert storage.frame_cache.stats()["misses"] == 2
+
+        # Sin los archivos, la misma versión se sirve entera desde memoria
+        shutil.rmtree(store.storage_path("ds-1"))
+        again = storage.load(dataset, columns=["salario", "edad"])
+        pd.testing.assert_frame_equal(again, df[["salario", "edad"]])
+        pd.testing.assert_frame_equal(storage.load(dataset), df)
+        stats = storage.frame_cache.stats()
+        assert stats["hits"] == 2 and stats["entries"] == 1 and stats["bytes"] > 0
+
+        # Modificar lo devuelto no altera la caché
+        again.loc[0, "edad"] = -1
+        assert storage.load(dataset, columns=["edad"]).loc[0, "edad"] == df.loc[0, "edad"]
+
+        # Otra versión del dataset deja obsoleta la entrada
+        changed = {**dataset, "updated_at": "2024-02-01T00:00:00"}
+        assert storage.load(changed).empty
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print("✓ Las columnas decodificadas se reutilizan mientras no cambie updated_at")
+
+
+def test_memory_budget_evicts_least_recently_used():
+    df = _sample(5000)
+    size = int(df.memory_usage(deep=True, index=False).sum())
+    cache = FrameCache(max_bytes=int(size * 2.5))
+
+    for name in ("a", "b"):
+        cache.store(name, "v1", df, complete=True)
+    # Usar "a" la convierte en la más reciente: la siguiente expulsa "b"
+    assert cache.lookup("a", "v1", None)[1] == []
+    cache.store("c", "v1", df, complete=True)
+    assert cache.lookup("b", "v1", None)[1] is None
+    assert cache.lookup("a", "v1", ["edad"])[1] == []
+
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1 and stats["bytes"] <= cache.max_bytes
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+    # Lo que no cabe en el presupuesto no se guarda, y la invalidación libera la memoria
+    small = FrameCache(max_bytes=size // 2)
+    small.store("grande", "v1", df, complete=True)
+    assert small.stats()["entries"] == 0
+    assert cache.invalidate("a") == 1 and cache.invalidate() == 1
+    assert cache.stats()["bytes"] == 0
+    print("✓ Presupuesto de memoria con expulsión LRU y contadores")
+
+
+if __name__ == "__main__":
+    test_storage_serves_decoded_columns_from_cache()
+    test_memory_budget_evicts_least_recently_used()
@@ -0,0 +1,136 @@
+"""
+Test de jerarquías de generalización y búsqueda en el retículo.
+"""
+import time
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from hierarchies import Hierarchy, LatticeSearch, lattice_anonymize
+
+
+SPECS = {
+    "codigo_postal": {"type": "mask", "levels": 3},
+    "edad": {"type": "intervals", "widths": [5, 10, 20]},
+    "ciudad": {"type": "mapping", "levels": [
+        {"Madrid": "Centro", "Toledo": "Centro", "Sevilla": "Sur", "Cádiz": "Sur"},
+    ]},
+}
+
+
+def _sample(n=3000, seed=5):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "codigo_postal": rng.integers(28000, 28300, n).astype(str),
+        "edad": rng.integers(18, 80, n),
+        "ciudad": rng.choice(["Madrid", "Toledo", "Sevilla", "Cádiz"], n),
+        "sexo": rng.choice(["H", "M"], n),
+    })
+
+
+def test_hierarchy_levels():
+    print("\n" + "="*80)
+    print("TEST: JERARQUÍAS DE GENERALIZACIÓN")
+    print("="*80)
+
+    zipcodes = Hierarchy.from_spec(pd.Series(["10001", "10002", "10115"]), {"type": "mask", "levels": 2})
+    assert [list(zipcodes.generalize(l)) for l in range(zipcodes.height + 1)] == [
+        ["10001", "10002", "10115"], ["1000*", "1000*", "1011*"], ["100**", "100**", "101**"], ["*", "*", "*"]
+    ]
+    ages = Hierarchy.from_spec(pd.Series([37, 12]), SPECS["edad"])
+    assert list(ages.generalize(2)) == ["30-40", "10-20"]
+    print("✓ Niveles de máscara e intervalos correctos, siempre terminan en '*'")
+
+    try:
+        # 1 y 4 comparten el intervalo 0-5 pero caerían en 0-3 y 3-6 en el nivel siguiente
+        Hierarchy.from_spec(pd.Series([1, 4]), {"type": "intervals", "widths": [5, 3]})
+        assert False, "Jerarquía inconsistente aceptada"
+    except ValueError:
+        print("✓ Jerarquías inconsistentes rechazadas")
+
+
+def test_lattice_finds_least_lossy_node():
+    df = _sample()
+    qis = ["codigo_postal", "edad", "ciudad", "sexo"]
+    k = 10
+    hierarchies = [Hierarchy.from_spec(df[col], SPECS.get(col)) for col in qis]
+    result = LatticeSearch(hierarchies, k).search()
+
+    # Fuerza bruta: reagrupar el DataFrame completo en cada nodo
+    best = None
+    for node in product(*[range(h.height + 1) for h in hierarchies]):
+        codes = pd.DataFrame({j: h.level_codes(level) for j, (h, level) in enumerate(zip(hierarchies, node))})
+        if codes.groupby(list(codes.columns)).size().min() >= k:
+            loss = np.mean([h.loss(level) for h, level in zip(hierarchies, node)])
+            best = min(best or (loss, node), (loss, node))
+    assert result["node"] == best[1]
+    assert result["nodes_evaluated"] < np.prod([h.height + 1 for h in hierarchies])
+    print(f"✓ Nodo óptimo {result['node']} evaluando {result['nodes_evaluated']} nodos")
+
+    anonymized, summary = lattice_anonymize(df, qis, k, SPECS)
+    assert anonymized.groupby(qis, observed=True).size().min() >= k
+    assert summary["levels"] == dict(zip(qis, best[1]))
+
+
+def test_suppression_budget():
+    df = _sample(500)
+    qis = ["codigo_postal", "edad"]
+    strict, strict_summary = lattice_anonymize(df, qis, 5, SPECS)
+    relaxed, relaxed_summary = lattice_anonymize(df, qis, 5, SPECS, max_suppression=0.05)
+    assert relaxed_summary["loss"] <= strict_summary["loss"]
+    assert relaxed_summary["suppressed_rows"] <= 25
+    assert len(relaxed) == len(df) - relaxed_summary["suppressed_rows"]
+    assert relaxed.groupby(qis, observed=True).size().min() >= 5
+    print("✓ Con presupuesto de supresión se elige un nodo menos generalizado")
+
+
+def test_suppressed_rows_do_not_form_a_small_class():
+    # Dos valores atípicos: suprimirlos es más barato que generalizar a todos
+    df = pd.DataFrame({
+        "edad": [30] * 10 + [40] * 10 + [70, 95],
+        "sexo": ["H", "M"] * 11,
+    })
+    df.loc[[20, 21], "sexo"] = ["H", "M"]
+    qis = ["edad", "sexo"]
+    anonymized, summary = lattice_anonymize(df, ["edad", "sexo"], 5, {"edad": SPECS["edad"]}, max_suppression=0.1)
+    assert summary["suppressed_rows"] == 2
+    assert anonymized.groupby(qis, observed=True).size().min() >= 5
+    assert not anonymized.index.isin([20, 21]).any()
+    print("✓ Las filas suprimidas se eliminan y el k logrado alcanza el objetivo")
+
+
+def test_oversized_lattice_rejected_before_enumerating():
+    df = _sample(50)
+    # 4^20 nodos: enumerarlos antes de comprobar el tamaño no terminaría
+    hierarchies = [Hierarchy.from_spec(df["edad"], SPECS["edad"]) for _ in range(20)]
+    start = time.perf_counter()
+    try:
+        LatticeSearch(hierarchies, 5).search()
+        raise AssertionError("El retículo debería rechazarse")
+    except ValueError:
+        pass
+    assert time.perf_counter() - start < 1.0
+    print("✓ Un retículo demasiado grande se rechaza sin enumerar sus nodos")
+
+
+def test_unreachable_k_suppresses_and_flags():
+    # Menos filas que k: ningún nodo cumple y la generalización completa tampoco
+    df = _sample(4)
+    qis = ["edad", "sexo"]
+    anonymized, summary = lattice_anonymize(df, qis, 5, SPECS)
+    assert summary["suppression_limit_exceeded"] is True
+    assert summary["suppressed_rows"] == 4 and len(anonymized) == 0
+    assert summary["levels"] == {"edad": 4, "sexo": 1}
+
+    _, reachable = lattice_anonymize(_sample(500), qis, 5, SPECS)
+    assert reachable["suppression_limit_exceeded"] is False
+    print("✓ Si ningún nodo cumple k las filas se suprimen y se indica en el resumen")
+
+
+if __name__ == "__main__":
+    test_hierarchy_levels()
+    test_lattice_finds_least_lossy_node()
+    test_suppression_budget()
+    test_suppressed_rows_do_not_form_a_small_class()
+    test_oversized_lattice_rejected_before_enumerating()
+    test_unreachable_k_suppresses_and_flags()
@@ -0,0 +1,244 @@
+"""
+Test de la re-anonimización incremental (huellas, plan e instantáneas).
+"""
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+from incremental import (
+    SnapshotStore,
+    column_fingerprints,
+    extend_classes,
+    global_fingerprint,
+    plan_append,
+    plan_changes,
+    split_details,
+)
+from privacy_metrics import class_table
+
+
+def _config(techniques=None, **global_params):
+    return {
+        "column_mappings": [
+            {"column": "dni", "type": "identifier"},
+            {"column": "edad", "type": "quasi-identifier"},
+            {"column": "diagnostico", "type": "sensitive"},
+        ],
+        "techniques": techniques if techniques is not None else [
+            {"column": "edad", "technique": "generalization", "params": {"bins": 5}},
+            {"column": "salario", "technique": "differential_privacy", "params": {"epsilon": 1.0}},
+        ],
+        "global_params": {"k": 3, "seed": 42, **global_params},
+    }
+
+
+COLUMNS = ["dni", "edad", "diagnostico", "salario"]
+
+
+def _manifest(config):
+    return {
+        "result_id": "r-1",
+        "fingerprints": column_fingerprints(config, COLUMNS),
+        "global": global_fingerprint(config),
+        "stage1_columns": ["edad", "diagnostico", "salario"],
+        "dropped_columns": ["dni"],
+    }
+
+
+def test_plan_recomputes_only_changed_columns():
+    print("\n" + "="*80)
+    print("TEST: PLAN DE RE-ANONIMIZACIÓN INCREMENTAL")
+    print("="*80)
+
+    base = _config()
+    manifest = _manifest(base)
+    same = plan_changes(manifest, column_fingerprints(base, COLUMNS), global_fingerprint(base))
+    assert same.recompute == [] and len(same.reuse) == 4 and not same.global_changed
+
+    # Cambiar ε sólo afecta a su columna
+    changed = _config(techniques=[
+        {"column": "edad", "technique": "generalization", "params": {"bins": 5}},
+        {"column": "salario", "technique": "differential_privacy", "params": {"epsilon": 0.5}},
+    ])
+    plan = plan_changes(manifest, column_fingerprints(changed, COLUMNS), global_fingerprint(changed))
+    assert plan.recompute == ["salario"] and not plan.global_changed
+    assert plan.to_dict()["base_result_id"] == "r-1"
+
+    # La semilla sólo cuenta en las columnas con técnicas aleatorias
+    reseeded = _config(seed=7)
+    plan = plan_changes(manifest, column_fingerprints(reseeded, COLUMNS), global_fingerprint(reseeded))
+    assert plan.recompute == ["salario"]
+
+    # k forma parte de los pasos globales, no de las columnas
+    stricter = _config(k=5)
+    plan = plan_changes(manifest, column_fingerprints(stricter, COLUMNS), global_fingerprint(stricter))
+    assert plan.recompute == [] and plan.global_changed
+
+    # Sin salida guardada (columna nueva) hay que calcularla
+    plan = plan_changes({**manifest, "stage1_columns": ["edad", "diagnostico"]},
+                        column_fingerprints(base, COLUMNS), global_fingerprint(base))
+    assert plan.recompute == ["salario"]
+    print("✓ Sólo se recalculan las columnas cuya huella cambió")
+
+
+def test_snapshot_round_trip():
+    rng = np.random.default_rng(8)
+    stage1 = pd.DataFrame({
+        "edad": pd.Series(rng.integers(18, 90, 1000)).astype(object),
+        "diagnostico": rng.choice(["A", "B", "C"], 1000),
+        "salario": rng.normal(30000, 5000, 1000),
+    })
+    stage1.loc[3, "edad"] = "*"
+    final = stage1[["edad", "diagnostico"]].drop(index=[5, 7])
+
+    root = tempfile.mkdtemp()
+    try:
+        store = SnapshotStore(root)
+        assert store.latest("ds-1") is None
+        store.save("ds-1", {"result_id": "r-1", "seed": 42}, stage1, final)
+        store.save("ds-1", {"result_id": "r-2", "seed": 42}, stage1, final)
+
+        manifest = store.latest("ds-1")
+        assert manifest["result_id"] == "r-2" and manifest["rows"] == 1000
+        pd.testing.assert_frame_equal(store.load_stage1(manifest, ["salario", "edad"]), stage1[["salario", "edad"]])
+        pd.testing.assert_frame_equal(store.load_final(manifest), final)
+        assert store.load_stage1(manifest, []).index.equals(stage1.index)
+
+        store.delete("ds-1")
+        assert store.latest("ds-1") is None
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print("✓ La instantánea conserva tipos mixtos y el índice de las filas que quedan")
+
+
+def test_split_details():
+    details = {
+        "identifier_dni": {"technique": "Supresión de Identificadores"},
+        "generalization_edad": {"technique": "Generalización", "column": "edad"},
+        "k_anonymity": {"technique": "k-Anonimato"},
+        "no_changes": {"technique": "Sin Transformaciones"},
+    }
+    split = split_details(details, COLUMNS)
+    assert set(split["columns"]["dni"]) == {"identifier_dni"}
+    assert set(split["columns"]["edad"]) == {"generalization_edad"}
+    assert split["columns"]["salario"] == {}
+    assert set(split["global"]) == {"k_anonymity"}
+    print("✓ Detalles separados por columna y pasos globales")
+
+
+def _segment(index, row_offset, row_count, content_hash):
+    return {"index": index, "row_offset": row_offset, "row_count": row_count, "content_hash": content_hash}
+
+
+def test_plan_append_only_new_segments():
+    config = _config()
+    manifest = {**_manifest(config), "content_hash": "h1", "rows": 1000}
+    segments = [_segment(0, 0, 1000, "h0"), _segment(1, 1000, 200, "h1"), _segment(2, 1200, 50, "h2")]
+    fingerprints, global_fp = column_fingerprints(config, COLUMNS), global_fingerprint(config)
+
+    # La instantánea cubre los dos primeros segmentos... pero con 1000 filas, no 1200
+    assert plan_append(manifest, segments, fingerprints, global_fp) is None
+    plan = plan_append({**manifest, "rows": 1200}, segments, fingerprints, global_fp)
+    assert (plan.offset, plan.rows, plan.segments) == (1200, 50, [2])
+    assert plan.to_dict()["mode"] == "append"
+
+    # Sin segmentos nuevos, con otro contenido o con otra configuración no hay plan de segmentos
+    assert plan_append({**manifest, "content_hash": "h2"}, segments, fingerprints, global_fp) is None
+    assert plan_append({**manifest, "content_hash": "otro"}, segments, fingerprints, global_fp) is None
+    stricter = _config(k=5)
+    assert plan_append({**manifest, "rows": 1200}, segments, fingerprints, global_fingerprint(stricter)) is None
+    print("✓ Sólo se procesan los segmentos posteriores a la instantánea")
+
+
+def test_extend_classes_publishes_only_safe_rows():
+    published = pd.DataFrame({
+        "edad": ["20-30"] * 3 + ["30-40"] * 2,
+        "diagnostico": ["A", "B", "A", "A", "B"],
+    })
+    classes = class_table(published, ["edad"], "diagnostico")
+    delta = pd.DataFrame({
+        "edad": ["20-30", "30-40", "40-50", "40-50", "*"],
+        "diagnostico": ["C", "C", "A", "A", "B"],
+    }, index=pd.RangeIndex(5, 10))
+
+    publish = extend_classes(delta, ["edad"], "diagnostico", classes, k=3, l=2)
+    # 40-50 sólo tendría dos filas con un único diagnóstico y "*" una sola fila: ninguna cumple k
+    assert publish.tolist() == [True, True, False, False, False]
+    assert publish.index.equals(delta.index)
+    assert extend_classes(delta, ["edad"], "diagnostico", classes, k=2, l=1).tolist() == [True] * 4 + [False]
+    print("✓ Las filas nuevas sólo se publican en clases que siguen cumpliendo k y l")
+
+
+def test_snapshot_extend_appends_parts():
+    stage1 = pd.DataFrame({"edad": ["20-30", "30-40", "20-30"], "salario": [1.0, 2.0, 3.0]})
+    final = stage1[["edad"]].drop(index=[1])
+    delta = pd.DataFrame({"edad": ["30-40", "*"], "salario": [4.0, 5.0]}, index=pd.RangeIndex(3, 5))
+
+    root = tempfile.mkdtemp()
+    try:
+        store = SnapshotStore(root)
+        store.save("ds-1", {"result_id": "r-1"}, stage1, final, class_table(final, ["edad"], None))
+        base = store.latest("ds-1")
+        merged = class_table(pd.concat([final, delta[["edad"]]]), ["edad"], None)
+        store.extend("ds-1", {"result_id": "r-2"}, base, delta, delta[["edad"]], merged)
+
+        manifest = store.latest("ds-1")
+        assert manifest["result_id"] == "r-2" and manifest["rows"] == 5
+        assert store.load_stage1(manifest, ["salario"])["salario"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+        output = store.load_output(manifest)
+        assert output.index.tolist() == [0, 2, 3, 4]
+        assert output["edad"].tolist() == ["20-30", "20-30", "30-40", "*"]
+        assert store.load_classes(manifest)["_rows"].sum() == 4
+        # La ejecución anterior se borra: sus partes siguen enlazadas desde la nueva
+        assert len(os.listdir(os.path.join(root, "ds-1"))) == 2
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print("✓ La instantánea ampliada enlaza las partes anteriores y añade las nuevas")
+
+
+def test_snapshot_kept_while_a_job_reads_it():
+    stage1 = pd.DataFrame({"edad": ["20-30", "30-40", "20-30"], "salario": [1.0, 2.0, 3.0]})
+    final = stage1[["edad"]]
+
+    root = tempfile.mkdtemp()
+    try:
+        store = SnapshotStore(root)
+        store.save("ds-1", {"result_id": "r-1"}, stage1, final)
+        held = store.acquire("ds-1")
+
+        # Otro trabajo guarda una ejecución más reciente mientras la primera se está leyendo
+        store.save("ds-1", {"result_id": "r-2"}, stage1, final)
+        assert store.latest("ds-1")["result_id"] == "r-2"
+        pd.testing.assert_frame_equal(store.load_output(held), stage1)
+
+        store.release(held)
+        assert not os.path.exists(held["path"])
+        assert store.latest("ds-1")["result_id"] == "r-2"
+
+        # Escrituras concurrentes: siempre queda una única ejecución completa y ningún puntero temporal
+        threads = [threading.Thread(target=store.save, args=("ds-1", {"result_id": f"r-{3 + i}"}, stage1, final))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        manifest = store.latest("ds-1")
+        pd.testing.assert_frame_equal(store.load_output(manifest), stage1)
+        assert sorted(os.listdir(os.path.join(root, "ds-1"))) == sorted(["latest.json",
+                                                                          os.path.basename(manifest["path"])])
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print("✓ Una instantánea en uso no se borra hasta soltarla")
+
+
+if __name__ == "__main__":
+    test_plan_recomputes_only_changed_columns()
+    test_snapshot_round_trip()
+    test_split_details()
+    test_plan_append_only_new_segments()
+    test_extend_classes_publishes_only_safe_rows()
+    test_snapshot_extend_appends_parts()
+    test_snapshot_kept_while_a_job_reads_it()
@@ -0,0 +1,43 @@
+"""
+Test de la re-anonimización incremental desde la instantánea anterior (a
+través de la API, con la base de datos en memoria de `api_testing`).
+"""
+import numpy as np
+import pandas as pd
+from api_testing import create_config, process, result_rows, upload_dataset
+
+
+def test_incremental_rerun_recomputes_changed_columns():
+    print("\n" + "="*80)
+    print("TEST: API - RE-ANONIMIZACIÓN INCREMENTAL")
+    print("="*80)
+
+    dataset = upload_dataset(seed=3)
+    _, _, first = process(dataset["id"], create_config(dataset["id"], seed=9)["id"])
+    # Sólo cambia el epsilon de `salario`: el resto de columnas sale de la instantánea
+    _, _, second = process(dataset["id"], create_config(dataset["id"], epsilon=0.5, seed=9)["id"])
+
+    incremental = second["metrics"]["incremental"]
+    assert incremental["base_result_id"] == first["id"]
+    assert incremental["recomputed_columns"] == ["salario"] and incremental["reused_columns"] >= 2
+    before, after = pd.DataFrame(result_rows(first["id"])), pd.DataFrame(result_rows(second["id"]))
+    assert before[["edad", "ciudad"]].equals(after[["edad", "ciudad"]])
+    assert not before["salario"].equals(after["salario"])
+    print("✓ La re-ejecución incremental sólo recalcula la columna cambiada")
+
+
+def test_unseeded_runs_without_cache_get_fresh_noise():
+    dataset = upload_dataset(seed=7)
+    config = create_config(dataset["id"])
+    _, _, first = process(dataset["id"], config["id"], use_cache=False)
+    _, _, second = process(dataset["id"], config["id"], use_cache=False)
+
+    # La semilla de la instantánea no se reutiliza si se pidió recalcular
+    before, after = pd.DataFrame(result_rows(first["id"])), pd.DataFrame(result_rows(second["id"]))
+    assert len(before) == len(after) and not np.allclose(before["salario"], after["salario"])
+    print("✓ Sin semilla y sin caché cada ejecución usa ruido nuevo")
+
+
+if __name__ == "__main__":
+    test_incremental_rerun_recomputes_changed_columns()
+    test_unseeded_runs_without_cache_get_fresh_noise()
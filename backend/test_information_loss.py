@@ -0,0 +1,72 @@
+"""
+Test de las métricas de pérdida de información (NCP, discernibilidad, entropía).
+"""
+import numpy as np
+import pandas as pd
+from information_loss import column_ncp, column_statistics, compute_information_loss, merge_information_loss
+from techniques import apply_pseudonymization, generalize_numeric
+
+
+def _sample(n=2000, seed=4):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "edad": rng.integers(20, 60, n),
+        "ciudad": rng.choice(["Madrid", "Toledo", "Sevilla", "Cádiz"], n),
+        "email": [f"usuario{i}@email.com" for i in range(n)],
+    })
+
+
+def test_numeric_ncp_from_interval_labels():
+    print("\n" + "="*80)
+    print("TEST: PÉRDIDA DE INFORMACIÓN")
+    print("="*80)
+
+    df = _sample()
+    stats = column_statistics(df)
+    generalized = generalize_numeric(df["edad"], 4)
+    # Cuatro intervalos de igual ancho: cada fila pierde 1/4 del rango
+    assert abs(column_ncp(df["edad"], generalized, stats["edad"]) - 0.25) < 0.01
+    assert column_ncp(df["edad"], df["edad"], stats["edad"]) == 0.0
+    suppressed = pd.Series(["*"] * len(df))
+    assert column_ncp(df["edad"], suppressed, stats["edad"]) == 1.0
+    print("✓ NCP numérico calculado desde las etiquetas de intervalo")
+
+
+def test_categorical_ncp_and_entropy():
+    df = _sample()
+    stats = column_statistics(df)
+    regions = df["ciudad"].map({"Madrid": "Centro", "Toledo": "Centro", "Sevilla": "Sur", "Cádiz": "Sur"})
+    # Cada región agrupa 2 de las 4 ciudades: (2 - 1) / (4 - 1)
+    assert abs(column_ncp(df["ciudad"], regions, stats["ciudad"]) - 1 / 3) < 1e-9
+
+    anonymized = df.assign(ciudad=regions, email=apply_pseudonymization(df["email"]))
+    result = compute_information_loss(df, anonymized, list(df.columns) + ["dni"], stats, ["edad", "ciudad"])
+    assert result["columns"]["email"]["ncp"] == 0.0
+    assert result["columns"]["email"]["entropy_loss"] == 0.0
+    assert 0.45 < result["columns"]["ciudad"]["entropy_loss"] < 0.55
+    assert result["columns"]["dni"] == {"ncp": 1.0, "entropy_loss": 1.0}
+    sizes = anonymized.groupby(["edad", "ciudad"]).size()
+    assert result["discernibility"] == float((sizes ** 2).sum())
+    print("✓ NCP categórico, pérdida por entropía y discernibilidad")
+
+
+def test_merged_loss_of_appended_rows():
+    df = _sample()
+    stats = column_statistics(df)
+    anonymized = df.assign(edad=generalize_numeric(df["edad"], 4).astype(object))
+    expected = compute_information_loss(df, anonymized, list(df.columns), stats, ["edad"])
+
+    base = compute_information_loss(df.iloc[:1500], anonymized.iloc[:1500], list(df.columns), stats, ["edad"])
+    delta = compute_information_loss(df.iloc[1500:], anonymized.iloc[1500:], list(df.columns), stats, ["edad"])
+    sizes = anonymized.groupby("edad").size().to_numpy()
+    merged = merge_information_loss(base["columns"], 1500, delta["columns"], 500, len(df), sizes)
+    assert abs(merged["columns"]["edad"]["ncp"] - expected["columns"]["edad"]["ncp"]) < 1e-3
+    assert merged["discernibility"] == expected["discernibility"]
+    assert merged["normalized_discernibility"] == expected["normalized_discernibility"]
+    print("✓ Pérdida combinada de las filas añadidas ponderada por filas")
+
+
+if __name__ == "__main__":
+    test_numeric_ncp_from_interval_labels()
+    test_categorical_ncp_and_entropy()
+    test_merged_loss_of_appended_rows()
@@ -0,0 +1,76 @@
+"""
+Test de la cola de trabajos de `/api/process` y del estado en `/api/jobs/{id}`
+(a través de la API, con la base de datos en memoria de `api_testing`).
+"""
+import io
+
+from api_testing import FAKE_DB, client, create_config, csv_bytes, main, process, result_rows, upload_dataset, wait_for_job
+
+
+def test_process_queues_job():
+    print("\n" + "="*80)
+    print("TEST: API - COLA DE TRABAJOS")
+    print("="*80)
+
+    dataset = upload_dataset(seed=12)
+    config = create_config(dataset["id"], seed=11)
+    response = client.post("/api/process", json={"dataset_id": dataset["id"], "config_id": config["id"]})
+    queued = response.json()
+    assert response.status_code == 202 and queued["cached"] is False
+    assert queued["status"] in ("pending", "running", "completed") and queued["stage"]
+
+    job = wait_for_job(queued["id"])
+    assert job["result_id"] == queued["id"] and job["progress"] == 100 and job["stage"] == "completed"
+    metrics = job["metrics"]
+    assert metrics["original_rows"] == 120 and metrics["k_anonymity"] >= 3
+    rows = result_rows(job["id"])
+    assert len(rows) == metrics["anonymized_rows"] and "nombre" not in rows[0]
+    assert client.get("/api/jobs/00000000-0000-0000-0000-000000000000").status_code == 404
+    print("✓ /api/process encola el trabajo (202) y su estado se consulta en /api/jobs")
+
+
+def test_process_requires_a_ready_dataset():
+    dataset = upload_dataset(seed=10)
+    config = create_config(dataset["id"], seed=1)
+    for status in ("uploading", "appending"):
+        FAKE_DB.update("datasets", {"status": status}, {"id": dataset["id"]})
+        response = client.post("/api/process", json={"dataset_id": dataset["id"], "config_id": config["id"]})
+        assert response.status_code == 409 and status in response.json()["detail"]
+    FAKE_DB.update("datasets", {"status": "ready"}, {"id": dataset["id"]})
+    print("✓ Sólo se procesan datasets listos")
+
+
+def test_job_reads_the_current_dataset():
+    dataset = upload_dataset(n=100, seed=11)
+    config = create_config(dataset["id"], seed=2)
+    process(dataset["id"], config["id"])
+
+    # Filas añadidas mientras el trabajo esperaba en la cola: el dataset encolado ya no es el actual
+    stale = main.select_fields("datasets", main.DATASET_PROCESS_FIELDS, {"id": dataset["id"]})
+    appended = client.post(f"/api/datasets/{dataset['id']}/append",
+                           files={"file": ("nuevas.csv", io.BytesIO(csv_bytes(30, 12, start=100)), "text/csv")})
+    assert appended.status_code == 200, appended.text
+
+    job = FAKE_DB.insert_returning("anonymization_results", {"user_id": "public-user", "dataset_id": dataset["id"],
+                                                             "config_id": config["id"], "status": "pending"})
+    config_row = FAKE_DB.select_one("anonymization_configs", {"id": config["id"]})
+    main.run_anonymization_job(job["id"], stale, config_row, "public-user")
+    finished = client.get(f"/api/jobs/{job['id']}").json()
+    assert finished["status"] == "completed", finished.get("error_message")
+    assert finished["metrics"]["original_rows"] == 130
+    assert finished["metrics"]["incremental"]["appended_rows"] == 30
+
+    # Un dataset que vuelve a estar ocupado hace fallar el trabajo en lugar de leer filas a medias
+    FAKE_DB.update("datasets", {"status": "appending"}, {"id": dataset["id"]})
+    job = FAKE_DB.insert_returning("anonymization_results", {"user_id": "public-user", "dataset_id": dataset["id"],
+                                                             "config_id": config["id"], "status": "pending"})
+    main.run_anonymization_job(job["id"], stale, config_row, "public-user")
+    FAKE_DB.update("datasets", {"status": "ready"}, {"id": dataset["id"]})
+    assert client.get(f"/api/jobs/{job['id']}").json()["status"] == "failed"
+    print("✓ El trabajo usa el dataset actual, no el del momento de encolarlo")
+
+
+if __name__ == "__main__":
+    test_process_queues_job()
+    test_process_requires_a_ready_dataset()
+    test_job_reads_the_current_dataset()
@@ -0,0 +1,56 @@
+"""
+Test de l-diversidad aplicada: fusión y supresión de grupos que no cumplen.
+"""
+import numpy as np
+import pandas as pd
+from diversity import enforce_l_diversity
+from mondrian import mondrian_anonymize
+
+
+QIS = ["edad", "codigo_postal"]
+
+
+def _sample(n=4000, seed=11):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "edad": rng.integers(18, 90, n),
+        "codigo_postal": rng.integers(28000, 28050, n),
+        "diagnostico": rng.choice(["gripe", "asma", "diabetes", "cáncer"], n, p=[0.8, 0.12, 0.06, 0.02]),
+    })
+    anonymized, _ = mondrian_anonymize(df, QIS, 4)
+    return anonymized
+
+
+def _diversity(df):
+    return df.groupby(QIS, observed=True)["diagnostico"].nunique()
+
+
+def test_merge_reaches_l_and_keeps_k():
+    print("\n" + "="*80)
+    print("TEST: L-DIVERSIDAD APLICADA")
+    print("="*80)
+
+    df = _sample()
+    checked, summary = enforce_l_diversity(df, QIS, "diagnostico", 3, "check")
+    assert checked is df and summary["violating_classes"] == int((_diversity(df) < 3).sum()) > 0
+
+    merged, summary = enforce_l_diversity(df, QIS, "diagnostico", 3, "merge")
+    assert len(merged) == len(df)
+    assert _diversity(merged).min() >= 3
+    assert merged.groupby(QIS, observed=True).size().min() >= 4
+    assert merged["diagnostico"].equals(df["diagnostico"])
+    assert 0 < summary["rows_touched"] < len(df)
+    print(f"✓ Fusión: {summary['classes_touched']} grupos y {summary['rows_touched']} filas afectadas")
+
+
+def test_suppress_drops_violating_classes():
+    df = _sample()
+    suppressed, summary = enforce_l_diversity(df, QIS, "diagnostico", 3, "suppress")
+    assert _diversity(suppressed).min() >= 3
+    assert len(suppressed) == len(df) - summary["rows_touched"]
+    print(f"✓ Supresión: {summary['rows_touched']} filas eliminadas")
+
+
+if __name__ == "__main__":
+    test_merge_reaches_l_and_keeps_k()
+    test_suppress_drops_violating_classes()
@@ -0,0 +1,53 @@
+"""
+Test de los listados paginados por cursor (`GET /api/datasets`): cada página
+trae sólo los metadatos y el cursor de `X-Next-Cursor` recorre todas las
+filas una vez, también cuando varias comparten `created_at`.
+"""
+from datetime import datetime
+
+from api_testing import FAKE_DB, client, upload_dataset
+
+
+def _walk(limit):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/datasets", params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page) <= limit and all("data" not in row for row in page)
+        seen.extend(page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+
+
+def test_dataset_cursor_walk():
+    print("\n" + "="*80)
+    print("TEST: API - LISTADO DE DATASETS POR CURSOR")
+    print("="*80)
+
+    uploaded = [upload_dataset(n=10, seed=30 + i)["id"] for i in range(5)]
+    # Tres datasets con el mismo created_at: el desempate es el id
+    same_time = datetime(2024, 1, 1, 12, 0, 0)
+    for dataset_id in uploaded[1:4]:
+        FAKE_DB.update("datasets", {"created_at": same_time}, {"id": dataset_id})
+
+    full = client.get("/api/datasets").json()
+    seen = _walk(limit=2)
+    ids = [row["id"] for row in seen]
+    assert ids == [row["id"] for row in full]
+    assert len(ids) == len(set(ids)) and set(uploaded) <= set(ids)
+
+    keys = [(row["created_at"], row["id"]) for row in seen]
+    assert keys == sorted(keys, reverse=True)
+    print(f"✓ {len(ids)} datasets recorridos en páginas de 2, sin repetir ni saltar filas")
+
+    assert client.get("/api/datasets", params={"limit": 1000}).headers.get("X-Next-Cursor") is None
+    assert client.get("/api/datasets", params={"cursor": "no-es-un-cursor"}).status_code == 400
+    assert "data" in client.get("/api/datasets", params={"include": "data", "limit": 1}).json()[0]
+    print("✓ Sin cursor en la última página, cursor inválido rechazado y `data` sólo con include")
+
+
+if __name__ == "__main__":
+    test_dataset_cursor_walk()
@@ -0,0 +1,50 @@
+"""
+Test de equivalencia: el enmascaramiento vectorizado debe producir exactamente
+la misma salida que la implementación celda a celda original.
+"""
+import numpy as np
+import pandas as pd
+from techniques import apply_masking, _apply_masking_elementwise
+
+
+EDGE_CASES = [
+    "juan.perez@email.com", "a@b", "@x", "ab@c@d", "a@", "@", "",
+    "612345678", "12345", "Juan Pérez", "Juan  Pérez ", "   ", " a b ", "x\ty z",
+    "Información", "abc", None, np.nan, 12345678, 3.5, True,
+]
+
+
+def _same(a, b):
+    if not a.index.equals(b.index):
+        return False
+    for x, y in zip(a, b):
+        if pd.isna(x) and pd.isna(y):
+            continue
+        if x != y or type(x) != type(y):
+            return False
+    return True
+
+
+def test_vectorized_masking_matches_elementwise():
+    print("\n" + "="*80)
+    print("TEST: ENMASCARAMIENTO VECTORIZADO")
+    print("="*80)
+
+    series = pd.Series(EDGE_CASES * 3, index=[i % 5 for i in range(len(EDGE_CASES) * 3)])
+    for mask_type in ["email", "phone", "middle", "partial", "otro"]:
+        for mask_char in ["*", "#X"]:
+            vectorized = apply_masking(series, mask_type, mask_char)
+            elementwise = _apply_masking_elementwise(series, mask_type, mask_char)
+            assert _same(vectorized, elementwise), f"Diferencia en modo '{mask_type}' con '{mask_char}'"
+            print(f"✓ {mask_type} ({mask_char}): salida idéntica")
+
+
+def test_numeric_phone_column():
+    phones = pd.Series([612345678, 987654321, 55512])
+    assert list(apply_masking(phones, "phone")) == ["612***678", "987***321", "55512"]
+    print("✓ Teléfonos numéricos enmascarados igual que como texto")
+
+
+if __name__ == "__main__":
+    test_vectorized_masking_matches_elementwise()
+    test_numeric_phone_column()
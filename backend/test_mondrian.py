@@ -0,0 +1,81 @@
+"""
+Test del particionado Mondrian para k-anonimato.
+"""
+import numpy as np
+import pandas as pd
+from mondrian import mondrian_anonymize
+
+
+def _sample(n=5000, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "edad": rng.integers(18, 90, n),
+        "codigo_postal": rng.integers(28000, 28100, n),
+        "sexo": rng.choice(["H", "M"], n),
+        "salario": rng.normal(30000, 8000, n).round(2),
+        "diagnostico": rng.choice(["A", "B", "C"], n),
+    })
+    df.loc[::97, "salario"] = np.nan
+    return df
+
+
+def test_every_group_reaches_k():
+    print("\n" + "="*80)
+    print("TEST: K-ANONIMATO CON MONDRIAN")
+    print("="*80)
+
+    df = _sample()
+    qis = ["edad", "codigo_postal", "sexo", "salario"]
+    for k in [2, 5, 25]:
+        result, summary = mondrian_anonymize(df, qis, k)
+        groups = result.groupby(qis, observed=True).size()
+        assert groups.sum() == len(df)
+        assert groups.min() >= k
+        assert summary["min_partition_size"] >= k
+        assert result["diagnostico"].equals(df["diagnostico"])
+        print(f"✓ k={k}: {summary['partition_count']} grupos, NCP={summary['ncp']}")
+
+
+def test_partitions_are_recorded_and_minimal():
+    df = _sample(400)
+    result, summary = mondrian_anonymize(df, ["edad", "sexo"], 3)
+    # Con pocas dimensiones y muchas filas casi todas las edades quedan exactas o en rangos cortos
+    assert summary["ncp"] < 0.1
+    assert len(summary["partitions"]) == min(summary["partition_count"], 100)
+    first = summary["partitions"][0]
+    assert set(first["bounds"]) == {"edad", "sexo"} and first["size"] >= 3
+    print("✓ Particiones registradas con sus rangos y baja pérdida de información")
+
+
+def test_dataset_smaller_than_k():
+    df = _sample(4)
+    result, summary = mondrian_anonymize(df, ["edad", "sexo"], 10)
+    assert summary["partition_count"] == 1
+    assert result["edad"].nunique() == 1
+    print("✓ Con menos filas que k todo queda en un único grupo")
+
+
+def test_nulls_never_get_a_value_range():
+    df = _sample(2000)
+    qis = ["edad", "salario"]
+    result, summary = mondrian_anonymize(df, qis, 10)
+    labels = result["salario"].astype(str)
+    nulls = df["salario"].isna()
+    # Los nulos quedan como "nan" (partición sólo de nulos) o "*" (partición mixta), nunca con un rango de valores
+    assert labels[nulls].isin(["nan", "*"]).all()
+    # En una partición mixta también los valores pasan a "*": nulos y valores siguen en la misma clase
+    mixed = labels == "*"
+    assert mixed.any() and not df.loc[mixed, "salario"].isna().all()
+    assert result.groupby(qis, observed=True).size().min() >= 10
+
+    small = pd.DataFrame({"edad": [20.0, 21.0, np.nan, 22.0]})
+    result, summary = mondrian_anonymize(small, ["edad"], 3)
+    assert result["edad"].astype(str).tolist() == ["*"] * 4 and summary["ncp"] == 1.0
+    print("✓ Los nulos de una partición mixta no reciben el rango de los valores")
+
+
+if __name__ == "__main__":
+    test_every_group_reaches_k()
+    test_partitions_are_recorded_and_minimal()
+    test_dataset_smaller_than_k()
+    test_nulls_never_get_a_value_range()
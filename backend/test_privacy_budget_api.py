@@ -0,0 +1,67 @@
+"""
+Test del presupuesto de privacidad de un dataset (a través de la API, con la
+base de datos en memoria de `api_testing`).
+"""
+import numpy as np
+import pandas as pd
+from api_testing import FAKE_DB, client, create_config, main, process, upload_dataset
+
+
+def test_privacy_budget_change_keeps_dataset_caches():
+    print("\n" + "="*80)
+    print("TEST: API - PRESUPUESTO DE PRIVACIDAD")
+    print("="*80)
+
+    dataset = upload_dataset(seed=9)
+    config = create_config(dataset["id"], seed=6)
+    _, _, first = process(dataset["id"], config["id"])
+    before = FAKE_DB.select_one("datasets", {"id": dataset["id"]})
+
+    response = client.put(f"/api/datasets/{dataset['id']}/privacy-budget", json={"epsilon": 5.0})
+    assert response.status_code == 200 and response.json()["budget_epsilon"] == 5.0
+    after = FAKE_DB.select_one("datasets", {"id": dataset["id"]})
+    assert after["updated_at"] == before["updated_at"]
+
+    # Las columnas decodificadas y el resultado cacheado siguen sirviendo
+    stats = main.storage.frame_cache.stats()
+    main.storage.load(after, columns=["edad", "ciudad"])
+    assert main.storage.frame_cache.stats()["hits"] == stats["hits"] + 1
+    assert main.storage.frame_cache.stats()["misses"] == stats["misses"]
+    status, cached, _ = process(dataset["id"], config["id"])
+    assert status == 200 and cached["result_id"] == first["id"]
+    print("✓ Cambiar el presupuesto no invalida las cachés del dataset")
+
+
+def _dp_config(epsilon, seed):
+    return {
+        "column_mappings": [{"column": "salario", "type": "sensitive"}],
+        "techniques": [{"column": "salario", "technique": "differential_privacy",
+                        "params": {"epsilon": epsilon, "lower": 0, "upper": 100000}}],
+        "global_params": {"seed": seed},
+    }
+
+
+def test_dp_noise_is_not_derived_from_the_published_seed():
+    df = pd.DataFrame({"salario": np.linspace(20000, 40000, 500)})
+    noise = {}
+    for run, epsilon in [("a", 1.0), ("b", 0.5), ("c", 1.0)]:
+        details = {}
+        out = main.apply_column_techniques(df, _dp_config(epsilon, seed=11), details)
+        noise[run] = (out["salario"] - df["salario"]).to_numpy()
+        assert "seed" not in details["differential_privacy_salario"]["params"]
+
+    # Con los mismos uniformes el ruido con epsilon 0.5 sería exactamente el doble que con epsilon 1
+    assert not np.allclose(noise["b"], 2 * noise["a"])
+    assert not np.allclose(noise["a"], noise["c"])
+
+    # La semilla publicada sólo sirve para la supresión
+    dataset = upload_dataset(seed=12)
+    _, _, job = process(dataset["id"], create_config(dataset["id"], seed=13)["id"])
+    details = client.get(f"/api/results/{job['id']}").json()["technique_details"]
+    assert "seed" not in details["differential_privacy_salario"]["params"]
+    print("✓ El ruido de privacidad diferencial no se puede regenerar con la semilla del resultado")
+
+
+if __name__ == "__main__":
+    test_privacy_budget_change_keeps_dataset_caches()
+    test_dp_noise_is_not_derived_from_the_published_seed()
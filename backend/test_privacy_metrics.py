@@ -0,0 +1,80 @@
+"""
+Test del motor de métricas de privacidad frente a un cálculo grupo a grupo.
+"""
+import numpy as np
+import pandas as pd
+from privacy_metrics import CLASS_COUNT_COLUMN, class_table, compute_privacy_metrics, merge_class_tables
+
+
+def _sample(n=6000, seed=2):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "edad": rng.integers(0, 20, n),
+        "sexo": rng.choice(["H", "M"], n),
+        "diagnostico": rng.choice(["A", "B", "C", "D"], n, p=[0.5, 0.3, 0.15, 0.05]),
+        "ingresos": rng.integers(0, 8, n).astype(float),
+    })
+    df.loc[::40, "diagnostico"] = None
+    return df
+
+
+def test_matches_groupwise_reference():
+    print("\n" + "="*80)
+    print("TEST: MÉTRICAS DE PRIVACIDAD EN UNA PASADA")
+    print("="*80)
+
+    df = _sample()
+    qis = ["edad", "sexo"]
+    metrics = compute_privacy_metrics(df, qis, "diagnostico")
+    groups = df.groupby(qis)
+
+    assert metrics["k_anonymity"] == groups.size().min()
+    assert metrics["equivalence_classes"] == groups.ngroups
+    assert sum(metrics["class_size_histogram"].values()) == groups.ngroups
+    assert metrics["l_diversity"] == groups["diagnostico"].nunique().min()
+
+    global_p = df["diagnostico"].value_counts(normalize=True)
+    entropy_l, distance = [], []
+    for _, group in groups:
+        p = group["diagnostico"].value_counts(normalize=True)
+        entropy_l.append(np.exp(-(p * np.log(p)).sum()))
+        distance.append(0.5 * (p.reindex(global_p.index, fill_value=0) - global_p).abs().sum())
+    assert abs(metrics["entropy_l_diversity"] - min(entropy_l)) < 1e-4
+    assert abs(metrics["t_closeness"] - max(distance)) < 1e-4
+    print(f"✓ k={metrics['k_anonymity']}, l={metrics['l_diversity']}, t={metrics['t_closeness']}")
+
+
+def test_ordered_t_closeness_for_numeric_attribute():
+    df = _sample()
+    metrics = compute_privacy_metrics(df, ["edad", "sexo"], "ingresos")
+    global_cdf = df["ingresos"].value_counts(normalize=True).sort_index().cumsum()
+    expected = max(
+        (group["ingresos"].value_counts(normalize=True).reindex(global_cdf.index, fill_value=0).cumsum()
+         - global_cdf).abs().iloc[:-1].sum() / (len(global_cdf) - 1)
+        for _, group in df.groupby(["edad", "sexo"])
+    )
+    assert abs(metrics["t_closeness"] - expected) < 1e-4
+    print("✓ EMD ordenada para atributos numéricos")
+
+
+def test_class_tables_reproduce_row_metrics():
+    df = _sample()
+    qis = ["edad", "sexo"]
+    expected = compute_privacy_metrics(df, qis, "diagnostico")
+
+    # Tablas de clases de dos segmentos combinadas: mismas métricas que sobre todas las filas
+    classes = merge_class_tables(class_table(df.iloc[:2500], qis, "diagnostico"),
+                                 class_table(df.iloc[2500:], qis, "diagnostico"))
+    assert classes[CLASS_COUNT_COLUMN].sum() == len(df)
+    weighted = compute_privacy_metrics(classes, qis, "diagnostico", weights=classes[CLASS_COUNT_COLUMN])
+    for key in ("k_anonymity", "l_diversity", "equivalence_classes", "class_size_histogram"):
+        assert weighted[key] == expected[key], key
+    for key in ("entropy_l_diversity", "t_closeness", "avg_class_size"):
+        assert abs(weighted[key] - expected[key]) < 1e-4, key
+    print("✓ Las tablas de clases combinadas dan las mismas métricas que las filas")
+
+
+if __name__ == "__main__":
+    test_matches_groupwise_reference()
+    test_ordered_t_closeness_for_numeric_attribute()
+    test_class_tables_reproduce_row_metrics()
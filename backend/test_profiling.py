@@ -0,0 +1,110 @@
+"""
+Test del perfil de columnas calculado por bloques durante la subida.
+"""
+import numpy as np
+import pandas as pd
+from information_loss import column_statistics
+from ingestion import ingest_chunks
+from profiling import ColumnProfiler, merge_profiles, numeric_range, profile_dataframe, top_values
+from techniques import generalize_categorical
+
+
+def _sample(n=5000, seed=7):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "edad": rng.integers(18, 90, n).astype(float),
+        "ciudad": rng.choice(["Madrid", "Toledo", "Sevilla", "Cádiz", "Lugo"], n, p=[.4, .3, .15, .1, .05]),
+        "email": [f"usuario{i}@email.com" for i in range(n)],
+    })
+    df.loc[::50, "edad"] = np.nan
+    return df
+
+
+def test_chunked_profile_matches_full_statistics():
+    print("\n" + "="*80)
+    print("TEST: PERFIL DE COLUMNAS")
+    print("="*80)
+
+    df = _sample()
+    profiler = ColumnProfiler()
+    chunks = (df.iloc[start:start + 700] for start in range(0, len(df), 700))
+    tracker = ingest_chunks(chunks, lambda *args: None, profiler)
+    profile = profiler.to_dict()
+    expected = column_statistics(df)
+
+    assert tracker.row_count == len(df)
+    for col in df.columns:
+        for key in ("kind", "count", "null_count", "distinct", "min", "max"):
+            assert profile[col].get(key) == expected[col].get(key), (col, key)
+        assert abs(profile[col]["entropy"] - expected[col]["entropy"]) < 1e-6
+        assert profile[col]["distinct_exact"]
+
+    assert profile["edad"]["type"] == "integer"
+    assert [v["value"] for v in profile["ciudad"]["top_values"][:2]] == ["Madrid", "Toledo"]
+    assert numeric_range(profile["edad"]) == df["edad"].max() - df["edad"].min()
+    assert numeric_range(profile["ciudad"]) is None
+    print("✓ El perfil por bloques coincide con las estadísticas del dataset completo")
+
+
+def test_value_cap_switches_to_sketches():
+    df = _sample()
+    profiler = ColumnProfiler(max_tracked_values=1000, top_k=3)
+    for start in range(0, len(df), 1000):
+        profiler.update(df.iloc[start:start + 1000])
+    email = profiler.to_dict()["email"]
+
+    assert not email["distinct_exact"]
+    assert email["entropy"] is None
+    # Estimación HyperLogLog: dentro de unas pocas veces su error típico
+    assert abs(email["distinct"] - len(df)) / len(df) < 4 * email["distinct_error"]
+    assert len(email["top_values"]) == 3
+    assert email["top_values_error"] > 0 and "distinct_sketch" in email
+    # Las columnas por debajo del límite siguen siendo exactas
+    assert profiler.to_dict()["ciudad"]["distinct_exact"]
+    print("✓ Por encima del límite, los distintos se estiman con HyperLogLog")
+
+
+def test_top_values_feed_categorical_generalization():
+    df = _sample()
+    profile = profile_dataframe(df)
+
+    top = top_values(profile["ciudad"], 2)
+    assert top == ["Madrid", "Toledo"]
+    cached = generalize_categorical(df["ciudad"], 2, top)
+    assert cached.equals(generalize_categorical(df["ciudad"], 2))
+    # Si el perfil no guarda suficientes valores, se cuentan sobre los datos
+    assert top_values(profile_dataframe(df, top_k=3)["email"], 5) is None
+    assert top_values(profile["ciudad"], 8) == ["Madrid", "Toledo", "Sevilla", "Cádiz", "Lugo"]
+    print("✓ Los valores frecuentes del perfil evitan recontar la columna")
+
+
+def test_merged_profile_of_appended_rows():
+    df = _sample()
+    base = profile_dataframe(df.iloc[:3000])
+    delta = ColumnProfiler(sketch_distinct=True)
+    delta.update(df.iloc[3000:])
+    merged = merge_profiles(base, delta.to_dict())
+    expected = column_statistics(df)
+
+    for col in ("edad", "ciudad"):
+        for key in ("count", "null_count", "min", "max"):
+            assert merged[col].get(key) == expected[col].get(key), (col, key)
+    # Los distintos siguen siendo exactos si ambos perfiles enumeran todos sus valores
+    assert merged["ciudad"]["distinct_exact"] and merged["ciudad"]["distinct"] == 5
+    assert abs(merged["ciudad"]["entropy"] - expected["ciudad"]["entropy"]) < 1e-6
+    assert not merged["edad"]["distinct_exact"]
+
+    # Con valores sin enumerar, los distintos se estiman combinando los HLL
+    base = ColumnProfiler(max_tracked_values=1000, sketch_distinct=True)
+    base.update(df.iloc[:3000])
+    merged = merge_profiles(base.to_dict(), delta.to_dict())
+    assert not merged["email"]["distinct_exact"] and merged["email"]["entropy"] is None
+    assert abs(merged["email"]["distinct"] - len(df)) / len(df) < 4 * merged["email"]["distinct_error"]
+    print("✓ El perfil combinado de las filas añadidas coincide con el del dataset completo")
+
+
+if __name__ == "__main__":
+    test_chunked_profile_matches_full_statistics()
+    test_value_cap_switches_to_sketches()
+    test_top_values_feed_categorical_generalization()
+    test_merged_profile_of_appended_rows()
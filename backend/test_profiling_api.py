@@ -0,0 +1,31 @@
+"""
+Test de la reutilización del perfil de columnas guardado al subir un dataset
+(a través de la API, con la base de datos en memoria de `api_testing`).
+"""
+from api_testing import create_config, main, process, upload_dataset
+
+
+def test_job_uses_upload_profile():
+    print("\n" + "="*80)
+    print("TEST: API - PERFIL DE COLUMNAS REUTILIZADO")
+    print("="*80)
+
+    dataset = upload_dataset()
+    assert set(dataset["column_names"]) == {"nombre", "edad", "ciudad", "salario"}
+    config = create_config(dataset["id"], seed=11)
+
+    # El perfil guardado al subir basta: el trabajo no vuelve a recorrer las columnas
+    original = main.column_statistics
+    main.column_statistics = lambda df: (_ for _ in ()).throw(AssertionError("column profile recomputed"))
+    try:
+        _, _, job = process(dataset["id"], config["id"])
+    finally:
+        main.column_statistics = original
+
+    metrics = job["metrics"]
+    assert metrics["original_rows"] == 120 and metrics["information_loss"]["columns"]
+    print("✓ El trabajo usa el perfil de columnas guardado al subir el dataset")
+
+
+if __name__ == "__main__":
+    test_job_uses_upload_profile()
@@ -0,0 +1,54 @@
+"""
+Test de la bóveda de pseudónimos con el almacén SQLite local.
+"""
+import os
+import tempfile
+
+import pandas as pd
+from pseudonym_vault import PseudonymVault, SQLiteVaultStore
+from techniques import apply_pseudonymization
+
+
+class CountingStore(SQLiteVaultStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.lookups = 0
+
+    def lookup(self, namespace, digests):
+        self.lookups += 1
+        return super().lookup(namespace, digests)
+
+
+def test_vault_reuses_pseudonyms_across_datasets():
+    print("\n" + "="*80)
+    print("TEST: BÓVEDA DE PSEUDÓNIMOS")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CountingStore(os.path.join(tmp, "vault.db"))
+        vault = PseudonymVault(store, key="secreto", cache_size=3)
+
+        day1 = pd.Series(["Ana", "Luis", "Ana", None, "Eva"])
+        first = vault.pseudonymize(day1, "P", digest_length=12)
+        assert first.equals(apply_pseudonymization(day1, "P", key="secreto", digest_length=12))
+        assert store.lookups == 1
+        print("✓ Pseudónimos iguales a los de apply_pseudonymization, una consulta por columna")
+
+        # Caché caliente: sin consultas al almacén
+        vault.pseudonymize(pd.Series(["Eva", "Ana"]), "P", digest_length=12)
+        assert store.lookups == 1
+
+        # Otra instancia (otro proceso) con la caché vacía: el almacén conserva los pseudónimos
+        other = PseudonymVault(store, key="secreto", cache_size=10)
+        day2 = pd.Series(["Luis", "Marta"])
+        second = other.pseudonymize(day2, "P", digest_length=12)
+        assert second[0] == first[1]
+        assert store.lookups == 2
+        print("✓ Valores repetidos entre datasets reutilizan el pseudónimo guardado")
+
+        assert len(vault._cache) <= 3
+        store.close()
+
+
+if __name__ == "__main__":
+    test_vault_reuses_pseudonyms_across_datasets()
@@ -0,0 +1,51 @@
+"""
+Test de pseudonimización codificada como diccionario con hash con clave.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+from execution import ExecutionEngine
+from techniques import apply_pseudonymization
+
+
+def test_consistent_keyed_pseudonyms():
+    print("\n" + "="*80)
+    print("TEST: PSEUDONIMIZACIÓN CON CLAVE")
+    print("="*80)
+
+    series = pd.Series(["Juan", "María", "Juan", None, "Pedro", np.nan], index=[10, 11, 12, 13, 14, 15])
+    for algorithm in ["blake2b", "hmac-sha256"]:
+        result = apply_pseudonymization(series, "USER", algorithm, key="secreto", digest_length=20)
+        assert result.index.equals(series.index)
+        assert result[10] == result[12] and result[10] != result[11]
+        assert pd.isna(result[13]) and pd.isna(result[15])
+        assert len(result[10]) == len("USER_") + 20
+        other_key = apply_pseudonymization(series, "USER", algorithm, key="otra", digest_length=20)
+        assert other_key[10] != result[10]
+        print(f"✓ {algorithm}: consistente, nulos preservados y dependiente de la clave")
+
+
+def test_legacy_md5_output():
+    series = pd.Series(["Juan Pérez", 42])
+    result = apply_pseudonymization(series, "P", "md5", digest_length=6)
+    assert result[0] == "P_" + hashlib.md5("Juan Pérez".encode()).hexdigest()[:6]
+    assert result[1] == "P_" + hashlib.md5(b"42").hexdigest()[:6]
+    print("✓ md5 con 6 caracteres reproduce los pseudónimos anteriores")
+
+
+def test_engine_matches_function():
+    series = pd.Series([f"cliente{i % 700}" for i in range(5000)])
+    engine = ExecutionEngine(max_workers=2, chunk_rows=100, min_parallel_rows=0)
+    try:
+        expected = apply_pseudonymization(series, "C", key=b"k")
+        assert engine.pseudonymization(series, "C", key=b"k").equals(expected)
+        print("✓ El motor paralelo reproduce apply_pseudonymization")
+    finally:
+        engine.shutdown()
+
+
+if __name__ == "__main__":
+    test_consistent_keyed_pseudonyms()
+    test_legacy_md5_output()
+    test_engine_matches_function()
@@ -0,0 +1,92 @@
+"""
+Test de reproducibilidad de los flujos aleatorios por trabajo: misma semilla
+→ mismo resultado, sin importar el tamaño de bloque ni el número de procesos.
+"""
+import numpy as np
+import pandas as pd
+from execution import ExecutionEngine
+from randomness import RandomStreams
+from techniques import apply_differential_privacy, suppress_data
+
+
+def _ages(n=20000):
+    return pd.Series(np.random.default_rng(3).integers(18, 90, n), name="edad")
+
+
+def test_streams_are_positional():
+    print("\n" + "="*80)
+    print("TEST: FLUJOS ALEATORIOS REPRODUCIBLES")
+    print("="*80)
+
+    streams = RandomStreams(2024)
+    whole = streams.uniform("edad", "laplace", 1000)
+    # Cualquier bloque puede generarse saltando a su posición
+    for offset, size in [(0, 10), (3, 17), (250, 401), (999, 1)]:
+        assert np.array_equal(streams.uniform("edad", "laplace", size, offset), whole[offset:offset + size])
+    assert (whole > 0).all() and (whole < 1).all()
+    # Columnas y propósitos distintos tienen flujos independientes
+    assert not np.array_equal(whole, streams.uniform("cp", "laplace", 1000))
+    assert not np.array_equal(whole, streams.uniform("edad", "suppression", 1000))
+    assert RandomStreams(2024).to_dict() == {"seed": 2024, "algorithm": "philox"}
+    print("✓ El número de cada fila depende sólo de semilla, columna y posición")
+
+
+def test_techniques_reproducible_without_global_state():
+    ages = _ages()
+    np.random.seed(1)
+    first = apply_differential_privacy(ages, 1.0, streams=RandomStreams(7))
+    np.random.seed(2)
+    second = apply_differential_privacy(ages, 1.0, streams=RandomStreams(7))
+    assert first.equals(second)
+    assert not first.equals(apply_differential_privacy(ages, 1.0, streams=RandomStreams(8)))
+
+    suppressed = suppress_data(ages, 0.25, RandomStreams(7))
+    assert suppressed.equals(suppress_data(ages, 0.25, RandomStreams(7)))
+    assert (suppressed == "*").sum() == len(ages) // 4
+    # Con índice duplicado también se suprime exactamente la proporción pedida
+    duplicated = pd.Series(ages.to_numpy(), index=np.zeros(len(ages), dtype=int), name="edad")
+    assert (suppress_data(duplicated, 0.25, RandomStreams(7)) == "*").sum() == len(ages) // 4
+
+    noise = apply_differential_privacy(ages, 0.5, streams=RandomStreams(7)) - ages
+    scale = (ages.max() - ages.min()) / 0.5
+    assert abs(noise.abs().mean() - scale) / scale < 0.05
+    print("✓ Supresión y ruido reproducibles y sin usar np.random global")
+
+
+def test_engine_matches_serial_for_any_chunking():
+    ages = _ages()
+    serial_noise = apply_differential_privacy(ages, 1.0, streams=RandomStreams(11), column="edad")
+    serial_mask = suppress_data(ages, 0.1, RandomStreams(11), "edad")
+
+    parallel = ExecutionEngine(max_workers=2, chunk_rows=2500, min_parallel_rows=0)
+    try:
+        for engine in (parallel, ExecutionEngine(max_workers=1, chunk_rows=7000)):
+            assert engine.differential_privacy(ages, 1.0, 11, "edad").equals(serial_noise)
+            assert engine.suppression(ages, 0.1, 11, "edad").equals(serial_mask)
+    finally:
+        parallel.shutdown()
+    print("✓ Motor paralelo y ruta en serie coinciden con cualquier tamaño de bloque")
+
+
+def test_appended_segment_uses_its_own_positions():
+    ages = _ages()
+    segment = ages.iloc[15000:]
+    streams = RandomStreams(11)
+    # Un segmento añadido usa los números de sus filas, no los de las primeras
+    noise = apply_differential_privacy(segment, 1.0, (0.0, 100.0), streams, "edad", 15000)
+    whole = apply_differential_privacy(ages, 1.0, (0.0, 100.0), streams, "edad")
+    assert np.allclose(noise.to_numpy(), whole.iloc[15000:].to_numpy())
+
+    mask = suppress_data(segment, 0.1, streams, "edad", 15000)
+    assert (mask == "*").sum() == len(segment) // 10
+    assert not mask.equals(suppress_data(segment, 0.1, streams, "edad"))
+    engine = ExecutionEngine(max_workers=1, chunk_rows=1500)
+    assert engine.suppression(segment, 0.1, 11, "edad", 15000).equals(mask)
+    print("✓ Las filas añadidas se procesan con los flujos de su posición en el dataset")
+
+
+if __name__ == "__main__":
+    test_streams_are_positional()
+    test_techniques_reproducible_without_global_state()
+    test_engine_matches_serial_for_any_chunking()
+    test_appended_segment_uses_its_own_positions()
@@ -0,0 +1,54 @@
+"""
+Test del acceso por rangos a un dataset y a un resultado (`offset`, `limit`
+y `columns` en `GET /api/datasets/{id}` y `GET /api/results/{id}`).
+"""
+from api_testing import client, create_config, process, upload_dataset
+
+
+def test_dataset_range_and_columns():
+    print("\n" + "="*80)
+    print("TEST: API - RANGOS DE FILAS")
+    print("="*80)
+
+    dataset = upload_dataset(n=50, seed=40)
+    full = client.get(f"/api/datasets/{dataset['id']}").json()
+    assert len(full["data"]) == 50 and full["total_rows"] == 50
+
+    page = client.get(f"/api/datasets/{dataset['id']}", params={"offset": 10, "limit": 5}).json()
+    assert page["offset"] == 10 and page["limit"] == 5 and page["total_rows"] == 50
+    assert page["data"] == full["data"][10:15]
+
+    page = client.get(f"/api/datasets/{dataset['id']}",
+                      params={"offset": 45, "limit": 10, "columns": "edad,ciudad"}).json()
+    assert page["data"] == [{"edad": row["edad"], "ciudad": row["ciudad"]} for row in full["data"][45:]]
+
+    # Sin `limit`, desde `offset` hasta el final
+    assert client.get(f"/api/datasets/{dataset['id']}", params={"offset": 48}).json()["data"] == full["data"][48:]
+    assert client.get(f"/api/datasets/{dataset['id']}", params={"limit": 0}).status_code == 422
+    print("✓ Dataset: páginas, proyección de columnas y límites validados")
+
+
+def test_result_range_and_columns():
+    dataset = upload_dataset(n=60, seed=41)
+    config = create_config(dataset["id"], seed=6)
+    _, _, job = process(dataset["id"], config["id"])
+
+    full = client.get(f"/api/results/{job['id']}").json()
+    rows = full["anonymized_data"]
+    assert full["total_rows"] == len(rows) > 0
+
+    page = client.get(f"/api/results/{job['id']}", params={"offset": 3, "limit": 4}).json()
+    assert page["offset"] == 3 and page["limit"] == 4 and page["total_rows"] == len(rows)
+    assert page["anonymized_data"] == rows[3:7]
+
+    page = client.get(f"/api/results/{job['id']}", params={"offset": len(rows) - 2, "limit": 10,
+                                                           "columns": "edad"}).json()
+    assert page["anonymized_data"] == [{"edad": row["edad"]} for row in rows[-2:]]
+
+    assert client.get(f"/api/results/{job['id']}", params={"offset": len(rows)}).json()["anonymized_data"] == []
+    print("✓ Resultado: páginas, proyección de columnas y offset al final")
+
+
+if __name__ == "__main__":
+    test_dataset_range_and_columns()
+    test_result_range_and_columns()
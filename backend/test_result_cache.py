@@ -0,0 +1,88 @@
+"""
+Test de las claves de la caché de resultados (contenido, configuración y semilla).
+"""
+import json
+
+import numpy as np
+import pandas as pd
+from result_cache import ContentHasher, cache_key, config_hash, content_hash, normalize_config
+
+
+def _sample(n=10000, seed=5):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "edad": rng.integers(18, 90, n),
+        "ciudad": rng.choice(["Madrid", "Toledo", "Sevilla"], n),
+    })
+
+
+def _config(**overrides):
+    config = {
+        "column_mappings": [
+            {"column": "edad", "type": "quasi-identifier"},
+            {"column": "ciudad", "type": "quasi-identifier"},
+        ],
+        "techniques": [
+            {"column": "edad", "technique": "generalization", "params": {"bins": 5}},
+            {"column": "ciudad", "technique": "suppression", "params": {"threshold": 0.1}},
+        ],
+        "global_params": {"k": 3, "seed": 42},
+    }
+    config.update(overrides)
+    return config
+
+
+def test_content_hash_ignores_chunking():
+    print("\n" + "="*80)
+    print("TEST: CLAVES DE LA CACHÉ DE RESULTADOS")
+    print("="*80)
+
+    df = _sample()
+    whole = content_hash([df])
+    chunked = content_hash(df.iloc[start:start + 777] for start in range(0, len(df), 777))
+    assert whole == chunked
+
+    changed = df.copy()
+    changed.loc[1234, "ciudad"] = "Lugo"
+    assert content_hash([changed]) != whole
+    assert content_hash([df.rename(columns={"ciudad": "municipio"})]) != whole
+    assert content_hash([df[["ciudad", "edad"]]]) != whole
+
+    hasher = ContentHasher()
+    hasher.update(df.iloc[:10])
+    assert hasher.hexdigest() != whole
+    print("✓ El hash del contenido no depende del reparto en bloques y detecta cualquier cambio")
+
+
+def test_config_hash_is_normalized():
+    base = _config()
+    # El orden de los mapeos, la forma serializada y la semilla no cambian el hash de la configuración
+    reordered = _config(column_mappings=list(reversed(base["column_mappings"])))
+    serialized = {key: json.dumps(value) for key, value in base.items()}
+    assert config_hash(reordered) == config_hash(base) == config_hash(serialized)
+    assert config_hash(_config(global_params={"seed": 7, "k": 3})) == config_hash(base)
+    assert "seed" not in normalize_config(base)["global_params"]
+
+    # Las técnicas se aplican en secuencia: su orden y sus parámetros sí cuentan
+    assert config_hash(_config(techniques=list(reversed(base["techniques"])))) != config_hash(base)
+    assert config_hash(_config(global_params={"k": 4, "seed": 42})) != config_hash(base)
+    print("✓ La configuración se normaliza antes de resumirla")
+
+
+def test_cache_key_components():
+    df_hash = content_hash([_sample()])
+    cfg_hash = config_hash(_config())
+    key = cache_key(df_hash, cfg_hash, 42, "ajustes")
+
+    assert len(key) == 64 and key == cache_key(df_hash, cfg_hash, 42, "ajustes")
+    assert key != cache_key(df_hash, cfg_hash, 43, "ajustes")
+    assert key != cache_key(df_hash, cfg_hash, None, "ajustes")
+    assert key != cache_key(df_hash, cfg_hash, 42, "otra clave")
+    assert key != cache_key(content_hash([_sample(seed=6)]), cfg_hash, 42, "ajustes")
+    print("✓ Contenido, configuración, semilla y ajustes forman parte de la clave")
+
+
+if __name__ == "__main__":
+    test_content_hash_ignores_chunking()
+    test_config_hash_is_normalized()
+    test_cache_key_components()
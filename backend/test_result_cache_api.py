@@ -0,0 +1,29 @@
+"""
+Test de la caché de resultados de `/api/process` (a través de la API, con la
+base de datos en memoria de `api_testing`).
+"""
+from api_testing import client, create_config, process, result_rows, upload_dataset
+
+
+def test_result_cache_hit_returns_same_result():
+    print("\n" + "="*80)
+    print("TEST: API - CACHÉ DE RESULTADOS")
+    print("="*80)
+
+    dataset = upload_dataset(seed=2)
+    config = create_config(dataset["id"], seed=5)
+    _, _, first = process(dataset["id"], config["id"])
+
+    status, cached, _ = process(dataset["id"], config["id"])
+    assert status == 200 and cached["cached"] is True and cached["result_id"] == first["id"]
+    assert client.get("/api/cache").json()["hits"] >= 1
+
+    # Sin caché se vuelve a ejecutar; con la misma semilla se reutiliza la instantánea y el resultado es el mismo
+    status, fresh, job = process(dataset["id"], config["id"], use_cache=False)
+    assert status == 202 and job["id"] != first["id"]
+    assert result_rows(job["id"]) == result_rows(first["id"])
+    print("✓ Reenviar la misma configuración devuelve el mismo result_id")
+
+
+if __name__ == "__main__":
+    test_result_cache_hit_returns_same_result()
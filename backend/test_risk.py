@@ -0,0 +1,86 @@
+"""
+Test del cálculo de riesgo de reidentificación.
+"""
+import numpy as np
+import pandas as pd
+from risk import RiskAccumulator, compute_risk
+
+
+def test_risk_measures_on_known_classes():
+    print("\n" + "="*80)
+    print("TEST: RIESGO DE REIDENTIFICACIÓN")
+    print("="*80)
+
+    # Clases de tamaño 1, 2, 3 y 4 (10 filas)
+    df = pd.DataFrame({
+        "edad": [30, 40, 40, 50, 50, 50, 60, 60, 60, 60],
+        "sexo": ["H", "M", "M", "H", "H", "H", "M", "M", "M", "M"],
+        "diagnostico": list("abcdefghij"),
+    })
+    risk = compute_risk(df, ["edad", "sexo"], threshold=0.4, top=3)
+
+    assert risk["equivalence_classes"] == 4
+    assert risk["k_anonymity"] == 1
+    assert risk["prosecutor"]["max_risk"] == 1.0
+    assert risk["prosecutor"]["avg_risk"] == 0.4
+    # Riesgo > 0.4: la clase única (1.0) y la de tamaño 2 (0.5)
+    assert risk["prosecutor"]["records_at_risk"] == 3
+    assert risk["marketer"]["risk"] == 0.4
+    assert risk["sample_uniques"] == 1 and risk["sample_unique_share"] == 0.1
+
+    top = risk["top_records"]
+    assert [r["row"] for r in top] == [0, 1, 2]
+    assert [r["class_size"] for r in top] == [1, 2, 2]
+    # Sólo se devuelven los cuasi-identificadores, nunca el atributo sensible
+    assert set(top[0]["values"]) == {"edad", "sexo"}
+    print("✓ Riesgos fiscal, comercializador y únicos muestrales correctos")
+
+
+def test_sampling_fraction_lowers_journalist_risk():
+    df = pd.DataFrame({"cp": [1, 1, 2, 2, 2, 3]})
+    full = compute_risk(df, ["cp"])
+    sample = compute_risk(df, ["cp"], sampling_fraction=0.1)
+
+    assert full["journalist"]["max_risk"] == full["prosecutor"]["max_risk"] == 1.0
+    # Con una muestra del 10%, la clase única representa ~10 personas
+    assert sample["journalist"]["max_risk"] == 0.1
+    assert sample["marketer"]["risk"] < full["marketer"]["risk"]
+    assert sample["prosecutor"] == full["prosecutor"]
+    print("✓ La fracción de muestreo reduce el riesgo de periodista")
+
+
+def test_large_dataset_top_records_are_smallest_classes():
+    rng = np.random.default_rng(21)
+    n = 200000
+    df = pd.DataFrame({"edad": rng.integers(18, 90, n), "cp": rng.integers(0, 3000, n)})
+    risk = compute_risk(df, ["edad", "cp"], top=50)
+
+    sizes = df.groupby(["edad", "cp"])["edad"].transform("size").to_numpy()
+    assert risk["k_anonymity"] == sizes.min()
+    assert [r["class_size"] for r in risk["top_records"]] == sorted(sizes)[:50]
+    assert risk["sample_uniques"] == int((df.groupby(["edad", "cp"]).size() == 1).sum())
+    print(f"✓ {risk['sample_uniques']} únicos muestrales sobre {n} filas")
+
+
+def test_accumulated_chunks_match_whole_result():
+    rng = np.random.default_rng(5)
+    n = 5000
+    df = pd.DataFrame({
+        "edad": rng.choice(["18-30", "30-45", "45-90"], n).astype(object),
+        "cp": rng.integers(28000, 28040, n).astype(object),
+    })
+    df.loc[::97, "cp"] = None
+
+    accumulator = RiskAccumulator(["edad", "cp"])
+    for start in range(0, n, 700):
+        accumulator.update(df.iloc[start:start + 700].reset_index(drop=True))
+    assert accumulator.result(0.5, top=30) == compute_risk(df, ["edad", "cp"], 0.5, top=30)
+    assert RiskAccumulator(["edad"]).result()["rows"] == 0
+    print("✓ El riesgo acumulado por bloques coincide con el del resultado completo")
+
+
+if __name__ == "__main__":
+    test_risk_measures_on_known_classes()
+    test_sampling_fraction_lowers_journalist_risk()
+    test_large_dataset_top_records_are_smallest_classes()
+    test_accumulated_chunks_match_whole_result()
@@ -0,0 +1,66 @@
+"""
+Test de `GET /api/results/{id}/risk` (a través de la API, con la base de
+datos en memoria de `api_testing`).
+"""
+import pandas as pd
+from api_testing import FAKE_DB, client, create_config, main, process, result_rows, upload_dataset
+
+
+def test_result_risk_streams_rows():
+    print("\n" + "="*80)
+    print("TEST: API - RIESGO DEL RESULTADO")
+    print("="*80)
+
+    dataset = upload_dataset(seed=8)
+    _, _, job = process(dataset["id"], create_config(dataset["id"], seed=4)["id"])
+    rows = pd.DataFrame(result_rows(job["id"]))
+
+    # Lotes pequeños: el riesgo se acumula por bloques
+    main.credentials["backend"]["export_batch_rows"], batch_rows = 7, main.credentials["backend"]["export_batch_rows"]
+    try:
+        risk = client.get(f"/api/results/{job['id']}/risk", params={"top": 5}).json()
+        unknown = client.get(f"/api/results/{job['id']}/risk", params={"quasi_identifiers": "edad,nombre"})
+    finally:
+        main.credentials["backend"]["export_batch_rows"] = batch_rows
+
+    assert risk == {"result_id": job["id"], **main.compute_risk(rows, ["edad", "ciudad"], top=5)}
+    assert risk["k_anonymity"] >= 3 and unknown.status_code == 400
+    print("✓ El riesgo del resultado se calcula leyendo las filas por lotes")
+
+
+def test_unknown_columns_leave_no_open_cursor():
+    dataset = upload_dataset(seed=10)
+    _, _, job = process(dataset["id"], create_config(dataset["id"], seed=4)["id"])
+
+    # Cada lectura por lotes anota si se abrió y si se cerró
+    cursors = []
+    iter_jsonb_array = main.db.iter_jsonb_array
+
+    def tracked(*args, **kwargs):
+        state = {"closed": False}
+        cursors.append(state)
+        try:
+            yield from iter_jsonb_array(*args, **kwargs)
+        finally:
+            state["closed"] = True
+
+    main.db.iter_jsonb_array = tracked
+    try:
+        # Con el esquema del resultado las columnas se rechazan sin leer filas
+        response = client.get(f"/api/results/{job['id']}/risk", params={"quasi_identifiers": "edad,nombre"})
+        assert response.status_code == 400 and cursors == []
+
+        # Sin esquema (resultados anteriores) se detectan en el primer lote y el cursor se cierra
+        metrics = {k: v for k, v in job["metrics"].items() if k != "output_schema"}
+        FAKE_DB.update("anonymization_results", {"metrics": metrics}, {"id": job["id"]})
+        response = client.get(f"/api/results/{job['id']}/risk", params={"quasi_identifiers": "edad,nombre"})
+        assert response.status_code == 400 and cursors == [{"closed": True}]
+        assert client.get(f"/api/results/{job['id']}/risk").status_code == 200
+    finally:
+        main.db.iter_jsonb_array = iter_jsonb_array
+    print("✓ Columnas desconocidas rechazadas sin dejar cursores abiertos")
+
+
+if __name__ == "__main__":
+    test_result_risk_streams_rows()
+    test_unknown_columns_leave_no_open_cursor()
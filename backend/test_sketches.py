@@ -0,0 +1,94 @@
+"""
+Test de los sketches aproximados (HyperLogLog, Count-Min, Misra-Gries) y de
+las métricas de privacidad estimadas con ellos.
+"""
+import numpy as np
+import pandas as pd
+from privacy_metrics import approximate_privacy_metrics, compute_privacy_metrics
+from sketches import CountMinSketch, FrequentItems, HyperLogLog, hash_values64
+
+
+def test_hyperloglog_estimate_and_merge():
+    print("\n" + "="*80)
+    print("TEST: SKETCHES APROXIMADOS")
+    print("="*80)
+
+    rng = np.random.default_rng(11)
+    values = pd.Series(rng.integers(0, 200000, 600000))
+    true = values.nunique()
+
+    whole = HyperLogLog()
+    whole.update(values)
+    merged = HyperLogLog()
+    for start in range(0, len(values), 50000):
+        part = HyperLogLog()
+        part.update(values.iloc[start:start + 50000])
+        merged.merge(part)
+
+    assert np.array_equal(whole.registers, merged.registers)
+    assert abs(whole.estimate() - true) / true < 4 * whole.relative_error
+    # Un mismo número hashea igual como int o como float (bloques con nulos)
+    assert np.array_equal(hash_values64(pd.Series([1, 2])), hash_values64(pd.Series([1.0, 2.0])))
+    assert HyperLogLog.from_dict(whole.to_dict()).estimate() == whole.estimate()
+    print(f"✓ HyperLogLog: {whole.estimate():.0f} estimados frente a {true} reales")
+
+
+def test_count_min_never_underestimates():
+    rng = np.random.default_rng(12)
+    df = pd.DataFrame({"a": rng.integers(0, 300, 200000), "b": rng.choice(list("xyz"), 200000)})
+    left, right = CountMinSketch.for_rows(len(df)), CountMinSketch.for_rows(len(df))
+    left.update(df.iloc[:80000])
+    right.update(df.iloc[80000:])
+    sketch = left.merge(right)
+
+    estimate = sketch.query_hashes(hash_values64(df))
+    true = df.groupby(["a", "b"])["a"].transform("size").to_numpy()
+    assert (estimate >= true).all()
+    assert (estimate - true).max() <= sketch.error_bound
+    print("✓ Count-Min combinado por bloques nunca subestima")
+
+
+def test_frequent_items_bound():
+    rng = np.random.default_rng(13)
+    values = pd.Series(rng.zipf(1.5, 100000) % 5000)
+    true = values.value_counts()
+    items = FrequentItems(50)
+    for start in range(0, len(values), 10000):
+        items.update(values.iloc[start:start + 10000])
+
+    assert len(items.counts) <= 50
+    assert items.error <= len(values) / 51 * 2
+    for value, count in items.top(5).items():
+        assert true[value] - items.error <= count <= true[value]
+    assert items.top(1).index[0] == true.index[0]
+    print("✓ Misra-Gries conserva los más frecuentes dentro de su cota")
+
+
+def test_approximate_privacy_metrics_close_to_exact():
+    rng = np.random.default_rng(14)
+    n = 300000
+    df = pd.DataFrame({
+        "edad": rng.integers(18, 80, n),
+        "sexo": rng.choice(["H", "M"], n),
+        "cp": rng.integers(0, 400, n),
+    })
+    exact = compute_privacy_metrics(df, ["edad", "sexo", "cp"])
+    approx = approximate_privacy_metrics(df, ["edad", "sexo", "cp"])
+
+    assert approx["approximate"]
+    bounds = approx["error_bounds"]
+    # El k informado es conservador; la estimación del sketch sólo acota el real por arriba
+    assert 1 <= approx["k_anonymity"] <= exact["k_anonymity"] <= approx["k_anonymity_upper_bound"]
+    assert approx["k_anonymity_upper_bound"] <= exact["k_anonymity"] + bounds["class_size_overestimate"]
+    relative = abs(approx["equivalence_classes"] - exact["equivalence_classes"]) / exact["equivalence_classes"]
+    assert relative < 4 * bounds["equivalence_classes_relative"]
+    assert sum(approx["class_size_histogram"].values()) > 0.9 * exact["equivalence_classes"]
+    print(f"✓ Métricas aproximadas: {approx['equivalence_classes']} clases "
+          f"(exactas {exact['equivalence_classes']}), {approx['k_anonymity']} ≤ k ≤ {approx['k_anonymity_upper_bound']}")
+
+
+if __name__ == "__main__":
+    test_hyperloglog_estimate_and_merge()
+    test_count_min_never_underestimates()
+    test_frequent_items_bound()
+    test_approximate_privacy_metrics_close_to_exact()
@@ -0,0 +1,78 @@
+"""
+Test del almacenamiento Parquet por bloques: los tipos de cada columna
+(enteros con nulos, columnas vacías) se conservan al leer el dataset.
+"""
+import io
+import shutil
+import tempfile
+
+import pandas as pd
+from ingestion import chunk_to_records, ingest_chunks, iter_csv_chunks
+from storage import StorageManager
+
+
+def _csv(n=10):
+    # `hijos` tiene nulos sólo en algunos bloques; `notas` está vacía
+    rows = [f"{20 + i},{'' if i >= 4 and i % 3 == 0 else i % 4},{1000.5 + i},{'Madrid' if i % 2 else ''},"
+            for i in range(n)]
+    return "edad,hijos,salario,ciudad,notas\n" + "\n".join(rows)
+
+
+def _ingest(manager, dataset_id, csv, chunk_rows=4):
+    store = manager.default()
+    tracker = ingest_chunks(iter_csv_chunks(io.StringIO(csv), chunk_rows),
+                            lambda index, offset, chunk: store.write_chunk(dataset_id, index, offset, chunk))
+    return {"id": dataset_id, "storage_format": store.name, "schema": tracker.to_dict()}
+
+
+def test_parquet_round_trip_keeps_types():
+    print("\n" + "="*80)
+    print("TEST: ALMACENAMIENTO PARQUET")
+    print("="*80)
+
+    root = tempfile.mkdtemp()
+    try:
+        manager = StorageManager(None, {"backend": "parquet", "path": root, "frame_cache_mb": 0})
+        dataset = _ingest(manager, "d1", _csv())
+        original = pd.read_csv(io.StringIO(_csv()))
+
+        # Cada bloque se escribe con sus propios tipos: sin el esquema, `hijos` mezcla int64 y float64
+        chunk_types = {str(chunk["hijos"].dtype) for chunk in manager.default().iter_chunks(dataset)}
+        assert chunk_types == {"int64", "float64"}
+
+        df = manager.load(dataset)
+        assert str(df["edad"].dtype) == "int64" and str(df["salario"].dtype) == "float64"
+        assert str(df["hijos"].dtype) == "Int64"
+        assert df["hijos"].isna().tolist() == original["hijos"].isna().tolist()
+        assert df["hijos"].dropna().tolist() == original["hijos"].dropna().astype(int).tolist()
+        assert df["notas"].isna().all() and df["ciudad"].isna().sum() == 5
+
+        # Los nulos llegan como None a los registros JSON, no como NaN ni como 0
+        records = chunk_to_records(df)
+        assert records[6]["hijos"] is None and records[7]["hijos"] == 3 and records[0]["ciudad"] is None
+        print("✓ Enteros con nulos como Int64 y columnas vacías como nulos")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def test_parquet_range_and_projection():
+    root = tempfile.mkdtemp()
+    try:
+        manager = StorageManager(None, {"backend": "parquet", "path": root, "frame_cache_mb": 0})
+        dataset = _ingest(manager, "d2", _csv(10))
+
+        # Un rango que cruza bloques, sólo con las columnas pedidas
+        page = manager.read_range(dataset, 3, 4, ["hijos", "ciudad"])
+        assert list(page.columns) == ["hijos", "ciudad"] and len(page) == 4
+        assert str(page["hijos"].dtype) == "Int64" and page["hijos"].isna().tolist() == [False, False, False, True]
+
+        assert len(manager.read_range(dataset, 8, 10)) == 2
+        assert list(manager.load(dataset, columns=["salario"]).columns) == ["salario"]
+        print("✓ Rangos entre bloques y proyección de columnas")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_parquet_round_trip_keeps_types()
+    test_parquet_range_and_projection()
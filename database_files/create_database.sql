@@ -24,7 +24,15 @@ CREATE TABLE IF NOT EXISTS datasets (
     row_count INTEGER DEFAULT 0,
     column_count INTEGER DEFAULT 0,
     column_names JSONB NOT NULL,
-    data JSONB NOT NULL,
+    data JSONB,
+    schema JSONB,
+    column_stats JSONB,
+    storage_format VARCHAR(50) DEFAULT 'inline',
+    storage_path VARCHAR(1000),
+    privacy_budget_epsilon DOUBLE PRECISION,
+    privacy_budget_delta DOUBLE PRECISION,
+    content_hash CHAR(64),
+    segments JSONB,
     status VARCHAR(50) DEFAULT 'ready',
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
@@ -35,6 +43,50 @@ CREATE INDEX IF NOT EXISTS idx_datasets_user_id ON datasets(user_id);
 CREATE INDEX IF NOT EXISTS idx_datasets_created_at ON datasets(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_datasets_status ON datasets(status);
 
+-- Actualización de instalaciones existentes (ingesta por bloques)
+ALTER TABLE datasets ALTER COLUMN data DROP NOT NULL;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS schema JSONB;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS column_stats JSONB;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS storage_format VARCHAR(50) DEFAULT 'inline';
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS storage_path VARCHAR(1000);
+
+-- Actualización de instalaciones existentes (presupuesto de privacidad diferencial)
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS privacy_budget_epsilon DOUBLE PRECISION;
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS privacy_budget_delta DOUBLE PRECISION;
+
+-- Actualización de instalaciones existentes (caché de resultados)
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+
+-- Actualización de instalaciones existentes (segmentos de filas añadidas)
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS segments JSONB;
+
+-- ================================================
+-- TABLA: dataset_chunks
+-- Filas de los datasets subidos por bloques
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS dataset_chunks (
+    dataset_id UUID NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    row_offset BIGINT NOT NULL,
+    row_count INTEGER NOT NULL,
+    rows JSONB NOT NULL,
+    PRIMARY KEY (dataset_id, chunk_index)
+);
+
+-- ================================================
+-- TABLA: pseudonym_vault
+-- Pseudónimos persistentes compartidos entre datasets
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS pseudonym_vault (
+    namespace VARCHAR(255) NOT NULL,
+    value_digest CHAR(64) NOT NULL,
+    pseudonym VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (namespace, value_digest)
+);
+
 -- ================================================
 -- TABLA: anonymization_configs
 -- Almacena configuraciones de anonimización
@@ -71,17 +123,74 @@ CREATE TABLE IF NOT EXISTS anonymization_results (
     metrics JSONB NOT NULL,
     technique_details JSONB,
     status VARCHAR(50) DEFAULT 'completed',
+    stage VARCHAR(100),
+    progress INTEGER DEFAULT 0,
+    error_message TEXT,
     processing_time_ms INTEGER DEFAULT 0,
+    started_at TIMESTAMP WITH TIME ZONE,
     completed_at TIMESTAMP WITH TIME ZONE,
+    -- Resultado de filas añadidas: `anonymized_data` sólo tiene esas filas y amplía el resultado enlazado
+    base_result_id UUID REFERENCES anonymization_results(id) ON DELETE CASCADE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Actualización de instalaciones existentes (procesamiento en segundo plano)
+ALTER TABLE anonymization_results ADD COLUMN IF NOT EXISTS stage VARCHAR(100);
+ALTER TABLE anonymization_results ADD COLUMN IF NOT EXISTS progress INTEGER DEFAULT 0;
+ALTER TABLE anonymization_results ADD COLUMN IF NOT EXISTS error_message TEXT;
+ALTER TABLE anonymization_results ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITH TIME ZONE;
+
+-- Actualización de instalaciones existentes (resultados de filas añadidas)
+ALTER TABLE anonymization_results ADD COLUMN IF NOT EXISTS base_result_id UUID
+    REFERENCES anonymization_results(id) ON DELETE CASCADE;
+
 -- Índices para anonymization_results
 CREATE INDEX IF NOT EXISTS idx_results_user_id ON anonymization_results(user_id);
 CREATE INDEX IF NOT EXISTS idx_results_dataset_id ON anonymization_results(dataset_id);
 CREATE INDEX IF NOT EXISTS idx_results_config_id ON anonymization_results(config_id);
 CREATE INDEX IF NOT EXISTS idx_results_created_at ON anonymization_results(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_results_status ON anonymization_results(status);
+CREATE INDEX IF NOT EXISTS idx_results_base_result_id ON anonymization_results(base_result_id);
+
+-- ================================================
+-- TABLA: result_cache
+-- Resultados reutilizables por (contenido, configuración, semilla)
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS result_cache (
+    user_id VARCHAR(255) NOT NULL,
+    cache_key CHAR(64) NOT NULL,
+    dataset_id UUID NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    result_id UUID NOT NULL REFERENCES anonymization_results(id) ON DELETE CASCADE,
+    config_hash CHAR(64) NOT NULL,
+    seed BIGINT,
+    size_bytes BIGINT DEFAULT 0,
+    hits INTEGER DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, cache_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_result_cache_dataset_id ON result_cache(dataset_id);
+CREATE INDEX IF NOT EXISTS idx_result_cache_last_used ON result_cache(last_used_at DESC);
+
+-- ================================================
+-- TABLA: privacy_budget_ledger
+-- Gasto de privacidad diferencial (ε, δ) de cada ejecución por dataset
+-- ================================================
+
+CREATE TABLE IF NOT EXISTS privacy_budget_ledger (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    dataset_id UUID NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    result_id UUID REFERENCES anonymization_results(id) ON DELETE SET NULL,
+    column_name VARCHAR(500) NOT NULL,
+    mechanism VARCHAR(50) NOT NULL,
+    epsilon DOUBLE PRECISION NOT NULL,
+    delta DOUBLE PRECISION NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_privacy_budget_dataset_id ON privacy_budget_ledger(dataset_id);
 
 -- ================================================
 -- TABLA: audit_logs
@@ -109,8 +218,12 @@ CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_logs(timestamp DESC);
 -- ================================================
 
 COMMENT ON TABLE datasets IS 'Almacena información sobre datasets subidos por los usuarios';
+COMMENT ON TABLE dataset_chunks IS 'Bloques de filas de los datasets ingeridos por bloques';
+COMMENT ON TABLE pseudonym_vault IS 'Correspondencia hash del valor → pseudónimo, sin valores reales';
 COMMENT ON TABLE anonymization_configs IS 'Configuraciones de anonimización creadas por los usuarios';
 COMMENT ON TABLE anonymization_results IS 'Resultados de procesamiento de anonimización';
+COMMENT ON TABLE result_cache IS 'Caché de resultados direccionada por contenido del dataset, configuración y semilla';
+COMMENT ON TABLE privacy_budget_ledger IS 'Gasto de presupuesto de privacidad diferencial por dataset y ejecución';
 COMMENT ON TABLE audit_logs IS 'Registro de auditoría de todas las acciones del sistema';
 
 -- ================================================
@@ -6,8 +6,12 @@
 
 -- Eliminar tablas en orden (respetando foreign keys)
 DROP TABLE IF EXISTS audit_logs CASCADE;
+DROP TABLE IF EXISTS result_cache CASCADE;
+DROP TABLE IF EXISTS privacy_budget_ledger CASCADE;
 DROP TABLE IF EXISTS anonymization_results CASCADE;
 DROP TABLE IF EXISTS anonymization_configs CASCADE;
+DROP TABLE IF EXISTS dataset_chunks CASCADE;
+DROP TABLE IF EXISTS pseudonym_vault CASCADE;
 DROP TABLE IF EXISTS datasets CASCADE;
 
 -- Verificar que las tablas fueron eliminadas
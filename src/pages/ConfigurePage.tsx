@@ -6,7 +6,25 @@ interface Dataset {
   id: string;
   name: string;
   column_names: string[];
-  data: any[];
+  row_count: number;
+}
+
+interface ColumnProfile {
+  kind?: string;
+  type?: string;
+  count?: number;
+  null_count?: number;
+  distinct?: number;
+  distinct_exact?: boolean;
+  min?: number;
+  max?: number;
+}
+
+interface RiskSummary {
+  equivalence_classes: number;
+  k_anonymity: number;
+  prosecutor: { max_risk: number; avg_risk: number; records_at_risk_share: number };
+  sample_unique_share: number;
 }
 
 interface ColumnMapping {
@@ -31,6 +49,9 @@ export const ConfigurePage: React.FC<ConfigurePageProps> = ({ selectedDatasetId,
   const [step, setStep] = useState(1);
   const [configName, setConfigName] = useState('');
   const [columnMappings, setColumnMappings] = useState<ColumnMapping[]>([]);
+  const [columnProfiles, setColumnProfiles] = useState<Record<string, ColumnProfile>>({});
+  const [risk, setRisk] = useState<RiskSummary | null>(null);
+  const [riskLoading, setRiskLoading] = useState(false);
   const [techniques, setTechniques] = useState<TechniqueConfig[]>([]);
   const [globalParams, setGlobalParams] = useState({
     k: 2,
@@ -79,8 +100,51 @@ export const ConfigurePage: React.FC<ConfigurePageProps> = ({ selectedDatasetId,
     }
   };
 
+  const fetchProfile = async (datasetId: string) => {
+    try {
+      const apiUrl = getApiUrl();
+      const response = await fetch(`${apiUrl}/api/datasets/${datasetId}/profile`);
+      if (response.ok) {
+        const data = await response.json();
+        setColumnProfiles(data.columns || {});
+      }
+    } catch (error) {
+      console.error('Error al cargar el perfil del dataset:', error);
+    }
+  };
+
+  const describeProfile = (profile?: ColumnProfile) => {
+    if (!profile || profile.distinct === undefined) return '';
+    const parts = [`${profile.distinct_exact === false ? '≥' : ''}${profile.distinct} distintos`];
+    if (profile.null_count) parts.push(`${profile.null_count} nulos`);
+    if (profile.kind === 'numeric' && profile.min !== undefined) parts.push(`${profile.min} – ${profile.max}`);
+    return parts.join(' · ');
+  };
+
+  const evaluateRisk = async () => {
+    if (!selectedDataset) return;
+    const quasiIdentifiers = columnMappings.filter(m => m.type === 'quasi-identifier').map(m => m.column);
+    if (quasiIdentifiers.length === 0) return;
+    setRiskLoading(true);
+    try {
+      const apiUrl = getApiUrl();
+      const params = new URLSearchParams({ quasi_identifiers: quasiIdentifiers.join(','), top: '0' });
+      const response = await fetch(`${apiUrl}/api/datasets/${selectedDataset.id}/risk?${params}`);
+      if (response.ok) {
+        setRisk(await response.json());
+      }
+    } catch (error) {
+      console.error('Error al calcular el riesgo:', error);
+    } finally {
+      setRiskLoading(false);
+    }
+  };
+
   const selectDataset = (dataset: Dataset) => {
     setSelectedDataset(dataset);
+    setRisk(null);
+    setColumnProfiles({});
+    fetchProfile(dataset.id);
     const mappings = dataset.column_names.map(col => ({
       column: col,
       type: 'non-sensitive',
@@ -189,6 +253,24 @@ export const ConfigurePage: React.FC<ConfigurePageProps> = ({ selectedDatasetId,
     }
   };
 
+  // El procesamiento se ejecuta en segundo plano: se consulta el trabajo hasta que termine
+  const waitForJob = async (apiUrl: string, jobId: string) => {
+    while (true) {
+      const jobResponse = await fetch(`${apiUrl}/api/jobs/${jobId}`);
+      if (!jobResponse.ok) {
+        throw new Error(`Error al consultar el procesamiento (${jobResponse.status})`);
+      }
+      const job = await jobResponse.json();
+      if (job.status === 'completed') {
+        return job;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error_message || 'Error al procesar la anonimización');
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleProcess = async () => {
     if (!selectedDataset) return;
 
@@ -238,7 +320,8 @@ export const ConfigurePage: React.FC<ConfigurePageProps> = ({ selectedDatasetId,
       });
 
       if (processResponse.ok) {
-        const result = await processResponse.json();
+        const job = await processResponse.json();
+        const result = await waitForJob(apiUrl, job.id);
         onNavigate('results', result.id);
       } else {
         let errorMessage = 'Error al procesar la anonimización';
@@ -296,7 +379,7 @@ export const ConfigurePage: React.FC<ConfigurePageProps> = ({ selectedDatasetId,
             >
               <h3 className="text-lg font-bold text-slate-900 mb-2">{dataset.name}</h3>
               <p className="text-sm text-slate-600">
-                {dataset.data.length} filas × {dataset.column_names.length} columnas
+                {dataset.row_count} filas × {dataset.column_names.length} columnas
               </p>
             </button>
           ))}
@@ -348,7 +431,12 @@ export const ConfigurePage: React.FC<ConfigurePageProps> = ({ selectedDatasetId,
             <div className="space-y-3">
               {columnMappings.map((mapping) => (
                 <div key={mapping.column} className="flex items-center space-x-4 p-4 bg-slate-50 rounded-lg">
-                  <div className="flex-1 font-medium text-slate-900">{mapping.column}</div>
+                  <div className="flex-1">
+                    <div className="font-medium text-slate-900">{mapping.column}</div>
+                    {describeProfile(columnProfiles[mapping.column]) && (
+                      <div className="text-xs text-slate-500">{describeProfile(columnProfiles[mapping.column])}</div>
+                    )}
+                  </div>
                   <select
                     value={mapping.type}
                     onChange={(e) => updateColumnMapping(mapping.column, e.target.value)}
@@ -363,6 +451,28 @@ export const ConfigurePage: React.FC<ConfigurePageProps> = ({ selectedDatasetId,
                 </div>
               ))}
             </div>
+
+            <div className="flex items-center justify-between p-4 bg-slate-50 rounded-lg">
+              <div className="text-sm text-slate-700">
+                {risk ? (
+                  <>
+                    <span className="font-medium">Riesgo actual:</span> máximo {(risk.prosecutor.max_risk * 100).toFixed(0)}%,
+                    medio {(risk.prosecutor.avg_risk * 100).toFixed(1)}%,
+                    únicos {(risk.sample_unique_share * 100).toFixed(1)}% · k = {risk.k_anonymity}
+                    {' '}({risk.equivalence_classes} clases)
+                  </>
+                ) : (
+                  'Evalúa el riesgo de reidentificación de los cuasi-identificadores antes de anonimizar.'
+                )}
+              </div>
+              <button
+                onClick={evaluateRisk}
+                disabled={riskLoading || !columnMappings.some(m => m.type === 'quasi-identifier')}
+                className="px-4 py-2 bg-white border border-slate-300 rounded-lg text-sm font-medium text-slate-700 hover:bg-slate-100 disabled:opacity-50"
+              >
+                {riskLoading ? 'Calculando...' : 'Evaluar riesgo'}
+              </button>
+            </div>
           </div>
         )}
 
@@ -444,23 +554,48 @@ export const ConfigurePage: React.FC<ConfigurePageProps> = ({ selectedDatasetId,
                       )}
 
                       {currentTechnique && currentTechnique.technique === 'differential_privacy' && (
-                        <div className="mt-3 pt-3 border-t border-slate-200">
-                          <label className="block text-sm font-medium text-slate-700 mb-2">
-                            Epsilon (presupuesto de privacidad)
-                          </label>
-                          <input
-                            type="number"
-                            min="0.1"
-                            max="10"
-                            step="0.1"
-                            value={currentTechnique.params.epsilon || 1.0}
-                            onChange={(e) =>
-                              updateTechnique(mapping.column, 'differential_privacy', {
-                                epsilon: parseFloat(e.target.value),
-                              })
-                            }
-                            className="w-full px-4 py-2 border border-slate-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500 outline-none"
-                          />
+                        <div className="mt-3 pt-3 border-t border-slate-200 space-y-3">
+                          <div>
+                            <label className="block text-sm font-medium text-slate-700 mb-2">
+                              Mecanismo
+                            </label>
+                            <select
+                              value={currentTechnique.params.mechanism || 'laplace'}
+                              onChange={(e) =>
+                                updateTechnique(mapping.column, 'differential_privacy', {
+                                  ...currentTechnique.params,
+                                  mechanism: e.target.value,
+                                })
+                              }
+                              className="w-full px-4 py-2 border border-slate-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500 outline-none"
+                            >
+                              <option value="laplace">Laplace (ε)</option>
+                              <option value="gaussian">Gaussiano (ε, δ)</option>
+                              <option value="geometric">Geométrico (valores enteros)</option>
+                            </select>
+                          </div>
+                          <div>
+                            <label className="block text-sm font-medium text-slate-700 mb-2">
+                              Epsilon (presupuesto de privacidad)
+                            </label>
+                            <input
+                              type="number"
+                              min="0.1"
+                              max="10"
+                              step="0.1"
+                              value={currentTechnique.params.epsilon || 1.0}
+                              onChange={(e) =>
+                                updateTechnique(mapping.column, 'differential_privacy', {
+                                  ...currentTechnique.params,
+                                  epsilon: parseFloat(e.target.value),
+                                })
+                              }
+                              className="w-full px-4 py-2 border border-slate-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500 outline-none"
+                            />
+                            <p className="mt-1 text-xs text-slate-500">
+                              Cada ejecución descuenta este epsilon del presupuesto del dataset
+                            </p>
+                          </div>
                         </div>
                       )}
 
@@ -481,7 +616,7 @@ export const ConfigurePage: React.FC<ConfigurePageProps> = ({ selectedDatasetId,
                             className="w-full px-4 py-2 border border-slate-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500 outline-none"
                           />
                           <p className="mt-1 text-xs text-slate-500">
-                            Ejemplo: USER → USER_a3b2c1, PATIENT → PATIENT_x7y8z9
+                            Ejemplo: USER → USER_a3b2c1d4e5f60718, PATIENT → PATIENT_9f8e7d6c5b4a3210
                           </p>
                         </div>
                       )}
@@ -8,7 +8,12 @@ interface Result {
   config_id: string;
   metrics: {
     k_anonymity: number;
-    l_diversity: number;
+    l_diversity: number | null;
+    entropy_l_diversity?: number | null;
+    t_closeness?: number | null;
+    equivalence_classes?: number;
+    avg_class_size?: number;
+    class_size_histogram?: Record<string, number>;
     information_loss_percentage: number;
     original_rows: number;
     anonymized_rows: number;
@@ -16,6 +21,15 @@ interface Result {
     anonymized_columns: number;
     quasi_identifiers: string[];
     sensitive_attributes: string[];
+    approximate?: boolean;
+    k_anonymity_upper_bound?: number;
+    error_bounds?: Record<string, number>;
+    privacy_budget?: {
+      epsilon_spent: number;
+      dataset_epsilon_spent: number;
+      budget_epsilon: number | null;
+      remaining_epsilon: number | null;
+    };
   };
   technique_details: Record<string, any>;
   anonymized_data: any[];
@@ -37,6 +51,8 @@ export const ResultsPage: React.FC<ResultsPageProps> = ({ selectedResultId, onNa
   const [error, setError] = useState('');
   const [dataCurrentPage, setDataCurrentPage] = useState(1);
   const dataRowsPerPage = 20;
+  // Máximo de filas anonimizadas que se piden al backend para la vista previa
+  const dataRowLimit = 500;
 
   useEffect(() => {
     fetchResults();
@@ -46,7 +62,7 @@ export const ResultsPage: React.FC<ResultsPageProps> = ({ selectedResultId, onNa
     if (selectedResultId && results.length > 0) {
       const result = results.find(r => r.id === selectedResultId);
       if (result) {
-        setSelectedResult(result);
+        selectResult(result.id);
       }
     }
   }, [selectedResultId, results]);
@@ -59,12 +75,12 @@ export const ResultsPage: React.FC<ResultsPageProps> = ({ selectedResultId, onNa
   const fetchResults = async () => {
     try {
       const apiUrl = getApiUrl();
-      const response = await fetch(`${apiUrl}/api/results`);
+      const response = await fetch(`${apiUrl}/api/results?status=completed`);
       if (response.ok) {
         const data = await response.json();
         setResults(data);
         if (data.length > 0 && !selectedResult) {
-          setSelectedResult(data[0]);
+          await selectResult(data[0].id);
         }
       } else {
         console.error('Error al cargar resultados:', response.status);
@@ -83,17 +99,31 @@ export const ResultsPage: React.FC<ResultsPageProps> = ({ selectedResultId, onNa
     }
   };
 
+  // El listado no incluye los datos anonimizados: se cargan al seleccionar un resultado
+  const selectResult = async (resultId: string) => {
+    try {
+      const apiUrl = getApiUrl();
+      const response = await fetch(`${apiUrl}/api/results/${resultId}?limit=${dataRowLimit}`);
+      if (response.ok) {
+        setSelectedResult(await response.json());
+      } else {
+        console.error('Error al cargar el resultado:', response.status);
+      }
+    } catch (error) {
+      console.error('Error fetching result:', error);
+    }
+  };
+
   const downloadResult = () => {
     if (!selectedResult) return;
 
-    const dataStr = JSON.stringify(selectedResult.anonymized_data, null, 2);
-    const blob = new Blob([dataStr], { type: 'application/json' });
-    const url = URL.createObjectURL(blob);
+    // La descarga va directamente al endpoint de exportación: el servidor envía las filas por lotes
+    // y el navegador las guarda en disco sin cargar el resultado completo en memoria
+    const apiUrl = getApiUrl();
     const link = document.createElement('a');
-    link.href = url;
-    link.download = `anonymized_data_${selectedResult.id}.json`;
+    link.href = `${apiUrl}/api/results/${selectedResult.id}/export?format=ndjson`;
+    link.download = `anonymized_data_${selectedResult.id}.ndjson`;
     link.click();
-    URL.revokeObjectURL(url);
   };
 
   if (loading) {
@@ -178,7 +208,7 @@ export const ResultsPage: React.FC<ResultsPageProps> = ({ selectedResultId, onNa
             value={selectedResult.id}
             onChange={(e) => {
               const result = results.find(r => r.id === e.target.value);
-              if (result) setSelectedResult(result);
+              if (result) selectResult(result.id);
             }}
             className="w-full px-4 py-2 border border-slate-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500 outline-none"
           >
@@ -197,12 +227,25 @@ export const ResultsPage: React.FC<ResultsPageProps> = ({ selectedResultId, onNa
             <div className="w-12 h-12 bg-green-100 rounded-lg flex items-center justify-center">
               <Shield className="w-6 h-6 text-green-600" />
             </div>
-            <div className="text-3xl font-bold text-slate-900">{selectedResult.metrics.k_anonymity}</div>
+            <div className="text-3xl font-bold text-slate-900">
+              {/* Con métricas aproximadas el k mostrado es una cota inferior conservadora */}
+              {selectedResult.metrics.approximate ? '≥' : ''}{selectedResult.metrics.k_anonymity}
+            </div>
           </div>
           <h3 className="text-sm font-medium text-slate-600">Nivel de K-Anonimato</h3>
           <p className="text-xs text-slate-500 mt-2">
             Cada registro es indistinguible de al menos {selectedResult.metrics.k_anonymity - 1} otros
           </p>
+          {selectedResult.metrics.approximate && selectedResult.metrics.k_anonymity_upper_bound != null && (
+            <p className="text-xs text-slate-500 mt-1">
+              K real entre {selectedResult.metrics.k_anonymity} y {selectedResult.metrics.k_anonymity_upper_bound}
+            </p>
+          )}
+          {selectedResult.metrics.approximate && selectedResult.metrics.error_bounds && (
+            <p className="text-xs text-amber-600 mt-1">
+              Estimado con sketches (±{selectedResult.metrics.error_bounds.class_size_overestimate} filas por clase)
+            </p>
+          )}
         </div>
 
         <div className="bg-white rounded-xl p-6 shadow-md border border-slate-200">
@@ -210,7 +253,9 @@ export const ResultsPage: React.FC<ResultsPageProps> = ({ selectedResultId, onNa
             <div className="w-12 h-12 bg-blue-100 rounded-lg flex items-center justify-center">
               <BarChart3 className="w-6 h-6 text-blue-600" />
             </div>
-            <div className="text-3xl font-bold text-slate-900">{selectedResult.metrics.l_diversity.toFixed(1)}</div>
+            <div className="text-3xl font-bold text-slate-900">
+              {selectedResult.metrics.l_diversity != null ? selectedResult.metrics.l_diversity.toFixed(1) : '—'}
+            </div>
           </div>
           <h3 className="text-sm font-medium text-slate-600">L-Diversidad</h3>
           <p className="text-xs text-slate-500 mt-2">
@@ -231,6 +276,13 @@ export const ResultsPage: React.FC<ResultsPageProps> = ({ selectedResultId, onNa
           <p className="text-xs text-slate-500 mt-2">
             Porcentaje de precisión de datos perdida durante la anonimización
           </p>
+          {selectedResult.metrics.privacy_budget && (
+            <p className="text-xs text-slate-500 mt-1">
+              ε gastado: {selectedResult.metrics.privacy_budget.epsilon_spent}
+              {selectedResult.metrics.privacy_budget.budget_epsilon != null &&
+                ` (restante ${selectedResult.metrics.privacy_budget.remaining_epsilon} de ${selectedResult.metrics.privacy_budget.budget_epsilon})`}
+            </p>
+          )}
         </div>
 
         <div className="bg-white rounded-xl p-6 shadow-md border border-slate-200">
@@ -28,6 +28,8 @@ export const UploadPage: React.FC<UploadPageProps> = ({onNavigate}) => {
     const [previewData, setPreviewData] = useState<Dataset | null>(null);
     const [previewPage, setPreviewPage] = useState(1);
     const previewRowsPerPage = 10;
+    // Máximo de filas que se piden al backend para la vista previa
+    const previewRowLimit = 500;
 
     useEffect(() => {
         fetchDatasets();
@@ -147,7 +149,7 @@ export const UploadPage: React.FC<UploadPageProps> = ({onNavigate}) => {
     const viewPreview = async (datasetId: string) => {
         try {
             const apiUrl = getApiUrl();
-            const response = await fetch(`${apiUrl}/api/datasets/${datasetId}`);
+            const response = await fetch(`${apiUrl}/api/datasets/${datasetId}?limit=${previewRowLimit}`);
             if (response.ok) {
                 const data = await response.json();
                 setPreviewData(data);